@@ -0,0 +1,51 @@
+'''
+Encoding a batch of flow_mods into one send buffer, by the builder and
+b"".join(), by ofp_flow_mod_into() into a preallocated bytearray, or by
+patching a FlowModTemplate.
+
+usage: python bench/bench_build.py [count]
+'''
+from __future__ import print_function
+import os
+import sys
+import timeit
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import twink.ofp4 as ofp4
+import twink.ofp4.build as b
+import twink.ofp4.oxm as oxm
+from twink.template import FlowModTemplate
+
+def rules(count):
+	instructions = [b.ofp_instruction_actions(ofp4.OFPIT_APPLY_ACTIONS, None,
+		[b.ofp_action_output(None, None, 2, 0xffff)])]
+	return [((4, None, None, i), i, 0, 0, ofp4.OFPFC_ADD, 0, 0, 10, None, None, None, 0,
+		b.ofp_match(None, None, oxm.build(None, oxm.OXM_OF_IN_PORT, None, None, i)),
+		instructions) for i in range(count)]
+
+def joined(args):
+	return b"".join([b.ofp_flow_mod(*a) for a in args])
+
+def into(args, buf):
+	offset = 0
+	for a in args:
+		offset += b.ofp_flow_mod_into(buf, offset, *a)
+	return offset
+
+def templated(template, count, buf):
+	offset = 0
+	for i in range(count):
+		offset += template.into(buf, offset, (i,), i, i)
+	return offset
+
+if __name__=="__main__":
+	count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+	args = rules(count)
+	buf = bytearray(128 * count)
+	assert joined(args) == buf[:into(args, buf)]
+	template = FlowModTemplate(b.ofp_flow_mod(*args[0]), "in_port")
+	assert joined(args) == buf[:templated(template, count, buf)]
+	for label, func in (("ofp_flow_mod + join", lambda: joined(args)),
+			("ofp_flow_mod_into", lambda: into(args, buf)),
+			("FlowModTemplate.into", lambda: templated(template, count, buf))):
+		t = min(timeit.repeat(func, number=20, repeat=3)) / 20
+		print("%-22s %8.2f usec/msg" % (label, t / count * 1e6))
@@ -0,0 +1,110 @@
+'''
+Classifying Ethernet frames against a flow table by Classifier, the
+tuple space search, and by a linear scan of the rules in priority order.
+
+Rules are a mix of TCP 5-tuples, IPv4 destination prefixes of /16 to /32,
+and exact MAC destinations, with a table-miss rule.
+
+usage: python bench/bench_classifier.py [count ...]
+'''
+from __future__ import print_function
+import os
+import random
+import struct
+import sys
+import time
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import twink.ofp4.build as b
+import twink.ofp4.oxm as oxm
+from twink.classifier import Classifier, frame_fields
+
+def _prefix(length):
+	return struct.pack("!I", (0xffffffff << (32 - length)) & 0xffffffff)
+
+def rules(count, rnd):
+	ret = [(0, b.ofp_match(None, None, None))]
+	for i in range(count - 1):
+		kind = i % 3
+		if kind == 0:
+			ret.append((300, b.ofp_match(None, None, [
+				oxm.build(None, oxm.OXM_OF_ETH_TYPE, None, None, 0x0800),
+				oxm.build(None, oxm.OXM_OF_IPV4_SRC, None, None, struct.pack("!I", rnd.getrandbits(32))),
+				oxm.build(None, oxm.OXM_OF_IPV4_DST, None, None, struct.pack("!I", rnd.getrandbits(32))),
+				oxm.build(None, oxm.OXM_OF_IP_PROTO, None, None, 6),
+				oxm.build(None, oxm.OXM_OF_TCP_DST, None, None, rnd.choice((22, 80, 443)))])))
+		elif kind == 1:
+			length = rnd.randint(16, 32)
+			mask = _prefix(length)
+			value = bytes(bytearray([a & m for (a, m) in zip(bytearray(struct.pack("!I", rnd.getrandbits(32))), bytearray(mask))]))
+			ret.append((100 + length, b.ofp_match(None, None, [
+				oxm.build(None, oxm.OXM_OF_ETH_TYPE, None, None, 0x0800),
+				oxm.build(None, oxm.OXM_OF_IPV4_DST, True, None, value, mask)])))
+		else:
+			ret.append((50, b.ofp_match(None, None, [
+				oxm.build(None, oxm.OXM_OF_ETH_DST, None, None, struct.pack("!HI", 2, rnd.getrandbits(32)))])))
+	return ret
+
+def frames(count, rules, rnd):
+	ret = []
+	for i in range(count):
+		(priority, match) = rnd.choice(rules)
+		fields = dict([(f.oxm_field, f.oxm_value) for f in oxm.parse_list(match, 4, struct.unpack_from("!HH", match)[1])])
+		dst = fields.get(oxm.OXM_OF_ETH_DST, b"\x02\0\0\0\0\1")
+		ip_dst = fields.get(oxm.OXM_OF_IPV4_DST, struct.pack("!I", rnd.getrandbits(32)))
+		ip_src = fields.get(oxm.OXM_OF_IPV4_SRC, struct.pack("!I", rnd.getrandbits(32)))
+		dport = fields.get(oxm.OXM_OF_TCP_DST, rnd.randint(1024, 65535))
+		ret.append(dst + b"\x02\0\0\0\0\2\x08\x00" +
+			struct.pack("!BBHHHBBH4s4s", 0x45, 0, 40, 0, 0, 64, 6, 0, ip_src, ip_dst) +
+			struct.pack("!HHIIHHHH", 40000, dport, 0, 0, 0x5000, 0, 0, 0))
+	return ret
+
+def linear(rules):
+	'''
+	@return classify function by a linear scan
+	'''
+	compiled = []
+	c = Classifier(4)
+	for (priority, match) in rules:
+		(masks, values) = c.compile(match)
+		compiled.append((priority, tuple(zip(masks, values)), match))
+	compiled.sort(key=lambda r: -r[0])
+	def classify(frame):
+		fields = frame_fields(frame)
+		for (priority, tests, match) in compiled:
+			for ((field, mask), value) in tests:
+				if field not in fields or fields[field] & mask != value:
+					break
+			else:
+				return match
+	return classify
+
+if __name__=="__main__":
+	counts = [int(a) for a in sys.argv[1:]] or [10000, 100000]
+	rnd = random.Random(1)
+	for count in counts:
+		rs = rules(count, rnd)
+		fs = frames(10000, rs, rnd)
+
+		start = time.time()
+		c = Classifier(4)
+		for (priority, match) in rs:
+			c.add(priority, match, match)
+		c.lookup({})
+		compile_time = time.time() - start
+
+		scan = linear(rs)
+		for frame in fs[:100]:
+			assert c.classify(frame) == scan(frame)
+
+		start = time.time()
+		for frame in fs:
+			c.classify(frame)
+		tss = (time.time() - start) / len(fs)
+
+		start = time.time()
+		for frame in fs[:200]:
+			scan(frame)
+		lin = (time.time() - start) / 200
+
+		print("%6d rules %4d groups: add %.2fs, tuple space %6.2f usec/frame (%d frames/s), linear scan %8.1f usec/frame" % (
+			count, len(c.groups), compile_time, tss * 1e6, 1 / tss, lin * 1e6))
@@ -0,0 +1,62 @@
+'''
+Per-message parse cost of ofp4.parse and ofp5.parse.
+
+usage: python bench/bench_parse.py [count]
+'''
+from __future__ import print_function
+import os
+import sys
+import struct
+import timeit
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import twink.ofp4 as ofp4
+import twink.ofp4.build as b4
+import twink.ofp4.parse as p4
+import twink.ofp4.oxm as oxm4
+import twink.ofp5.parse as p5
+
+def ofp4_messages():
+	match = b4.ofp_match(None, None, b"".join([
+		oxm4.build(None, oxm4.OXM_OF_IN_PORT, None, None, 1),
+		oxm4.build(None, oxm4.OXM_OF_ETH_TYPE, None, None, 0x0800),
+		oxm4.build(None, oxm4.OXM_OF_IPV4_DST, None, None, b"\x0a\0\0\1"),
+		]))
+	instructions = [b4.ofp_instruction_actions(ofp4.OFPIT_APPLY_ACTIONS, None,
+		[b4.ofp_action_output(None, None, 2, 0xffff)])]
+
+	packet_in = b4.ofp_packet_in((4, None, None, 1),
+		0xffffffff, 64, 0, 0, 0, match, b"\0"*64)
+
+	flows = [b4.ofp_flow_stats(None, 0, 1, 0, 10, 0, 0, 0, i, 100, 6400, match, instructions)
+		for i in range(16)]
+	flow_stats = b4.ofp_multipart_reply((4, None, None, 2),
+		ofp4.OFPMP_FLOW, 0, flows)
+
+	ports = [b4.ofp_port(i, b"\0\0\0\0\0\1", "eth%d" % i, 0, 0, 0, 0, 0, 0, 0, 0)
+		for i in range(48)]
+	port_desc = b4.ofp_multipart_reply((4, None, None, 3),
+		ofp4.OFPMP_PORT_DESC, 0, ports)
+
+	return (("PACKET_IN", packet_in), ("FLOW_STATS x16", flow_stats), ("PORT_DESC x48", port_desc))
+
+def ofp5_messages():
+	# OFP 1.4 PACKET_IN has the same layout
+	packet_in = ofp4_messages()[0][1]
+	return (("PACKET_IN", b"\5" + packet_in[1:]),)
+
+if __name__=="__main__":
+	count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+	for name, module, messages in (("ofp4", p4, ofp4_messages()), ("ofp5", p5, ofp5_messages())):
+		for label, message in messages:
+			module.parse(message)
+			t = min(timeit.repeat(lambda: module.parse(message), number=count, repeat=3))
+			print("%s %-15s %8.2f usec/msg" % (name, label, t / count * 1e6))
+		if name == "ofp4" and hasattr(ofp4, "view"):
+			for label, message, access in (
+					("PACKET_IN", messages[0][1], lambda v: v.buffer_id),
+					("FLOW_STATS x16", messages[1][1], lambda v: next(v.iter_body()).cookie)):
+				t = min(timeit.repeat(lambda: access(ofp4.view(message)), number=count, repeat=3))
+				print("%s %-15s %8.2f usec/msg (view, one field)" % (name, label, t / count * 1e6))
+		if hasattr(module, "parse_header_only"):
+			t = min(timeit.repeat(lambda: module.parse_header_only(message), number=count, repeat=3))
+			print("%s %-15s %8.2f usec/msg (parse_header_only)" % (name, label, t / count * 1e6))
@@ -0,0 +1,42 @@
+'''
+OpenflowBaseChannel.recv throughput over a socketpair.
+
+usage: python bench/bench_recv.py [count]
+'''
+from __future__ import print_function
+import os
+import sys
+import struct
+import threading
+import time
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import twink
+
+def writer(sock, payload, count):
+	chunk = payload * 256
+	for i in range(count // 256):
+		sock.sendall(chunk)
+	sock.close()
+
+def run(size, count, **kwargs):
+	a,b = twink.sched.socket.socketpair()
+	payload = struct.pack("!BBHI", 4, 10, size, 0) + b"\0"*(size-8)
+	th = threading.Thread(target=writer, args=(a, payload, count))
+	th.start()
+	ch = twink.OpenflowBaseChannel(socket=b, **kwargs)
+	num = 0
+	start = time.time()
+	for message in ch:
+		num += 1
+	elapsed = time.time() - start
+	th.join()
+	ch.close()
+	assert num == count // 256 * 256, num
+	return num / elapsed
+
+if __name__=="__main__":
+	count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+	for size in (8, 128, 1500):
+		print("%5d bytes: %10.0f msgs/sec" % (size, run(size, count)))
+		if hasattr(twink, "FrameBuffer"):
+			print("%5d bytes: %10.0f msgs/sec (recv_copy=False)" % (size, run(size, count, recv_copy=False)))
@@ -0,0 +1,158 @@
+import unittest
+import socket
+import struct
+import twink
+import twink.base
+import twink.ofp4.parse as ofp4p
+import twink.ofp4.build as ofp4b
+try:
+	import asyncio
+	import twink.aio
+except (ImportError, SyntaxError):
+	asyncio = None
+
+if asyncio:
+	class Switch(twink.aio.AsyncChannel, twink.AutoEchoChannel):
+		async def handle(self, message, channel):
+			msg = ofp4p.parse(message)
+			if msg.header.type == 20: # BARRIER_REQUEST
+				channel.send(twink.ofp_header_only(21, version=4, xid=msg.header.xid))
+			elif msg.header.type == 18 and msg.type == 13: # PORT_DESC
+				channel.send(ofp4b.ofp_multipart_reply(ofp4b.ofp_header(4, 19, None, msg.header.xid),
+					13, 0, ()))
+			elif msg.header.type == 18 and msg.type == 1: # FLOW
+				for cookie in range(1, 6):
+					channel.send(ofp4b.ofp_multipart_reply(ofp4b.ofp_header(4, 19, None, msg.header.xid),
+						1, int(cookie < 5), [ofp4b.ofp_flow_stats(None, 0, 0, 0, 10, 0, 0, 0, cookie, 0, 0,
+						ofp4b.ofp_match(None, None, None), None)]))
+	
+	class Controller(twink.aio.AsyncSyncChannel):
+		result = None
+		async def handle(self, message, channel):
+			if twink.parse_ofp_header(message)[1] == 0: # HELLO
+				echo = await channel.echo()
+				replies = await channel.multi([twink.ofp_header_only(2, version=4)])
+				self.result = (echo, replies)
+				channel.close()
+	
+	class Streamer(twink.aio.AsyncSyncChannel):
+		result = None
+		async def handle(self, message, channel):
+			if twink.parse_ofp_header(message)[1] == 0: # HELLO
+				request = ofp4b.ofp_multipart_request(ofp4b.ofp_header(4, 18, None, None), 1, 0,
+					ofp4b.ofp_flow_stats_request(None, None, None, None, None, None))
+				def cookies(segment):
+					return [struct.unpack_from("!Q", segment, 40)[0]]
+				self.result = [cookie async for cookie in channel.stream(request, entries=cookies, maxsize=1)]
+				self.result.append(len(channel.syncs))
+				channel.close()
+	
+	class PortMonitor(twink.aio.AsyncPortMonitorChannel):
+		result = None
+		async def handle(self, message, channel):
+			if twink.parse_ofp_header(message)[1] == 0: # HELLO
+				self.result = await channel.fetch_ports()
+				channel.close()
+
+
+@unittest.skipUnless(asyncio, "asyncio is not available")
+class AsyncioTestCase(unittest.TestCase):
+	def setUp(self):
+		self.use_asyncio = twink.base._use_asyncio
+		twink.use_asyncio()
+	
+	def tearDown(self):
+		twink.base._use_asyncio = self.use_asyncio
+	
+	def run_pair(self, cls):
+		async def main():
+			loop = asyncio.get_running_loop()
+			a,b = socket.socketpair()
+			a.setblocking(False)
+			b.setblocking(False)
+			await loop.connect_accepted_socket(Switch, a)
+			transport, ch = await loop.connect_accepted_socket(cls, b)
+			await asyncio.wait_for(ch.wait_closed(), 5)
+			return ch.result
+		return asyncio.run(main())
+	
+	def test_sync(self):
+		(echo, replies) = self.run_pair(Controller)
+		assert twink.parse_ofp_header(echo)[1] == 3
+		assert twink.parse_ofp_header(replies[0])[1] == 3
+	
+	def test_stream(self):
+		assert self.run_pair(Streamer) == [1, 2, 3, 4, 5, 0]
+	
+	def test_reconciler(self):
+		from twink.reconcile import Reconciler
+		self.assertRaises(ValueError, lambda: Reconciler(Streamer()))
+	
+	def test_port_monitor(self):
+		assert self.run_pair(PortMonitor) == ()
+	
+	def test_server(self):
+		async def main():
+			serv = twink.aio.AsyncStreamServer(("127.0.0.1", 0))
+			serv.channel_cls = Switch
+			await serv.start()
+			transport, ch = await asyncio.get_running_loop().create_connection(Controller,
+				*serv.server_address[:2])
+			await asyncio.wait_for(ch.wait_closed(), 5)
+			await serv.stop()
+			return ch.result
+		(echo, replies) = asyncio.run(main())
+		assert twink.parse_ofp_header(echo)[1] == 3
+
+	
+	def test_rate_limit(self):
+		async def main():
+			done = asyncio.Event()
+			results = []
+			def job():
+				results.append(1)
+				if len(results) == 5:
+					done.set()
+			limit = twink.RateLimit(20, burst=1)
+			for i in range(5):
+				limit.submit(10, job) # PACKET_IN
+			await asyncio.sleep(0.1)
+			early = len(results)
+			await asyncio.wait_for(done.wait(), 2)
+			return (early, limit.draining)
+		(early, draining) = asyncio.run(main())
+		assert early < 5
+		assert not draining
+	
+	def test_async_rate(self):
+		class Rated(twink.aio.AsyncChannel, twink.ParallelChannel):
+			async_rate = 20
+			accept_versions = [4]
+			def handle(self, message, channel):
+				if twink.parse_ofp_header(message)[1] == 10: # PACKET_IN
+					self.received.append(message)
+					if len(self.received) == 5:
+						channel.close()
+		
+		async def main():
+			loop = asyncio.get_running_loop()
+			a,b = socket.socketpair()
+			a.setblocking(False)
+			b.setblocking(False)
+			transport, ch = await loop.connect_accepted_socket(Rated, b)
+			ch.received = []
+			ch.async_pool = twink.RateLimit(ch.async_rate, burst=1, dispatch=ch.dispatch) # waits between the messages
+			start = loop.time()
+			await loop.sock_sendall(a, twink.ofp_header_only(0, version=4) +
+				b"".join([ofp4b.ofp_packet_in((4, None, None, i+1), 0xffffffff, 0, 0, 0, 0,
+					ofp4b.ofp_match(None, None, None), b"") for i in range(5)]))
+			await asyncio.wait_for(ch.wait_closed(), 5)
+			a.close()
+			return (len(ch.received), loop.time() - start)
+		(count, elapsed) = asyncio.run(main())
+		assert count == 5
+		assert elapsed > 0.15
+
+
+if __name__=="__main__":
+	unittest.main()
@@ -122,6 +122,137 @@ class ParallelTest(unittest.TestCase):
 		assert [r[0] for r in results
 			if p.parse(r[1][0]).header.type!=ofp4.OFPT_BARRIER_REPLY] == ["cb1", "cb2", "cb1"], results
 
+class PoolTest(unittest.TestCase):
+	def setUp(self):
+		self.sc, self.ss = socket.socketpair()
+	
+	def tearDown(self):
+		self.sc.close()
+		self.ss.close()
+	
+	def run_channel(self, handle, pool, ordered, count):
+		serv = type("PoolChannel", (twink.ParallelChannel,), {
+			"worker_pool": pool,
+			"ordered": ordered,
+			"handle": staticmethod(handle)})(socket=self.ss)
+		self.sc.send(b"".join([b.ofp_header(version=4,type=2,xid=i,length=8) for i in range(count)]))
+		self.sc.close()
+		serv.loop()
+	
+	def test_ordered(self):
+		results = []
+		done = twink.sched.Event()
+		def handle(message, channel):
+			results.append(p.parse(message).header.xid)
+			if len(results) == 100:
+				done.set()
+		
+		pool = twink.sched.Pool(4, 8)
+		self.run_channel(handle, pool, True, 100)
+		assert done.wait(5)
+		assert results == list(range(100)), results
+		assert pool.rejected == 0
+		pool.stop()
+	
+	def test_rejected(self):
+		results = []
+		ev = twink.sched.Event()
+		def handle(message, channel):
+			xid = p.parse(message).header.xid
+			if xid == 0:
+				ev.wait(5)
+			results.append(xid)
+		
+		pool = twink.sched.Pool(1, 1)
+		self.run_channel(handle, pool, False, 5)
+		assert pool.rejected >= 3 # ran in the receiving thread
+		ev.set()
+		while pool.depth or len(results) < 5:
+			twink.sched.Event().wait(0.01)
+		assert sorted(results) == list(range(5))
+		pool.stop()
+	
+	def test_rejected_count(self):
+		import threading
+		ev = twink.sched.Event()
+		started = twink.sched.Event()
+		def job():
+			started.set()
+			ev.wait(5)
+		
+		pool = twink.sched.Pool(1, 1)
+		pool.submit(job)
+		assert started.wait(5)
+		pool.submit(job) # fills the queue
+		def submit():
+			for i in range(1000):
+				pool.submit(job)
+		threads = [threading.Thread(target=submit) for i in range(4)]
+		for th in threads:
+			th.start()
+		for th in threads:
+			th.join()
+		assert pool.rejected == 4000
+		ev.set()
+		pool.stop()
+	
+	def test_rated(self):
+		import threading
+		results = []
+		done = twink.sched.Event()
+		pool = twink.sched.Pool(2, 8)
+		def handle(message, channel):
+			msg = p.parse(message)
+			if msg.header.type == ofp4.OFPT_PACKET_IN:
+				results.append((msg.header.xid, threading.current_thread() in pool.workers))
+				if len(results) == 10:
+					done.set()
+		
+		serv = type("RatedPoolChannel", (twink.ParallelChannel,), {
+			"worker_pool": pool,
+			"ordered": True,
+			"async_rate": 1000,
+			"handle": staticmethod(handle)})(socket=self.ss)
+		self.sc.send(b"".join([b.ofp_packet_in((4, None, None, i), 0xffffffff, 0, 0, 0, 0,
+			b.ofp_match(None, None, None), b"") for i in range(10)]))
+		self.sc.close()
+		serv.loop()
+		assert done.wait(5)
+		assert results == [(i, True) for i in range(10)], results
+		pool.stop()
+
+class RateLimitTest(unittest.TestCase):
+	def test_priority(self):
+		results = []
+		done = twink.sched.Event()
+		def job(name):
+			results.append(name)
+			if len(results) == 6:
+				done.set()
+		
+		limit = twink.RateLimit(50, burst=1, backlog=5)
+		for i in range(10):
+			limit.submit(ofp4.OFPT_PACKET_IN, job, "packet_in")
+		limit.submit(ofp4.OFPT_PORT_STATUS, job, "port_status")
+		
+		assert limit.dropped[ofp4.OFPT_PACKET_IN] >= 4
+		assert done.wait(2)
+		assert results.index("port_status") <= 1, results
+	
+	def test_rate(self):
+		done = twink.sched.Event()
+		results = []
+		def job():
+			results.append(1)
+			if len(results) == 5:
+				done.set()
+		
+		limit = twink.RateLimit(20, burst=1)
+		for i in range(5):
+			limit.submit(ofp4.OFPT_FLOW_REMOVED, job)
+		assert not done.wait(0.1)
+		assert done.wait(2)
+
 if __name__=="__main__":
 	import os
 	if os.environ.get("USE_GEVENT"):
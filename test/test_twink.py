@@ -1,6 +1,12 @@
 import unittest
 import struct
+import collections
+import time
 import twink
+try:
+	import numpy
+except ImportError:
+	numpy = None
 
 def timeout_pause(func):
 	def wrap(*args, **kwargs):
@@ -54,6 +60,96 @@ class ChannelTestCase(unittest.TestCase):
 		x.close()
 		y.close()
 
+	def test_cork(self):
+		a,b = twink.sched.socket.socketpair()
+		
+		x = twink.Channel(socket=a, cork=True, cork_size=24)
+		y = twink.Channel(socket=b, read_wrap=timeout_pause)
+		y._socket.settimeout(0.1)
+		
+		x.send(struct.pack("!BBHI", 4, 2, 8, 0))
+		x.send(struct.pack("!BBHI", 4, 2, 8, 1))
+		assert len(y._recv(8192)) == 0
+		x.flush()
+		assert len(y._recv(8192)) == 16
+		
+		for i in range(3):
+			x.send(struct.pack("!BBHI", 4, 2, 8, i))
+		assert len(y._recv(8192)) == 24 # cork_size reached
+		
+		x.send(struct.pack("!BBHI", 4, 2, 8, 0))
+		x.close()
+		assert len(y._recv(8192)) == 8 # flushed on close
+		
+		y.close()
+
+	def test_cork_interval(self):
+		a,b = twink.sched.socket.socketpair()
+		
+		x = twink.Channel(socket=a, cork=True, cork_interval=0.05)
+		y = twink.Channel(socket=b)
+		
+		x.send(struct.pack("!BBHI", 4, 2, 8, 0))
+		assert len(y._recv(8192)) == 8
+		
+		x.close()
+		y.close()
+
+	def test_sendmsg(self):
+		a,b = twink.sched.socket.socketpair()
+		
+		x = twink.Channel(socket=a)
+		y = twink.OpenflowBaseChannel(socket=b)
+		
+		data = bytearray(b"x"*60000)
+		messages = []
+		for i in range(20):
+			messages.append(struct.pack("!BBHI", 4, 13, 8+len(data), i))
+			messages.append(memoryview(data))
+		th = twink.sched.spawn(x.send, messages) # larger than socket buffer
+		for i in range(20):
+			msg = y.recv()
+			assert struct.unpack_from("!BBHI", msg) == (4, 13, 8+len(data), i)
+			assert msg[8:] == data
+		th.join()
+		
+		x.close()
+		y.close()
+
+	def test_overflow(self):
+		a,b = twink.sched.socket.socketpair()
+		
+		big = struct.pack("!BBHI", 4, 13, 8, 0) * (1<<19) # 4MB, larger than socket buffer
+		small = struct.pack("!BBHI", 4, 2, 8, 0)
+		for overflow in ("raise", "drop", "block"):
+			x = twink.Channel(socket=a, send_highwater=1<<20, send_overflow=overflow)
+			y = twink.Channel(socket=b)
+			
+			th = twink.sched.spawn(x.send, big)
+			while x.send_queued_bytes == 0:
+				twink.sched.Event().wait(0.01)
+			assert x.send_queued_bytes == len(big)
+			
+			if overflow == "raise":
+				self.assertRaises(twink.SendOverflow, x.send, small)
+			elif overflow == "drop":
+				x.send(small, low_priority=True)
+				assert x.send_dropped == 1
+			else:
+				th2 = twink.sched.spawn(x.send, small) # blocks until drained
+			
+			expect = len(big)
+			if overflow == "block":
+				expect += len(small)
+			received = 0
+			while received < expect:
+				received += len(y._recv(1<<20))
+			th.join()
+			if overflow == "block":
+				th2.join()
+			assert received == expect
+			assert x.send_queued_bytes == 0
+
 
 class OpenflowBaseChannelTestCase(unittest.TestCase):
 	def test_pair1(self):
@@ -101,6 +197,63 @@ class OpenflowBaseChannelTestCase(unittest.TestCase):
 		y.close()
 
 
+	def test_framing(self):
+		a,b = twink.sched.socket.socketpair()
+		
+		x = twink.Channel(socket=a)
+		y = twink.OpenflowBaseChannel(socket=b)
+		
+		big = struct.pack("!BBHI", 4, 10, 20000, 1) + b"x"*(20000-8)
+		stream = b"".join([struct.pack("!BBHI", 4, 2, 12, i)+b"abcd" for i in range(1000)]) + big
+		x.send(stream[:3])
+		x.send(stream[3:20005])
+		x.send(stream[20005:])
+		x.close()
+		
+		for i in range(1000):
+			msg = y.recv()
+			assert isinstance(msg, bytes)
+			assert struct.unpack_from("!BBHI", msg) == (4, 2, 12, i)
+		assert y.recv() == big
+		assert len(y.recv()) == 0
+		
+		y.close()
+
+	def test_nocopy(self):
+		a,b = twink.sched.socket.socketpair()
+		
+		x = twink.Channel(socket=a)
+		y = twink.OpenflowBaseChannel(socket=b, recv_copy=False)
+		
+		x.send(struct.pack("!BBHI", 4, 2, 12, 7)+b"abcd")
+		x.close()
+		
+		msg = y.recv()
+		assert isinstance(msg, memoryview)
+		assert msg.tobytes() == struct.pack("!BBHI", 4, 2, 12, 7)+b"abcd"
+		assert len(y.recv()) == 0
+		
+		y.close()
+
+	def test_batch(self):
+		a,b = twink.sched.socket.socketpair()
+		
+		x = twink.Channel(socket=a)
+		y = twink.OpenflowBaseChannel(socket=b)
+		
+		x.send(b"".join([struct.pack("!BBHI", 4, 2, 8, i) for i in range(3)]) + struct.pack("!BB", 4, 2))
+		
+		msgs = y.recv_batch()
+		assert [struct.unpack_from("!BBHI", m)[3] for m in msgs] == [0, 1, 2]
+		
+		x.send(struct.pack("!HI", 8, 3))
+		x.close()
+		assert [len(m) for m in y.iter_batches()] == [1]
+		assert y.recv_batch() == []
+		
+		y.close()
+
+
 class OpenflowChannelTestCase(unittest.TestCase):
 	def test_pair1(self):
 		a,b = twink.sched.socket.socketpair()
@@ -238,6 +391,915 @@ class ControllerChannelTestCase2(unittest.TestCase):
 		
 		xth.join(0.5)
 
+class ControllerChannelTestCase3(unittest.TestCase):
+	def test_batch(self):
+		a,b = twink.sched.socket.socketpair()
+		
+		x = twink.OpenflowBaseChannel(socket=a)
+		y = twink.ControllerChannel(socket=b)
+		y.version = 4
+		handled = TypesCapture()
+		y.handle = handled
+		chunked = TypesCapture()
+		
+		y.send(twink.ofp_header_only(2, version=4), callback=chunked)
+		y.send(twink.ofp_header_only(20, version=4))
+		
+		replies = []
+		for i in range(3):
+			(version, oftype, length, xid) = twink.parse_ofp_header(x.recv())
+			replies.append(twink.ofp_header_only(oftype+1, version=4, xid=xid))
+		x.send(b"".join(replies)) # all replies arrive in one batch
+		x.close()
+		
+		with twink.ReadWrapper(y, timeout_pause):
+			y.loop()
+		
+		assert handled.types == [21, 21]
+		assert chunked.types == [3]
+		assert y.seq == []
+		y.close()
+
+	def test_iov(self):
+		a,b = twink.sched.socket.socketpair()
+		
+		x = twink.OpenflowBaseChannel(socket=a)
+		y = twink.ControllerChannel(socket=b)
+		y.version = 4
+		
+		y.send([struct.pack("!BBHI", 4, 13, 12, 1), b"ab", b"cd"], callback=lambda m,c: None)
+		msgs = [x.recv(), x.recv()]
+		assert twink.parse_ofp_header(msgs[0])[1] == 20 # implicit barrier
+		assert msgs[1] == struct.pack("!BBHI", 4, 13, 12, 1)+b"abcd"
+		
+		x.close()
+		y.close()
+
+class BuildIovTestCase(unittest.TestCase):
+	def test_ofp4(self):
+		import twink.ofp4.build as b
+		import twink.ofp4.oxm as oxm
+		match = b.ofp_match(None, None, oxm.build(None, oxm.OXM_OF_IN_PORT, None, None, 1))
+		instructions = [b.ofp_instruction_actions(4, None, [b.ofp_action_output(None, None, 2, 0xffe5)])]
+		for iov in (False, True):
+			f = b.ofp_flow_mod((4, None, None, 1), 1, 0, 0, 0, 0, 0, 1, None, None, None, 0, match, instructions, iov=iov)
+			p = b.ofp_packet_out((4, None, None, 1), None, 1, None, None, b"p"*100, iov=iov)
+			i = b.ofp_packet_in((4, None, None, 1), 0xffffffff, 100, 0, 0, 0, match, b"p"*100, iov=iov)
+			if iov:
+				assert isinstance(f, list)
+				assert (b"".join(f), b"".join(p), b"".join(i)) == built
+			else:
+				built = (f, p, i)
+	
+	def test_ofp5(self):
+		import twink.ofp5.build as b
+		import twink.ofp5.oxm as oxm
+		match = b.ofp_match(None, None, oxm.build(None, oxm.OXM_OF_IN_PORT, None, None, 1))
+		for iov in (False, True):
+			f = b.ofp_flow_mod((5, None, None, 1), 1, 0, 0, 0, 0, 0, 1, None, None, None, 0, 0, match, b"", iov=iov)
+			p = b.ofp_packet_out((5, None, None, 1), None, 1, None, None, b"p"*100, iov=iov)
+			if iov:
+				assert isinstance(f, list)
+				assert (b"".join(f), b"".join(p)) == built
+			else:
+				built = (f, p)
+
+
+class BuildIntoTestCase(unittest.TestCase):
+	def test_ofp4(self):
+		import twink.ofp4.build as b
+		import twink.ofp4.parse as p
+		import twink.ofp4.oxm as oxm
+		match = b.ofp_match(None, None, oxm.build(None, oxm.OXM_OF_IN_PORT, None, None, 1))
+		instructions = [b.ofp_instruction_actions(4, None, [b.ofp_action_output(None, None, 2, 0xffe5)])]
+		messages = [
+			((4, None, None, 1), 1, 0, 0, 0, 0, 0, 1, None, None, None, 0, match, instructions),
+			((4, None, None, 2), 1, 0, 0, 0, 0, 0, 1, None, None, None, 0, match, None)]
+		built = [b.ofp_flow_mod(*m) for m in messages]
+		built.append(b.ofp_packet_out((4, None, None, 3), None, 1, None, [b.ofp_action_output(None, None, 2, 0)], b"p"*100))
+		
+		buf = bytearray(1024)
+		offset = 0
+		for m in messages:
+			offset += b.ofp_flow_mod_into(buf, offset, *m)
+		offset += b.ofp_packet_out_into(memoryview(buf), offset, *p.parse(built[2]))
+		assert buf[:offset] == b"".join(built)
+		
+		# parsed records are encoded through the schema
+		offset = b.ofp_flow_mod_into(buf, 0, *p.parse(built[0]))
+		assert buf[:offset] == built[0]
+		self.assertRaises(ValueError, lambda: b.ofp_packet_out_into(buf, 0, None, None, 1, None, None, b"p"*1024))
+		
+		# records of no known type are refused
+		unknown = collections.namedtuple("unknown_record", "type len")(0, 8)
+		self.assertRaises(ValueError, lambda: b.ofp_packet_out_into(buf, 0, None, None, 1, None, [unknown], b""))
+
+
+class FlowModTemplateTestCase(unittest.TestCase):
+	def test_ofp4(self):
+		import twink.ofp4.build as b
+		import twink.ofp4.oxm as oxm
+		from twink.template import FlowModTemplate
+		def flow_mod(xid, cookie, port, mac, ip):
+			match = b.ofp_match(None, None, [
+				oxm.build(None, oxm.OXM_OF_IN_PORT, None, None, port),
+				oxm.build(None, oxm.OXM_OF_ETH_DST, None, None, mac),
+				oxm.build(None, oxm.OXM_OF_ETH_TYPE, None, None, 0x0800),
+				oxm.build(None, oxm.OXM_OF_IPV4_DST, None, None, ip, b"\xff\xff\xff\0")])
+			instructions = [b.ofp_instruction_actions(4, None, [b.ofp_action_output(None, None, 2, 0xffe5)])]
+			return b.ofp_flow_mod((4, None, None, xid), cookie, 0, 0, 0, 0, 0, 1, None, None, None, 0, match, instructions)
+		
+		t = FlowModTemplate(flow_mod(0, 0, 0, b"\0"*6, b"\0"*4), "in_port", "eth_dst", oxm.OXM_OF_IPV4_DST)
+		expected = flow_mod(7, 9, 3, b"\x02"*6, b"\x0a\0\0\0")
+		assert t((3, b"\x02"*6, b"\x0a\0\0\x01"), xid=7, cookie=9) == expected # masked with /24
+		
+		buf = bytearray(len(t)*2)
+		assert t.into(buf, len(t), (3, b"\x02"*6, b"\x0a\0\0\x01"), 7, 9) == len(t)
+		assert buf[len(t):] == expected
+		
+		self.assertRaises(ValueError, lambda: FlowModTemplate(expected, "tcp_dst"))
+		self.assertRaises(ValueError, lambda: t((3,)))
+	
+	def test_ofp5(self):
+		import twink.ofp5.build as b
+		import twink.ofp5.oxm as oxm
+		from twink.template import FlowModTemplate
+		def flow_mod(xid, cookie, port):
+			match = b.ofp_match(None, None, oxm.build(None, oxm.OXM_OF_IN_PORT, None, None, port))
+			return b.ofp_flow_mod((5, None, None, xid), cookie, 0, 0, 0, 0, 0, 1, None, None, None, 0, 0, match, b"")
+		
+		t = FlowModTemplate(flow_mod(0, 0, 0), "in_port")
+		assert t((5,), 1, 2) == flow_mod(1, 2, 5)
+		assert t((5,), 1) == flow_mod(1, 0, 5)
+	
+	def test_mask(self):
+		import twink.ofp4.build as b
+		import twink.ofp4.oxm as oxm
+		from twink.template import FlowModTemplate
+		def flow_mod(ip, vid):
+			match = b.ofp_match(None, None, [
+				oxm.build(None, oxm.OXM_OF_VLAN_VID, None, None, vid, 0x1f00),
+				oxm.build(None, oxm.OXM_OF_ETH_TYPE, None, None, 0x0800),
+				oxm.build(None, oxm.OXM_OF_IPV4_DST, None, None, ip, b"\xff\0\0\0")])
+			return b.ofp_flow_mod((4, None, None, 1), 0, 0, 0, 0, 0, 0, 1, None, None, None, 0, match, None)
+		
+		t = FlowModTemplate(flow_mod(b"\0"*4, 0x1000), "vlan_vid", "ipv4_dst")
+		m = t((0x1234, b"\x0a\x01\x02\x03"), 1)
+		assert m == flow_mod(b"\x0a\0\0\0", 0x1200)
+		assert t((0x1200, b"\x0a\0\0\0"), 1) == m
+
+
+class ParseTestCase(unittest.TestCase):
+	def test_ofp4(self):
+		import twink.ofp4.build as b
+		import twink.ofp4.parse as p
+		import twink.ofp4.oxm as oxm
+		match = b.ofp_match(None, None, oxm.build(None, oxm.OXM_OF_IN_PORT, None, None, 1))
+		instructions = [b.ofp_instruction_actions(4, None, [b.ofp_action_output(None, None, 2, 0xffe5)])]
+		flow = b.ofp_flow_stats(None, 0, 1, 0, 10, 0, 0, 0, 7, 100, 6400, match, instructions)
+		msg = b.ofp_multipart_reply((4, None, None, 1), 1, 0, [flow, flow]) # OFPMP_FLOW
+		
+		x = p.parse(msg)
+		y = p.parse(msg)
+		assert type(x) is type(y)
+		assert type(x.body[0]) is type(y.body[1])
+		assert x.body[1].cookie == 7
+		assert x.body[1].instructions[0].actions[0].port == 2
+		assert x == y
+		assert p.parse_header_only(msg) == (19, 1) # MULTIPART_REPLY
+	
+	def test_experimenter(self):
+		import twink.ofp4.parse as p
+		msg = struct.pack("!BBHIII", 4, 4, 20, 1, 0x2320, 7) + b"abcd"
+		assert p.parse(msg).data == b"abcd"
+		
+		def nicira(message, cursor):
+			(length,) = struct.unpack_from("!H", message, cursor.offset+2)
+			data = message[cursor.offset+16:cursor.offset+length]
+			cursor.offset += length
+			return ("nx", data)
+		p.experimenter_parsers[(0x2320, 7)] = nicira
+		try:
+			assert p.parse(msg) == ("nx", b"abcd")
+		finally:
+			del p.experimenter_parsers[(0x2320, 7)]
+	
+	def test_ofp5(self):
+		import twink.ofp5.build as b
+		import twink.ofp5.parse as p
+		import twink.ofp5.oxm as oxm
+		match = b.ofp_match(None, None, oxm.build(None, oxm.OXM_OF_IN_PORT, None, None, 1))
+		msg = b.ofp_packet_in((5, None, None, 1), 0xffffffff, 100, 0, 0, 0, match, b"p"*100)
+		x = p.parse(msg)
+		assert type(x) is type(p.parse(msg))
+		assert x.data == b"p"*100
+
+
+class SchemaTestCase(unittest.TestCase):
+	def roundtrip(self, module):
+		schema = __import__(module+".schema", fromlist=["schema"]).schema
+		p = __import__(module+".parse", fromlist=["parse"])
+		for name, (s, fields) in schema.entries.items():
+			args = []
+			for f in fields:
+				if f.op == "==":
+					args.append(eval(f.expr, schema.namespace))
+				elif f.op:
+					args.append(None)
+				else:
+					args.append(len(args)+1)
+			if "s" in s.format:
+				args = [b"%d" % a if isinstance(a, int) else a for a in args]
+			message = schema.builder(name)(*args)
+			assert len(message) == s.size, name
+			
+			cursor = p._cursor(4)
+			record = getattr(p, name)(b"head"+message, cursor)
+			assert cursor.offset == 4+s.size, name
+			assert schema.builder(name)(*record) == message, name
+	
+	def test_ofp4(self):
+		self.roundtrip("twink.ofp4")
+		import twink.ofp4.build as b
+		import twink.ofp4.parse as p
+		ports = p.parse(b.ofp_multipart_reply((4, None, None, 1), 4, 0, # OFPMP_PORT_STATS
+			[b.ofp_port_stats(i, *range(14)) for i in range(2)])).body
+		assert [x.port_no for x in ports] == [0, 1]
+		assert ports[1].duration_nsec == 13
+	
+	def test_ofp5(self):
+		self.roundtrip("twink.ofp5")
+		import twink.ofp5.build as b
+		import twink.ofp5.parse as p
+		import twink.ofp5.oxm as oxm
+		match = b.ofp_match(None, None, oxm.build(None, oxm.OXM_OF_IN_PORT, None, None, 1))
+		flow = b.ofp_flow_stats(None, 0, 1, 0, 10, 0, 0, 0, 7, 100, 6400, match, None, importance=9)
+		x = p.parse(b.ofp_multipart_reply((5, None, None, 1), 1, 0, [flow])).body[0] # OFPMP_FLOW
+		assert (x.importance, x.cookie, x.packet_count) == (9, 7, 100)
+		flow = b.ofp_flow_stats(None, 0, 1, 0, 10, 0, 0, 0, 7, 100, 6400, match, None) # 1.4 API before importance
+		assert p.parse(b.ofp_multipart_reply((5, None, None, 1), 1, 0, [flow])).body[0].importance == 0
+		assert b.ofp_queue_desc_prop_header(1, len=4) == b.ofp_queue_desc_prop_header(1, 4) == b"\0\x01\0\x04"
+		
+		prop = b.ofp_port_stats_prop_ethernet(None, None, 1, 2, 3, 4)
+		stats = b.ofp_port_stats(None, 3, 10, 0, *(list(range(8))+[[prop]]))
+		x = p.ofp_port_stats(stats, 0)
+		assert (x.length, x.port_no, x.tx_errors) == (120, 3, 7)
+		assert x.properties[0].collisions == 4
+		
+		prop = b.ofp_port_desc_prop_ethernet(None, None, 1, 2, 3, 4, 5, 6)
+		x = p.ofp_port(b.ofp_port(1, None, b"\0"*6, b"eth1", 0, 0, [prop]), 0)
+		assert (x.name, x.properties[0].max_speed) == (b"eth1", 6)
+		
+		x = p.ofp_table_stats(b.ofp_table_stats(1, 2, 3, 4), 0)
+		assert (x.active_count, x.matched_count) == (2, 4)
+	
+	def test_schema(self):
+		from twink.schema import Schema
+		self.assertRaises(ValueError, lambda: Schema("x HH a", {}))
+		s = Schema('''
+		# comment
+		x HHI a==1 b:=8
+			c=LIMIT
+		'''.replace("\t\t", ""), dict(LIMIT=5))
+		assert s.builder("x")(None, None, None) == struct.pack("!HHI", 1, 8, 5)
+		self.assertRaises(AssertionError, lambda: s.builder("x")(2, None, None))
+		assert s.parser("x")(struct.pack("!HHI", 1, 8, 5), 0) == (1, 8, 5)
+
+
+class OxmCodecTestCase(unittest.TestCase):
+	def roundtrip(self, oxm):
+		tlvs = []
+		for (name, field) in oxm.oxm_ofb_match_fields.items():
+			bits = oxm._bits(field)
+			value = b"\x01"*int(bits[:-1]) if bits.endswith("s") else 1
+			for mask in (None, value):
+				tlvs.append(oxm.build(None, field, None, None, value, mask))
+				expected = oxm.oxm(oxm.OFPXMC_OPENFLOW_BASIC, field, int(mask is not None),
+					struct.calcsize("!"+bits*(1 if mask is None else 2)), value, mask)
+				assert oxm.parse(tlvs[-1]) == expected
+		records = oxm.parse_list(b"".join(tlvs))
+		assert [oxm.build(*r) for r in records] == tlvs
+		
+		# walks the oxm fields in place, and leaves padding
+		assert oxm.parse_list(b"\0"*4 + b"".join(tlvs[:3]) + b"\0"*4, 4, 4+len(b"".join(tlvs[:3]))) == records[:3]
+		assert oxm.lookup(oxm.OFPXMC_OPENFLOW_BASIC, oxm.OXM_OF_MPLS_LABEL, 0).length == 4
+		
+		oxm.register_experimenter(0x12345678, lambda message, offset: ("exp", message[offset+8:offset+10]))
+		try:
+			tlv = struct.pack("!HBBI2s", oxm.OFPXMC_EXPERIMENTER, 2, 6, 0x12345678, b"xy")
+			assert oxm.parse_list(tlv + tlvs[0]) == [("exp", b"xy"), records[0]]
+		finally:
+			del oxm.experimenters[0x12345678]
+		self.assertRaises(ValueError, lambda: oxm.parse(tlv))
+	
+	def test_ofp4(self):
+		import twink.ofp4.oxm as oxm
+		self.roundtrip(oxm)
+		tlv = oxm.build_stratos(None, oxm.STRATOS_OXM_FIELD_BASIC, None, None,
+			oxm.STRATOS_EXPERIMENTER_ID, oxm.STROXM_BASIC_DOT11, 1)
+		assert oxm.parse(tlv) == oxm.stratos(oxm.OFPXMC_EXPERIMENTER, oxm.STRATOS_OXM_FIELD_BASIC, 0, 7,
+			oxm.STRATOS_EXPERIMENTER_ID, oxm.STROXM_BASIC_DOT11, 1, None)
+		tlv = oxm.build_stratos(None, oxm.STRATOS_OXM_FIELD_BASIC, None, None,
+			oxm.STRATOS_EXPERIMENTER_ID, oxm.STROXM_BASIC_DOT11_SSID, b"ab", b"\xff\0")
+		assert oxm.parse(tlv).value == b"ab"
+		assert oxm.parse(tlv).mask == b"\xff\0"
+	
+	def test_ofp5(self):
+		import twink.ofp5.oxm as oxm
+		self.roundtrip(oxm)
+
+
+class MatchKeyTestCase(unittest.TestCase):
+	def test_canonical(self):
+		import twink.ofp4.oxm as oxm
+		a = b"".join([oxm.build(None, oxm.OXM_OF_IN_PORT, None, None, 1),
+			oxm.build(None, oxm.OXM_OF_ETH_TYPE, None, None, 0x0800),
+			oxm.build(None, oxm.OXM_OF_IPV4_DST, None, None, b"\x0a\0\0\x01", b"\xff\xff\xff\0"),
+			oxm.build(None, oxm.OXM_OF_VLAN_VID, None, None, 0x1005, 0x1fff)])
+		b = b"".join([oxm.build(None, oxm.OXM_OF_VLAN_VID, None, None, 0x1005),
+			oxm.build(None, oxm.OXM_OF_IPV4_DST, None, None, b"\x0a\0\0\x02", b"\xff\xff\xff\0"),
+			oxm.build(None, oxm.OXM_OF_ETH_TYPE, None, None, 0x0800),
+			oxm.build(None, oxm.OXM_OF_TCP_DST, None, None, 80, 0),
+			oxm.build(None, oxm.OXM_OF_IN_PORT, None, None, 1)])
+		assert oxm.canonical(a) == oxm.canonical(b) == oxm.canonical(oxm.parse_list(b))
+		assert oxm.canonical(a)[-1] == (oxm.OFPXMC_OPENFLOW_BASIC, oxm.OXM_OF_IPV4_DST, b"\x0a\0\0\0", b"\xff\xff\xff\0")
+		assert oxm.canonical(a) != oxm.canonical(a[:8])
+		assert hash(oxm.canonical(a)) == hash(oxm.canonical(b))
+	
+	def test_cache(self):
+		import twink.ofp5.build as b
+		import twink.ofp5.parse as p
+		import twink.ofp5.oxm as oxm
+		from twink.match import MatchCache, key
+		matches = [b.ofp_match(None, None, oxm.build(None, oxm.OXM_OF_IN_PORT, None, None, i)) for i in range(3)]
+		cache = MatchCache(version=5, size=2)
+		keys = [cache.match_key(m) for m in matches]
+		assert keys[0] == key(5, p.ofp_match(matches[0], 0).oxm_fields)
+		assert cache.match_key(p.ofp_match(matches[2], 0)) is keys[2]
+		assert cache.key(memoryview(matches[1])[4:12]) is keys[1]
+		assert (cache.hits, cache.misses, len(cache)) == (2, 3, 2)
+		cache.match_key(matches[0]) # evicted
+		assert (cache.hits, cache.misses) == (2, 4)
+		assert matches[2][4:12] not in cache.entries
+
+
+class LazyViewTestCase(unittest.TestCase):
+	def setUp(self):
+		import twink.ofp4.build as b
+		import twink.ofp4.oxm as oxm
+		self.match = b.ofp_match(None, None, oxm.build(None, oxm.OXM_OF_IN_PORT, None, None, 1))
+		self.instructions = [b.ofp_instruction_actions(4, None, [b.ofp_action_output(None, None, 2, 0xffe5)])]
+	
+	def test_packet_in(self):
+		import twink.ofp4 as ofp4
+		import twink.ofp4.build as b
+		import twink.ofp4.parse as p
+		msg = b.ofp_packet_in((4, None, None, 1), 0xffffffff, 100, 0, 3, 5, self.match, b"p"*100)
+		v = ofp4.view(msg)
+		assert "match" not in v.__dict__
+		assert v.buffer_id == 0xffffffff
+		assert "match" not in v.__dict__
+		x = p.parse(msg)
+		assert (v.header, v.table_id, v.cookie, v.match, v.data) == (x.header, x.table_id, x.cookie, x.match, x.data)
+	
+	def test_flow_mod(self):
+		import twink.ofp4 as ofp4
+		import twink.ofp4.build as b
+		import twink.ofp4.parse as p
+		msg = b.ofp_flow_mod((4, None, None, 1), 1, 0, 0, 0, 0, 0, 1, None, None, None, 0, self.match, self.instructions)
+		v = ofp4.view(msg)
+		x = p.parse(msg)
+		assert v.priority == x.priority
+		assert list(v.iter_instructions()) == x.instructions
+		assert v.instructions == x.instructions
+	
+	def test_multipart(self):
+		import twink.ofp4 as ofp4
+		import twink.ofp4.build as b
+		import twink.ofp4.parse as p
+		flows = [b.ofp_flow_stats(None, 0, 1, 0, 10, 0, 0, 0, i, 100, 6400, self.match, self.instructions)
+			for i in range(3)]
+		msg = b.ofp_multipart_reply((4, None, None, 1), ofp4.OFPMP_FLOW, 0, flows)
+		v = ofp4.view(msg)
+		assert v.type == ofp4.OFPMP_FLOW
+		it = v.iter_body()
+		assert next(it).cookie == 0
+		assert [f.cookie for f in it] == [1, 2]
+		assert v.body == p.parse(msg).body
+		
+		msg = b.ofp_multipart_reply((4, None, None, 1), ofp4.OFPMP_DESC, 0, b.ofp_desc(b"a", b"b", b"c", b"d", b"e"))
+		self.assertRaises(ValueError, lambda: list(ofp4.view(msg).iter_body()))
+	
+	def test_fallback(self):
+		import twink.ofp4 as ofp4
+		msg = twink.ofp_header_only(2, version=4) # ECHO_REQUEST
+		assert ofp4.view(msg).data == b""
+	
+	def test_exports(self):
+		import twink.ofp4 as ofp4
+		import twink.ofp4.build as b
+		import twink.ofp4.parse as p
+		ofp4.view(twink.ofp_header_only(2, version=4))
+		assert "view" not in vars(ofp4)
+		assert not hasattr(b, "view") and not hasattr(p, "view")
+
+
+@unittest.skipUnless(numpy, "numpy is not available")
+class StatsNumpyTestCase(unittest.TestCase):
+	def test_ofp4(self):
+		import twink.ofp4 as ofp4
+		import twink.ofp4.build as b
+		import twink.ofp4.parse as p
+		import twink.ofp4.oxm as oxm
+		import twink.ofp4.stats_np as s
+		ports = [b.ofp_port_stats(i, 1, 2, 3, i*100, 5, 6, 7, 8, 9, 10, 11, 12, 13, 500000000)
+			for i in range(4)]
+		data = b"".join([
+			b.ofp_multipart_reply((4, None, None, 1), ofp4.OFPMP_PORT_STATS, ofp4.OFPMPF_REPLY_MORE, ports[:2]),
+			b.ofp_multipart_reply((4, None, None, 1), ofp4.OFPMP_PORT_STATS, 0, ports[2:])])
+		rows = s.port_stats(data)
+		assert len(rows) == 4
+		assert list(rows["tx_bytes"]) == [0, 100, 200, 300]
+		assert list(s.duration(rows)) == [13.5]*4
+		assert rows[3]["port_no"] == 3 and rows[3]["collisions"] == 12
+		
+		msg = b.ofp_multipart_reply((4, None, None, 1), ofp4.OFPMP_TABLE, 0,
+			[b.ofp_table_stats(i, 1, 2, 3) for i in range(3)])
+		assert list(s.table_stats(msg)["table_id"]) == [0, 1, 2]
+		self.assertRaises(ValueError, lambda: s.port_stats(msg))
+		
+		match = b.ofp_match(None, None, oxm.build(None, oxm.OXM_OF_IN_PORT, None, None, 1))
+		flows = [b.ofp_flow_stats(None, 0, 1, 0, 10, 0, 0, 0, i, 100, 6400,
+			match if i % 2 else b.ofp_match(None, None, None), None) for i in range(5)]
+		msg = b.ofp_multipart_reply((4, None, None, 1), ofp4.OFPMP_FLOW, 0, flows)
+		(rows, offsets) = s.flow_stats(msg)
+		x = p.parse(msg)
+		assert list(rows["cookie"]) == [f.cookie for f in x.body]
+		assert p.ofp_match(s.flow_match(msg, offsets[1]), 0) == x.body[1].match
+	
+	def test_ofp5(self):
+		import twink.ofp5 as ofp5
+		import twink.ofp5.stats_np as s
+		prop = struct.pack("!HH4x4Q", ofp5.OFPPSPT_ETHERNET, 40, 1, 2, 3, 4)
+		rows = [struct.pack("!H2xIII8Q", 80+len(prop), i, 10, 0, 1, 2, 3, i*100, 5, 6, 7, 8) + prop
+			for i in range(3)]
+		body = struct.pack("!HH4x", ofp5.OFPMP_PORT_STATS, 0) + b"".join(rows)
+		data = struct.pack("!BBHI", 5, ofp5.OFPT_MULTIPART_REPLY, 8+len(body), 1) + body
+		(rows, offsets) = s.port_stats(data)
+		assert list(rows["tx_bytes"]) == [0, 100, 200]
+		assert list(offsets) == [16, 136, 256]
+
+
+@unittest.skipUnless(numpy, "numpy is not available")
+class StatsPollerTestCase(unittest.TestCase):
+	def port_stats(self, counts, xid=1):
+		import twink.ofp4 as ofp4
+		import twink.ofp4.build as b
+		return b.ofp_multipart_reply((4, None, None, xid), ofp4.OFPMP_PORT_STATS, 0,
+			[b.ofp_port_stats(port_no, 0, 0, 0, tx_bytes, 0, 0, 0, 0, 0, 0, 0, 0, sec, 0)
+				for (port_no, tx_bytes, sec) in counts])
+	
+	def test_delta_rates(self):
+		import twink.stats as stats
+		prev = stats.sample(4, "port", self.port_stats([(1, 100, 10), (2, 2**64-100, 10), (3, 500, 10)]), 0.0)
+		cur = stats.sample(4, "port", self.port_stats([(4, 0, 0), (3, 50, 2), (2, 100, 15), (1, 300, 12)]), 5.0)
+		r = stats.delta_rates(prev, cur, stats.counters["port"])
+		assert list(r.keys) == [4, 3, 2, 1]
+		tx = r.delta["tx_bytes"]
+		assert numpy.isnan(tx[0]) # new port
+		assert list(tx[1:]) == [50, 200, 200] # restarted, wrapped, normal
+		assert list(r.interval[1:]) == [2, 5, 2]
+		assert list(r.rate["tx_bytes"][1:]) == [25, 40, 100]
+		assert numpy.isnan(r.rate["rx_packets"][0])
+		
+		cur = stats.sample(4, "port", self.port_stats([(1, 2**64-1, 12)]), 5.0)
+		assert numpy.isnan(stats.delta_rates(prev, cur, stats.counters["port"]).delta["tx_bytes"][0])
+	
+	def test_flow(self):
+		import twink.ofp4 as ofp4
+		import twink.ofp4.build as b
+		import twink.ofp4.oxm as oxm
+		import twink.stats as stats
+		def reply(byte_counts):
+			flows = [b.ofp_flow_stats(None, 0, 10, 0, 10, 0, 0, 0, 7, 1, byte_count,
+				b.ofp_match(None, None, oxm.build(None, oxm.OXM_OF_IN_PORT, None, None, in_port)), None)
+				for (in_port, byte_count) in byte_counts]
+			return b.ofp_multipart_reply((4, None, None, 1), ofp4.OFPMP_FLOW, 0, flows)
+		prev = stats.sample(4, "flow", reply([(1, 100), (2, 100)]), 0.0)
+		cur = stats.sample(4, "flow", reply([(2, 600), (1, 100)]), 5.0)
+		r = stats.delta_rates(prev, cur, stats.counters["flow"])
+		assert list(r.rate["byte_count"]) == [100, 0] # duration is not moving
+	
+	def test_poller(self):
+		import twink.stats as stats
+		test = self
+		class Channel(object):
+			version = 4
+			datapath = 1
+			closed = False
+			polls = 0
+			def multi(self, messages):
+				self.polls += 1
+				count = self.polls * 1000
+				return [test.port_stats([(1, count, self.polls)], struct.unpack_from("!I", messages[0], 4)[0])]
+		
+		ch = Channel()
+		poller = stats.StatsPoller(interval=0.05, kinds=("port",), workers=2)
+		poller.start()
+		try:
+			poller.add(ch)
+			for i in range(100):
+				if poller.rates(1, "port"):
+					break
+				time.sleep(0.02)
+		finally:
+			poller.stop()
+		assert poller.rate(1, "port", 1)["tx_bytes"] == 1000.0
+		assert poller.rate(1, "port", 2) is None
+
+
+class FlowProgrammerTestCase(unittest.TestCase):
+	def run_pair(self, version, switch, controller):
+		a,b = twink.sched.socket.socketpair()
+		x = type("FlowProgrammerX", (twink.SyncChannel,), {"accept_versions": [version]})(socket=a)
+		x.handle = controller
+		y = type("FlowProgrammerY", (twink.OpenflowServerChannel,), {"accept_versions": [version]})(socket=b)
+		y.handle = switch
+		
+		x.start()
+		y.start()
+		xl = twink.sched.spawn(x.loop)
+		yl = twink.sched.spawn(y.loop)
+		xl.join()
+		yl.join()
+		x.close()
+		y.close()
+	
+	def flow_mods(self, version, count):
+		if version == 4:
+			import twink.ofp4.build as b
+			match = b.ofp_match(None, None, None)
+			return [b.ofp_flow_mod((4, None, None, i+1), i, 0, 0, 0, 0, 0, 1, None, None, None, 0, match, None)
+				for i in range(count)]
+		else:
+			import twink.ofp5.build as b
+			match = b.ofp_match(None, None, None)
+			return [b.ofp_flow_mod((5, None, None, i+1), i, 0, 0, 0, 0, 0, 1, None, None, None, 0, 0, match, None)
+				for i in range(count)]
+	
+	def test_barrier(self):
+		from twink.programmer import FlowProgrammer
+		flow_mods = self.flow_mods(4, 100)
+		received = []
+		def switch(message, channel):
+			(version, oftype, length, xid) = twink.parse_ofp_header(message)
+			if oftype == 14: # FLOW_MOD
+				received.append(xid)
+				if struct.unpack_from("!Q", message, 8)[0] == 42:
+					channel.send(struct.pack("!BBHIHH", 4, 1, 12, xid, 5, 0)) # FLOW_MOD_FAILED
+			elif oftype == 20: # BARRIER_REQUEST
+				channel.send(struct.pack("!BBHI", 4, 21, 8, xid))
+		
+		results = []
+		def controller(message, channel):
+			if twink.parse_ofp_header(message)[1] == 0: # HELLO
+				results.append(FlowProgrammer(channel, batch=16, window=2).program(iter(flow_mods)))
+				results.append(len(channel.syncs))
+				channel.close()
+		
+		self.run_pair(4, switch, controller)
+		(result, syncs) = results
+		assert received == list(range(1, 101))
+		assert result.count == 100
+		assert [(m, e[8:10]) for (m, e) in result.errors] == [(flow_mods[42], b"\0\x05")]
+		assert result.rate > 0
+		assert syncs == 0
+	
+	def test_window(self):
+		from twink.programmer import FlowProgrammer
+		flow_mods = self.flow_mods(4, 40) # batches of 16, 16 and 8
+		held = []
+		lock = twink.sched.Lock()
+		outstanding = [0]
+		def reply_later(channel):
+			time.sleep(0.1)
+			with lock:
+				for xid in held:
+					channel.send(struct.pack("!BBHI", 4, 21, 8, xid))
+				del held[:]
+		
+		def switch(message, channel):
+			(version, oftype, length, xid) = twink.parse_ofp_header(message)
+			if oftype == 20: # BARRIER_REQUEST
+				with lock:
+					held.append(xid)
+					outstanding[0] = max(outstanding[0], len(held))
+					if len(held) == 1:
+						twink.sched.spawn(reply_later, channel)
+		
+		results = []
+		def controller(message, channel):
+			if twink.parse_ofp_header(message)[1] == 0: # HELLO
+				results.append(FlowProgrammer(channel, batch=16, window=2).program(flow_mods))
+				channel.close()
+		
+		self.run_pair(4, switch, controller)
+		assert results[0].count == 40
+		assert outstanding[0] == 2
+	
+	def test_bundle(self):
+		import twink.ofp5 as ofp5
+		from twink.programmer import FlowProgrammer
+		flow_mods = self.flow_mods(5, 10)
+		bundles = {}
+		def switch(message, channel):
+			(version, oftype, length, xid) = twink.parse_ofp_header(message)
+			if oftype == ofp5.OFPT_BUNDLE_CONTROL:
+				(bundle_id, type, flags) = struct.unpack_from("!IHH", message, 8)
+				if type == ofp5.OFPBCT_OPEN_REQUEST:
+					bundles[bundle_id] = []
+					channel.send(struct.pack("!BBHIIHH", 5, oftype, 16, xid, bundle_id, type+1, flags))
+				elif type == ofp5.OFPBCT_COMMIT_REQUEST:
+					if None in bundles[bundle_id]:
+						channel.send(struct.pack("!BBHIHH", 5, 1, 12, xid, ofp5.OFPET_BUNDLE_FAILED, ofp5.OFPBFC_MSG_FAILED))
+					else:
+						channel.send(struct.pack("!BBHIIHH", 5, oftype, 16, xid, bundle_id, type+1, flags))
+			elif oftype == ofp5.OFPT_BUNDLE_ADD_MESSAGE:
+				(bundle_id,) = struct.unpack_from("!I", message, 8)
+				if struct.unpack_from("!Q", message, 24)[0] == 7:
+					bundles[bundle_id].append(None)
+					channel.send(struct.pack("!BBHIHH", 5, 1, 12, xid, 5, 0))
+				else:
+					bundles[bundle_id].append(xid)
+		
+		results = []
+		def controller(message, channel):
+			if twink.parse_ofp_header(message)[1] == 0: # HELLO
+				results.append(FlowProgrammer(channel, batch=4, bundle=True).program(flow_mods))
+				channel.close()
+		
+		self.run_pair(5, switch, controller)
+		(result,) = results
+		assert sorted(bundles) == [1, 2, 3]
+		assert bundles[1] == [1, 2, 3, 4]
+		assert [m for (m, e) in result.errors][0] == flow_mods[7]
+		assert struct.unpack_from("!IH", result.errors[1][0], 8) == (2, ofp5.OFPBCT_COMMIT_REQUEST)
+		assert len(result.errors) == 2
+
+
+class FlowTableTestCase(unittest.TestCase):
+	def flow_mod(self, command, table_id, priority, cookie, fields, port=None, group=None,
+			cookie_mask=0, out_port=None):
+		import twink.ofp4.build as b
+		import twink.ofp4.oxm as oxm
+		actions = []
+		if port is not None:
+			actions.append(b.ofp_action_output(None, None, port, 0))
+		if group is not None:
+			actions.append(b.ofp_action_group(None, None, group))
+		match = b.ofp_match(None, None, [oxm.build(None, f, None, None, v) for (f, v) in fields])
+		return b.ofp_flow_mod(None, cookie, cookie_mask, table_id, command, 0, 0, priority,
+			None, out_port, None, 0, match, [b.ofp_instruction_actions(4, None, actions)])
+	
+	def test_flow_mod(self):
+		import twink.ofp4 as ofp4
+		import twink.ofp4.build as b
+		import twink.ofp4.oxm as oxm
+		from twink.flowtable import FlowTable
+		(IN_PORT, ETH_TYPE) = (oxm.OXM_OF_IN_PORT, oxm.OXM_OF_ETH_TYPE)
+		t = FlowTable(4)
+		t.flow_mod(self.flow_mod(ofp4.OFPFC_ADD, 0, 10, 0xab01, [(IN_PORT, 1)], port=2))
+		t.flow_mod(self.flow_mod(ofp4.OFPFC_ADD, 0, 10, 0xab02, [(ETH_TYPE, 0x0800), (IN_PORT, 1)], port=3))
+		t.flow_mod(self.flow_mod(ofp4.OFPFC_ADD, 0, 20, 0xcd01, [(IN_PORT, 2)], group=5))
+		t.flow_mod(self.flow_mod(ofp4.OFPFC_ADD, 1, 10, 0xab03, [(IN_PORT, 1)], port=2))
+		t.flow_mod(self.flow_mod(ofp4.OFPFC_ADD, 1, 10, 0xab04, [(IN_PORT, 1)], port=2)) # replaces
+		assert len(t) == 4
+		
+		a = b.ofp_match(None, None, [oxm.build(None, ETH_TYPE, None, None, 0x0800), oxm.build(None, IN_PORT, None, None, 1)])
+		assert t.get(0, 10, a).cookie == 0xab02
+		assert t.get(0, 11, a) is None
+		assert sorted([f.cookie for f in t.cookies(0xab00, 0xff00)]) == [0xab01, 0xab02, 0xab04]
+		assert [f.cookie for f in t.cookies(0xcd01)] == [0xcd01]
+		assert [f.cookie for f in t.select(out_group=5)] == [0xcd01]
+		
+		t.flow_mod(self.flow_mod(ofp4.OFPFC_MODIFY, 0, 0, 0, [(IN_PORT, 1)], port=9))
+		assert sorted([(f.cookie, tuple(f.ports)) for f in t.select(0)]) == [(0xab01, (9,)), (0xab02, (9,)), (0xcd01, ())]
+		t.flow_mod(self.flow_mod(ofp4.OFPFC_MODIFY_STRICT, 0, 10, 0xab01, [(IN_PORT, 1)], port=8, cookie_mask=0xffff))
+		assert t.get(0, 10, a).ports == frozenset([9])
+		assert t.cookies(0xab01)[0].ports == frozenset([8])
+		
+		t.flow_mod(self.flow_mod(ofp4.OFPFC_DELETE, ofp4.OFPTT_ALL, 0, 0, [], out_port=2))
+		assert t.cookies(0xab04) == []
+		t.flow_mod(self.flow_mod(ofp4.OFPFC_DELETE_STRICT, 0, 10, 0xffff, [(IN_PORT, 1)], cookie_mask=0xffff))
+		assert len(t) == 3
+		t.flow_mod(self.flow_mod(ofp4.OFPFC_DELETE, 0, 0, 0xab00, [(IN_PORT, 1)], cookie_mask=0xff00))
+		assert [f.cookie for f in t] == [0xcd01]
+		
+		t.flow_removed(b.ofp_flow_removed(None, 0xcd01, 20, 0, 0, 0, 0, 0, 0, 0, 0,
+			b.ofp_match(None, None, oxm.build(None, IN_PORT, None, None, 2))))
+		assert len(t) == 0 and t.cookie_list == [] and t.tables == {}
+	
+	def test_mirror_requests(self):
+		import twink.ofp4.build as b
+		from twink.flowtable import FlowTableMirror
+		ch = type("FlowTableMirrorZ", (FlowTableMirror,), {})(sendto=lambda m, a: None, flow_request_timeout=0.05)
+		ch.version = 4
+		def request():
+			return b.ofp_multipart_request((4, None, None, None), 1, 0, # OFPMP_FLOW
+				b.ofp_flow_stats_request(None, None, None, None, None, None))
+		ch.send(request())
+		time.sleep(0.1)
+		ch.send(request()) # the first one without reply is pruned
+		assert len(ch._flow_requests) == 1
+		ch.close()
+		assert ch._flow_requests == {}
+	
+	def test_mirror(self):
+		import twink.ofp4 as ofp4
+		import twink.ofp4.build as b
+		import twink.ofp4.oxm as oxm
+		from twink.flowtable import FlowTableMirror
+		def match(port):
+			return b.ofp_match(None, None, oxm.build(None, oxm.OXM_OF_IN_PORT, None, None, port))
+		
+		def switch(message, channel):
+			(version, oftype, length, xid) = twink.parse_ofp_header(message)
+			if oftype == 18: # MULTIPART_REQUEST
+				for (more, port) in ((1, 5), (0, 6)):
+					channel.send(b.ofp_multipart_reply((4, None, None, xid), ofp4.OFPMP_FLOW, more,
+						[b.ofp_flow_stats(None, 0, 1, 0, 10, 0, 0, 0, port, 0, 0, match(port), None)]))
+				channel.send(b.ofp_flow_removed(None, 6, 10, 0, 0, 0, 0, 0, 0, 0, 0, match(6)))
+			elif oftype == 20: # BARRIER_REQUEST
+				channel.send(struct.pack("!BBHI", 4, 21, 8, xid))
+		
+		results = []
+		def controller(message, channel):
+			if twink.parse_ofp_header(message)[1] == 0: # HELLO
+				channel.send(self.flow_mod(ofp4.OFPFC_ADD, 0, 10, 1, [(oxm.OXM_OF_IN_PORT, 1)], port=2))
+				results.append([f.cookie for f in channel.flow_table])
+				channel.single(b.ofp_multipart_request((4, None, None, None), ofp4.OFPMP_FLOW, 0,
+					b.ofp_flow_stats_request(None, None, None, None, None, None)))
+				results.append([f.cookie for f in channel.flow_table])
+				channel.close()
+		
+		a,b_ = twink.sched.socket.socketpair()
+		x = type("FlowTableMirrorX", (twink.SyncChannel, FlowTableMirror), {})(socket=a)
+		x.handle = controller
+		y = type("FlowTableMirrorY", (twink.OpenflowServerChannel,), {})(socket=b_)
+		y.handle = switch
+		x.start()
+		y.start()
+		xl = twink.sched.spawn(x.loop)
+		yl = twink.sched.spawn(y.loop)
+		xl.join()
+		yl.join()
+		x.close()
+		y.close()
+		assert results == [[1], [5]] # replaced by the flow stats, and 6 removed before the barrier of single()
+
+class ReconcileTestCase(unittest.TestCase):
+	def flow_mod(self, priority, cookie, port, out):
+		import twink.ofp4.build as b
+		import twink.ofp4.oxm as oxm
+		match = b.ofp_match(None, None, oxm.build(None, oxm.OXM_OF_IN_PORT, None, None, port))
+		return b.ofp_flow_mod(None, cookie, 0, 0, 0, 0, 0, priority, None, None, None, 0, match,
+			[b.ofp_instruction_actions(4, None, [b.ofp_action_output(None, None, out, 0)])])
+	
+	def test_diff(self):
+		from twink.flowtable import FlowTable
+		from twink.reconcile import diff
+		want = FlowTable(4)
+		have = FlowTable(4)
+		for m in (self.flow_mod(10, 1, 1, 2), self.flow_mod(10, 1, 2, 3), self.flow_mod(10, 1, 3, 4), self.flow_mod(10, 1, 4, 5)):
+			want.flow_mod(m)
+		for m in (self.flow_mod(10, 1, 1, 2), self.flow_mod(10, 1, 2, 9), self.flow_mod(10, 2, 3, 4), self.flow_mod(20, 1, 4, 5)):
+			have.flow_mod(m)
+		(add, modify, delete) = diff(want, have)
+		assert sorted([(f.priority, f.cookie, f.ports) for f in add]) == [(10, 1, frozenset([4])), (10, 1, frozenset([5]))]
+		assert [(f.priority, f.ports) for f in modify] == [(10, frozenset([3]))]
+		assert [(f.priority, f.ports) for f in delete] == [(20, frozenset([5]))]
+	
+	def test_reconcile(self):
+		import twink.ofp4 as ofp4
+		import twink.ofp4.build as b
+		from twink.flowtable import FlowTable
+		from twink.reconcile import Reconciler
+		
+		table = FlowTable(4)
+		for m in (self.flow_mod(10, 0xab01, 1, 2), self.flow_mod(10, 0xab02, 2, 9),
+				self.flow_mod(10, 0xab03, 3, 4), self.flow_mod(10, 0xcd01, 4, 5)):
+			table.flow_mod(m)
+		commands = []
+		def switch(message, channel):
+			(version, oftype, length, xid) = twink.parse_ofp_header(message)
+			if oftype == 14: # FLOW_MOD
+				commands.append(struct.unpack_from("!B", message, 25)[0])
+				table.flow_mod(message)
+			elif oftype == 18: # MULTIPART_REQUEST
+				(cookie, cookie_mask) = struct.unpack_from("!QQ", message, 32)
+				flows = [f for f in table if f.cookie & cookie_mask == cookie]
+				for i, f in enumerate(flows):
+					channel.send(b.ofp_multipart_reply((4, None, None, xid), ofp4.OFPMP_FLOW,
+						int(i < len(flows)-1), [b.ofp_flow_stats(None, f.table_id, 0, 0, f.priority,
+						f.idle_timeout, f.hard_timeout, f.flags, f.cookie, 0, 0, f.match, f.instructions)]))
+			elif oftype == 20: # BARRIER_REQUEST
+				channel.send(struct.pack("!BBHI", 4, 21, 8, xid))
+		
+		desired = [self.flow_mod(10, 0xab01, 1, 2), self.flow_mod(10, 0xab02, 2, 3), self.flow_mod(10, 0xab04, 6, 7)]
+		results = []
+		def controller(message, channel):
+			if twink.parse_ofp_header(message)[1] == 0: # HELLO
+				r = Reconciler(channel, cookie=0xab00, cookie_mask=0xff00, batch=2)
+				results.append(r.reconcile(desired))
+				results.append(r.reconcile(desired))
+				channel.close()
+		
+		a,b_ = twink.sched.socket.socketpair()
+		x = type("ReconcileX", (twink.SyncChannel,), {})(socket=a)
+		x.handle = controller
+		y = type("ReconcileY", (twink.OpenflowServerChannel,), {})(socket=b_)
+		y.handle = switch
+		x.start()
+		y.start()
+		xl = twink.sched.spawn(x.loop)
+		yl = twink.sched.spawn(y.loop)
+		xl.join()
+		yl.join()
+		x.close()
+		y.close()
+		
+		(first, second) = results
+		assert [f.cookie for f in first.add] == [0xab04]
+		assert [f.cookie for f in first.modify] == [0xab02]
+		assert [f.cookie for f in first.delete] == [0xab03]
+		assert first.programmed.count == 3 and first.programmed.errors == []
+		assert commands == [ofp4.OFPFC_ADD, ofp4.OFPFC_MODIFY_STRICT, ofp4.OFPFC_DELETE_STRICT]
+		assert (second.add, second.modify, second.delete, second.programmed) == ([], [], [], None)
+		assert sorted([(f.cookie, tuple(f.ports)) for f in table]) == [(0xab01, (2,)), (0xab02, (3,)), (0xab04, (7,)), (0xcd01, (5,))]
+
+
+class ClassifierTestCase(unittest.TestCase):
+	def match(self, *fields):
+		import twink.ofp4.build as b
+		import twink.ofp4.oxm as oxm
+		oxms = []
+		for f in fields:
+			if len(f) == 3:
+				oxms.append(oxm.build(None, f[0], True, None, f[1], f[2]))
+			else:
+				oxms.append(oxm.build(None, f[0], None, None, f[1]))
+		return b.ofp_match(None, None, oxms)
+	
+	def frame(self, dst, proto=17, dport=53, vlan=None):
+		eth = b"\x02"*6 + b"\x04"*6
+		if vlan is not None:
+			eth += struct.pack("!HH", 0x8100, vlan)
+		ip = struct.pack("!BBHHHBBH4s4s", 0x45, 0, 28, 0, 0, 64, proto, 0, b"\xc0\xa8\0\1", dst)
+		return eth + b"\x08\x00" + ip + struct.pack("!HHI", 1234, dport, 0)
+	
+	def test_classify(self):
+		import twink.ofp4.oxm as oxm
+		from twink.classifier import Classifier
+		(ETH_TYPE, IPV4_DST, IP_PROTO, TCP_DST) = (oxm.OXM_OF_ETH_TYPE, oxm.OXM_OF_IPV4_DST, oxm.OXM_OF_IP_PROTO, oxm.OXM_OF_TCP_DST)
+		c = Classifier(4)
+		c.add(0, self.match(), "miss")
+		c.add(10, self.match((ETH_TYPE, 0x800), (IPV4_DST, b"\x0a\0\0\0", b"\xff\0\0\0")), "10/8")
+		c.add(20, self.match((ETH_TYPE, 0x800), (IPV4_DST, b"\x0a\x01\x09\x09", b"\xff\xff\0\0")), "10.1/16")
+		c.add(30, self.match((ETH_TYPE, 0x800), (IP_PROTO, 6), (TCP_DST, 80)), "http")
+		c.add(40, self.match((oxm.OXM_OF_IN_PORT, 7)), "port7")
+		c.add(5, self.match((oxm.OXM_OF_VLAN_VID, 0x1000, 0x1000)), "vlan")
+		assert len(c) == 6
+		assert c.classify(self.frame(b"\x0a\x01\x02\x03")) == "10.1/16"
+		assert c.classify(self.frame(b"\x0a\x02\x02\x03")) == "10/8"
+		assert c.classify(self.frame(b"\x0b\0\0\1")) == "miss"
+		assert c.classify(self.frame(b"\x0b\0\0\1", dport=80)) == "miss" # UDP
+		assert c.classify(self.frame(b"\x0b\0\0\1", proto=6, dport=80)) == "http"
+		assert c.classify(self.frame(b"\x0b\0\0\1", proto=6, dport=80), in_port=7) == "port7"
+		assert c.classify(self.frame(b"\x0b\0\0\1", vlan=5)) == "vlan"
+		
+		assert c.remove(40, self.match((oxm.OXM_OF_IN_PORT, 7))) == 1
+		assert c.remove(40, self.match((oxm.OXM_OF_IN_PORT, 7))) == 0
+		assert c.classify(self.frame(b"\x0b\0\0\1", proto=6, dport=80), in_port=7) == "http"
+		c.remove(0, self.match())
+		assert c.classify(self.frame(b"\x0b\0\0\1")) is None
+	
+	def test_packet_in(self):
+		import twink.ofp4.build as b
+		import twink.ofp4.oxm as oxm
+		from twink.flowtable import FlowTable
+		from twink.classifier import Classifier
+		t = FlowTable(4)
+		for (priority, port, out) in ((10, 1, 2), (10, 7, 3)):
+			t.flow_mod(b.ofp_flow_mod(None, out, 0, 0, 0, 0, 0, priority, None, None, None, 0,
+				self.match((oxm.OXM_OF_IN_PORT, port)),
+				[b.ofp_instruction_actions(4, None, [b.ofp_action_output(None, None, out, 0)])]))
+		c = Classifier(4)
+		for flow in t:
+			c.add(flow.priority, flow.key, flow)
+		message = b.ofp_packet_in(None, 0xffffffff, 42, 0, 0, 0, self.match((oxm.OXM_OF_IN_PORT, 7)),
+			self.frame(b"\x0a\0\0\1"))
+		assert c.packet_in(message).cookie == 3
+
 class StreamServerTestCase(unittest.TestCase):
 	def test_server(self):
 		s = twink.sched.socket.socket(twink.sched.socket.AF_INET, twink.sched.socket.SOCK_STREAM)
@@ -258,6 +1320,126 @@ class StreamServerTestCase(unittest.TestCase):
 		ch.close()
 		serv.stop()
 
+@unittest.skipUnless(twink.base.selectors, "selectors is not available")
+class EpollStreamServerTestCase(unittest.TestCase):
+	def connect(self, serv):
+		c = twink.sched.socket.socket(twink.sched.socket.AF_INET, twink.sched.socket.SOCK_STREAM)
+		c.connect(serv.server_address)
+		ch = twink.OpenflowChannel()
+		ch.attach(c)
+		ch.recv() # HELLO
+		return ch
+	
+	def test_server(self):
+		serv = type("S", (twink.EpollStreamServer,), dict(
+			channel_cls=type("Sc", (twink.AutoEchoChannel, twink.LoggingChannel), 
+				dict(handle=staticmethod(lambda a,b:None)))))(("127.0.0.1", 0))
+		serv.start()
+		
+		chs = [self.connect(serv) for i in range(20)]
+		for ch in chs:
+			ch.send(twink.ofp_header_only(2, version=ch.version))
+		for ch in chs:
+			assert twink.parse_ofp_header(ch.recv())[1] == 3
+			ch.close()
+		serv.stop()
+	
+	def test_write_blocked(self):
+		big = twink.ofp_header_only(3, version=4) + b"x"*65000
+		big = big[:2] + struct.pack("!H", len(big)) + big[4:]
+		def handle(message, channel):
+			if twink.parse_ofp_header(message)[1] == 4: # EXPERIMENTER
+				for i in range(100):
+					channel.send(big)
+		
+		serv = type("S", (twink.EpollStreamServer,), dict(
+			channel_cls=type("Sc", (twink.AutoEchoChannel,), 
+				dict(handle=staticmethod(handle)))))(("127.0.0.1", 0))
+		serv.start()
+		
+		a = self.connect(serv)
+		a.send(twink.ofp_header_only(4, version=a.version))
+		# selector thread is not blocked by the peer which does not read
+		b = self.connect(serv)
+		b.send(twink.ofp_header_only(2, version=b.version))
+		assert twink.parse_ofp_header(b.recv())[1] == 3
+		
+		for i in range(100):
+			assert a.recv() == big
+		a.close()
+		b.close()
+		serv.stop()
+	
+	def test_closed_by_handler(self):
+		def handle(message, channel):
+			if twink.parse_ofp_header(message)[1] == 4: # EXPERIMENTER
+				channel.close()
+		
+		serv = type("S", (twink.EpollStreamServer,), dict(
+			channel_cls=type("Sc", (twink.AutoEchoChannel,), 
+				dict(handle=staticmethod(handle), send_highwater=65536))))(("127.0.0.1", 0))
+		serv.start()
+		
+		a = self.connect(serv)
+		for i in range(50):
+			if serv.channels:
+				break
+			time.sleep(0.01)
+		assert [ch.send_overflow for ch in serv.channels] == ["raise"]
+		a._socket.settimeout(5)
+		a.send(twink.ofp_header_only(4, version=a.version))
+		assert a.recv() == b"" # closed by the server
+		for i in range(50):
+			if not serv.channels:
+				break
+			time.sleep(0.01)
+		assert len(serv.channels) == 0
+		assert len(serv.selector.get_map()) == 2 # listening socket and wakeup
+		a.close()
+		serv.stop()
+
+class ShardedServerTestCase(unittest.TestCase):
+	def test_route(self):
+		def handle(message, channel):
+			if twink.parse_ofp_header(message)[1] == 0: # HELLO
+				channel.send(twink.ofp_header_only(5, version=channel.version))
+		
+		serv = twink.ShardedServer(("127.0.0.1", 0), workers=2)
+		if twink.base.selectors:
+			serv.server_cls = twink.EpollStreamServer # stops quickly
+		serv.channel_cls = type("Sc", (twink.ControllerChannel, twink.AutoEchoChannel), 
+			dict(handle=staticmethod(handle)))
+		serv.start()
+		try:
+			chs = {}
+			for datapath in (1, 2, 3):
+				c = twink.sched.socket.socket(twink.sched.socket.AF_INET, twink.sched.socket.SOCK_STREAM)
+				c.connect(serv.server_address)
+				ch = twink.OpenflowChannel(socket=c)
+				ch.start()
+				ch.recv() # HELLO
+				(version, oftype, length, xid) = twink.parse_ofp_header(ch.recv())
+				assert oftype == 5 # FEATURES_REQUEST
+				ch.send(struct.pack("!BBHIQIBB2xII", ch.version, 6, 32, xid, datapath, 0, 0, 0, 0, 0))
+				chs[datapath] = ch
+			
+			for i in range(50):
+				found = sum(serv.datapaths().values(), [])
+				if len(found) == 3:
+					break
+				time.sleep(0.1)
+			assert sorted(found) == [1, 2, 3]
+			
+			for datapath, ch in chs.items():
+				serv.send(datapath, twink.ofp_header_only(2, version=ch.version, xid=datapath))
+			for datapath, ch in chs.items():
+				assert twink.parse_ofp_header(ch.recv()) == (ch.version, 2, 8, datapath)
+				ch.close()
+			
+			self.assertRaises(twink.ChannelClose, serv.send, 4, twink.ofp_header_only(2, version=4))
+		finally:
+			serv.stop()
+
 class SampleApp(object):
 	def __call__(self, message, channel):
 		hdr = twink.parse_ofp_header(message)
@@ -324,6 +1506,62 @@ class SyncChannelTestCase(unittest.TestCase):
 		x.close()
 		y.close()
 
+	
+	def test_stream(self):
+		import twink.ofp4.build as ofp4b
+		import twink.ofp4.oxm as oxm
+		match = ofp4b.ofp_match(None, None, oxm.build(None, oxm.OXM_OF_IN_PORT, None, None, 1))
+		
+		def switch(message, channel):
+			(version, oftype, length, xid) = twink.parse_ofp_header(message)
+			if oftype == 18 and struct.unpack_from("!H", message, 8)[0] == 1: # FLOW
+				for i in range(5):
+					flows = [ofp4b.ofp_flow_stats(None, 0, 1, 0, 10, 0, 0, 0, i*10+j, 100, 6400, match, ())
+						for j in range(10)]
+					more = 1 if i < 4 else 0
+					channel.send(ofp4b.ofp_multipart_reply((4, 19, None, xid), 1, more, flows))
+		
+		result = []
+		def controller(message, channel):
+			if twink.parse_ofp_header(message)[1] == 0: # HELLO
+				request = struct.pack("!BBHIHH4xB3xII4xQQHH4x", 4, 18, 56, twink.hms_xid(), 1, 0,
+					0xff, 0xffffffff, 0xffffffff, 0, 0, 1, 4)
+				result.extend([flow.cookie for flow in channel.stream(request, maxsize=2)])
+				channel.close()
+		
+		a,b = twink.sched.socket.socketpair()
+		x = twink.SyncChannel(socket=a)
+		x.handle = controller
+		y = type("SyncChannelTestCaseY", (twink.OpenflowServerChannel,), {})(socket=b)
+		y.handle = switch
+		
+		x.start()
+		y.start()
+		xl = twink.sched.spawn(x.loop)
+		yl = twink.sched.spawn(y.loop)
+		
+		xl.join()
+		yl.join()
+		x.close()
+		y.close()
+		assert result == list(range(50))
+	
+	def test_multipart_entries(self):
+		import twink.ofp4.build as ofp4b
+		import twink.ofp5.build as ofp5b
+		for (version, b) in ((4, ofp4b), (5, ofp5b)):
+			channel = twink.SyncChannel(sendto=lambda message, address: None)
+			channel.version = version
+			
+			desc = b.ofp_desc(b"mfr", b"hw", b"sw", b"sn", b"dp")
+			reply = struct.pack("!BBHIHH4x", version, 19, 16 + len(desc), 1, b.OFPMP_DESC, 0) + desc
+			entries = list(channel.multipart_entries(reply))
+			assert len(entries) == 1
+			assert entries[0].mfr_desc.rstrip(b"\0") == b"mfr"
+			
+			unknown = struct.pack("!BBHIHH4x", version, 19, 20, 2, 200, 0) + b"body"
+			assert list(channel.multipart_entries(unknown)) == [b"body"]
+
 
 if __name__=="__main__":
 #	import logging
@@ -0,0 +1,400 @@
+'''
+asyncio channels
+
+Openflow channels running on one asyncio event loop. Each channel is an
+asyncio protocol, so no thread is used per connection or per message.
+Handlers may be `async def`, and are run as tasks then.
+	
+	import twink.aio
+	twink.use_asyncio()
+	
+	class Controller(twink.aio.AsyncSyncChannel):
+		async def handle(self, message, channel):
+			...
+	
+	serv = twink.aio.AsyncStreamServer(("0.0.0.0", 6653))
+	serv.channel_cls = Controller
+	twink.sched.serve_forever(serv)
+'''
+from __future__ import absolute_import
+import asyncio
+import logging
+import struct
+import weakref
+from . import base
+from .base import ChannelClose, SyncTracker, StreamTracker, parse_ofp_header, ofp_header_only, hms_xid
+
+
+class AsyncChannel(asyncio.BufferedProtocol):
+	'''
+	Protocol mixin, put this in front of base channel classes.
+	
+	Received data is written into the channel FrameBuffer directly, and
+	complete messages are dispatched with handle_batch(). send() writes
+	into the transport, which does the buffering. With send_highwater,
+	`await drain()` waits until the transport buffer goes down.
+	'''
+	_transport = None
+	_closed_waiter = None
+	_writable = None
+	
+	def __init__(self, *args, **kwargs):
+		assert base._use_asyncio, "twink.use_asyncio() is required"
+		super(AsyncChannel, self).__init__(*args, **kwargs)
+	
+	def connection_made(self, transport):
+		self._transport = transport
+		self.remote_address = transport.get_extra_info("peername") or ()
+		self.local_address = transport.get_extra_info("sockname")
+		self._closed_waiter = asyncio.get_running_loop().create_future()
+		self._writable = asyncio.Event()
+		self._writable.set()
+		if self.send_highwater:
+			transport.set_write_buffer_limits(high=self.send_highwater)
+		if hasattr(self, "start"):
+			self.start()
+	
+	def get_buffer(self, sizehint):
+		buffer = self.buffer
+		return buffer.writable(max(buffer.missing(), self.recv_size))
+	
+	def buffer_updated(self, nbytes):
+		self.buffer.commit(nbytes)
+		try:
+			messages = []
+			while self.buffer.ready():
+				messages.append(self.recv())
+			if messages:
+				self.handle_batch(messages)
+				self.flush()
+		except ChannelClose:
+			logging.getLogger(__name__).info("closing", exc_info=True)
+			self.close()
+		except Exception:
+			logging.getLogger(__name__).error("handle error", exc_info=True)
+			self.close()
+	
+	def connection_lost(self, exc):
+		self.close()
+		if not self._closed_waiter.done():
+			self._closed_waiter.set_result(exc)
+	
+	def pause_writing(self):
+		self._writable.clear()
+	
+	def resume_writing(self):
+		self._writable.set()
+	
+	async def drain(self):
+		await self._writable.wait()
+	
+	async def wait_closed(self):
+		await self._closed_waiter
+	
+	def close(self):
+		super(AsyncChannel, self).close()
+		if self._transport:
+			self._transport.close()
+	
+	@property
+	def send_queued_bytes(self):
+		if self._transport:
+			return self._transport.get_write_buffer_size() + self._corked_size
+		return self._corked_size
+	
+	def _send(self, message):
+		if self._transport is None:
+			raise ChannelClose("not connected")
+		elif self._transport.is_closing():
+			return
+		if isinstance(message, (list, tuple)):
+			self._transport.writelines(message)
+		else:
+			self._transport.write(message)
+		self._send_queued = self._transport.get_write_buffer_size()
+	
+	def _send_wait(self, low_priority):
+		if self.send_overflow == "block":
+			return True # transport keeps them, callers may await drain()
+		return super(AsyncChannel, self)._send_wait(low_priority)
+	
+	async def _cork_timeout(self):
+		await asyncio.sleep(self.cork_interval)
+		with self._cork_lock:
+			self._cork_timer = None
+			if not self.closed:
+				self._flush()
+	
+	def _call_handler(self, handle, message, channel):
+		ret = handle(message, channel)
+		if asyncio.iscoroutine(ret):
+			ret = asyncio.ensure_future(ret)
+			ret.add_done_callback(self._handler_done)
+		return ret
+	
+	def _handler_done(self, task):
+		if task.cancelled():
+			return
+		e = task.exception()
+		if isinstance(e, ChannelClose):
+			logging.getLogger(__name__).info("closing", exc_info=e)
+			self.close()
+		elif e is not None:
+			logging.getLogger(__name__).error("handle error", exc_info=e)
+			self.close()
+
+
+class AsyncControllerChannel(AsyncChannel, base.ControllerChannel):
+	pass
+
+
+class AsyncStreamTracker(StreamTracker):
+	'''
+	StreamTracker of which put() does not block the event loop. The
+	transport stops reading while maxsize messages are kept, which pushes
+	back on the switch. Messages already read are still taken, so a few
+	more than maxsize may be kept.
+	'''
+	def __init__(self, xid, maxsize, transport):
+		super(AsyncStreamTracker, self).__init__(xid, maxsize)
+		self.transport = transport
+		self.paused = False
+	
+	def put(self, message, last):
+		with self.lock:
+			if not self.done:
+				self.segments.append(message)
+				if len(self.segments) >= self.maxsize and not self.paused:
+					self.transport.pause_reading()
+					self.paused = True
+				self.done = last
+			self.ev.set()
+	
+	def cancel(self):
+		with self.lock:
+			self.done = True
+			self.ev.set()
+			self._resume()
+	
+	def _resume(self):
+		# self.lock must be held
+		if self.paused:
+			self.paused = False
+			if not self.transport.is_closing():
+				self.transport.resume_reading()
+	
+	async def get(self, timeout=None):
+		'''
+		@return next message, or None at the end
+		'''
+		while True:
+			with self.lock:
+				if self.segments:
+					message = self.segments.popleft()
+					if len(self.segments) < self.maxsize:
+						self._resume()
+					return message
+				elif self.done:
+					return None
+				self.ev.clear()
+			try:
+				await asyncio.wait_for(self.ev.wait(), timeout)
+			except asyncio.TimeoutError:
+				raise ChannelClose("multipart reply timeout")
+
+
+class AsyncSyncChannel(AsyncChannel, base.SyncChannel):
+	'''
+	SyncChannel with awaitable synchronous methods.
+	'''
+	async def send_sync(self, message, **kwargs):
+		(version, oftype, length, xid) = parse_ofp_header(message)
+		x = SyncTracker(xid, asyncio.Event())
+		with self.syncs_lock:
+			self.syncs[x.xid] = x
+		try:
+			self.send(message, **kwargs)
+			self.flush()
+			await asyncio.wait_for(x.ev.wait(), kwargs.get("timeout", 10))
+		except asyncio.TimeoutError:
+			pass
+		finally:
+			with self.syncs_lock:
+				self.syncs.pop(x.xid)
+		return x.data
+	
+	async def _sync_simple(self, req_oftype, res_oftype):
+		message = await self.send_sync(ofp_header_only(req_oftype, version=self.version))
+		if message:
+			(version, oftype, length, xid) = parse_ofp_header(message)
+			if oftype != res_oftype:
+				raise base.OpenflowError(message)
+		else:
+			raise ChannelClose("no response")
+		return message
+	
+	async def echo(self):
+		return await self._sync_simple(2, 3)
+	
+	async def feature(self):
+		return await self._sync_simple(5, 6)
+	
+	async def get_config(self):
+		return await self._sync_simple(7, 8)
+	
+	async def barrier(self):
+		if self.version==1:
+			return await self._sync_simple(18, 19) # OFPT_BARRIER_REQUEST=18 (v1.0)
+		else:
+			return await self._sync_simple(20, 21) # OFPT_BARRIER_REQUEST=20 (v1.1, v1.2, v1.3)
+	
+	async def single(self, message, **kwargs):
+		return (await self.multi((message,), **kwargs)).pop()
+	
+	async def multi(self, messages, **kwargs):
+		prepared = []
+		for message in messages:
+			(version, oftype, length, xid) = parse_ofp_header(message)
+			x = SyncTracker(xid, asyncio.Event())
+			with self.syncs_lock:
+				self.syncs[x.xid] = x
+			self.send(message, **kwargs)
+			prepared.append(xid)
+		
+		await self.barrier()
+		results = []
+		for xid in prepared:
+			with self.syncs_lock:
+				x = self.syncs.pop(xid, None)
+			if x:
+				results.append(x.data)
+			else:
+				results.append(None)
+		return results
+	
+	async def stream(self, message, entries=None, maxsize=16, timeout=10):
+		'''
+		async iterator version of SyncChannel.stream()
+		
+			async for entry in channel.stream(request):
+				...
+		'''
+		if entries is None:
+			entries = self.multipart_entries
+		(version, oftype, length, xid) = parse_ofp_header(message)
+		x = AsyncStreamTracker(xid, maxsize, self._transport)
+		with self.syncs_lock:
+			self.syncs[x.xid] = x
+		try:
+			self.send(message)
+			self.flush()
+			while True:
+				segment = await x.get(timeout)
+				if segment is None:
+					break
+				(version, oftype, length, xid) = parse_ofp_header(segment)
+				if oftype != (17 if version==1 else 19): # MULTIPART_REPLY
+					raise base.OpenflowError(segment)
+				for entry in entries(segment):
+					yield entry
+			if self.closed:
+				raise ChannelClose("closed during multipart reply")
+		finally:
+			x.cancel()
+			with self.syncs_lock:
+				self.syncs.pop(x.xid, None)
+
+
+class AsyncPortMonitorChannel(AsyncChannel, base.PortMonitorChannel):
+	'''
+	PortMonitorChannel of which `ports` does not block. Use
+	`await fetch_ports()` for the initial sync with the switch.
+	'''
+	@property
+	def ports(self):
+		return tuple(self._ports)
+	
+	async def fetch_ports(self):
+		if not self._ports_init.is_set():
+			if self.version in (4, 5):
+				xid = hms_xid()
+				with self._ports_lock:
+					self._port_monitor_multi[xid] = []
+				self.send(struct.pack("!BBHIHH4x", self.version,
+					18, # MULTIPART_REQUEST (v1.3, v1.4)
+					16, # struct.calcsize(fmt)==16
+					xid,
+					13, # PORT_DESC
+					0, # no REQ_MORE
+					))
+			else:
+				self.send(ofp_header_only(5, version=self.version)) # FEATURES_REQUEST
+			self.flush()
+			try:
+				await asyncio.wait_for(self._ports_init.wait(), self.timeout)
+			except asyncio.TimeoutError:
+				pass
+		return tuple(self._ports)
+	
+	async def _wait_port(self, events, num_or_name, timeout):
+		with self._ports_lock:
+			if num_or_name not in events:
+				result = events[num_or_name] = asyncio.Event()
+			else:
+				result = events[num_or_name]
+		try:
+			await asyncio.wait_for(result.wait(), timeout)
+			return True
+		except asyncio.TimeoutError:
+			return False
+	
+	async def wait_attach(self, num_or_name, timeout=10):
+		for port in self._ports:
+			if port.port_no == num_or_name or port.name == num_or_name:
+				return port
+		
+		if await self._wait_port(self._attach, num_or_name, timeout):
+			for port in self._ports:
+				if port.port_no == num_or_name or port.name == num_or_name:
+					return port
+	
+	async def wait_detach(self, num_or_name, timeout=10):
+		hit = False
+		for port in self._ports:
+			if port.port_no == num_or_name or port.name == num_or_name:
+				hit = True
+		if not hit:
+			return num_or_name # already detached
+		
+		if await self._wait_port(self._detach, num_or_name, timeout):
+			return num_or_name
+
+
+class AsyncStreamServer(object):
+	'''
+	StreamServer on the running event loop. channel_cls must be an
+	AsyncChannel subclass.
+	'''
+	channel_cls = None
+	def __init__(self, bound_sock, **kwargs):
+		self.sock = base.stream_socket(bound_sock)
+		self.server_address = self.sock.getsockname()
+		self.channels = weakref.WeakSet()
+		self.server = None
+	
+	async def start(self):
+		self.sock.setblocking(False)
+		self.server = await asyncio.get_running_loop().create_server(self._protocol, sock=self.sock)
+	
+	def _protocol(self):
+		ch = self.channel_cls()
+		self.channels.add(ch)
+		return ch
+	
+	async def stop(self):
+		if self.server:
+			self.server.close()
+		for ch in list(self.channels):
+			ch.close()
+		if self.server:
+			await self.server.wait_closed()
@@ -1,6 +1,7 @@
 from __future__ import absolute_import
 import binascii
 import contextlib
+import errno
 import logging
 import os
 import struct
@@ -8,7 +9,12 @@ import types
 import weakref
 import functools
 import datetime
-from collections import namedtuple
+import time
+from collections import namedtuple, deque
+try:
+	import selectors
+except ImportError:
+	selectors = None
 
 
 _use_gevent = False
@@ -16,14 +22,21 @@ def use_gevent():
 	global _use_gevent
 	_use_gevent = True
 
+_use_asyncio = False
+def use_asyncio():
+	global _use_asyncio
+	_use_asyncio = True
+
 class _sched_proxy(object):
 	def __getattr__(self, name):
 		_sched = None
-		if _use_gevent:
+		if _use_asyncio:
+			_sched = __import__("sched_asyncio", globals(), level=1)
+		elif _use_gevent:
 			_sched = __import__("sched_gevent", globals(), level=1)
 		else:
 			_sched = __import__("sched_basic", globals(), level=1)
-		if name in "subprocess socket Queue Lock Event spawn serve_forever".split():
+		if name in "subprocess socket Queue Lock Event spawn wait serve_forever Pool".split():
 			return getattr(_sched, name)
 		raise AttributeError("No such attribute")
 
@@ -37,9 +50,9 @@ def default_wrapper(func):
 		except socket.timeout:
 			return None
 		except socket.error as e:
-			if e.errno in (os.errno.EAGAIN, os.errno.ECONNRESET, os.errno.EBADF):
+			if e.errno in (errno.EAGAIN, errno.ECONNRESET, errno.EBADF):
 				return b""
-			elif e.errno in (os.errno.EINTR,):
+			elif e.errno in (errno.EINTR,):
 				return None
 			raise
 		except KeyboardInterrupt:
@@ -47,6 +60,17 @@ def default_wrapper(func):
 	return wrap
 
 
+_iov_max = 1024 # IOV_MAX of linux
+
+def message_bytes(message):
+	'''
+	@return message as bytes, joining a list of buffers
+	'''
+	if isinstance(message, (list, tuple)):
+		return b"".join(message)
+	return message
+
+
 class ReadWrapper(object):
 	def __init__(self, channel, read_wrap):
 		self.channel = channel
@@ -76,7 +100,27 @@ class Channel(object):
 	This is the reason that the name is not "Connection" but "Channel".
 	You can subclass this to have instance members, of which lifecycle is 
 	the same with channel.
+	
+	send() accepts a message as bytes, or as a list of buffers, which 
+	is written with scatter-gather sendmsg() without joining them.
+	
+	With cork enabled, send() appends messages to an outgoing buffer, 
+	which is written out when it exceeds cork_size, when cork_interval 
+	seconds passed, or when flush() is called.
+	
+	Stream writes go through an outgoing queue. The thread that finds 
+	the queue idle writes out everything queued, including messages 
+	that other threads added meanwhile. When send_highwater bytes are 
+	queued, send() blocks, raises SendOverflow, or drops messages sent 
+	with low_priority=True, according to send_overflow.
 	'''
+	cork = False
+	cork_size = 65536
+	cork_interval = None # seconds, None for no timer
+	send_highwater = None # bytes, None for unlimited
+	send_overflow = "block" # "block", "raise" or "drop"
+	write_blocked = None # callable(channel) for non-blocking socket, called when it would block
+	
 	def __init__(self, *args, **kwargs):
 		self._socket = kwargs.pop("socket", None) # dedicated socket
 		self._sendto = kwargs.pop("sendto", None) # only if channel prefers sendto()
@@ -84,6 +128,23 @@ class Channel(object):
 		self.read_wrap = kwargs.pop("read_wrap", default_wrapper)
 		self.remote_address = kwargs.pop("remote_address", None)
 		self.local_address = kwargs.pop("local_address", None)
+		self.cork = kwargs.pop("cork", self.cork)
+		self.cork_size = kwargs.pop("cork_size", self.cork_size)
+		self.cork_interval = kwargs.pop("cork_interval", self.cork_interval)
+		self._corked = []
+		self._corked_size = 0
+		self._cork_lock = sched.Lock()
+		self._cork_timer = None
+		self.send_highwater = kwargs.pop("send_highwater", self.send_highwater)
+		self.send_overflow = kwargs.pop("send_overflow", self.send_overflow)
+		assert self.send_overflow in ("block", "raise", "drop")
+		self.send_dropped = 0
+		self._send_queue = deque()
+		self._send_queued = 0
+		self._sending = False
+		self._send_lock = sched.Lock()
+		self._send_ready = sched.Event()
+		self._send_ready.set()
 		if self._socket:
 			if self.remote_address is None:
 				self.remote_address = self._socket.getpeername()
@@ -106,19 +167,172 @@ class Channel(object):
 		return self.remote_address is None
 	
 	def close(self):
+		if not self.closed:
+			try:
+				self.flush()
+			except IOError:
+				pass
+		
 		if self._socket:
 			self._socket.close()
 		
 		if self.remote_address is not None:
 			self.remote_address = None
+		self._send_ready.set()
+	
+	@property
+	def send_queued_bytes(self):
+		'''
+		bytes accepted by send() and not yet written to the socket
+		'''
+		return self._send_queued + self._corked_size
 	
 	def send(self, message, **kwargs):
-		if self._sendto:
-			self._sendto(message, self.remote_address)
-		elif self._socket:
-			self._socket.send(message)
+		if self.send_highwater and self._send_queued >= self.send_highwater:
+			if not self._send_wait(kwargs.get("low_priority")):
+				return
+		
+		if self.cork:
+			with self._cork_lock:
+				if isinstance(message, (list, tuple)):
+					self._corked.extend(message)
+					self._corked_size += sum([len(m) for m in message])
+				else:
+					self._corked.append(message)
+					self._corked_size += len(message)
+				if self._corked_size < self.cork_size:
+					if self.cork_interval and self._cork_timer is None:
+						self._cork_timer = sched.spawn(self._cork_timeout)
+					return
+				self._flush()
 		else:
+			self._send(message)
+	
+	def flush(self):
+		if self._corked:
+			with self._cork_lock:
+				self._flush()
+	
+	def _flush(self):
+		# _cork_lock must be held
+		if self._corked:
+			message = self._corked
+			self._corked = []
+			self._corked_size = 0
+			self._send(message)
+	
+	def _cork_timeout(self):
+		sched.Event().wait(self.cork_interval)
+		with self._cork_lock:
+			self._cork_timer = None
+			if not self.closed:
+				self._flush()
+	
+	def _send_wait(self, low_priority):
+		'''
+		@return False if the message should be dropped
+		'''
+		if self.send_overflow == "raise":
+			raise SendOverflow("%d bytes queued" % self._send_queued)
+		elif self.send_overflow == "drop" and low_priority:
+			with self._send_lock:
+				self.send_dropped += 1
+			return False
+		
+		while not self.closed:
+			with self._send_lock:
+				if self._send_queued < self.send_highwater or not self._sending:
+					break
+				self._send_ready.clear()
+			self._send_ready.wait(timeout=1)
+		return True
+	
+	def _send(self, message):
+		if self._sendto:
+			self._sendto(message_bytes(message), self.remote_address)
+			return
+		elif not self._socket:
 			raise ValueError("socket or sendto is required")
+		
+		if isinstance(message, (list, tuple)):
+			size = sum([len(m) for m in message])
+		else:
+			size = len(message)
+			message = (message,)
+		
+		with self._send_lock:
+			self._send_queue.extend(message)
+			self._send_queued += size
+			if self._sending:
+				return # the writing thread will take them
+			self._sending = True
+		self._drain()
+	
+	def _drain(self):
+		try:
+			while True:
+				with self._send_lock:
+					if not self._send_queue:
+						self._sending = False
+						self._send_ready.set()
+						return
+					buffers = list(self._send_queue)
+					self._send_queue.clear()
+				
+				(size, rest) = self._write(buffers)
+				
+				with self._send_lock:
+					self._send_queued -= size
+					if not self.send_highwater or self._send_queued < self.send_highwater:
+						self._send_ready.set()
+					if rest:
+						self._send_queue.extendleft(reversed(rest))
+				
+				if rest:
+					self.write_blocked(self)
+					return # _drain() will be called again when writable
+		except:
+			with self._send_lock:
+				self._send_queue.clear()
+				self._send_queued = 0
+				self._sending = False
+				self._send_ready.set()
+			raise
+	
+	def _write(self, buffers):
+		'''
+		@return (bytes written, buffers left). Buffers are left only with 
+		write_blocked set, when the non-blocking socket would block.
+		'''
+		sendmsg = getattr(self._socket, "sendmsg", None)
+		if sendmsg is None and len(buffers) > 1:
+			buffers = [b"".join(buffers)]
+		
+		buffers = [memoryview(b) for b in buffers]
+		total = 0
+		idx = 0
+		while idx < len(buffers):
+			try:
+				if sendmsg and idx+1 < len(buffers):
+					sent = sendmsg(buffers[idx:idx+_iov_max])
+				else:
+					sent = self._socket.send(buffers[idx])
+			except sched.socket.error as e:
+				if self.write_blocked and e.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+					break
+				raise
+			
+			total += sent
+			while sent:
+				size = len(buffers[idx])
+				if sent < size:
+					buffers[idx] = buffers[idx][sent:]
+					break
+				sent -= size
+				idx += 1
+			while idx < len(buffers) and not len(buffers[idx]):
+				idx += 1
+		return (total, buffers[idx:])
 	
 	def _recv(self, num):
 		if self.reader:
@@ -136,13 +350,111 @@ class ChannelClose(Error):
 	pass
 
 
+class SendOverflow(Error):
+	pass
+
+
+class OpenflowError(Error):
+	'''
+	Raised with an unexpected response message, typically OFPT_ERROR.
+	'''
+	pass
+
+
+_unpack_length = struct.Struct("!H").unpack_from
+
+class FrameBuffer(object):
+	'''
+	Openflow message framing buffer
+	
+	Incoming bytes are stored in a preallocated bytearray. Messages are 
+	taken out by moving the read offset, and the unread bytes are moved 
+	to the head only when the tail space runs short.
+	'''
+	def __init__(self, size=65536):
+		self.data = bytearray(size)
+		self.view = memoryview(self.data)
+		self.start = 0
+		self.end = 0
+	
+	def __len__(self):
+		return self.end - self.start
+	
+	def missing(self):
+		'''
+		@return number of bytes required to complete the next message
+		'''
+		avail = self.end - self.start
+		if avail < 8:
+			return 8 - avail
+		return max(0, _unpack_length(self.data, self.start+2)[0] - avail)
+	
+	def ready(self):
+		'''
+		@return True if the next message was completely buffered
+		'''
+		avail = self.end - self.start
+		return avail >= 8 and _unpack_length(self.data, self.start+2)[0] <= avail
+	
+	def frame(self, copy=True):
+		'''
+		Takes out the next message if it was completely buffered.
+		If copy is False, the returned memoryview is valid only until 
+		the next write into the buffer.
+		@return message or None
+		'''
+		start = self.start
+		avail = self.end - start
+		if avail < 8:
+			return None
+		(length,) = _unpack_length(self.data, start+2)
+		if length > avail:
+			return None
+		elif length < 8:
+			raise ChannelClose("broken openflow message length %d" % length)
+		self.start = end = start + length
+		if copy:
+			return self.view[start:end].tobytes()
+		return self.view[start:end]
+	
+	def writable(self, size):
+		'''
+		@return memoryview of the free tail space, which is at least `size` bytes
+		'''
+		used = self.end - self.start
+		if used == 0:
+			self.start = self.end = 0
+		elif len(self.data) - self.end < size:
+			if len(self.data) - used < size:
+				data = bytearray(max(2*len(self.data), used+size))
+				data[:used] = self.data[self.start:self.end]
+				self.data = data
+				self.view = memoryview(data)
+			else:
+				self.data[:used] = self.data[self.start:self.end]
+			self.start = 0
+			self.end = used
+		return self.view[self.end:]
+	
+	def commit(self, size):
+		self.end += size
+	
+	def feed(self, data):
+		size = len(data)
+		self.writable(size)[:size] = data
+		self.end += size
+
+
 class OpenflowBaseChannel(Channel):
 	version = None # The negotiated version
 	accept_versions = [4,] # defaults to openflow 1.3
+	recv_size = 8192
+	recv_copy = True # False returns memoryview, which is valid until next recv()
 	
 	def __init__(self, *args, **kwargs):
+		self.recv_copy = kwargs.pop("recv_copy", self.recv_copy)
 		super(OpenflowBaseChannel, self).__init__(*args, **kwargs)
-		self.buffer = b""
+		self.buffer = FrameBuffer()
 	
 	def __iter__(self):
 		while True:
@@ -152,30 +464,64 @@ class OpenflowBaseChannel(Channel):
 			else:
 				break
 	
+	def iter_batches(self):
+		while True:
+			ret = self.recv_batch()
+			if ret:
+				yield ret
+			else:
+				break
+	
+	def recv_batch(self):
+		'''
+		Reads socket at most once and takes out every message that was 
+		completely buffered. With recv_copy=False, the memoryviews are 
+		valid until the next recv_batch().
+		@return list of messages, empty list for closed channel
+		'''
+		message = self.recv()
+		if not message:
+			return []
+		messages = [message]
+		while self.buffer.ready():
+			message = self.recv()
+			if not message:
+				break
+			messages.append(message)
+		return messages
+	
 	def recv(self):
-		required_len = 8
-		while len(self.buffer) < required_len:
-			tmp = super(OpenflowBaseChannel, self)._recv(8192)
-			if tmp is None:
-				continue
-			elif len(tmp)==0:
-				return tmp
-			self.buffer += tmp
-		
-		p = struct.unpack_from("!BBHI", self.buffer)
-		required_len = p[2]
-		
-		while len(self.buffer) < required_len:
-			tmp = super(OpenflowBaseChannel, self)._recv(8192)
-			if tmp is None:
+		buffer = self.buffer
+		message = buffer.frame(self.recv_copy)
+		while message is None:
+			num = self._fill()
+			if num is None:
 				continue
-			elif len(tmp)==0:
-				return tmp
-			self.buffer += tmp
-		
-		ret = self.buffer[0:required_len]
-		self.buffer = self.buffer[required_len:]
-		return ret
+			elif not num:
+				return b""
+			message = buffer.frame(self.recv_copy)
+		return message
+	
+	def _fill(self):
+		'''
+		Reads socket once into the buffer.
+		@return number of bytes read, 0 or b"" for closed channel, None for retry
+		'''
+		if self._corked:
+			self.flush() # peer may be waiting for them
+		buffer = self.buffer
+		space = buffer.writable(max(buffer.missing(), self.recv_size))
+		if self.reader is None and hasattr(self._socket, "recv_into"):
+			num = ReadWrapper(self, self.read_wrap)(self._socket.recv_into)(space)
+		else:
+			data = super(OpenflowBaseChannel, self)._recv(len(space))
+			if not data:
+				return data
+			num = len(data)
+			space[:num] = data
+		if num:
+			buffer.commit(num)
+		return num
 
 
 class LoggingChannel(OpenflowBaseChannel):
@@ -191,7 +537,9 @@ class LoggingChannel(OpenflowBaseChannel):
 		logging.getLogger(self.channel_log_name).info("%s connect%s" % (self, self.remote))
 	
 	def send(self, message, **kwargs):
-		logging.getLogger(self.send_log_name).debug("%s %s" % (self, binascii.b2a_hex(message)))
+		logger = logging.getLogger(self.send_log_name)
+		if logger.isEnabledFor(logging.DEBUG):
+			logger.debug("%s %s" % (self, binascii.b2a_hex(message_bytes(message))))
 		return super(LoggingChannel, self).send(message, **kwargs)
 	
 	def recv(self):
@@ -217,6 +565,7 @@ class OpenflowChannel(OpenflowBaseChannel):
 	def start(self):
 		if self._start is None:
 			self.send(hello(self.accept_versions))
+			self.flush()
 			self._start = True
 	
 	def recv(self):
@@ -241,8 +590,11 @@ class OpenflowChannel(OpenflowBaseChannel):
 
 def parse_ofp_header(message):
 	'''
+	message may be a list of buffers, of which the first one holds the header.
 	@return (version, oftype, message_len, xid)
 	'''
+	if isinstance(message, (list, tuple)):
+		message = message[0]
 	return struct.unpack_from("!BBHI", message)
 
 
@@ -318,17 +670,24 @@ def parse_hello(message):
 class OpenflowServerChannel(OpenflowChannel):
 	def loop(self):
 		try:
-			for message in self:
-				if not message:
-					break
-				
-				self.handle_proxy(self.handle)(message, self)
+			for messages in self.iter_batches():
+				self.handle_batch(messages)
+				self.flush()
 		except ChannelClose:
 			self.close()
 	
+	def handle_batch(self, messages):
+		handle = self.handle_proxy(self.handle)
+		for message in messages:
+			self._call_handler(handle, message, self)
+	
 	def handle_proxy(self, handle):
 		return handle
 	
+	def _call_handler(self, handle, message, channel):
+		# hook for scheduler backends which run coroutine handlers
+		return handle(message, channel)
+	
 	def handle(self, message, channel):
 		logging.getLogger(__name__).warn("check MRO")
 		pass
@@ -344,7 +703,7 @@ class AutoEchoChannel(OpenflowServerChannel):
 				if oftype==2: # ECHO
 					self.send(struct.pack("!BBHI", self.version, 3, length, xid)+message[8:])
 				else:
-					super(AutoEchoChannel, self).handle_proxy(handle)(message, channel)
+					return super(AutoEchoChannel, self).handle_proxy(handle)(message, channel)
 		return intercept
 
 
@@ -433,7 +792,10 @@ class ControllerChannel(OpenflowServerChannel):
 				self.seq.append(Chunk(callback))
 		
 		if bmsg:
-			super(ControllerChannel, self).send(bmsg)
+			if isinstance(message, (list, tuple)):
+				message = [bmsg] + list(message)
+			else:
+				message = [bmsg, message]
 		super(ControllerChannel, self).send(message)
 	
 	def recv(self):
@@ -450,104 +812,205 @@ class ControllerChannel(OpenflowServerChannel):
 	def callback(self, message, channel):
 		return super(ControllerChannel, self).handle_proxy(self.handle)(message, channel)
 	
+	def handle_batch(self, messages):
+		if getattr(type(self).handle_proxy, "__func__", type(self).handle_proxy) is not _controller_handle_proxy:
+			# another proxy runs before intercept, so resolve one by one
+			return super(ControllerChannel, self).handle_batch(messages)
+		
+		with self.seq_lock:
+			callbacks = [self._seq_callback(message) for message in messages]
+		for message, callback in zip(messages, callbacks):
+			self._seq_dispatch(message, callback)
+	
 	def handle_proxy(self, handle):
 		def intercept(message, channel):
-			(version, oftype, length, xid) = parse_ofp_header(message)
-			
-			if hasattr(self, "handle_async") and oftype in (10,11,12):
-				# bypass method call for async message
-				return super(ControllerChannel, self).handle_proxy(self.handle_async)(message, channel)
-			
-			callback = None
 			with self.seq_lock:
-				if self.seq:
-					if (oftype==19 and version==1) or (oftype==21 and version!=1): # is barrier
-						chunk_drop = False
-						for e in self.seq:
-							if isinstance(e, Barrier):
-								if e.xid == xid:
-									self.seq = self.seq[self.seq.index(e)+1:]
-									callback = e.callback
-								else:
-									assert False, "missing barrier(xid=%x) before barrier(xid=%x)" % (e.xid, xid)
-								break
-							elif isinstance(e, Chunk):
-								assert chunk_drop==False, "dropping multiple chunks at a time"
-								chunk_drop = True
-						if callback is None:
-							assert False, "got unknown barrier xid=%x" % xid
-					elif isinstance(self.seq[0], Chunk):
-						callback = self.seq[0].callback
-					else:
-						callback = self.callback
-				else:
-					callback = self.callback
-			
-			if callback:
-				return callback(message, self)
-			
-			logging.getLogger(__name__).warn("No callback found for handling message %s" % binascii.b2a_hex(message))
+				callback = self._seq_callback(message)
+			return self._seq_dispatch(message, callback)
 		return intercept
+	
+	def _seq_callback(self, message):
+		# seq_lock must be held
+		(version, oftype, length, xid) = parse_ofp_header(message)
+		
+		if hasattr(self, "handle_async") and oftype in (10,11,12):
+			# bypass method call for async message
+			return super(ControllerChannel, self).handle_proxy(self.handle_async)
+		
+		callback = None
+		if self.seq:
+			if (oftype==19 and version==1) or (oftype==21 and version!=1): # is barrier
+				chunk_drop = False
+				for e in self.seq:
+					if isinstance(e, Barrier):
+						if e.xid == xid:
+							self.seq = self.seq[self.seq.index(e)+1:]
+							callback = e.callback
+						else:
+							assert False, "missing barrier(xid=%x) before barrier(xid=%x)" % (e.xid, xid)
+						break
+					elif isinstance(e, Chunk):
+						assert chunk_drop==False, "dropping multiple chunks at a time"
+						chunk_drop = True
+				if callback is None:
+					assert False, "got unknown barrier xid=%x" % xid
+			elif isinstance(self.seq[0], Chunk):
+				callback = self.seq[0].callback
+			else:
+				callback = self.callback
+		else:
+			callback = self.callback
+		return callback
+	
+	def _seq_dispatch(self, message, callback):
+		if callback:
+			return self._call_handler(callback, message, self)
+		
+		logging.getLogger(__name__).warn("No callback found for handling message %s" % binascii.b2a_hex(message))
+
+_controller_handle_proxy = ControllerChannel.__dict__["handle_proxy"]
+
+
+_monotonic = getattr(time, "monotonic", time.time)
+
+class TokenBucket(object):
+	'''
+	`rate` tokens per second, holding `burst` tokens at most.
+	'''
+	def __init__(self, rate, burst=None):
+		self.rate = float(rate)
+		self.burst = float(burst or max(rate, 1))
+		self.tokens = self.burst
+		self.stamp = _monotonic()
+	
+	def delay(self, now):
+		'''
+		@return seconds until a token will be available
+		'''
+		self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+		self.stamp = now
+		if self.tokens >= 1:
+			return 0
+		return (1 - self.tokens) / self.rate
+	
+	def take(self):
+		self.tokens -= 1
 
 
 class RateLimit(object):
-	def __init__(self, size):
-		self.size = size
-		
-		self.cold_lock = sched.Lock()
-		self.cold = []
+	'''
+	Admission controller for asynchronous messages.
+	
+	Jobs are queued in a lane per message type, and lanes are served in 
+	`priorities` order, so that PORT_STATUS is never starved by PACKET_IN 
+	flood. A lane with a token bucket runs a job only when a token is 
+	available. Jobs over `backlog` in a lane are dropped and counted in 
+	`dropped`.
+	'''
+	priorities = (12, 11, 10) # PORT_STATUS, FLOW_REMOVED, PACKET_IN
+	
+	def __init__(self, rate, burst=None, rates=None, backlog=1024, dispatch=None):
+		'''
+		rate is jobs per second for PACKET_IN and FLOW_REMOVED lanes, 
+		or rates may be given as {oftype: rate} mapping.
+		dispatch(func, *args, **kwargs) starts an admitted job, 
+		sched.spawn by default.
+		'''
+		self.dispatch = dispatch
+		if rates is None:
+			rates = {10: rate, 11: rate}
+		self.buckets = dict([(oftype, TokenBucket(r, burst)) for oftype, r in rates.items() if r])
+		self.backlog = backlog
+		self.lanes = {}
+		self.order = list(self.priorities)
+		self.dropped = {}
+		self.lock = sched.Lock()
+		self.wakeup = sched.Event()
+		self.draining = False
+	
+	@property
+	def depth(self):
+		return sum([len(lane) for lane in self.lanes.values()])
+	
+	def submit(self, oftype, func, *args, **kwargs):
+		'''
+		@return False if the job was dropped
+		'''
+		with self.lock:
+			lane = self.lanes.get(oftype)
+			if lane is None:
+				lane = self.lanes[oftype] = deque()
+				if oftype not in self.order:
+					self.order.append(oftype)
+			
+			if len(lane) >= self.backlog:
+				self.dropped[oftype] = self.dropped.get(oftype, 0) + 1
+				return False
+			
+			lane.append((func, args, kwargs))
+			self.wakeup.set()
+			if self.draining:
+				return True
+			self.draining = True
 		
-		self.loop_lock = sched.Lock()
+		sched.spawn(self._drain)
+		return True
 	
 	def spawn(self, func, *args, **kwargs):
-		with self.cold_lock:
-			self.cold.append((func, args, kwargs))
-		
-		sched.spawn(self.loop)
+		return self.submit(None, func, *args, **kwargs)
+	
+	def _next(self):
+		# self.lock must be held
+		now = _monotonic()
+		delay = None
+		for oftype in self.order:
+			lane = self.lanes.get(oftype)
+			if not lane:
+				continue
+			
+			bucket = self.buckets.get(oftype)
+			if bucket:
+				wait = bucket.delay(now)
+				if wait:
+					if delay is None or wait < delay:
+						delay = wait
+					continue
+				bucket.take()
+			return (lane.popleft(), None)
+		return (None, delay)
 	
-	def loop(self):
-		with self.loop_lock:
-			while len(self.cold) > 0:
-				hot_lock = sched.Lock()
-				hot = []
-				children = {}
-				while len(hot) < self.size and len(self.cold) > 0:
-					task = None
-					with self.cold_lock:
-						task = self.cold.pop(0)
-					
-					if task:
-						(func, args, kwargs) = task
-						def proxy():
-							func(*args, **kwargs)
-							with hot_lock:
-								hot.remove(task)
-						hot.append(task)
-						children[id(task)] = sched.spawn(proxy)
-					
-					for task_id,job in tuple(children.items()):
-						running = False
-						with hot_lock:
-							if task_id in [id(task) for task in hot]:
-								running = True
-						
-						if running:
-							job.join(3)
-						else:
-							chilren.pop(task)
-						
-						break
+	def _drain(self):
+		while True:
+			with self.lock:
+				self.wakeup.clear()
+				(job, delay) = self._next()
+				if job is None and delay is None:
+					self.draining = False
+					return
+			
+			if job:
+				(func, args, kwargs) = job
+				(self.dispatch or sched.spawn)(func, *args, **kwargs)
+			else:
+				waiting = sched.wait(self.wakeup, delay)
+				if not isinstance(waiting, bool):
+					# asyncio task, drains again when the wait is over
+					waiting.add_done_callback(lambda task: self._drain())
+					return
 
 
 class ParallelChannel(OpenflowServerChannel):
 	# mixin for parent channel
 	socket_dir = None
-	async_rate = 0
+	async_rate = 0 # PACKET_IN and FLOW_REMOVED per second, 0 for no limit
+	async_backlog = 1024
+	worker_pool = None # sched.Pool, which may be shared by channels. None spawns per message
+	ordered = False # keep message order on worker_pool
 	
 	def __init__(self, *args, **kwargs):
 		super(ParallelChannel, self).__init__(*args, **kwargs)
 		self.close_lock = sched.Lock()
-		self.async_pool = RateLimit(self.async_rate)
+		self.async_pool = RateLimit(self.async_rate, backlog=self.async_backlog, dispatch=self.dispatch)
 	
 	def close(self):
 		with self.close_lock:
@@ -557,7 +1020,8 @@ class ParallelChannel(OpenflowServerChannel):
 		def intercept(message, channel):
 			def proxy(message, channel):
 				try:
-					handle(message, channel)
+					channel._call_handler(handle, message, channel)
+					channel.flush()
 				except ChannelClose:
 					logging.getLogger(__name__).info("closing", exc_info=True)
 					channel.close()
@@ -572,11 +1036,25 @@ class ParallelChannel(OpenflowServerChannel):
 					rated_call = True
 			
 			if rated_call:
-				self.async_pool.spawn(proxy, message, channel)
+				self.async_pool.submit(oftype, proxy, message, channel)
 			else:
-				sched.spawn(proxy, message, channel)
+				self.dispatch(proxy, message, channel)
 		return super(ParallelChannel, self).handle_proxy(intercept)
 	
+	def dispatch(self, proxy, message, channel):
+		'''
+		Runs a handler job on worker_pool, or spawns one per message.
+		Jobs admitted by async_pool come here too.
+		'''
+		if self.worker_pool:
+			key = None
+			if self.ordered:
+				key = id(channel)
+			if not self.worker_pool.submit(proxy, (message, channel), key=key, block=self.ordered):
+				proxy(message, channel) # pool is full, run in the calling thread
+		else:
+			sched.spawn(proxy, message, channel)
+	
 	def socket_path(self, path):
 		if self.socket_dir:
 			path = os.path.join(self.socket_dir, path)
@@ -597,7 +1075,11 @@ class ParallelChannel(OpenflowServerChannel):
 		raise Error("Concrete MixIn required")
 
 
-def bound_socket(info, socktype):
+def bound_socket(info, socktype, reuse_port=False):
+	'''
+	reuse_port sets SO_REUSEPORT, so that sockets of several processes 
+	bind the same address and the kernel spreads connections among them.
+	'''
 	socket = sched.socket
 	if isinstance(info, socket.socket):
 		return info
@@ -606,6 +1088,8 @@ def bound_socket(info, socktype):
 		(family, socktype, proto, canonname, sockaddr) = infos[0]
 		s = socket.socket(family, socktype)
 		s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+		if reuse_port:
+			s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
 		s.bind(sockaddr)
 		return s
 	elif isinstance(info, str):
@@ -617,8 +1101,8 @@ def bound_socket(info, socktype):
 		raise ValueError("unexpected %s" % info)
 
 
-def stream_socket(info):
-	return bound_socket(info, sched.socket.SOCK_STREAM)
+def stream_socket(info, reuse_port=False):
+	return bound_socket(info, sched.socket.SOCK_STREAM, reuse_port=reuse_port)
 
 
 def dgram_socket(info):
@@ -629,7 +1113,7 @@ class StreamServer(object):
 	channel_cls = None
 	def __init__(self, bound_sock, **kwargs):
 		self.accepting = False
-		self.sock = stream_socket(bound_sock)
+		self.sock = stream_socket(bound_sock, reuse_port=kwargs.get("reuse_port", False))
 		self.channels_lock = sched.Lock()
 		self.channels = set()
 		self.server_address = self.sock.getsockname()
@@ -681,6 +1165,300 @@ class StreamServer(object):
 			ch.close()
 
 
+class EpollStreamServer(StreamServer):
+	'''
+	StreamServer that multiplexes the listening socket and all channel 
+	sockets on one selector (epoll on linux) in one thread, instead of 
+	one thread per connection. Sockets are non-blocking. Readable data 
+	goes into the channel FrameBuffer and complete messages are passed 
+	to handle_batch(), in the selector thread. Use ParallelChannel with 
+	a worker_pool to move handler work off the selector thread.
+	
+	Sends that would block are left in the channel send queue and 
+	written when the socket becomes writable. A handler in the selector 
+	thread can not wait for the queue to go down, so send_overflow 
+	"block" is taken as "raise" with send_highwater.
+	'''
+	select_timeout = 0.5 # seconds
+	
+	def __init__(self, bound_sock, **kwargs):
+		if selectors is None:
+			raise Error("selectors module is not available")
+		super(EpollStreamServer, self).__init__(bound_sock, **kwargs)
+		self.selector = None
+		self._wakeup = None
+		self._want_write = deque()
+	
+	def start(self):
+		self.accepting = True
+		self.sock.setblocking(False)
+		self.sock.listen(128)
+		self.selector = selectors.DefaultSelector()
+		self.selector.register(self.sock, selectors.EVENT_READ, None)
+		self._wakeup = sched.socket.socketpair()
+		for s in self._wakeup:
+			s.setblocking(False)
+		self.selector.register(self._wakeup[0], selectors.EVENT_READ, self)
+		sched.spawn(self.run)
+	
+	def run(self):
+		selector = self.selector
+		try:
+			while self.accepting:
+				for key, events in selector.select(self.select_timeout):
+					if key.data is None:
+						self._accept()
+					elif key.data is self:
+						self._woken()
+					else:
+						if events & selectors.EVENT_WRITE:
+							self._writable(key.fd, key.data)
+						if events & selectors.EVENT_READ:
+							self._readable(key.fd, key.data)
+		finally:
+			for ch in list(self.channels):
+				ch.close()
+			selector.close()
+			self.sock.close()
+			for s in self._wakeup:
+				s.close()
+	
+	def _accept(self):
+		while self.accepting:
+			try:
+				(s, remote_address) = self.sock.accept()
+			except sched.socket.error as e:
+				if e.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+					return
+				raise
+			
+			s.setblocking(False)
+			fd = s.fileno()
+			if fd in self.selector.get_map():
+				# fd of a channel closed by handler, now reused
+				self._unregister(fd, self.selector.get_map()[fd].data)
+			try:
+				ch = self.channel_cls(socket=s, remote_address=remote_address, read_wrap=self.read_wrap)
+				ch.write_blocked = self._write_blocked
+				if ch.send_highwater and ch.send_overflow == "block":
+					ch.send_overflow = "raise" # the selector thread would wait for itself
+				ch.start()
+			except Exception as e:
+				logging.getLogger(__name__).error("Channel setup failed for %s %s" % (remote_address, e), exc_info=True)
+				s.close()
+				continue
+			
+			with self.channels_lock:
+				self.channels.add(ch)
+			self.selector.register(fd, selectors.EVENT_READ, ch)
+	
+	def _readable(self, fd, ch):
+		try:
+			num = ch._fill()
+			if num is None:
+				return
+			elif not num:
+				raise ChannelClose("closed")
+			
+			messages = []
+			while ch.buffer.ready():
+				messages.append(ch.recv())
+			if messages:
+				ch.handle_batch(messages)
+				ch.flush()
+		except ChannelClose:
+			self._unregister(fd, ch)
+		except Exception:
+			logging.getLogger(__name__).error("handle error", exc_info=True)
+			self._unregister(fd, ch)
+		else:
+			if ch.closed: # by the handler
+				self._unregister(fd, ch)
+	
+	def _writable(self, fd, ch):
+		try:
+			ch._drain()
+		except Exception:
+			self._unregister(fd, ch)
+			return
+		if ch.closed:
+			self._unregister(fd, ch)
+		elif not ch._sending:
+			self.selector.modify(fd, selectors.EVENT_READ, ch)
+	
+	def _write_blocked(self, ch):
+		# may be called from handler threads
+		self._want_write.append(ch)
+		try:
+			self._wakeup[1].send(b"\0")
+		except sched.socket.error:
+			pass # already has pending wakeup
+	
+	def _woken(self):
+		try:
+			while self._wakeup[0].recv(4096):
+				pass
+		except sched.socket.error:
+			pass
+		
+		while self._want_write:
+			ch = self._want_write.popleft()
+			key = self.selector.get_map().get(ch._socket.fileno())
+			if key and key.data is ch:
+				self.selector.modify(key.fd, selectors.EVENT_READ|selectors.EVENT_WRITE, ch)
+	
+	def _unregister(self, fd, ch):
+		try:
+			self.selector.unregister(fd)
+		except (KeyError, ValueError):
+			pass
+		ch.close()
+		with self.channels_lock:
+			self.channels.discard(ch)
+	
+	def read_wrap(self, func):
+		def nonblocking(*args, **kwargs):
+			try:
+				return func(*args, **kwargs)
+			except sched.socket.error as e:
+				if e.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+					return None
+				raise
+		return super(EpollStreamServer, self).read_wrap(nonblocking)
+
+
+Shard = namedtuple("Shard", "process conn lock")
+
+class ShardedServer(object):
+	'''
+	Forks worker processes, each running its own server_cls instance on 
+	the same address with SO_REUSEPORT, so that switch connections are 
+	spread over cores by the kernel. Without SO_REUSEPORT, or with a 
+	socket instance, workers accept on the inherited socket.
+	
+	The parent talks to each worker over a multiprocessing Pipe; 
+	datapaths() lists datapath ids per worker and send() routes a 
+	message to the worker which owns the datapath. channel_cls should 
+	be a ControllerChannel so that datapath is known.
+	'''
+	channel_cls = None
+	server_cls = StreamServer
+	def __init__(self, bound_sock, workers=None, **kwargs):
+		import multiprocessing
+		if hasattr(multiprocessing, "get_context"):
+			self.mp = multiprocessing.get_context("fork")
+		else:
+			self.mp = multiprocessing
+		self.workers = workers or multiprocessing.cpu_count()
+		self.reuse_port = isinstance(bound_sock, (tuple, list)) and hasattr(sched.socket, "SO_REUSEPORT")
+		self.sock = stream_socket(bound_sock, reuse_port=self.reuse_port)
+		self.server_address = self.sock.getsockname()
+		self.server_kwargs = kwargs
+		self.shards = []
+		self.routes = {}
+	
+	def start(self):
+		for index in range(self.workers):
+			(conn, child_conn) = self.mp.Pipe()
+			p = self.mp.Process(target=self._worker, args=(child_conn,))
+			p.daemon = True
+			p.start()
+			child_conn.close()
+			self.shards.append(Shard(p, conn, sched.Lock()))
+		
+		for shard in self.shards:
+			self._call(shard, "ping") # wait for the worker listening
+	
+	def _worker(self, conn):
+		if self.reuse_port:
+			self.sock.close()
+			serv = self.server_cls(self.server_address[:2], reuse_port=True, **self.server_kwargs)
+		else:
+			serv = self.server_cls(self.sock, **self.server_kwargs)
+		serv.channel_cls = self.channel_cls
+		serv.start()
+		try:
+			while True:
+				try:
+					req = conn.recv()
+				except (EOFError, IOError):
+					break
+				if req is None:
+					break
+				try:
+					ret = self._control(serv, *req)
+				except Exception as e:
+					ret = e
+				conn.send(ret)
+		finally:
+			serv.stop()
+	
+	def _control(self, serv, op, *args):
+		if op == "ping":
+			return os.getpid()
+		
+		with serv.channels_lock:
+			channels = [ch for ch in serv.channels
+				if getattr(ch, "datapath", None) is not None and not getattr(ch, "auxiliary", None)]
+		if op == "datapaths":
+			return [ch.datapath for ch in channels]
+		elif op == "send":
+			(datapath, message) = args
+			for ch in channels:
+				if ch.datapath == datapath:
+					ch.send(message)
+					ch.flush()
+					return True
+			return False
+		raise ValueError("unknown control %s" % op)
+	
+	def _call(self, shard, *req):
+		with shard.lock:
+			shard.conn.send(req)
+			ret = shard.conn.recv()
+		if isinstance(ret, Exception):
+			raise ret
+		return ret
+	
+	def datapaths(self):
+		'''
+		@return {worker index: [datapath id, ...]}
+		'''
+		result = {}
+		routes = {}
+		for index, shard in enumerate(self.shards):
+			result[index] = self._call(shard, "datapaths")
+			for datapath in result[index]:
+				routes[datapath] = index
+		self.routes = routes
+		return result
+	
+	def send(self, datapath, message):
+		index = self.routes.get(datapath)
+		if index is not None and self._call(self.shards[index], "send", datapath, message):
+			return
+		
+		self.datapaths() # datapath may have moved after reconnect
+		index = self.routes.get(datapath)
+		if index is None or not self._call(self.shards[index], "send", datapath, message):
+			raise ChannelClose("datapath %x is not connected" % datapath)
+	
+	def stop(self):
+		for shard in self.shards:
+			try:
+				with shard.lock:
+					shard.conn.send(None)
+			except IOError:
+				pass
+		for shard in self.shards:
+			shard.process.join(6)
+			if shard.process.is_alive():
+				shard.process.terminate()
+			shard.conn.close()
+		self.shards = []
+		self.sock.close()
+
+
 class DgramServer(object):
 	channel_cls = None
 	def __init__(self, bound_sock):
@@ -824,7 +1602,7 @@ class ChildChannel(OpenflowChannel):
 		try:
 			super(ChildChannel, self).send(message, **kwargs)
 		except:
-			logging.getLogger(__name__).warn("child channel send error %s" % binascii.b2a_hex(message), exc_info=True)
+			logging.getLogger(__name__).warn("child channel send error %s" % binascii.b2a_hex(message_bytes(message)), exc_info=True)
 			self.close()
 	
 	def handle(self, message, channel):
@@ -848,11 +1626,76 @@ class JackinChildChannel(ChildChannel):
 		super(JackinChildChannel, self).close()
 
 
+def _iter_entries(fetcher, message, cursor):
+	(length,) = _unpack_length(message, 2)
+	while cursor.offset < length:
+		yield fetcher(message, cursor)
+
+
 class SyncTracker(object):
 	def __init__(self, xid, ev):
 		self.xid = xid
 		self.ev = ev
 		self.data = None
+		self.segments = [] # multipart reply messages, joined into data at the end
+	
+	def put(self, message, last):
+		self.segments.append(message)
+		if last:
+			self.data = b"".join(self.segments)
+			self.segments = []
+			self.ev.set()
+	
+	def cancel(self):
+		self.data = ""
+		self.ev.set()
+
+
+class StreamTracker(SyncTracker):
+	'''
+	Keeps at most maxsize multipart reply messages until the consumer 
+	takes them. The receiving thread waits for space, which pushes back 
+	on the switch through the socket buffer.
+	'''
+	def __init__(self, xid, maxsize):
+		super(StreamTracker, self).__init__(xid, sched.Event())
+		self.maxsize = maxsize
+		self.lock = sched.Lock()
+		self.space = sched.Event()
+		self.space.set()
+		self.segments = deque()
+		self.done = False
+	
+	def put(self, message, last):
+		self.space.wait()
+		with self.lock:
+			if not self.done:
+				self.segments.append(message)
+				if len(self.segments) >= self.maxsize:
+					self.space.clear()
+				self.done = last
+			self.ev.set()
+	
+	def cancel(self):
+		with self.lock:
+			self.done = True
+			self.ev.set()
+			self.space.set()
+	
+	def get(self, timeout=None):
+		'''
+		@return next message, or None at the end
+		'''
+		while True:
+			with self.lock:
+				if self.segments:
+					self.space.set()
+					return self.segments.popleft()
+				elif self.done:
+					return None
+				self.ev.clear()
+			if not self.ev.wait(timeout):
+				raise ChannelClose("multipart reply timeout")
 
 
 class SyncChannel(ParallelChannel):
@@ -868,19 +1711,12 @@ class SyncChannel(ParallelChannel):
 		message = super(SyncChannel, self).recv()
 		if message:
 			(version, oftype, length, xid) = parse_ofp_header(message)
-			if xid in self.syncs:
-				x = self.syncs[xid]
+			x = self.syncs.get(xid)
+			if x:
 				if (version==1 and oftype==17) or (version!=1 and oftype==19): # multipart
-					with self.syncs_lock:
-						if x.data is None:
-							x.data = message
-						else:
-							x.data += message
-					if not struct.unpack_from("!H", message, offset=10)[0] & 1:
-						x.ev.set()
+					x.put(message, not struct.unpack_from("!H", message, offset=10)[0] & 1)
 				else:
-					x.data = message
-					x.ev.set()
+					x.put(message, True)
 		return message
 	
 	def send_sync(self, message, **kwargs):
@@ -889,6 +1725,7 @@ class SyncChannel(ParallelChannel):
 		with self.syncs_lock:
 			self.syncs[x.xid] = x
 		self.send(message, **kwargs)
+		self.flush()
 		x.ev.wait(timeout=kwargs.get("timeout", 10))
 		with self.syncs_lock:
 			self.syncs.pop(x.xid)
@@ -907,10 +1744,76 @@ class SyncChannel(ParallelChannel):
 	def close(self):
 		if self.syncs is not None:
 			for k,x in tuple(self.syncs.items()):
-				x.data = ""
-				x.ev.set()
+				x.cancel()
 		super(SyncChannel, self).close()
 	
+	def stream(self, message, entries=None, maxsize=16, timeout=10):
+		'''
+		Sends a multipart request and yields the reply entries (flow stats, 
+		ports, ...) segment by segment as they arrive, instead of keeping 
+		the whole reply. At most maxsize reply messages are buffered.
+		
+		entries(segment) returns the entries of one reply message, which 
+		defaults to multipart_entries(). This blocks, and AsyncSyncChannel 
+		has an async iterator version for asyncio.
+		'''
+		if entries is None:
+			entries = self.multipart_entries
+		(version, oftype, length, xid) = parse_ofp_header(message)
+		x = StreamTracker(xid, maxsize)
+		with self.syncs_lock:
+			self.syncs[x.xid] = x
+		try:
+			self.send(message)
+			self.flush()
+			while True:
+				segment = x.get(timeout)
+				if segment is None:
+					break
+				(version, oftype, length, xid) = parse_ofp_header(segment)
+				if oftype != (17 if version==1 else 19): # MULTIPART_REPLY
+					raise OpenflowError(segment)
+				for entry in entries(segment):
+					yield entry
+			if self.closed:
+				raise ChannelClose("closed during multipart reply")
+		finally:
+			x.cancel()
+			with self.syncs_lock:
+				self.syncs.pop(x.xid, None)
+	
+	def multipart_entries(self, segment):
+		'''
+		Entries of one multipart reply message, parsed one by one for 
+		OpenFlow 1.3 and 1.4. A body of one record (desc, features) is 
+		the only entry. Unknown multipart types and older versions yield 
+		the raw body.
+		'''
+		(length,) = _unpack_length(segment, 2)
+		if self.version == 4:
+			from .ofp4.lazy import MultipartReplyView
+			view = MultipartReplyView(segment)
+			parser = view.parsers.get(view.type)
+			if parser is None:
+				return [segment[16:length]]
+			elif getattr(parser, "fetcher", None) is None:
+				return [view.body]
+			return view.iter_body()
+		elif self.version == 5:
+			from .ofp5 import parse as p
+			(mptype,) = struct.unpack_from("!H", segment, 8)
+			parser = p.multipart_reply_parsers.get(mptype)
+			if parser is None:
+				return [segment[16:length]]
+			fetcher = getattr(parser, "fetcher", None)
+			if fetcher is None:
+				return [parser(segment, p._cursor(16), length)]
+			return _iter_entries(fetcher, segment, p._cursor(16))
+		elif self.version == 1:
+			return [segment[12:length]]
+		else:
+			return [segment[16:length]]
+	
 	def echo(self):
 		return self._sync_simple(2, 3)
 	
@@ -1034,8 +1937,9 @@ class PortMonitorChannel(ControllerChannel, ParallelChannel):
 				
 				s = self._attach.get(port.port_no, self._attach.get(port.name))
 				if s:
-					s.set(port)
-					self._attach.pop(s)
+					s.set()
+					self._attach.pop(port.port_no, None)
+					self._attach.pop(port.name, None)
 			elif reason==1: # DELETE
 				if self._ports_init.is_set():
 					assert hit
@@ -1045,8 +1949,9 @@ class PortMonitorChannel(ControllerChannel, ParallelChannel):
 				
 				s = self._detach.get(port.port_no, self._detach.get(port.name))
 				if s:
-					s.set(port)
-					self._detach.pop(s)
+					s.set()
+					self._detach.pop(port.port_no, None)
+					self._detach.pop(port.name, None)
 			elif reason==2: # MODIFY
 				if self._ports_init.is_set():
 					assert hit
@@ -1078,6 +1983,7 @@ class PortMonitorChannel(ControllerChannel, ParallelChannel):
 					))
 			else:
 				self.send(ofp_header_only(5, version=self.version)) # FEATURES_REQUEST
+			self.flush()
 			self._ports_init.wait(timeout=self.timeout)
 		return tuple(self._ports)
 	
@@ -1091,27 +1997,23 @@ class PortMonitorChannel(ControllerChannel, ParallelChannel):
 		
 		for port in old_ports:
 			if port.port_no in old_nums-new_nums:
-				s = self._detach.get(port.port_no)
+				s = self._detach.pop(port.port_no, None)
 				if s:
-					s.set(port)
-					self._detach.pop(s)
+					s.set()
 			if port.name in old_names-new_names:
-				s = self._detach.get(port.name)
+				s = self._detach.pop(port.name, None)
 				if s:
-					s.set(port)
-					self._detach.pop(s)
+					s.set()
 		
 		for port in new_ports:
 			if port.port_no in new_nums-old_nums:
-				s = self._attach.get(port.port_no)
+				s = self._attach.pop(port.port_no, None)
 				if s:
-					s.set(port)
-					self._attach.pop(s)
+					s.set()
 			if port.name in new_names-old_names:
-				s = self._attach.get(port.name)
+				s = self._attach.pop(port.name, None)
 				if s:
-					s.set(port)
-					self._attach.pop(s)
+					s.set()
 		
 		self._ports = new_ports
 	
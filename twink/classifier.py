@@ -0,0 +1,340 @@
+'''
+Software packet classifier
+
+Classifier finds the highest priority rule of one flow table that an
+Ethernet frame would hit, by tuple space search: rules are grouped by
+their set of (field, mask), and each group is a hash table of the masked
+values. A frame is looked up once per group, with the groups in the order
+of their highest priority so that the search stops early.
+
+	c = Classifier(version=4)
+	for flow in flow_table.select(0):
+		c.add(flow.priority, flow.key, flow)
+	c.classify(frame, in_port=1) # the flow, or None
+	c.packet_in(message) # in_port etc. are taken from the PACKET_IN match
+
+Matches are given as ofp_match bytes, canonical keys (twink.match) or
+lists of oxm records. The fields of the frame are taken as a switch
+would, with OXM prerequisites: a rule on tcp_dst only hits TCP packets.
+in_port, in_phy_port, metadata and tunnel_id are not in the frame and
+are given by keyword arguments. IPV6_EXTHDR has the UNREP and UNSEQ
+bits never set. Experimenter fields are not supported. Among the rules
+of the same priority which overlap, which one hits is not defined, as
+in OpenFlow.
+'''
+from __future__ import absolute_import
+import binascii
+import struct
+from .base import sched
+
+_header = struct.Struct("!BBH")
+_match = struct.Struct("!HH")
+_eth = struct.Struct("!6s6sH")
+_vlan = struct.Struct("!HH")
+_u8 = struct.Struct("!B")
+_u16 = struct.Struct("!H")
+_u32 = struct.Struct("!I")
+_u48 = struct.Struct("!HI")
+_u128 = struct.Struct("!QQ")
+_ports = struct.Struct("!HH")
+_icmp = struct.Struct("!BB")
+_arp = struct.Struct("!H6s4s6s4s")
+_packet_in = struct.Struct("!IHBBQ")
+
+OFPXMC_OPENFLOW_BASIC = 0x8000
+OFPVID_PRESENT = 0x1000
+
+(IN_PORT, IN_PHY_PORT, METADATA,
+	ETH_DST, ETH_SRC, ETH_TYPE, VLAN_VID, VLAN_PCP,
+	IP_DSCP, IP_ECN, IP_PROTO, IPV4_SRC, IPV4_DST,
+	TCP_SRC, TCP_DST, UDP_SRC, UDP_DST, SCTP_SRC, SCTP_DST,
+	ICMPV4_TYPE, ICMPV4_CODE,
+	ARP_OP, ARP_SPA, ARP_TPA, ARP_SHA, ARP_THA,
+	IPV6_SRC, IPV6_DST, IPV6_FLABEL,
+	ICMPV6_TYPE, ICMPV6_CODE,
+	IPV6_ND_TARGET, IPV6_ND_SLL, IPV6_ND_TLL,
+	MPLS_LABEL, MPLS_TC, MPLS_BOS,
+	PBB_ISID, TUNNEL_ID, IPV6_EXTHDR) = range(40)
+
+_names = {"in_port": IN_PORT, "in_phy_port": IN_PHY_PORT,
+	"metadata": METADATA, "tunnel_id": TUNNEL_ID}
+
+# IPv6 extension header -> OFPIEH_* bit
+_exthdrs = {0: 1<<6, 43: 1<<5, 44: 1<<4, 60: 1<<3, 51: 1<<2, 50: 1<<1}
+
+def _oxm(version):
+	if version == 4:
+		from .ofp4 import oxm
+	elif version == 5:
+		from .ofp5 import oxm
+	else:
+		raise ValueError("OpenFlow 1.3 or 1.4 is required")
+	return oxm
+
+def _int(value):
+	if isinstance(value, bytes):
+		return int(binascii.b2a_hex(value) or b"0", 16)
+	return value
+
+def _mac(data, offset):
+	(hi, lo) = _u48.unpack_from(data, offset)
+	return hi << 32 | lo
+
+def _ipv6(data, offset):
+	(hi, lo) = _u128.unpack_from(data, offset)
+	return hi << 64 | lo
+
+def frame_fields(frame, fields=None):
+	'''
+	@param fields dict to add to, with in_port and such
+	@return {oxm_field: int value} of an Ethernet frame
+	'''
+	if fields is None:
+		fields = {}
+	try:
+		_frame_fields(frame, fields)
+	except struct.error:
+		pass # truncated, keeps the fields so far
+	return fields
+
+def _frame_fields(frame, f):
+	(f[ETH_DST], f[ETH_SRC], eth_type) = _eth.unpack_from(frame, 0)
+	f[ETH_DST] = _int(f[ETH_DST])
+	f[ETH_SRC] = _int(f[ETH_SRC])
+	offset = 14
+	f[VLAN_VID] = 0 # OFPVID_NONE
+	if eth_type in (0x8100, 0x88a8):
+		(tci, eth_type) = _vlan.unpack_from(frame, offset)
+		f[VLAN_VID] = OFPVID_PRESENT | tci & 0xfff
+		f[VLAN_PCP] = tci >> 13
+		offset += 4
+		while eth_type in (0x8100, 0x88a8): # inner tags are not matched
+			(tci, eth_type) = _vlan.unpack_from(frame, offset)
+			offset += 4
+	f[ETH_TYPE] = eth_type
+
+	if eth_type == 0x0800:
+		(vihl,) = _u8.unpack_from(frame, offset)
+		(tos,) = _u8.unpack_from(frame, offset+1)
+		(proto,) = _u8.unpack_from(frame, offset+9)
+		(f[IPV4_SRC],) = _u32.unpack_from(frame, offset+12)
+		(f[IPV4_DST],) = _u32.unpack_from(frame, offset+16)
+		(f[IP_DSCP], f[IP_ECN], f[IP_PROTO]) = (tos >> 2, tos & 3, proto)
+		(frag,) = _u16.unpack_from(frame, offset+6)
+		if frag & 0x1fff: # not the first fragment, without L4 header
+			return
+		offset += (vihl & 0xf) * 4
+		if proto == 1:
+			(f[ICMPV4_TYPE], f[ICMPV4_CODE]) = _icmp.unpack_from(frame, offset)
+		else:
+			_l4(frame, offset, proto, f)
+	elif eth_type == 0x86dd:
+		(vtf,) = _u32.unpack_from(frame, offset)
+		(proto,) = _u8.unpack_from(frame, offset+6)
+		f[IP_DSCP] = vtf >> 22 & 0x3f
+		f[IP_ECN] = vtf >> 20 & 3
+		f[IPV6_FLABEL] = vtf & 0xfffff
+		f[IPV6_SRC] = _ipv6(frame, offset+8)
+		f[IPV6_DST] = _ipv6(frame, offset+24)
+		offset += 40
+		exthdr = 0
+		while proto in _exthdrs:
+			exthdr |= _exthdrs[proto]
+			if proto == 50: # ESP, the rest is encrypted
+				break
+			(nxt, hlen) = _icmp.unpack_from(frame, offset)
+			if proto == 44:
+				offset += 8
+			elif proto == 51:
+				offset += (hlen + 2) * 4
+			else:
+				offset += (hlen + 1) * 8
+			proto = nxt
+		if proto == 59:
+			exthdr |= 1 # OFPIEH_NONEXT
+		f[IPV6_EXTHDR] = exthdr
+		f[IP_PROTO] = proto
+		if proto == 58:
+			(icmp_type, code) = _icmp.unpack_from(frame, offset)
+			(f[ICMPV6_TYPE], f[ICMPV6_CODE]) = (icmp_type, code)
+			if icmp_type in (135, 136) and code == 0: # neighbor solicitation/advertisement
+				f[IPV6_ND_TARGET] = _ipv6(frame, offset+8)
+				f[IPV6_ND_SLL if icmp_type == 135 else IPV6_ND_TLL] = 0
+				pos = offset + 24
+				while pos + 8 <= len(frame):
+					(otype, olen) = _icmp.unpack_from(frame, pos)
+					if olen == 0:
+						break
+					if (otype, icmp_type) in ((1, 135), (2, 136)):
+						f[IPV6_ND_SLL if otype == 1 else IPV6_ND_TLL] = _mac(frame, pos+2)
+					pos += olen * 8
+		elif proto in _exthdrs:
+			pass
+		else:
+			_l4(frame, offset, proto, f)
+	elif eth_type == 0x0806:
+		(f[ARP_OP], sha, spa, tha, tpa) = _arp.unpack_from(frame, offset+6)
+		(f[ARP_SHA], f[ARP_SPA], f[ARP_THA], f[ARP_TPA]) = (_int(sha), _int(spa), _int(tha), _int(tpa))
+	elif eth_type in (0x8847, 0x8848):
+		(label,) = _u32.unpack_from(frame, offset)
+		(f[MPLS_LABEL], f[MPLS_TC], f[MPLS_BOS]) = (label >> 12, label >> 9 & 7, label >> 8 & 1)
+	elif eth_type == 0x88e7:
+		(itag,) = _u32.unpack_from(frame, offset)
+		f[PBB_ISID] = itag & 0xffffff
+
+def _l4(frame, offset, proto, f):
+	if proto == 6:
+		(f[TCP_SRC], f[TCP_DST]) = _ports.unpack_from(frame, offset)
+	elif proto == 17:
+		(f[UDP_SRC], f[UDP_DST]) = _ports.unpack_from(frame, offset)
+	elif proto == 132:
+		(f[SCTP_SRC], f[SCTP_DST]) = _ports.unpack_from(frame, offset)
+
+
+class _Group(object):
+	'''
+	rules of one set of (field, mask)
+	'''
+	def __init__(self, masks):
+		self.masks = masks # ((oxm_field, mask), ...), mask -1 for exact match
+		self.rules = {} # masked values -> [(-priority, serial, value)] sorted
+		self.priority = -1 # the highest in rules
+
+
+class Classifier(object):
+	'''
+	rules of one flow table
+	'''
+	def __init__(self, version=4):
+		self.canonical = _oxm(version).canonical
+		self.lock = sched.Lock()
+		self.groups = {} # masks -> _Group
+		self.order = [] # _Group, the highest priority first, or None to sort
+		self.serial = 0
+
+	def __len__(self):
+		return sum([len(rs) for g in self.groups.values() for rs in g.rules.values()])
+
+	def compile(self, match):
+		'''
+		@param match ofp_match bytes, canonical key or list of oxm records
+		@return (masks, values) of the rule
+		'''
+		if isinstance(match, bytes):
+			(type, length) = _match.unpack_from(match, 0)
+			key = self.canonical(match[4:length])
+		elif isinstance(match, list):
+			key = self.canonical(match)
+		else:
+			key = match
+		masks = []
+		values = []
+		for f in key:
+			if f[0] != OFPXMC_OPENFLOW_BASIC or len(f) != 4:
+				raise ValueError("unsupported match field %s" % (f,))
+			(oxm_class, oxm_field, value, mask) = f
+			masks.append((oxm_field, -1 if mask is None else _int(mask)))
+			values.append(_int(value))
+		return (tuple(masks), tuple(values))
+
+	def add(self, priority, match, value=None):
+		'''
+		adds a rule. value is what classify() returns, which defaults to
+		(priority, match).
+		'''
+		if value is None:
+			value = (priority, match)
+		(masks, values) = self.compile(match)
+		with self.lock:
+			group = self.groups.get(masks)
+			if group is None:
+				group = self.groups[masks] = _Group(masks)
+			self.serial += 1
+			rules = group.rules.setdefault(values, [])
+			rules.append((-priority, self.serial, value))
+			rules.sort()
+			if priority > group.priority:
+				group.priority = priority
+				self.order = None
+
+	def remove(self, priority, match):
+		'''
+		removes the rules of priority and match
+		@return the number of rules removed
+		'''
+		(masks, values) = self.compile(match)
+		with self.lock:
+			group = self.groups.get(masks)
+			if group is None or values not in group.rules:
+				return 0
+			rules = group.rules[values]
+			kept = [r for r in rules if r[0] != -priority]
+			if kept:
+				group.rules[values] = kept
+			else:
+				del group.rules[values]
+			if not group.rules:
+				del self.groups[masks]
+				self.order = None
+			elif priority == group.priority:
+				group.priority = max([-r[0][0] for r in group.rules.values()])
+				self.order = None
+			return len(rules) - len(kept)
+
+	def _sort(self):
+		with self.lock:
+			order = list(self.groups.values())
+			order.sort(key=lambda g: -g.priority)
+			self.order = order
+			return order
+
+	def lookup(self, fields):
+		'''
+		@param fields {oxm_field: int value}
+		@return value of the rule which fields hit, or None
+		'''
+		best = None
+		best_priority = -1
+		order = self.order
+		if order is None:
+			order = self._sort()
+		for group in order:
+			if group.priority <= best_priority:
+				break
+			try:
+				values = tuple([fields[field] & mask for (field, mask) in group.masks])
+			except KeyError: # the packet does not have the field
+				continue
+			rules = group.rules.get(values)
+			if rules:
+				(priority, serial, value) = rules[0]
+				if -priority > best_priority:
+					(best, best_priority) = (value, -priority)
+		return best
+
+	def classify(self, frame, **kwargs):
+		'''
+		@param kwargs in_port, in_phy_port, metadata and tunnel_id
+		@return value of the rule which the frame hits, or None
+		'''
+		fields = dict([(_names[k], v) for (k, v) in kwargs.items() if v is not None])
+		if IN_PORT in fields and IN_PHY_PORT not in fields:
+			fields[IN_PHY_PORT] = fields[IN_PORT]
+		return self.lookup(frame_fields(frame, fields))
+
+	def packet_in(self, message):
+		'''
+		classifies the frame of PACKET_IN message, with the pipeline fields
+		of its match
+		'''
+		(buffer_id, total_len, reason, table_id, cookie) = _packet_in.unpack_from(message, 8)
+		(type, length) = _match.unpack_from(message, 24)
+		fields = {}
+		for f in self.canonical(message[28:24+length]):
+			if f[0] == OFPXMC_OPENFLOW_BASIC and f[1] in (IN_PORT, IN_PHY_PORT, METADATA, TUNNEL_ID):
+				fields[f[1]] = f[2]
+		if IN_PORT in fields and IN_PHY_PORT not in fields:
+			fields[IN_PHY_PORT] = fields[IN_PORT]
+		(version, oftype, mlength) = _header.unpack_from(message, 0)
+		offset = 24 + (length+7)//8*8 + 2
+		return self.lookup(frame_fields(message[offset:mlength], fields))
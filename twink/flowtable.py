@@ -0,0 +1,401 @@
+'''
+Local mirror of switch flow tables
+
+FlowTable keeps the flow entries of one datapath, indexed by table,
+priority and canonical match key (twink.match), and by cookie. Flow_mods
+are applied with the OpenFlow 1.3/1.4 semantics of ADD, MODIFY and
+DELETE, strict or not, with cookie_mask, out_port and out_group filters.
+
+FlowTableMirror is a channel mixin which keeps a FlowTable from outgoing
+FLOW_MOD (also inside BUNDLE_ADD_MESSAGE), FLOW_REMOVED and OFPMP_FLOW
+replies. A flow stats reply replaces the flows within the filter of its
+request, so sending a flow stats request of all flows resyncs the mirror.
+
+	class Controller(twink.SyncChannel, FlowTableMirror):
+		pass
+	...
+	channel.flow_table.get(0, 10, match) # the exact flow, or None
+	channel.flow_table.cookies(0xab00000000000000, 0xff00000000000000)
+
+FlowTableMirror goes after the other channel classes in the bases, so
+that it sees the messages as sent to and received from the socket, and
+a reply updates the mirror before SyncChannel methods waiting for it
+return.
+
+The mirror assumes that flow_mods succeed, and does not know the flows
+that expired without OFPFF_SEND_FLOW_REM. A flow stats request of which
+the reply did not complete in flow_request_timeout seconds is forgotten.
+'''
+from __future__ import absolute_import
+import binascii
+import bisect
+import struct
+from collections import namedtuple
+from .base import sched, OpenflowChannel, parse_ofp_header, message_bytes, _monotonic
+from .match import MatchCache
+
+OFPTT_ALL = 0xff
+OFPP_ANY = 0xffffffff
+OFPG_ANY = 0xffffffff
+_cookie_all = 0xffffffffffffffff
+
+_header = struct.Struct("!BBHI")
+_match = struct.Struct("!HH")
+_tl = struct.Struct("!HH")
+_u32 = struct.Struct("!I")
+_flow_mod = struct.Struct("!QQBBHHHIIIHH") # importance is pad in OpenFlow 1.3
+_flow_removed = struct.Struct("!QHBB")
+_flow_stats = struct.Struct("!HBxIIHHHHH2xQ")
+_flow_stats_request = struct.Struct("!B3xII4xQQ")
+_multipart = struct.Struct("!HH")
+
+# match is ofp_match bytes, and key is its canonical key.
+# ports and groups are the output actions in the instructions.
+Flow = namedtuple("Flow", '''table_id priority cookie key match
+	idle_timeout hard_timeout flags importance instructions ports groups''')
+
+# the flows a request selects
+Filter = namedtuple("Filter", "table_id key cookie cookie_mask out_port out_group")
+
+def _align(length):
+	return (length+7)//8*8
+
+def _int(value):
+	if isinstance(value, bytes):
+		return int(binascii.b2a_hex(value) or b"0", 16)
+	return value
+
+def _outputs(instructions):
+	'''
+	@return (ports, groups) of output and group actions in instructions
+	'''
+	ports = set()
+	groups = set()
+	offset = 0
+	while offset + 4 <= len(instructions):
+		(itype, ilen) = _tl.unpack_from(instructions, offset)
+		if ilen < 8:
+			break
+		if itype in (3, 4): # OFPIT_WRITE_ACTIONS, OFPIT_APPLY_ACTIONS
+			pos = offset + 8
+			while pos + 8 <= offset + ilen:
+				(atype, alen) = _tl.unpack_from(instructions, pos)
+				if alen < 8:
+					break
+				if atype == 0: # OFPAT_OUTPUT
+					ports.add(_u32.unpack_from(instructions, pos+4)[0])
+				elif atype == 22: # OFPAT_GROUP
+					groups.add(_u32.unpack_from(instructions, pos+4)[0])
+				pos += alen
+		offset += ilen
+	return (frozenset(ports), frozenset(groups))
+
+def covers(key, flow_key):
+	'''
+	@return True if the match of key includes the match of flow_key, the
+		non-strict matching of flow_mod and flow stats requests
+	'''
+	if not key:
+		return True
+	fields = dict([(f[:2], f) for f in flow_key])
+	for f in key:
+		g = fields.get(f[:2])
+		if g is None:
+			return False
+		elif len(f) != 4: # experimenter
+			if f != g:
+				return False
+		elif f[3] is None:
+			if g[3] is not None or f[2] != g[2]:
+				return False
+		else:
+			mask = _int(f[3])
+			if g[3] is not None and _int(g[3]) & mask != mask:
+				return False
+			if _int(g[2]) & mask != _int(f[2]):
+				return False
+	return True
+
+
+class FlowTable(object):
+	def __init__(self, version=4, cache_size=4096):
+		self.version = version
+		self.cache = MatchCache(version, cache_size)
+		self.lock = sched.Lock()
+		self.tables = {} # table_id -> {(priority, key): Flow}
+		self.by_cookie = {} # cookie -> set of (table_id, priority, key)
+		self.cookie_list = [] # sorted cookies in by_cookie
+
+	def __len__(self):
+		return sum([len(t) for t in self.tables.values()])
+
+	def __iter__(self):
+		with self.lock:
+			flows = [f for t in self.tables.values() for f in t.values()]
+		return iter(flows)
+
+	def key(self, match):
+		'''
+		@param match ofp_match bytes, parsed ofp_match, or a canonical key
+		'''
+		if match is None:
+			return ()
+		elif isinstance(match, tuple) and not hasattr(match, "oxm_fields"):
+			return match
+		return self.cache.match_key(match)
+
+	def get(self, table_id, priority, match):
+		'''
+		@return the flow of the same table, priority and match, or None
+		'''
+		table = self.tables.get(table_id)
+		if table:
+			return table.get((priority, self.key(match)))
+
+	def cookies(self, cookie, cookie_mask=_cookie_all):
+		'''
+		@return flows of which cookie & cookie_mask equals cookie & cookie_mask
+		'''
+		with self.lock:
+			return [self.tables[t][(p, k)] for c in self._cookies(cookie, cookie_mask)
+				for (t, p, k) in self.by_cookie[c]]
+
+	def select(self, table_id=OFPTT_ALL, match=None, cookie=0, cookie_mask=0,
+			out_port=OFPP_ANY, out_group=OFPG_ANY, priority=None, strict=False):
+		'''
+		@return flows which a flow stats request or a flow_mod selects
+		'''
+		f = Filter(table_id, self.key(match), cookie, cookie_mask, out_port, out_group)
+		with self.lock:
+			return self._select(f, priority, strict)
+
+	def _cookies(self, cookie, cookie_mask):
+		cookie &= cookie_mask
+		rest = ~cookie_mask & _cookie_all
+		if rest & (rest+1) == 0: # prefix
+			lo = bisect.bisect_left(self.cookie_list, cookie)
+			hi = bisect.bisect_right(self.cookie_list, cookie | rest)
+			return self.cookie_list[lo:hi]
+		return [c for c in self.cookie_list if c & cookie_mask == cookie]
+
+	def _select(self, f, priority=None, strict=False):
+		if f.table_id == OFPTT_ALL:
+			tables = list(self.tables.items())
+		elif f.table_id in self.tables:
+			tables = [(f.table_id, self.tables[f.table_id])]
+		else:
+			return []
+
+		if strict:
+			candidates = [t[(priority, f.key)] for (table_id, t) in tables if (priority, f.key) in t]
+		elif f.cookie_mask:
+			candidates = [self.tables[t][(p, k)] for c in self._cookies(f.cookie, f.cookie_mask)
+				for (t, p, k) in self.by_cookie[c] if f.table_id in (OFPTT_ALL, t)]
+		else:
+			candidates = [flow for (table_id, t) in tables for flow in t.values()]
+
+		ret = []
+		for flow in candidates:
+			if flow.cookie & f.cookie_mask != f.cookie & f.cookie_mask:
+				continue
+			if f.out_port != OFPP_ANY and f.out_port not in flow.ports:
+				continue
+			if f.out_group != OFPG_ANY and f.out_group not in flow.groups:
+				continue
+			if not strict and not covers(f.key, flow.key):
+				continue
+			ret.append(flow)
+		return ret
+
+	def _add(self, flow):
+		ident = (flow.priority, flow.key)
+		old = self.tables.get(flow.table_id, {}).get(ident)
+		if old is not None:
+			self._remove(old)
+		self.tables.setdefault(flow.table_id, {})[ident] = flow
+		cookies = self.by_cookie.get(flow.cookie)
+		if cookies is None:
+			cookies = self.by_cookie[flow.cookie] = set()
+			bisect.insort(self.cookie_list, flow.cookie)
+		cookies.add((flow.table_id,) + ident)
+
+	def _remove(self, flow):
+		ident = (flow.priority, flow.key)
+		table = self.tables[flow.table_id]
+		del table[ident]
+		if not table:
+			del self.tables[flow.table_id]
+		cookies = self.by_cookie[flow.cookie]
+		cookies.discard((flow.table_id,) + ident)
+		if not cookies:
+			del self.by_cookie[flow.cookie]
+			del self.cookie_list[bisect.bisect_left(self.cookie_list, flow.cookie)]
+
+	def _flow(self, table_id, priority, cookie, match, idle_timeout, hard_timeout,
+			flags, importance, instructions):
+		(type, length) = _match.unpack_from(match, 0)
+		(ports, groups) = _outputs(instructions)
+		return Flow(table_id, priority, cookie, self.cache.key(match[4:length]), match,
+			idle_timeout, hard_timeout, flags, importance, instructions, ports, groups)
+
+	def flow_mod(self, message):
+		'''
+		applies FLOW_MOD message
+		'''
+		(cookie, cookie_mask, table_id, command, idle_timeout, hard_timeout, priority,
+			buffer_id, out_port, out_group, flags, importance) = _flow_mod.unpack_from(message, 8)
+		if self.version == 4:
+			importance = 0
+		(version, oftype, length, xid) = _header.unpack_from(message, 0)
+		(mtype, mlength) = _match.unpack_from(message, 48)
+		match = message[48:48+_align(mlength)]
+		instructions = message[48+_align(mlength):length]
+
+		if command == 0: # OFPFC_ADD
+			flow = self._flow(table_id, priority, cookie, match, idle_timeout, hard_timeout,
+				flags, importance, instructions)
+			with self.lock:
+				self._add(flow)
+			return
+
+		strict = command in (2, 4) # OFPFC_MODIFY_STRICT, OFPFC_DELETE_STRICT
+		if command in (1, 2): # OFPFC_MODIFY, OFPFC_MODIFY_STRICT
+			(out_port, out_group) = (OFPP_ANY, OFPG_ANY) # not used for modify
+		f = Filter(table_id, self.cache.key(match[4:mlength]), cookie, cookie_mask, out_port, out_group)
+		with self.lock:
+			for flow in self._select(f, priority, strict):
+				if command in (1, 2):
+					(ports, groups) = _outputs(instructions)
+					self._add(flow._replace(instructions=instructions, ports=ports, groups=groups))
+				else:
+					self._remove(flow)
+
+	def flow_removed(self, message):
+		'''
+		applies FLOW_REMOVED message
+		'''
+		(cookie, priority, reason, table_id) = _flow_removed.unpack_from(message, 8)
+		(mtype, mlength) = _match.unpack_from(message, 48)
+		key = self.cache.key(message[52:48+mlength])
+		with self.lock:
+			flow = self.tables.get(table_id, {}).get((priority, key))
+			if flow is not None:
+				self._remove(flow)
+
+	def flow_stats(self, data, offset=0):
+		'''
+		@return flows in OFPMP_FLOW reply messages of data
+		'''
+		ret = []
+		while offset < len(data):
+			(version, oftype, length, xid) = _header.unpack_from(data, offset)
+			pos = offset + 16
+			while pos < offset + length:
+				(elength, table_id, duration_sec, duration_nsec, priority, idle_timeout, hard_timeout,
+					flags, importance, cookie) = _flow_stats.unpack_from(data, pos)
+				if self.version == 4:
+					importance = 0
+				(mtype, mlength) = _match.unpack_from(data, pos+48)
+				end = pos + 48 + _align(mlength)
+				ret.append(self._flow(table_id, priority, cookie, bytes(data[pos+48:end]),
+					idle_timeout, hard_timeout, flags, importance, bytes(data[end:pos+elength])))
+				pos += elength
+			offset += length
+		return ret
+
+	def replace(self, f, flows):
+		'''
+		replaces the flows which Filter f selects with flows
+		'''
+		with self.lock:
+			for flow in self._select(f):
+				self._remove(flow)
+			for flow in flows:
+				self._add(flow)
+
+	def request_filter(self, message):
+		'''
+		@return Filter of OFPMP_FLOW request message
+		'''
+		(table_id, out_port, out_group, cookie, cookie_mask) = _flow_stats_request.unpack_from(message, 16)
+		(mtype, mlength) = _match.unpack_from(message, 48)
+		return Filter(table_id, self.cache.key(message[52:48+mlength]), cookie, cookie_mask, out_port, out_group)
+
+
+class FlowTableMirror(OpenflowChannel):
+	'''
+	FlowTableMirror exposes `flow_table`, which follows the flow_mods sent
+	and the flow removed and flow stats messages received.
+	'''
+	flow_request_timeout = 60 # seconds
+
+	def __init__(self, *args, **kwargs):
+		super(FlowTableMirror, self).__init__(*args, **kwargs)
+		self.flow_table_cache_size = kwargs.get("flow_table_cache_size", 4096)
+		self.flow_request_timeout = kwargs.get("flow_request_timeout", self.flow_request_timeout)
+		self._flow_table = None
+		self._flow_requests = {} # xid -> (Filter, [Flow], deadline)
+
+	@property
+	def flow_table(self):
+		if self._flow_table is None:
+			if self.version not in (4, 5):
+				raise ValueError("OpenFlow 1.3 or 1.4 is required")
+			self._flow_table = FlowTable(self.version, self.flow_table_cache_size)
+		return self._flow_table
+
+	def send(self, message, **kwargs):
+		if self.version in (4, 5):
+			data = message_bytes(message)
+			offset = 0
+			while offset + 8 <= len(data):
+				(version, oftype, length, xid) = _header.unpack_from(data, offset)
+				if length < 8:
+					break
+				self._mirror_sent(data[offset:offset+length], oftype, xid)
+				offset += length
+		return super(FlowTableMirror, self).send(message, **kwargs)
+
+	def _mirror_sent(self, message, oftype, xid):
+		if oftype == 14: # FLOW_MOD
+			self.flow_table.flow_mod(message)
+		elif oftype == 18: # MULTIPART_REQUEST
+			(mptype, flags) = _multipart.unpack_from(message, 8)
+			if mptype == 1: # OFPMP_FLOW
+				now = _monotonic()
+				self._prune_flow_requests(now)
+				self._flow_requests[xid] = (self.flow_table.request_filter(message), [],
+					now + self.flow_request_timeout)
+		elif oftype == 34 and self.version == 5: # BUNDLE_ADD_MESSAGE
+			(version, oftype, length, xid) = _header.unpack_from(message, 16)
+			self._mirror_sent(message[16:16+length], oftype, xid)
+
+	def recv(self):
+		message = super(FlowTableMirror, self).recv()
+		if message and self.version in (4, 5):
+			(version, oftype, length, xid) = parse_ofp_header(message)
+			if oftype == 11: # FLOW_REMOVED
+				self.flow_table.flow_removed(message)
+			elif oftype == 19: # MULTIPART_REPLY
+				request = self._flow_requests.get(xid)
+				if request:
+					(f, flows, deadline) = request
+					(mptype, flags) = _multipart.unpack_from(message, 8)
+					if mptype == 1: # OFPMP_FLOW
+						flows.extend(self.flow_table.flow_stats(message))
+					if not flags & 1: # no OFPMPF_REPLY_MORE
+						self._flow_requests.pop(xid, None)
+						if mptype == 1:
+							self.flow_table.replace(f, flows)
+			elif oftype == 1: # ERROR
+				self._flow_requests.pop(xid, None)
+		return message
+
+	def _prune_flow_requests(self, now):
+		for xid, request in list(self._flow_requests.items()):
+			if request[2] < now:
+				self._flow_requests.pop(xid, None)
+
+	def close(self):
+		self._flow_requests.clear()
+		super(FlowTableMirror, self).close()
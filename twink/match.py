@@ -0,0 +1,74 @@
+'''
+Canonical match keys
+
+oxm.canonical() turns oxm_fields into a hashable key which does not
+depend on the order of the fields or on the bits under the masks.
+MatchCache keeps the keys of recently seen oxm_fields bytes, so that
+a match seen again is not parsed again.
+
+	cache = MatchCache(version=4)
+	if cache.match_key(flow.match) in installed:
+		...
+'''
+from __future__ import absolute_import
+import struct
+from collections import OrderedDict
+from .base import sched
+
+_match = struct.Struct("!HH")
+
+def _oxm(version):
+	if version == 4:
+		from .ofp4 import oxm
+	elif version == 5:
+		from .ofp5 import oxm
+	else:
+		raise ValueError("OpenFlow 1.3 or 1.4 is required")
+	return oxm
+
+def key(version, oxm_fields):
+	'''
+	@return canonical key of oxm_fields bytes or records
+	'''
+	return _oxm(version).canonical(oxm_fields)
+
+class MatchCache(object):
+	'''
+	LRU cache of canonical keys by oxm_fields bytes
+	'''
+	def __init__(self, version=4, size=4096):
+		self.canonical = _oxm(version).canonical
+		self.size = size
+		self.entries = OrderedDict() # oxm_fields -> key, the oldest first
+		self.lock = sched.Lock()
+		self.hits = 0
+		self.misses = 0
+
+	def __len__(self):
+		return len(self.entries)
+
+	def key(self, oxm_fields):
+		if not isinstance(oxm_fields, bytes):
+			oxm_fields = bytes(bytearray(oxm_fields))
+		with self.lock:
+			ret = self.entries.pop(oxm_fields, None)
+			if ret is not None:
+				self.entries[oxm_fields] = ret
+				self.hits += 1
+				return ret
+		ret = self.canonical(oxm_fields)
+		with self.lock:
+			self.misses += 1
+			self.entries[oxm_fields] = ret
+			while len(self.entries) > self.size:
+				self.entries.popitem(last=False)
+		return ret
+
+	def match_key(self, match):
+		'''
+		@param match ofp_match bytes, or a parsed ofp_match record
+		'''
+		if isinstance(match, tuple):
+			return self.key(match.oxm_fields)
+		(type, length) = _match.unpack_from(match, 0)
+		return self.key(match[4:length])
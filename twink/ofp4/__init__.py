@@ -141,6 +141,12 @@ ofp_port_features = type("ofp_port_features", (_enum_base,), {
 		COPPER FIBER AUTONEG PAUSE PAUSE_ANY'''
 	})(globals())
 
+ofp_queue = type("ofp_queue", (_enum_base,), {
+	"prefix": "OFPQ",
+	"numbers": {
+		"ALL": 0xffffffff }
+	})(globals())
+
 ofp_queue_properties = type("ofp_queue_properties", (_enum_base,), {
 	"prefix": "OFPQT",
 	"numbers": {
@@ -542,3 +548,14 @@ def ofptuple(etherframe, in_port=None):
 		transport_src_port_or_icmp_type,
 		transport_dst_port_or_icmp_code
 		)
+
+def __getattr__(name):
+	'''
+	view(message, offset=0) returns a lazy view of the message, see 
+	twink.ofp4.lazy. It is imported on the first access, and stays out 
+	of `from twink.ofp4 import *`.
+	'''
+	if name == "view":
+		from .lazy import view
+		return view
+	raise AttributeError("module %r has no attribute %r" % (__name__, name))
@@ -2,6 +2,7 @@ from __future__ import absolute_import
 import struct
 import random
 from . import *
+from .schema import schema as _schema
 
 _len = len
 _type = type
@@ -83,6 +84,11 @@ def ofp_(header, data, type=None):
 	else:
 		raise ValueError(header)
 	
+	if isinstance(data, list):
+		# buffer list for scatter-gather send
+		length = 8 + sum([_len(d) for d in data])
+		return [ofp_header(version, oftype, length, xid)+data[0]] + data[1:]
+	
 	data = _obj(data)
 	length = 8 + _len(data)
 	return ofp_header(version, oftype, length, xid)+data
@@ -133,14 +139,7 @@ def ofp_packet_queue(queue_id, port, len, properties):
 	assert _len(desc)==16
 	return desc + properties
 
-def ofp_queue_prop_header(property, len):
-	if len is None:
-		len = 8
-	msg = _pack("HH4x",
-		property,
-		len)
-	assert _len(msg)==8
-	return msg
+ofp_queue_prop_header = _schema.builder("ofp_queue_prop_header")
 
 def ofp_queue_prop_(prop_header, data, type=None):
 	if isinstance(prop_header, bytes):
@@ -218,33 +217,9 @@ def ofp_match(type, length, oxm_fields):
 	return msg
 
 # 7.2.4
-def ofp_instruction(type, len):
-	return _pack("HH", type, len)
-
-def ofp_instruction_goto_table(type, len, table_id):
-	if type is None:
-		type = OFPIT_GOTO_TABLE
-	assert type==OFPIT_GOTO_TABLE
-	len = 8
-	msg = _pack("HHB3x",
-		type,
-		len,
-		table_id)
-	assert _len(msg)==8
-	return msg
-
-def ofp_instruction_write_metadata(type, len, metadata, metadata_mask):
-	if type is None:
-		type = OFPIT_WRITE_METADATA
-	assert type==OFPIT_WRITE_METADATA
-	len = 24
-	msg = _pack("HH4xQQ",
-		type,
-		len,
-		metadata,
-		metadata_mask)
-	assert _len(msg)==24
-	return msg
+ofp_instruction = _schema.builder("ofp_instruction")
+ofp_instruction_goto_table = _schema.builder("ofp_instruction_goto_table")
+ofp_instruction_write_metadata = _schema.builder("ofp_instruction_write_metadata")
 
 def ofp_instruction_actions(type, len, actions):
 	'''type: OFPIT_WRITE_ACTIONS/APPLY_ACTIONS/CLEAR_ACTIONS
@@ -266,16 +241,7 @@ def ofp_instruction_actions(type, len, actions):
 		len) + actions
 	return msg
 
-def ofp_instruction_meter(type, len, meter_id):
-	if type is None:
-		type = OFPIT_METER
-	assert type==OFPIT_METER
-	len = 8
-	msg = _pack("HHI",
-		type,
-		len,
-		meter_id)
-	return msg
+ofp_instruction_meter = _schema.builder("ofp_instruction_meter")
 
 def ofp_instruction_experimenter(type, len, experimenter, data):
 	if type is None:
@@ -293,81 +259,12 @@ def ofp_instruction_experimenter(type, len, experimenter, data):
 	return msg
 
 # 7.2.5
-def ofp_action_header(type, len):
-	return _pack("HH4x", type, len)
-
-def ofp_action_output(type, len, port, max_len):
-	'''max_len: OFP_CML_MAX/NO_BUFFER
-	'''
-	if type is None:
-		type = OFPAT_OUTPUT
-	assert type == OFPAT_OUTPUT
-	
-	len = 16
-	
-	msg = _pack("HHIH6x",
-		type,
-		len,
-		port,
-		max_len)
-	assert _len(msg) == 16
-	return msg
-
-def ofp_action_group(type, len, group_id):
-	if type is None:
-		type = OFPAT_GROUP
-	assert type == OFPAT_GROUP
-	
-	len = 8
-	
-	msg = _pack("HHI",
-		type,
-		len,
-		group_id)
-	assert _len(msg) == 8
-	return msg
-
-def ofp_action_set_queue(type, len, queue_id):
-	if type is None:
-		type = OFPAT_SET_QUEUE
-	assert type == OFPAT_SET_QUEUE
-	
-	len = 8
-	
-	msg = _pack("HHI",
-		type,
-		len,
-		queue_id)
-	assert _len(msg) == 8
-	return msg
-
-def ofp_action_mpls_ttl(type, len, mpls_ttl):
-	if type is None:
-		type = OFPAT_SET_MPLS_TTL
-	assert type == OFPAT_SET_MPLS_TTL
-	
-	len = 8
-	
-	msg = _pack("HHB3x",
-		type,
-		len,
-		mpls_ttl)
-	assert _len(msg) == 8
-	return msg
-
-def ofp_action_nw_ttl(type, len, nw_ttl):
-	if type is None:
-		type = OFPAT_SET_NW_TTL
-	assert type == OFPAT_SET_NW_TTL
-	
-	len = 8
-	
-	msg = _pack("HHB3x",
-		type,
-		len,
-		nw_ttl)
-	assert _len(msg) == 8
-	return msg
+ofp_action_header = _schema.builder("ofp_action_header")
+ofp_action_output = _schema.builder("ofp_action_output")
+ofp_action_group = _schema.builder("ofp_action_group")
+ofp_action_set_queue = _schema.builder("ofp_action_set_queue")
+ofp_action_mpls_ttl = _schema.builder("ofp_action_mpls_ttl")
+ofp_action_nw_ttl = _schema.builder("ofp_action_nw_ttl")
 
 def ofp_action_push(type, len, ethertype):
 	'''type: OFPAT_PUSH_VLAN/PUSH_MPLS/PUSH_PBB
@@ -383,19 +280,7 @@ def ofp_action_push(type, len, ethertype):
 	assert _len(msg) == 8
 	return msg
 
-def ofp_action_pop_mpls(type, len, ethertype):
-	if type is None:
-		type = OFPAT_POP_MPLS
-	assert type == OFPAT_POP_MPLS
-	
-	len = 8
-	
-	msg = _pack("3H2x",
-		type,
-		len,
-		ethertype)
-	assert _len(msg) == 8
-	return msg
+ofp_action_pop_mpls = _schema.builder("ofp_action_pop_mpls")
 
 def ofp_action_set_field(type, len, field):
 	if type is None:
@@ -454,15 +339,16 @@ def ofp_table_mod(header, table_id, config):
 # 7.3.4.1
 def ofp_flow_mod(header, cookie, cookie_mask, table_id, command,
 		idle_timeout, hard_timeout, priority, buffer_id, out_port, out_group, flags,
-		match, instructions):
+		match, instructions, iov=False):
 	'''command=OFPFC_ADD/MODIFY/MODIFY_STRICT/DELETE/DELETE_STRICT
+	iov=True returns a list of buffers for scatter-gather send
 	'''
 	if isinstance(instructions, bytes):
-		pass
+		instructions = [instructions]
 	elif isinstance(instructions, (tuple,list)):
-		instructions = b"".join([_obj(i) for i in instructions])
+		instructions = [_obj(i) for i in instructions]
 	elif instructions is None:
-		instructions = b""
+		instructions = []
 	else:
 		raise ValueError(instructions)
 	
@@ -475,15 +361,16 @@ def ofp_flow_mod(header, cookie, cookie_mask, table_id, command,
 	if out_group is None:
 		out_group = OFPG_ANY
 	
-	msg = ofp_(header, _pack("QQBB3H3IH2x",
+	data = [_pack("QQBB3H3IH2x",
 		cookie, cookie_mask,
 		table_id, command,
 		idle_timeout, hard_timeout,
 		priority, buffer_id,
 		out_port, out_group,
-		flags)+_obj(match)+instructions, 
-		OFPT_FLOW_MOD)
-	return msg
+		flags), _obj(match)] + instructions
+	if not iov:
+		data = b"".join(data)
+	return ofp_(header, data, OFPT_FLOW_MOD)
 
 # 7.3.4.2
 def ofp_group_mod(header, command, type, group_id, buckets):
@@ -550,41 +437,9 @@ def ofp_meter_mod(header, command, flags, meter_id, bands):
 		OFPT_METER_MOD)
 	return msg
 
-def ofp_meter_band_header(type, len, rate, burst_size):
-	msg = _pack("HHII", type, len, rate, burst_size)
-	assert _len(msg) == 12
-	return msg
-
-def ofp_meter_band_drop(type, len, rate, burst_size):
-	if type is None:
-		type = OFPMBT_DROP
-	assert type == OFPMBT_DROP
-	
-	len = 16
-	
-	msg = _pack("HHII4x",
-		type,
-		len,
-		rate,
-		burst_size)
-	assert _len(msg) == 16
-	return msg
-
-def ofp_meter_band_dscp_remark(type, len, rate, burst_size, prec_level):
-	if type is None:
-		type = OFPMBT_DSCP_REMARK
-	assert type == OFPMBT_DSCP_REMARK
-	
-	len = 16
-	
-	msg = _pack("HHIIB3x",
-		type,
-		len,
-		rate,
-		burst_size,
-		prec_level)
-	assert _len(msg) == 16
-	return msg
+ofp_meter_band_header = _schema.builder("ofp_meter_band_header")
+ofp_meter_band_drop = _schema.builder("ofp_meter_band_drop")
+ofp_meter_band_dscp_remark = _schema.builder("ofp_meter_band_dscp_remark")
 
 def ofp_meter_band_experimenter(type, len, rate, burst_size, experimenter, data):
 	if type is None:
@@ -660,25 +515,7 @@ def ofp_multipart_reply(header, type, flags, body):
 	return msg
 
 # 7.3.5.1
-def ofp_desc(mfr_desc, hw_desc, sw_desc, serial_num, dp_desc):
-	if mfr_desc is None:
-		mfr_desc = b""
-	if hw_desc is None:
-		hw_desc = b""
-	if sw_desc is None:
-		sw_desc = b""
-	if serial_num is None:
-		serial_num = b""
-	if dp_desc is None:
-		dp_desc = b""
-	msg = _pack("256s256s256s32s256s",
-		mfr_desc,
-		hw_desc,
-		sw_desc,
-		serial_num,
-		dp_desc)
-	assert _len(msg) == 1056
-	return msg
+ofp_desc = _schema.builder("ofp_desc")
 
 # 7.3.5.2
 def ofp_flow_stats_request(table_id, out_port, out_group, cookie, cookie_mask, match):
@@ -735,14 +572,10 @@ def ofp_aggregate_stats_request(table_id, out_port, out_group, cookie, cookie_ma
 	assert len(desc) == 40
 	return desc + _obj(match)
 
-def ofp_aggregate_stats_reply(packet_count, byte_count, flow_count):
-	return _pack("QQI4x", packet_count, byte_count, flow_count)
+ofp_aggregate_stats_reply = _schema.builder("ofp_aggregate_stats_reply")
 
 # 7.3.5.4
-def ofp_table_stats(table_id, active_count, lookup_count, matched_count):
-	msg = _pack("B3xIQQ", table_id, active_count, lookup_count, matched_count)
-	assert _len(msg) == 24
-	return msg
+ofp_table_stats = _schema.builder("ofp_table_stats")
 
 # 7.3.5.5.1
 def ofp_table_features(length, table_id, name, metadata_match, metadata_write, config, max_entries, properties):
@@ -763,8 +596,7 @@ def ofp_table_features(length, table_id, name, metadata_match, metadata_write, c
 	return msg
 
 # 7.3.5.5.2
-def ofp_table_feature_prop_header(type, length):
-	return _pack("HH", type, length)
+ofp_table_feature_prop_header = _schema.builder("ofp_table_feature_prop_header")
 
 def ofp_table_feature_prop_instructions(type, length, instruction_ids):
 	if isinstance(instruction_ids, (list,tuple)):
@@ -842,34 +674,15 @@ def ofp_table_feature_prop_experimenter(type, length, experimenter, exp_type, da
 	return _pack("HHII", type, length, experimenter, exp_type) + data
 
 # 7.3.5.6
-def ofp_port_stats_request(port_no):
-	if port_no is None:
-		port_no = OFPP_ANY
-	return _pack("I4x", port_no)
-
-def ofp_port_stats(port_no, rx_packets, tx_packets, rx_bytes, tx_bytes, rx_dropped, tx_dropped,
-		rx_errors, tx_errors, rx_frame_err, rx_over_err, rx_crc_err,
-		collisions, duration_sec, duration_nsec):
-	return _pack("I4x12Q2I", port_no, rx_packets, tx_packets, rx_bytes, tx_bytes, rx_dropped, tx_dropped,
-		rx_errors, tx_errors, rx_frame_err, rx_over_err, rx_crc_err,
-		collisions, duration_sec, duration_nsec)
+ofp_port_stats_request = _schema.builder("ofp_port_stats_request")
+ofp_port_stats = _schema.builder("ofp_port_stats")
 
 # 7.3.5.8
-def ofp_queue_stats_request(port_no, queue_id):
-	if port_no is None:
-		port_no = OFPP_ANY
-	if queue_id is None:
-		queue_id = OFPQ_ALL
-	return _pack("II", port_no, queue_id)
-
-def ofp_queue_stats(port_no, queue_id, tx_bytes, tx_packets, tx_errors, duration_sec, duration_nsec):
-	return _pack("2I3Q2I", port_no, queue_id, tx_bytes, tx_packets, tx_errors, duration_sec, duration_nsec)
+ofp_queue_stats_request = _schema.builder("ofp_queue_stats_request")
+ofp_queue_stats = _schema.builder("ofp_queue_stats")
 
 # 7.3.5.9
-def ofp_group_stats_request(group_id):
-	if group_id is None:
-		group_id = OFPG_ALL
-	return _pack("I4x", group_id)
+ofp_group_stats_request = _schema.builder("ofp_group_stats_request")
 
 def ofp_group_stats(length, group_id, ref_count, packet_count, byte_count,
 		duration_sec, duration_nsec, bucket_stats):
@@ -887,8 +700,7 @@ def ofp_group_stats(length, group_id, ref_count, packet_count, byte_count,
 	return _pack("H2xII4xQQII", length, group_id, ref_count, packet_count, byte_count,
 		duration_sec, duration_nsec) + bucket_stats
 
-def ofp_bucket_counter(packet_count, byte_count):
-	return _pack("QQ", packet_count, byte_count)
+ofp_bucket_counter = _schema.builder("ofp_bucket_counter")
 
 # 7.3.5.10
 def ofp_group_desc(length, type, group_id, buckets):
@@ -945,8 +757,7 @@ def ofp_meter_stats(meter_id, len, flow_count, packet_in_count, byte_in_count,
 	return _pack("IH6xIQQII", meter_id, len, flow_count, packet_in_count, byte_in_count,
 		duration_sec, duration_nsec) + band_stats
 
-def ofp_meter_band_stats(packet_band_count, byte_band_count):
-	return _pack("QQ", packet_band_count, byte_band_count)
+ofp_meter_band_stats = _schema.builder("ofp_meter_band_stats")
 
 # 7.3.5.13
 def ofp_meter_config(length, flags, meter_id, bands):
@@ -964,12 +775,10 @@ def ofp_meter_config(length, flags, meter_id, bands):
 	return _pack("HHI", length, flags, meter_id) + bands
 
 # 7.3.5.14
-def ofp_meter_features(max_meter, band_types, capabilities, max_bands, max_color):
-	return _pack("IIIBB2x", max_meter, band_types, capabilities, max_bands, max_color)
+ofp_meter_features = _schema.builder("ofp_meter_features")
 
 # 7.3.5.15
-def ofp_experimenter_multipart_header(experimenter, exp_type):
-	return _pack("II", experimenter, exp_type)
+ofp_experimenter_multipart_header = _schema.builder("ofp_experimenter_multipart_header")
 
 # XXX
 
@@ -994,7 +803,11 @@ def ofp_queue_get_config_reply(header, port, queues):
 		OFPT_QUEUE_GET_CONFIG_REPLY)
 
 # 7.3.7
-def ofp_packet_out(header, buffer_id, in_port, actions_len, actions, data):
+def ofp_packet_out(header, buffer_id, in_port, actions_len, actions, data, iov=False):
+	'''
+	iov=True returns a list of buffers for scatter-gather send, 
+	data is not copied and may be a bytearray or memoryview.
+	'''
 	if isinstance(actions, (list,tuple)):
 		actions = b"".join([_obj(a) for a in actions])
 	elif isinstance(actions, bytes):
@@ -1006,6 +819,8 @@ def ofp_packet_out(header, buffer_id, in_port, actions_len, actions, data):
 	
 	if isinstance(data, bytes):
 		pass
+	elif iov and isinstance(data, (bytearray, memoryview)):
+		pass
 	elif data is None:
 		data = b""
 	else:
@@ -1016,6 +831,10 @@ def ofp_packet_out(header, buffer_id, in_port, actions_len, actions, data):
 	
 	actions_len = _len(actions)
 	
+	if iov:
+		return ofp_(header,
+			[_pack("IIH6x", buffer_id, in_port, actions_len) + actions, data],
+			OFPT_PACKET_OUT)
 	return ofp_(header,
 		_pack("IIH6x", buffer_id, in_port, actions_len) + actions + data,
 		OFPT_PACKET_OUT)
@@ -1033,7 +852,14 @@ def ofp_async_config(header, packet_in_mask, port_status_mask, flow_removed_mask
 		(OFPT_GET_ASYNC_REPLY, OFPT_SET_ASYNC))
 
 # 7.4.1
-def ofp_packet_in(header, buffer_id, total_len, reason, table_id, cookie, match, data):
+def ofp_packet_in(header, buffer_id, total_len, reason, table_id, cookie, match, data, iov=False):
+	'''
+	iov=True returns a list of buffers for scatter-gather send
+	'''
+	if iov:
+		return ofp_(header,
+			[_pack("IHBBQ", buffer_id, total_len, reason, table_id, cookie), _obj(match) + b"\0"*2, data],
+			OFPT_PACKET_IN)
 	return ofp_(header,
 		_pack("IHBBQ", buffer_id, total_len, reason, table_id, cookie) + _obj(match) + b"\0"*2 + data,
 		OFPT_PACKET_IN)
@@ -1075,8 +901,7 @@ def ofp_hello(header, elements):
 	
 	return ofp_(header, elements, OFPT_HELLO)
 
-def ofp_hello_elem_header(type, length):
-	return _pack("HH", type, length)
+ofp_hello_elem_header = _schema.builder("ofp_hello_elem_header")
 
 def ofp_hello_elem_versionbitmap(type, length, bitmaps):
 	if type is None:
@@ -1102,3 +927,128 @@ def ofp_experimenter_header(header, experimenter, exp_type, data):
 		_pack("II", experimenter, exp_type) + data,
 		OFPT_EXPERIMENTER)
 
+
+# Encoders into a preallocated buffer.
+#
+# *_into(buf, offset, ...) takes the same arguments as the builder, writes
+# the message into buf (a bytearray or writable memoryview) at offset
+# without intermediate bytes, and returns the number of bytes written.
+# Many messages may be encoded into one send buffer.
+#
+#	buf = bytearray(1<<20)
+#	offset = 0
+#	for rule in rules:
+#		offset += ofp_flow_mod_into(buf, offset, None, ...)
+#	channel.send(memoryview(buf)[:offset])
+#
+# Records (namedtuples) in match, instructions and actions are encoded by
+# their *_into encoder, or the schema, or the builder as a fallback.
+
+_header_struct = struct.Struct("!BBHI")
+_match_header_struct = struct.Struct("!HH")
+_instruction_actions_struct = struct.Struct("!HH4x")
+_flow_mod_struct = struct.Struct("!QQBB3H3IH2x")
+_packet_out_struct = struct.Struct("!IIH6x")
+_pads = [b"\0"*i for i in range(8)]
+_intos = {}
+
+def _copy_into(buf, offset, data):
+	length = _len(data)
+	if offset + length > _len(buf):
+		raise ValueError("buffer too small")
+	buf[offset:offset+length] = data
+	return length
+
+_buffers = (bytes, bytearray, memoryview)
+
+def _into(buf, offset, obj):
+	if isinstance(obj, _buffers):
+		return _copy_into(buf, offset, obj)
+	elif isinstance(obj, tuple):
+		name = obj.__class__.__name__
+		into = _intos.get(name)
+		if into is None:
+			into = globals().get(name+"_into")
+			if into is None and name in _schema.entries:
+				into = _schema.builder_into(name)
+			elif into is None:
+				builder = globals().get(name)
+				if builder is None:
+					raise ValueError(obj)
+				into = lambda buf, offset, *args: _copy_into(buf, offset, builder(*args))
+			_intos[name] = into
+		return into(buf, offset, *obj)
+	raise ValueError(obj)
+
+def _list_into(buf, offset, objs):
+	if objs is None:
+		return 0
+	elif isinstance(objs, (list, tuple)):
+		start = offset
+		for obj in objs:
+			offset += _into(buf, offset, obj)
+		return offset - start
+	return _into(buf, offset, objs)
+
+def _header_into(buf, offset, header, type, length):
+	if isinstance(header, tuple):
+		(version, oftype, _, xid) = header
+		if oftype is None:
+			oftype = type
+	elif isinstance(header, bytes):
+		(version, oftype, _, xid) = _unpack("BBHI", header, 0)
+	elif header is None:
+		(version, oftype, xid) = (4, type, None)
+	else:
+		raise ValueError(header)
+	assert oftype == type
+	if version is None:
+		version = 4
+	assert version == 4
+	if xid is None:
+		xid = default_xid()
+	_header_struct.pack_into(buf, offset, version, oftype, length, xid)
+	return 8
+
+def ofp_match_into(buf, offset, type, length, oxm_fields):
+	if type is None:
+		type = OFPMT_OXM
+	length = 4 + _list_into(buf, offset+4, oxm_fields)
+	_match_header_struct.pack_into(buf, offset, type, length)
+	return length + _copy_into(buf, offset+length, _pads[_align(length)-length])
+
+def ofp_instruction_actions_into(buf, offset, type, len, actions):
+	assert type in (OFPIT_WRITE_ACTIONS, OFPIT_APPLY_ACTIONS, OFPIT_CLEAR_ACTIONS)
+	len = 8 + _list_into(buf, offset+8, actions)
+	_instruction_actions_struct.pack_into(buf, offset, type, len)
+	return len
+
+def ofp_flow_mod_into(buf, offset, header, cookie, cookie_mask, table_id, command,
+		idle_timeout, hard_timeout, priority, buffer_id, out_port, out_group, flags,
+		match, instructions):
+	if buffer_id is None:
+		buffer_id = OFP_NO_BUFFER
+	if out_port is None:
+		out_port = OFPP_ANY
+	if out_group is None:
+		out_group = OFPG_ANY
+	_flow_mod_struct.pack_into(buf, offset+8,
+		cookie, cookie_mask,
+		table_id, command,
+		idle_timeout, hard_timeout,
+		priority, buffer_id,
+		out_port, out_group,
+		flags)
+	length = 48 + _into(buf, offset+48, match)
+	length += _list_into(buf, offset+length, instructions)
+	return _header_into(buf, offset, header, OFPT_FLOW_MOD, length) + length - 8
+
+def ofp_packet_out_into(buf, offset, header, buffer_id, in_port, actions_len, actions, data):
+	if buffer_id is None:
+		buffer_id = OFP_NO_BUFFER
+	actions_len = _list_into(buf, offset+24, actions)
+	_packet_out_struct.pack_into(buf, offset+8, buffer_id, in_port, actions_len)
+	length = 24 + actions_len
+	if data is not None:
+		length += _copy_into(buf, offset+length, data)
+	return _header_into(buf, offset, header, OFPT_PACKET_OUT, length) + length - 8
@@ -0,0 +1,238 @@
+'''
+Lazy message views
+
+A view keeps the message buffer and decodes a field on the first access,
+then caches it. Variable length lists can be walked with iter_*() without
+building the whole list.
+
+	v = twink.ofp4.view(message)
+	if v.header.type == OFPT_PACKET_IN:
+		v.buffer_id # decodes the fixed part only
+		v.match # decodes ofp_match only
+	elif v.header.type == OFPT_MULTIPART_REPLY:
+		for flow in v.iter_body():
+			...
+
+Attributes that a view class does not know are taken from the full
+parse() result.
+'''
+from __future__ import absolute_import
+import struct
+from . import *
+from . import parse as p
+
+_header = struct.Struct("!BBHI")
+_match_length = struct.Struct("!H")
+
+def _align(length):
+	return (length+7)//8*8
+
+class cached(object):
+	'''
+	non-data descriptor which stores the value into the instance
+	'''
+	def __init__(self, func):
+		self.func = func
+		self.__name__ = func.__name__
+		self.__doc__ = func.__doc__
+
+	def __get__(self, obj, cls):
+		if obj is None:
+			return self
+		value = obj.__dict__[self.__name__] = self.func(obj)
+		return value
+
+class _field(object):
+	'''
+	fixed part field, the first access decodes all of them
+	'''
+	def __init__(self, index):
+		self.index = index
+
+	def __get__(self, obj, cls):
+		if obj is None:
+			return self
+		return obj._fixed_values[self.index]
+
+def _fixed(cls):
+	for index, name in enumerate(cls.fields):
+		setattr(cls, name, _field(index))
+	return cls
+
+
+class MessageView(object):
+	fields = () # names of fixed part after ofp_header
+	fixed = None # struct.Struct of the fixed part
+
+	def __init__(self, message, offset=0):
+		self.message = message
+		self.offset = offset
+		(version, self._oftype, self._length, self._xid) = _header.unpack_from(message, offset)
+		assert version == 4
+
+	def __getattr__(self, name):
+		# only called for attributes which the view does not know
+		if name.startswith("__"):
+			raise AttributeError(name)
+		return getattr(self.parsed, name)
+
+	def __repr__(self):
+		return "<%s type=%d xid=%d length=%d>" % (type(self).__name__, self._oftype, self._xid, self._length)
+
+	@cached
+	def _fixed_values(self):
+		return self.fixed.unpack_from(self.message, self.offset+8)
+
+	@cached
+	def header(self):
+		return p.ofp_header(self.message, self.offset)
+
+	@cached
+	def parsed(self):
+		return p.parse(self.message, self.offset)
+
+	def _iter(self, fetcher, start, end):
+		cursor = p._cursor(start)
+		while cursor.offset < end:
+			yield fetcher(self.message, cursor)
+		assert cursor.offset == end
+
+
+class _MatchView(MessageView):
+	match_offset = None # from the message head
+
+	@cached
+	def match(self):
+		return p.ofp_match(self.message, self.offset+self.match_offset)
+
+	@cached
+	def _match_end(self):
+		start = self.offset + self.match_offset
+		return start + _align(_match_length.unpack_from(self.message, start+2)[0])
+
+
+@_fixed
+class PacketInView(_MatchView):
+	fields = "buffer_id total_len reason table_id cookie".split()
+	fixed = struct.Struct("!IHBBQ")
+	match_offset = 24
+
+	@cached
+	def data(self):
+		return self.message[self._match_end+2:self.offset+self._length]
+
+
+@_fixed
+class FlowModView(_MatchView):
+	fields = '''cookie cookie_mask table_id command
+		idle_timeout hard_timeout priority
+		buffer_id out_port out_group flags'''.split()
+	fixed = struct.Struct("!QQBB3H3IH2x")
+	match_offset = 48
+
+	def iter_instructions(self):
+		return self._iter(p.ofp_instruction_, self._match_end, self.offset+self._length)
+
+	@cached
+	def instructions(self):
+		return list(self.iter_instructions())
+
+
+@_fixed
+class FlowRemovedView(_MatchView):
+	fields = '''cookie priority reason table_id
+		duration_sec duration_nsec
+		idle_timeout hard_timeout packet_count byte_count'''.split()
+	fixed = struct.Struct("!QHBBIIHHQQ")
+	match_offset = 48
+
+
+@_fixed
+class PacketOutView(MessageView):
+	fields = "buffer_id in_port actions_len".split()
+	fixed = struct.Struct("!IIH6x")
+
+	def iter_actions(self):
+		return self._iter(p.ofp_action_, self.offset+24, self.offset+24+self.actions_len)
+
+	@cached
+	def actions(self):
+		return list(self.iter_actions())
+
+	@cached
+	def data(self):
+		return self.message[self.offset+24+self.actions_len:self.offset+self._length]
+
+
+@_fixed
+class PortStatusView(MessageView):
+	fields = ("reason",)
+	fixed = struct.Struct("!B7x")
+
+	@cached
+	def desc(self):
+		return p.ofp_port(self.message, self.offset+16)
+
+
+@_fixed
+class GroupModView(MessageView):
+	fields = "command type group_id".split()
+	fixed = struct.Struct("!HBxI")
+
+	def iter_buckets(self):
+		return self._iter(p.ofp_bucket, self.offset+16, self.offset+self._length)
+
+	@cached
+	def buckets(self):
+		return list(self.iter_buckets())
+
+
+@_fixed
+class MultipartView(MessageView):
+	'''
+	iter_body() yields the entries of list bodies, such as flow stats,
+	ports, port stats or group desc, one by one.
+	'''
+	fields = "type flags".split()
+	fixed = struct.Struct("!HH4x")
+	parsers = None
+
+	def _body_parser(self):
+		func = self.parsers.get(self.type)
+		if func is None:
+			raise ValueError("multiaprt type=%d flags=%s" % (self.type, self.flags))
+		return func
+
+	def iter_body(self):
+		fetcher = getattr(self._body_parser(), "fetcher", None)
+		if fetcher is None:
+			raise ValueError("multipart type=%d body is not a list" % self.type)
+		return self._iter(fetcher, self.offset+16, self.offset+self._length)
+
+	@cached
+	def body(self):
+		return self._body_parser()(self.message, p._cursor(self.offset+16), self.offset+self._length)
+
+
+class MultipartRequestView(MultipartView):
+	parsers = p.multipart_request_parsers
+
+
+class MultipartReplyView(MultipartView):
+	parsers = p.multipart_reply_parsers
+
+
+views = {
+	OFPT_PACKET_IN: PacketInView,
+	OFPT_FLOW_MOD: FlowModView,
+	OFPT_FLOW_REMOVED: FlowRemovedView,
+	OFPT_PACKET_OUT: PacketOutView,
+	OFPT_PORT_STATUS: PortStatusView,
+	OFPT_GROUP_MOD: GroupModView,
+	OFPT_MULTIPART_REQUEST: MultipartRequestView,
+	OFPT_MULTIPART_REPLY: MultipartReplyView,
+}
+
+def view(message, offset=0):
+	(version, oftype) = _header.unpack_from(message, offset)[:2]
+	return views.get(oftype, MessageView)(message, offset)
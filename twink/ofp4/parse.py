@@ -3,6 +3,7 @@ from __future__ import absolute_import
 import struct
 from collections import namedtuple
 from . import *
+from .schema import schema as _schema
 
 _len = len
 _type = type
@@ -23,14 +24,23 @@ def _cursor(offset):
 	else:
 		raise ValueError(offset)
 
+_structs = {}
+
+def _struct(fmt):
+	s = _structs.get(fmt)
+	if s is None:
+		if fmt[0] != "!":
+			s = struct.Struct("!"+fmt)
+		else:
+			s = struct.Struct(fmt)
+		_structs[fmt] = s
+	return s
+
 def _unpack(fmt, msg, offset):
 	cur = _cursor(offset)
-	
-	if fmt[0] != "!":
-		fmt = "!"+fmt
-	
-	ret = struct.unpack_from(fmt, msg, cur.offset)
-	cur.offset += struct.calcsize(fmt)
+	s = _struct(fmt)
+	ret = s.unpack_from(msg, cur.offset)
+	cur.offset += s.size
 	return ret
 
 def from_bitmap(uint32_t_list):
@@ -46,62 +56,32 @@ def parse(message, offset=0):
 		return None
 	
 	cursor = _cursor(offset)
-	header = ofp_header(message, cursor.offset)
-	assert header.version == 4
-	if header.type == OFPT_HELLO:
-		return ofp_hello(message, cursor)
-	elif header.type == OFPT_ERROR:
-		return ofp_error_msg(message, cursor)
-	elif header.type == OFPT_FEATURES_REPLY:
-		return ofp_switch_features(message, cursor)
-	elif header.type in (OFPT_SET_CONFIG, OFPT_GET_CONFIG_REPLY):
-		return ofp_switch_config(message, cursor)
-	elif header.type == OFPT_PACKET_IN:
-		return ofp_packet_in(message, cursor)
-	elif header.type == OFPT_FLOW_REMOVED:
-		return ofp_flow_removed(message, cursor)
-	elif header.type == OFPT_PORT_STATUS:
-		return ofp_port_status(message, cursor)
-	elif header.type == OFPT_PACKET_OUT:
-		return ofp_packet_out(message, cursor)
-	elif header.type == OFPT_FLOW_MOD:
-		return ofp_flow_mod(message, cursor)
-	elif header.type == OFPT_GROUP_MOD:
-		return ofp_group_mod(message, cursor)
-	elif header.type == OFPT_PORT_MOD:
-		return ofp_port_mod(message, cursor)
-	elif header.type == OFPT_TABLE_MOD:
-		return ofp_table_mod(message, cursor)
-	elif header.type == OFPT_MULTIPART_REQUEST:
-		return ofp_multipart_request(message, cursor)
-	elif header.type == OFPT_MULTIPART_REPLY:
-		return ofp_multipart_reply(message, cursor)
-	elif header.type == OFPT_EXPERIMENTER:
-		return ofp_experimenter_(message, cursor)
-	elif header.type == OFPT_QUEUE_GET_CONFIG_REQUEST:
-		return ofp_queue_get_config_request(message, cursor)
-	elif header.type == OFPT_QUEUE_GET_CONFIG_REPLY:
-		return ofp_queue_get_config_reply(message, cursor)
-	elif header.type in (OFPT_SET_ASYNC, OFPT_GET_ASYNC_REPLY):
-		return ofp_async_config(message, cursor)
-	elif header.type == OFPT_METER_MOD:
-		return ofp_meter_mod(message, cursor)
-	else:
-		# OFPT_ECHO_REQUEST, OFPT_ECHO_REPLY
-		# OFPT_FEATURES_REQUEST
-		# OFPT_BARRIER_REQUEST, OFPT_BARRIER_REPLY
-		# OFPT_GET_ASYNC_REQUEST
-		return ofp_(message, cursor)
+	(version, type) = _struct("BB").unpack_from(message, cursor.offset)
+	assert version == 4
+	# OFPT_ECHO_REQUEST, OFPT_ECHO_REPLY, OFPT_FEATURES_REQUEST, 
+	# OFPT_BARRIER_REQUEST, OFPT_BARRIER_REPLY, OFPT_GET_ASYNC_REQUEST
+	# and unknown types are ofp_
+	return message_parsers.get(type, ofp_)(message, cursor)
+
+def parse_header_only(message, offset=0):
+	'''
+	Fast path for messages to be forwarded as they are.
+	@return (type, xid)
+	'''
+	(version, type, length, xid) = _struct("BBHI").unpack_from(message, offset)
+	assert version == 4
+	return (type, xid)
 
 # 7.1
+_ofp_header = namedtuple("ofp_header", "version type length xid")
 def ofp_header(message, offset):
 	cursor = _cursor(offset)
 	(version, type, length, xid) = _unpack("BBHI", message, cursor)
 	assert version == 4
-	return namedtuple("ofp_header",
-		"version type length xid")(
+	return _ofp_header(
 		version,type,length,xid)
 
+_ofp_ = namedtuple("ofp_", "header,data")
 def ofp_(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -110,21 +90,22 @@ def ofp_(message, offset):
 	
 	data = message[cursor.offset:offset+header.length]
 	cursor.offset = offset+header.length
-	return namedtuple("ofp_",
-		"header,data")(header, data)
+	return _ofp_(header, data)
 
 # 7.2.1 and 7.3.5.7
+_ofp_port = namedtuple("ofp_port", '''
+	port_no hw_addr name
+	config state
+	curr advertised supported peer
+	curr_speed max_speed''')
 def ofp_port(message, offset):
 	cursor = _cursor(offset)
 	p = list(_unpack("I4x6s2x16sII6I", message, cursor))
 	p[2] = p[2].partition(b"\0")[0].decode("UTF-8")
-	return namedtuple("ofp_port", '''
-		port_no hw_addr name
-		config state
-		curr advertised supported peer
-		curr_speed max_speed''')(*p)
+	return _ofp_port(*p)
 
 # 7.2.2
+_ofp_packet_queue = namedtuple("ofp_packet_queue", "queue_id port len properties")
 def ofp_packet_queue(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -142,13 +123,11 @@ def ofp_packet_queue(message, offset):
 		else:
 			raise ValueError(prop_header)
 	assert cursor.offset == offset + len
-	return namedtuple("ofp_packet_queue",
-		"queue_id port len properties")(queue_id,port,len,properties)
+	return _ofp_packet_queue(queue_id,port,len,properties)
 
-def ofp_queue_prop_header(message, offset):
-	return namedtuple("ofp_queue_prop_header",
-		"property len")(*_unpack("HH4x", message, offset))
+ofp_queue_prop_header = _schema.parser("ofp_queue_prop_header")
 
+_ofp_queue_prop_min_rate = namedtuple("ofp_queue_prop_min_rate", "prop_header rate")
 def ofp_queue_prop_min_rate(message, offset):
 	cursor = _cursor(offset)
 	
@@ -156,9 +135,9 @@ def ofp_queue_prop_min_rate(message, offset):
 	
 	(rate,) = _unpack("H6x", message, cursor)
 	
-	return namedtuple("ofp_queue_prop_min_rate",
-		"prop_header rate")(prop_header, rate)
+	return _ofp_queue_prop_min_rate(prop_header, rate)
 
+_ofp_queue_prop_max_rate = namedtuple("ofp_queue_prop_max_rate", "prop_header rate")
 def ofp_queue_prop_max_rate(message, offset):
 	cursor = _cursor(offset)
 	
@@ -166,9 +145,9 @@ def ofp_queue_prop_max_rate(message, offset):
 	
 	(rate,) = _unpack("H6x", message, cursor)
 	
-	return namedtuple("ofp_queue_prop_max_rate",
-		"prop_header rate")(prop_header, rate)
+	return _ofp_queue_prop_max_rate(prop_header, rate)
 
+_ofp_queue_prop_experimenter = namedtuple("ofp_queue_prop_experimenter", "prop_header experimenter data")
 def ofp_queue_prop_experimenter(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -180,10 +159,10 @@ def ofp_queue_prop_experimenter(message, offset):
 	data = message[cursor.offset:offset+prop_header.len]
 	cursor.offset = offset + prop_header.len
 	
-	return namedtuple("ofp_queue_prop_experimenter",
-		"prop_header experimenter data")(prop_header,experimenter,data)
+	return _ofp_queue_prop_experimenter(prop_header,experimenter,data)
 
 # 7.2.3.1
+_ofp_match = namedtuple("ofp_match", "type length oxm_fields")
 def ofp_match(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -191,18 +170,13 @@ def ofp_match(message, offset):
 	(type,length) = _unpack("HH", message, cursor)
 	oxm_fields = message[cursor.offset:offset+length]
 	cursor.offset = offset+_align(length)
-	return namedtuple("ofp_match",
-		"type length oxm_fields")(type,length,oxm_fields)
+	return _ofp_match(type,length,oxm_fields)
 
 # 7.2.3.8
-def ofp_oxm_experimenter_header(message, offset):
-	return namedtuple("ofp_oxm_experimenter_header",
-		"oxm_header experimenter")(*_unpack("II", message, offset))
+ofp_oxm_experimenter_header = _schema.parser("ofp_oxm_experimenter_header")
 
 # 7.2.4
-def ofp_instruction(message, offset):
-	return namedtuple("ofp_instruction",
-		"type len")(*_unpack("HH", message, offset))
+ofp_instruction = _schema.parser("ofp_instruction")
 
 def ofp_instruction_(message, offset):
 	cursor = _cursor(offset)
@@ -222,14 +196,10 @@ def ofp_instruction_(message, offset):
 	else:
 		raise ValueError(ofp_instruction(message, cursor.offset))
 
-def ofp_instruction_goto_table(message, offset):
-	return namedtuple("ofp_instruction_goto_table",
-		"type len table_id")(*_unpack("HHB3x", message, offset))
-
-def ofp_instruction_write_metadata(message, offset):
-	return namedtuple("ofp_instruction_write_metadata",
-		"type len metadata metadata_mask")(*_unpack("HH4xQQ", message, offset))
+ofp_instruction_goto_table = _schema.parser("ofp_instruction_goto_table")
+ofp_instruction_write_metadata = _schema.parser("ofp_instruction_write_metadata")
 
+_ofp_instruction_actions = namedtuple("ofp_instruction_actions", "type,len,actions")
 def ofp_instruction_actions(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -241,13 +211,11 @@ def ofp_instruction_actions(message, offset):
 		actions.append(ofp_action_(message,cursor))
 	
 	assert cursor.offset == offset+len
-	return namedtuple("ofp_instruction_actions",
-		"type,len,actions")(type,len,actions)
+	return _ofp_instruction_actions(type,len,actions)
 
-def ofp_instruction_meter(message, offset):
-	return namedtuple("ofp_instruction_meter",
-		"type len meter_id")(*_unpack("HHI", message, offset))
+ofp_instruction_meter = _schema.parser("ofp_instruction_meter")
 
+_ofp_instruction_experimenter = namedtuple("ofp_instruction_experimenter", "type len experimenter data")
 def ofp_instruction_experimenter(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -257,13 +225,10 @@ def ofp_instruction_experimenter(message, offset):
 	data = message[cursor.offset:offset+len]
 	cursor.offset = offset+len
 	
-	return namedtuple("ofp_instruction_experimenter",
-		"type len experimenter data")(type,len,experimenter,data)
+	return _ofp_instruction_experimenter(type,len,experimenter,data)
 
 # 7.2.5
-def ofp_action_header(message, offset):
-	return namedtuple("ofp_action_header",
-		"type,len")(*_unpack("HH4x", message, offset))
+ofp_action_header = _schema.parser("ofp_action_header")
 
 def ofp_action_(message, offset):
 	cursor = _cursor(offset)
@@ -289,34 +254,15 @@ def ofp_action_(message, offset):
 	else:
 		return ofp_action_header(message, cursor)
 
-def ofp_action_output(message, offset):
-	return namedtuple("ofp_action_output",
-		"type,len,port,max_len")(*_unpack("HHIH6x", message, offset))
-
-def ofp_action_group(message, offset):
-	return namedtuple("ofp_action_group",
-		"type,len,group_id")(*_unpack("HHI", message, offset))
-
-def ofp_action_set_queue(message, offset):
-	return namedtuple("ofp_action_set_queue",
-		"type,len,queue_id")(*_unpack("HHI", message, offset))
-
-def ofp_action_mpls_ttl(message, offset):
-	return namedutple("ofp_action_mpls_ttl",
-		"type,len,mpls_ttl")(*_unpack("HHB3x", message, offset))
-
-def ofp_action_nw_ttl(message, offset):
-	return namedtuple("ofp_action_nw_ttl",
-		"type,len,nw_ttl")(*_unpack("HHB3x", message, offset))
-
-def ofp_action_push(message, offset):
-	return namedtuple("ofp_action_push",
-		"type,len,ethertype")(*_unpack("HHH2x", message, offset))
-
-def ofp_action_pop_mpls(message, offset):
-	return namedtuple("ofp_action_pop_mpls",
-		"type,len,ethertype")(*_unpack("HHH2x", message, offset))
+ofp_action_output = _schema.parser("ofp_action_output")
+ofp_action_group = _schema.parser("ofp_action_group")
+ofp_action_set_queue = _schema.parser("ofp_action_set_queue")
+ofp_action_mpls_ttl = _schema.parser("ofp_action_mpls_ttl")
+ofp_action_nw_ttl = _schema.parser("ofp_action_nw_ttl")
+ofp_action_push = _schema.parser("ofp_action_push")
+ofp_action_pop_mpls = _schema.parser("ofp_action_pop_mpls")
 
+_ofp_action_set_field = namedtuple("ofp_action_set_field", "type,len,field")
 def ofp_action_set_field(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -324,13 +270,11 @@ def ofp_action_set_field(message, offset):
 	(type,len) = _unpack("HH", message, cursor)
 	field = message[cursor.offset:offset+len]
 	cursor.offset = offset+len
-	return namedtuple("ofp_action_set_field",
-		"type,len,field")(type,len,field)
+	return _ofp_action_set_field(type,len,field)
 
-def ofp_action_experimenter_header(message, offset):
-	return namedtuple("ofp_action_experimenter_header",
-		"type,len,experimenter")(*_unpack("HHI", message, offset))
+ofp_action_experimenter_header = _schema.parser("ofp_action_experimenter_header")
 
+_ofp_action_experimenter_ = namedtuple("ofp_action_experimenter_", "type,len,experimenter,data")
 def ofp_action_experimenter_(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -338,10 +282,10 @@ def ofp_action_experimenter_(message, offset):
 	header = ofp_action_experimenter_header(message, cursor)
 	data = message[cursor.offset:offset+header.len]
 	cursor.offset = offset + header.len
-	return namedtuple("ofp_action_experimenter_",
-		"type,len,experimenter,data")(*header+(data,))
+	return _ofp_action_experimenter_(*header+(data,))
 
 # 7.3.1
+_ofp_switch_features = namedtuple("ofp_switch_features", "header,datapath_id,n_buffers,n_tables,auxiliary_id,capabilities")
 def ofp_switch_features(message, offset=0):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -349,29 +293,31 @@ def ofp_switch_features(message, offset=0):
 	header = ofp_header(message, cursor)
 	(datapath_id, n_buffers, n_tables, 
 		auxiliary_id, capabilities, reserved) = _unpack("QIBB2xII", message, cursor)
-	return namedtuple("ofp_switch_features",
-		"header,datapath_id,n_buffers,n_tables,auxiliary_id,capabilities")(
+	return _ofp_switch_features(
 		header,datapath_id,n_buffers,n_tables,auxiliary_id,capabilities)
 
 # 7.3.2
+_ofp_switch_config = namedtuple("ofp_switch_config", "header,flags,miss_send_len")
 def ofp_switch_config(message, offset):
 	cursor = _cursor(offset)
 	
 	header = ofp_header(message, cursor)
 	(flags,miss_send_len) = _unpack("HH", message, cursor)
-	return namedtuple("ofp_switch_config",
-		"header,flags,miss_send_len")(header,flags,miss_send_len)
+	return _ofp_switch_config(header,flags,miss_send_len)
 
 # 7.3.3
+_ofp_table_mod = namedtuple("ofp_table_mod", "header,table_id,config")
 def ofp_table_mod(message, offset):
 	cursor = _cursor(offset)
 	
 	header = ofp_header(message, cursor)
 	(table_id,config) = _unpack("B3xI", message, cursor)
-	return namedtuple("ofp_table_mod",
-		"header,table_id,config")(header,table_id,config)
+	return _ofp_table_mod(header,table_id,config)
 
 # 7.3.4.1
+_ofp_flow_mod = namedtuple("ofp_flow_mod", '''header,cookie,cookie_mask,table_id,command,
+	idle_timeout,hard_timeout,priority,
+	buffer_id,out_port,out_group,flags,match,instructions''')
 def ofp_flow_mod(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -383,15 +329,13 @@ def ofp_flow_mod(message, offset):
 	match = ofp_match(message, cursor)
 	instructions = _list_fetch(message, cursor, offset+header.length, ofp_instruction_)
 	
-	return namedtuple("ofp_flow_mod",
-		'''header,cookie,cookie_mask,table_id,command,
-		idle_timeout,hard_timeout,priority,
-		buffer_id,out_port,out_group,flags,match,instructions''')(
+	return _ofp_flow_mod(
 		header,cookie,cookie_mask,table_id,command,
 		idle_timeout,hard_timeout,priority,
 		buffer_id,out_port,out_group,flags,match,instructions)
 
 # 7.3.4.2
+_ofp_group_mod = namedtuple("ofp_group_mod", "header,command,type,group_id,buckets")
 def ofp_group_mod(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -402,9 +346,9 @@ def ofp_group_mod(message, offset):
 	while cursor.offset < offset + header.length:
 		buckets.append(ofp_bucket(message, cursor))
 	
-	return namedtuple("ofp_group_mod",
-		"header,command,type,group_id,buckets")(header,command,type,group_id,buckets)
+	return _ofp_group_mod(header,command,type,group_id,buckets)
 
+_ofp_bucket = namedtuple("ofp_bucket", "len weight watch_port watch_group actions")
 def ofp_bucket(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -414,11 +358,11 @@ def ofp_bucket(message, offset):
 	while cursor.offset < offset+len:
 		actions.append(ofp_action_(message, cursor))
 	
-	return namedtuple("ofp_bucket",
-		"len weight watch_port watch_group actions")(
+	return _ofp_bucket(
 		len,weight,watch_port,watch_group,actions)
 
 # 7.3.4.3
+_ofp_port_mod = namedtuple("ofp_port_mod", "header,port_no,hw_addr,config,advertise")
 def ofp_port_mod(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -427,11 +371,11 @@ def ofp_port_mod(message, offset):
 	
 	(port_no, hw_addr, config, advertise) = _unpack("I4x6s2xIII4x", message, offset)
 	assert offset + header.length == cursor.offset
-	return namedtuple("ofp_port_mod",
-		"header,port_no,hw_addr,config,advertise")(
+	return _ofp_port_mod(
 		header,port_no,hw_addr,config,advertise)
 
 # 7.3.4.4
+_ofp_meter_mod = namedtuple("ofp_meter_mod", "header,command,flags,meter_id,bands")
 def ofp_meter_mod(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -444,13 +388,10 @@ def ofp_meter_mod(message, offset):
 	while cursor.offset < offset + header.length:
 		bands.append(ofp_meter_band_(message, cursor))
 	
-	return namedtuple("ofp_meter_mod",
-		"header,command,flags,meter_id,bands")(
+	return _ofp_meter_mod(
 		header,command,flags,meter_id,bands)
 
-def ofp_meter_band_header(message, offset):
-	return namedtuple("ofp_meter_band_header",
-		"type,len,rate,burst_size")(*_unpack("HHII", message, offset))
+ofp_meter_band_header = _schema.parser("ofp_meter_band_header")
 
 def ofp_meter_band_(message, offset):
 	cursor = _cursor(offset)
@@ -465,26 +406,21 @@ def ofp_meter_band_(message, offset):
 	else:
 		raise ValueError(header)
 
-def ofp_meter_band_drop(message, offset):
-	return namedtuple("ofp_meter_band_drop",
-		"type,len,rate,burst_size")(*_unpack("HHII4x", message, offset))
-
-def ofp_meter_band_dscp_remark(message, offset):
-	return namedtuple("ofp_meter_band_dscp_remark",
-		"type,len,rate,burst_size,prec_level")(
-		*_unpack("HHIIB3x", message, offset))
+ofp_meter_band_drop = _schema.parser("ofp_meter_band_drop")
+ofp_meter_band_dscp_remark = _schema.parser("ofp_meter_band_dscp_remark")
 
+_ofp_meter_band_experimenter = namedtuple("ofp_meter_band_experimenter", "type,len,rate,burst_size,experimenter,data")
 def ofp_meter_band_experimenter(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
 	
 	(type,len,rate,burst_size,experimenter) = _unpack("HH3I", message, offset)
 	data = message[cursor.offset:offset+len]
-	return namedtuple("ofp_meter_band_experimenter",
-		"type,len,rate,burst_size,experimenter,data")(
+	return _ofp_meter_band_experimenter(
 		type,len,rate,burst_size,experimenter,data)
 
 # 7.3.5
+_ofp_multipart_request = namedtuple("ofp_multipart_request", "header type flags body")
 def ofp_multipart_request(message, offset=0):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -492,34 +428,14 @@ def ofp_multipart_request(message, offset=0):
 	header = ofp_header(message, cursor)
 	
 	(type, flags) = _unpack("HH4x", message, cursor)
-	if type in (OFPMP_DESC, OFPMP_TABLE, OFPMP_GROUP_DESC, 
-			OFPMP_GROUP_FEATURES, OFPMP_METER_FEATURES, OFPMP_PORT_DESC):
-		body = ""
-	elif type == OFPMP_FLOW:
-		body = ofp_flow_stats_request(message, cursor)
-	elif type == OFPMP_AGGREGATE:
-		body = ofp_aggregate_stats_request(message, cursor)
-	elif type == OFPMP_PORT_STATS:
-		body = ofp_port_stats_request(message, cursor)
-	elif type == OFPMP_QUEUE:
-		body = ofp_queue_stats_request(message, cursor)
-	elif type == OFPMP_GROUP:
-		body = ofp_group_stats_request(message, cursor)
-	elif type in (OFPMP_METER, OFPMP_METER_CONFIG):
-		body = ofp_meter_multipart_requests(message, cursor)
-	elif type == OFPMP_TABLE_FEATURES:
-		body = []
-		while cursor.offset < offset + header.length:
-			body.append(ofp_table_features(message, cursor))
-	elif type == OFPMP_EXPERIMENTER:
-		body = message[cursor.offset:offset+header.length]
-		cursor.offset = offset + header.length
-	else:
+	func = multipart_request_parsers.get(type)
+	if func is None:
 		raise ValueError("multiaprt type=%d flags=%s" % (type, flags))
+	body = func(message, cursor, offset + header.length)
 	
-	return namedtuple("ofp_multipart_request",
-		"header type flags body")(header,type,flags,body)
+	return _ofp_multipart_request(header,type,flags,body)
 
+_ofp_multipart_reply = namedtuple("ofp_multipart_reply", "header type flags body")
 def ofp_multipart_reply(message, offset=0):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -527,42 +443,12 @@ def ofp_multipart_reply(message, offset=0):
 	header = ofp_header(message, cursor)
 	
 	(type, flags) = _unpack("HH4x", message, cursor)
-	body = []
-	if type == OFPMP_DESC:
-		body = ofp_desc(message, cursor)
-	elif type == OFPMP_FLOW:
-		body = _list_fetch(message, cursor, offset + header.length, ofp_flow_stats)
-	elif type == OFPMP_AGGREGATE:
-		body = _list_fetch(message, cursor, offset + header.length, ofp_aggregate_stats_reply)
-	elif type == OFPMP_TABLE:
-		body = _list_fetch(message, cursor, offset + header.length, ofp_table_stats)
-	elif type == OFPMP_PORT_STATS:
-		body = _list_fetch(message, cursor, offset + header.length, ofp_port_stats)
-	elif type == OFPMP_QUEUE:
-		body = _list_fetch(message, cursor, offset + header.length, ofp_queue_stats)
-	elif type == OFPMP_GROUP:
-		body = _list_fetch(message, cursor, offset + header.length, ofp_group_stats)
-	elif type == OFPMP_GROUP_DESC:
-		body = _list_fetch(message, cursor, offset + header.length, ofp_group_desc)
-	elif type == OFPMP_GROUP_FEATURES:
-		body = ofp_group_features(message, cursor)
-	elif type == OFPMP_METER:
-		body = _list_fetch(message, cursor, offset + header.length, ofp_meter_stats)
-	elif type == OFPMP_METER_CONFIG:
-		body = _list_fetch(message, cursor, offset + header.length, ofp_meter_config)
-	elif type == OFPMP_METER_FEATURES:
-		body = ofp_meter_features(message, cursor)
-	elif type == OFPMP_TABLE_FEATURES:
-		body = _list_fetch(message, cursor, offset + header.length, ofp_table_features)
-	elif type == OFPMP_PORT_DESC:
-		body = _list_fetch(message, cursor, offset + header.length, ofp_port)
-	elif type == OFPMP_EXPERIMENTER:
-		body = ofp_experimenter_multipart_(message, cursor, offset+header.length)
-	else:
+	func = multipart_reply_parsers.get(type)
+	if func is None:
 		raise ValueError("multiaprt type=%d flags=%s" % (type, flags))
+	body = func(message, cursor, offset + header.length)
 	
-	return namedtuple("ofp_multipart_reply",
-		"header type flags body")(header,type,flags,body)
+	return _ofp_multipart_reply(header,type,flags,body)
 
 def _list_fetch(message, cursor, limit, fetcher):
 	ret = []
@@ -572,12 +458,30 @@ def _list_fetch(message, cursor, limit, fetcher):
 	assert cursor.offset == limit
 	return ret
 
+def _list_of(fetcher):
+	def fetch(message, cursor, limit):
+		return _list_fetch(message, cursor, limit, fetcher)
+	fetch.fetcher = fetcher # for iterating entries
+	return fetch
+
+def _single(fetcher):
+	def fetch(message, cursor, limit):
+		return fetcher(message, cursor)
+	return fetch
+
+def _empty_body(message, cursor, limit):
+	return ""
+
+def _rest_body(message, cursor, limit):
+	data = message[cursor.offset:limit]
+	cursor.offset = limit
+	return data
+
 # 7.3.5.1
-def ofp_desc(message, offset):
-	return namedtuple("ofp_desc",
-		"mfr_desc,hw_desc,sw_desc,serial_num,dp_desc")(*_unpack("256s256s256s32s256s", message, offset))
+ofp_desc = _schema.parser("ofp_desc")
 
 # 7.3.5.2
+_ofp_flow_stats_request = namedtuple("ofp_flow_stats_request", "table_id,out_port,out_group,cookie,cookie_mask,match")
 def ofp_flow_stats_request(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -586,10 +490,13 @@ def ofp_flow_stats_request(message, offset):
 	
 	match = ofp_match(message, cursor)
 	
-	return namedtuple("ofp_flow_stats_request",
-		"table_id,out_port,out_group,cookie,cookie_mask,match")(
+	return _ofp_flow_stats_request(
 		table_id,out_port,out_group,cookie,cookie_mask,match)
 
+_ofp_flow_stats = namedtuple("ofp_flow_stats", '''
+	length table_id duration_sec duration_nsec
+	priority idle_timeout hard_timeout flags cookie
+	packet_count byte_count match instructions''')
 def ofp_flow_stats(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -602,15 +509,13 @@ def ofp_flow_stats(message, offset):
 	
 	instructions = _list_fetch(message, cursor, offset+length, ofp_instruction_)
 	
-	return namedtuple("ofp_flow_stats", '''
-		length table_id duration_sec duration_nsec
-		priority idle_timeout hard_timeout flags cookie
-		packet_count byte_count match instructions''')(
+	return _ofp_flow_stats(
 		length,table_id,duration_sec,duration_nsec,priority,
 		idle_timeout,hard_timeout,flags,cookie,
 		packet_count,byte_count,match,instructions)
 
 # 7.3.5.3
+_ofp_aggregate_stats_request = namedtuple("ofp_aggregate_stats_request", "table_id,out_port,out_group,cookie,cookie_mask,match")
 def ofp_aggregate_stats_request(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -618,21 +523,16 @@ def ofp_aggregate_stats_request(message, offset):
 	(table_id,out_port,out_group,cookie,cookie_mask) = _unpack("B3xII4xQQ", message, cursor)
 	match = ofp_match(message, cursor)
 	
-	return namedtuple("ofp_aggregate_stats_request",
-		"table_id,out_port,out_group,cookie,cookie_mask,match")(
+	return _ofp_aggregate_stats_request(
 		table_id,out_port,out_group,cookie,cookie_mask,match)
 
-def ofp_aggregate_stats_reply(message, offset):
-	return namedtuple("ofp_aggregate_stats_reply",
-		"packet_count,byte_count,flow_count")(
-		*_unpack("QQI4x", message, offset))
+ofp_aggregate_stats_reply = _schema.parser("ofp_aggregate_stats_reply")
 
 # 7.3.5.4
-def ofp_table_stats(message, offset):
-	return namedtuple("ofp_table_stats", "table_id,active_count,lookup_count,matched_count")(
-		*_unpack("B3xIQQ", message, offset))
+ofp_table_stats = _schema.parser("ofp_table_stats")
 
 # 7.3.5.5.1
+_ofp_table_features = namedtuple("ofp_table_features", "length,table_id,name,metadata_match,metadata_write,config,max_entries,properties")
 def ofp_table_features(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -642,15 +542,13 @@ def ofp_table_features(message, offset):
 	
 	name = name.partition('\0')[0]
 	
-	return namedtuple("ofp_table_feature_prop_header",
-		"length,table_id,name,metadata_match,metadata_write,config,max_entries,properties")(
+	return _ofp_table_features(
 		length,table_id,name,metadata_match,metadata_write,config,max_entries,properties)
 
 # 7.3.5.5.2
-def ofp_table_feature_prop_header(message, offset):
-	return namedtuple("ofp_table_feature_prop_header",
-		"type,length")(*_unpack("HH", message, offset))
+ofp_table_feature_prop_header = _schema.parser("ofp_table_feature_prop_header")
 
+_ofp_table_feature_prop_instructions = namedtuple("ofp_table_feature_prop_instructions", "type,length,instruction_ids")
 def ofp_table_feature_prop_instructions(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -666,10 +564,10 @@ def ofp_table_feature_prop_instructions(message, offset):
 			instruction_ids.append(header)
 	cursor.offset += _align(length)-length
 	
-	return namedtuple("ofp_table_feature_prop_instructions",
-		"type,length,instruction_ids")(
+	return _ofp_table_feature_prop_instructions(
 		type,length,instruction_ids)
 
+_ofp_table_feature_prop_next_tables = namedtuple("ofp_table_feature_prop_next_tables", "type,length,next_table_ids")
 def ofp_table_feature_prop_next_tables(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -678,9 +576,9 @@ def ofp_table_feature_prop_next_tables(message, offset):
 	next_table_ids = _unpack("%dB" % (length-4), message, offset)
 	cursor.offset += _align(length)-length
 	
-	return namedtuple("ofp_table_feature_prop_next_tables",
-		"type,length,next_table_ids")(type,length,next_table_ids)
+	return _ofp_table_feature_prop_next_tables(type,length,next_table_ids)
 
+_ofp_table_feature_prop_actions = namedtuple("ofp_table_feature_prop_actions", "type,length,action_ids")
 def ofp_table_feature_prop_actions(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -696,9 +594,9 @@ def ofp_table_feature_prop_actions(message, offset):
 			action_ids.append(header)
 	cursor.offset += _align(length)-length
 	
-	return namedtuple("ofp_table_feature_prop_actions",
-		"type,length,action_ids")(type,length,action_ids)
+	return _ofp_table_feature_prop_actions(type,length,action_ids)
 
+_ofp_table_feature_prop_oxm = namedtuple("ofp_table_feature_prop_oxm", "type,length,oxm_ids")
 def ofp_table_feature_prop_oxm(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -707,9 +605,9 @@ def ofp_table_feature_prop_oxm(message, offset):
 	oxm_ids = _unpack("%dI" % ((length-4)//4), message, cursor)
 	cursor.offset += _align(length)-length
 	
-	return namedtuple("ofp_table_feature_prop_oxm",
-		"type,length,oxm_ids")(type,length,oxm_ids)
+	return _ofp_table_feature_prop_oxm(type,length,oxm_ids)
 
+_ofp_table_feature_prop_experimenter = namedtuple("ofp_table_feature_prop_experimenter", "type,length,experimenter,exp_type,data")
 def ofp_table_feature_prop_experimenter(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -718,44 +616,23 @@ def ofp_table_feature_prop_experimenter(message, offset):
 	data = message[cursor.offset:offset+length]
 	cursor.offset += _align(length)-length
 	
-	return namedtuple("ofp_table_feature_prop_experimenter",
-		"type,length,experimenter,exp_type,data")(
+	return _ofp_table_feature_prop_experimenter(
 		type,length,experimenter,exp_type,data)
 
 # 7.3.5.6
-def ofp_port_stats_request(message, offset):
-	return namedtuple("ofp_port_stats_request",
-		"port_no")(*_unpack("I4x", message, offset))
-
-def ofp_port_stats(message, offset):
-	return namedtuple("ofp_port_stats", '''
-		port_no
-		rx_packets tx_packets
-		rx_bytes tx_bytes
-		rx_dropped tx_dropped
-		rx_errors tx_errors
-		rx_frame_err
-		rx_over_err
-		rx_crc_err
-		collisions
-		duration_sec duration_nsec''')(*_unpack("I3x12Q2I", message, offset))
+ofp_port_stats_request = _schema.parser("ofp_port_stats_request")
+ofp_port_stats = _schema.parser("ofp_port_stats")
 
 # 7.3.5.8
-def ofp_queue_stats_request(message, offset):
-	return namedtuple("ofp_queue_stats_request",
-		"port_no queue_id")(*_unpack("II", message, offset))
-
-def ofp_queue_stats(message, offset):
-	return namedtuple("ofp_queue_stats", '''
-		port_no queue_id
-		tx_bytes tx_packets tx_errors
-		duration_sec duration_nsec''')(*_unpack("2I3Q2I", message, offset))
+ofp_queue_stats_request = _schema.parser("ofp_queue_stats_request")
+ofp_queue_stats = _schema.parser("ofp_queue_stats")
 
 # 7.3.5.9
-def ofp_group_stats_request(message, offset):
-	return namedtuple("ofp_group_stats_request",
-		"group_id")(*_unpack("I4x", message, offset))
+ofp_group_stats_request = _schema.parser("ofp_group_stats_request")
 
+_ofp_group_stats = namedtuple("ofp_group_stats", '''
+	length group_id ref_count packet_count byte_count
+	duration_sec duration_nsec bucket_stats''')
 def ofp_group_stats(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -763,43 +640,42 @@ def ofp_group_stats(message, offset):
 	(length, group_id, ref_count, packet_count, byte_count,
 		duration_sec, duration_nsec) = _unpack("H2xII4xQQII", message, cursor)
 	bucket_stats = _list_fetch(message, cursor, offset+length, ofp_bucket_counter)
-	return namedtuple("ofp_group_stats", '''
-		length group_id ref_count packet_count byte_count
-		duration_sec duration_nsec bucket_stats''')(
+	return _ofp_group_stats(
 		length,group_id,ref_count,packet_count,byte_count,
 		duration_sec,duration_nsec,bucket_stats)
 
-def ofp_bucket_counter(message, offset):
-	return namedtuple("ofp_bucket_counter",
-		"packet_count byte_count")(*_unpack("QQ", message, offset))
+ofp_bucket_counter = _schema.parser("ofp_bucket_counter")
 
 # 7.3.5.10
+_ofp_group_desc = namedtuple("ofp_group_desc", "length type group_id buckets")
 def ofp_group_desc(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
 	
 	(length, type, group_id) = _unpack("HBxI", message, cursor)
 	buckets = _list_fetch(message, cursor, offset+length, ofp_bucket)
-	return namedtuple("ofp_group_desc",
-		"length type group_id buckets")(
+	return _ofp_group_desc(
 		length,type,group_id,buckets)
 
 # 7.3.5.11
+_ofp_group_features = namedtuple("ofp_group_features", "type,capabilities,max_groups,actions")
 def ofp_group_features(message, offset):
 	cursor = _cursor(offset)
 	(type,capabilities) = _unpack("II", message, cursor)
 	max_groups = _unpack("4I", message, cursor)
 	actions = _unpack("4I", message, cursor)
-	return namedtuple("ofp_group_features",
-		"type,capabilities,max_groups,actions")(
+	return _ofp_group_features(
 		type,capabilities,max_groups,actions)
 
 # 7.3.5.12
+_ofp_meter_multipart_request = namedtuple("ofp_meter_multipart_request", "meter_id")
 def ofp_meter_multipart_request(message, offset):
 	# and 7.3.5.13
-	return namedtuple("ofp_meter_multipart_request",
-		"meter_id")(*_unpack("I4x", message, offset))
+	return _ofp_meter_multipart_request(*_unpack("I4x", message, offset))
 
+_ofp_meter_stats = namedtuple("ofp_meter_stats", '''
+	meter_id len flow_count packet_in_count byte_in_count 
+	duration_sec duration_nsec band_stats''')
 def ofp_meter_stats(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -809,17 +685,14 @@ def ofp_meter_stats(message, offset):
 	
 	band_stats = _list_fetch(message, cursor, offset+len, ofp_meter_band_stats)
 	
-	return namedtuple("ofp_meter_stats", '''
-		meter_id len flow_count packet_in_count byte_in_count 
-		duration_sec duration_nsec band_stats''')(
+	return _ofp_meter_stats(
 		meter_id,len,flow_count,packet_in_count,byte_in_count,
 		duration_sec,duration_nsec,band_stats)
 
-def ofp_meter_band_stats(message, offset):
-	return namedtuple("ofp_meter_band_stats",
-		"packet_band_count,byte_band_count")(*_unpack("QQ", message, offset))
+ofp_meter_band_stats = _schema.parser("ofp_meter_band_stats")
 
 # 7.3.5.13
+_ofp_meter_config = namedtuple("ofp_meter_config", "length,flags,meter_id,bands")
 def ofp_meter_config(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -827,42 +700,42 @@ def ofp_meter_config(message, offset):
 	(length,flags,meter_id) = _unpack("HHI", message, cursor)
 	bands = _list_fetch(message, cursor, offset+length, ofp_meter_band_)
 	
-	return namedtuple("ofp_meter_config",
-		"length,flags,meter_id,bands")(
+	return _ofp_meter_config(
 		length,flags,meter_id,bands)
 
 # 7.3.5.14
-def ofp_meter_features(message, offset):
-	return namedtuple("ofp_meter_features", '''
-		max_meter band_types capabilities
-		max_bands max_color''')(*_unpack("3IBB2x", message, offset))
+ofp_meter_features = _schema.parser("ofp_meter_features")
 
 # 7.3.5.15
-def ofp_experimenter_multipart_header(message, offset):
-	return namedtuple("ofp_experimenter_multipart_header",
-		"experimenter,exp_type")(*_unpack("II", message, offset))
+ofp_experimenter_multipart_header = _schema.parser("ofp_experimenter_multipart_header")
 
+_ofp_experimenter_multipart_ = namedtuple("ofp_experimenter_multipart_", "experimenter,exp_type,data")
 def ofp_experimenter_multipart_(message, offset, limit):
 	cursor = _cursor(offset)
 	offset = cursor.offset
 	
 	(experimenter,exp_type) = ofp_experimenter_multipart_header(message, cursor)
+	func = _experimenter_parser(experimenter_multipart_parsers, experimenter, exp_type)
+	if func:
+		cursor.offset = offset
+		return func(message, cursor, limit)
+	
 	data = message[cursor.offset:limit]
 	cursor.offset = limit
 	
-	return namedtuple("ofp_experimenter_multipart_",
-		"experimenter,exp_type,data")(experimenter,exp_type,data)
+	return _ofp_experimenter_multipart_(experimenter,exp_type,data)
 
 # 7.3.6
+_ofp_queue_get_config_request = namedtuple("ofp_queue_get_config_request", "header,port")
 def ofp_queue_get_config_request(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
 	
 	header = ofp_header(message, cursor)
 	(port,) = _unpack("I4x", message, cursor)
-	return namedtuple("ofp_queue_get_config_request",
-		"header,port")(header,port)
+	return _ofp_queue_get_config_request(header,port)
 
+_ofp_queue_get_config_reply = namedtuple("ofp_queue_get_config_reply", "header,port,queues")
 def ofp_queue_get_config_reply(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -871,10 +744,10 @@ def ofp_queue_get_config_reply(message, offset):
 	(port,) = _unpack("I4x", message, cursor)
 	queues = _list_fetch(message, cursor, offset+header.length, ofp_packet_queue)
 	
-	return namedtuple("ofp_queue_get_config_reply",
-		"header,port,queues")(header,port,queues)
+	return _ofp_queue_get_config_reply(header,port,queues)
 
 # 7.3.7
+_ofp_packet_out = namedtuple("ofp_packet_out", "header,buffer_id,in_port,actions_len,actions,data")
 def ofp_packet_out(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -890,11 +763,11 @@ def ofp_packet_out(message, offset):
 	
 	data = message[cursor.offset:offset+header.length]
 	
-	return namedtuple("ofp_packet_out",
-		"header,buffer_id,in_port,actions_len,actions,data")(
+	return _ofp_packet_out(
 		header,buffer_id,in_port,actions_len,actions,data)
 
 # 7.3.9
+_ofp_role_request = namedtuple("ofp_role_request", "header,role,generation_id")
 def ofp_role_request(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -902,10 +775,10 @@ def ofp_role_request(message, offset):
 	header = ofp_header(message, cursor)
 	(role,generation_id) = _unpack("I4xQ", message, cursor)
 	
-	return namedtuple("ofp_role_request",
-		"header,role,generation_id")(header,role,generation_id)
+	return _ofp_role_request(header,role,generation_id)
 
 # 7.3.10
+_ofp_async_config = namedtuple("ofp_async_config", "header,packet_in_mask,port_status_mask,flow_removed_mask")
 def ofp_async_config(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -913,11 +786,11 @@ def ofp_async_config(message, offset):
 	header = ofp_header(message, cursor)
 	p = _unpack("6I", message, cursor)
 	
-	return namedtuple("ofp_async_config",
-		"header,packet_in_mask,port_status_mask,flow_removed_mask")(
+	return _ofp_async_config(
 		header,p[0:2],p[2:4],p[4:6])
 
 # 7.4.1
+_ofp_packet_in = namedtuple("ofp_packet_in", "header,buffer_id,total_len,reason,table_id,cookie,match,data")
 def ofp_packet_in(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -930,11 +803,14 @@ def ofp_packet_in(message, offset):
 	_unpack("2x", message, cursor);
 	data = message[cursor.offset:offset+header.length]
 	
-	return namedtuple("ofp_packet_in",
-		"header,buffer_id,total_len,reason,table_id,cookie,match,data")(
+	return _ofp_packet_in(
 		header,buffer_id,total_len,reason,table_id,cookie,match,data)
 
 # 7.4.2
+_ofp_flow_removed = namedtuple("ofp_flow_removed", '''header cookie priority reason table_id 
+	duration_sec duration_nsec 
+	idle_timeout hard_timeout packet_count byte_count
+	match''')
 def ofp_flow_removed(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -947,17 +823,14 @@ def ofp_flow_removed(message, offset):
 	
 	match = ofp_match(message, cursor)
 	
-	return namedtuple("ofp_flow_removed",
-		'''header cookie priority reason table_id 
-		duration_sec duration_nsec 
-		idle_timeout hard_timeout packet_count byte_count
-		match''')(
+	return _ofp_flow_removed(
 		header,cookie,priority,reason,table_id,
 		duration_sec,duration_nsec,
 		idle_timeout,hard_timeout,packet_count,byte_count,
 		match)
 
 # 7.4.3
+_ofp_port_status = namedtuple("ofp_port_status", "header,reason,desc")
 def ofp_port_status(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -967,11 +840,11 @@ def ofp_port_status(message, offset):
 	(reason,) = _unpack("B7x", message, cursor)
 	
 	desc = ofp_port(message, cursor)
-	return namedtuple("ofp_port_status",
-		"header,reason,desc")(
+	return _ofp_port_status(
 		header,reason,desc)
 
 # 7.4.4
+_ofp_error_msg = namedtuple("ofp_error_msg", "header,type,code,data")
 def ofp_error_msg(message, offset=0):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -983,10 +856,10 @@ def ofp_error_msg(message, offset=0):
 	data = message[cursor.offset:offset+header.length]
 	cursor.offset = offset + header.length
 	
-	return namedtuple("ofp_error_msg",
-		"header,type,code,data")(header,type,code,data)
+	return _ofp_error_msg(header,type,code,data)
 
 # 7.5.1
+_ofp_hello = namedtuple("ofp_hello", "header elements")
 def ofp_hello(message, offset=0):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -1003,12 +876,11 @@ def ofp_hello(message, offset=0):
 			raise ValueError("message offset=%d %s" % (cursor.offset, elem_header))
 	
 	assert cursor.offset == offset + header.length
-	return namedtuple("ofp_hello", "header elements")(header, elements)
+	return _ofp_hello(header, elements)
 
-def ofp_hello_elem_header(message, offset):
-	return namedtuple("ofp_hello_elem_header",
-		"type length")(*_unpack("HH", message, offset))
+ofp_hello_elem_header = _schema.parser("ofp_hello_elem_header")
 
+_ofp_hello_elem_versionbitmap = namedtuple("ofp_hello_elem_versionbitmap", "type length bitmaps")
 def ofp_hello_elem_versionbitmap(message, offset):
 	cursor = _cursor(offset)
 	(type, length) = _unpack("HH", message, cursor)
@@ -1017,27 +889,105 @@ def ofp_hello_elem_versionbitmap(message, offset):
 	bitmaps = _unpack("%dI" % ((length-4)//4), message, cursor)
 	cursor.offset += _align(length) - length
 	
-	return namedtuple("ofp_hello_elem_versionbitmap",
-		"type length bitmaps")(type,length,bitmaps)
+	return _ofp_hello_elem_versionbitmap(type,length,bitmaps)
 
 # 7.5.4
+_ofp_experimenter_header = namedtuple("ofp_experimenter_header", "header,experimenter,exp_type")
 def ofp_experimenter_header(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
 	
 	header = ofp_header(message, cursor)
 	(experimenter,exp_type) = _unpack("II", message, cursor)
-	return namedtuple("ofp_experimenter_header",
-		"header,experimenter,exp_type")(header,experimenter,exp_type)
+	return _ofp_experimenter_header(header,experimenter,exp_type)
 
+_ofp_experimenter_ = namedtuple("ofp_experimenter_", "header,experimenter,exp_type,data")
 def ofp_experimenter_(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
 	
 	(header,experimenter,exp_type) = ofp_experimenter_header(message, cursor)
+	func = _experimenter_parser(experimenter_parsers, experimenter, exp_type)
+	if func:
+		cursor.offset = offset
+		return func(message, cursor)
 	
-	data = message[cursor.offset:offset+length]
-	cursor.offset = offset+length
+	data = message[cursor.offset:offset+header.length]
+	cursor.offset = offset+header.length
 	
-	return namedtuple("ofp_experimenter_",
-		"header,experimenter,exp_type,data")(header,experimenter,exp_type,data)
+	return _ofp_experimenter_(header,experimenter,exp_type,data)
+
+def _experimenter_parser(table, experimenter, exp_type):
+	func = table.get((experimenter, exp_type))
+	if func is None:
+		func = table.get(experimenter)
+	return func
+
+# Dispatch tables. Entries may be added or replaced by users.
+# message_parsers: ofp_type -> func(message, cursor)
+# multipart_*_parsers: multipart type -> func(message, cursor, limit) for body
+message_parsers = {
+	OFPT_HELLO: ofp_hello,
+	OFPT_ERROR: ofp_error_msg,
+	OFPT_FEATURES_REPLY: ofp_switch_features,
+	OFPT_SET_CONFIG: ofp_switch_config,
+	OFPT_GET_CONFIG_REPLY: ofp_switch_config,
+	OFPT_PACKET_IN: ofp_packet_in,
+	OFPT_FLOW_REMOVED: ofp_flow_removed,
+	OFPT_PORT_STATUS: ofp_port_status,
+	OFPT_PACKET_OUT: ofp_packet_out,
+	OFPT_FLOW_MOD: ofp_flow_mod,
+	OFPT_GROUP_MOD: ofp_group_mod,
+	OFPT_PORT_MOD: ofp_port_mod,
+	OFPT_TABLE_MOD: ofp_table_mod,
+	OFPT_MULTIPART_REQUEST: ofp_multipart_request,
+	OFPT_MULTIPART_REPLY: ofp_multipart_reply,
+	OFPT_EXPERIMENTER: ofp_experimenter_,
+	OFPT_QUEUE_GET_CONFIG_REQUEST: ofp_queue_get_config_request,
+	OFPT_QUEUE_GET_CONFIG_REPLY: ofp_queue_get_config_reply,
+	OFPT_SET_ASYNC: ofp_async_config,
+	OFPT_GET_ASYNC_REPLY: ofp_async_config,
+	OFPT_METER_MOD: ofp_meter_mod,
+}
+
+multipart_request_parsers = {
+	OFPMP_DESC: _empty_body,
+	OFPMP_TABLE: _empty_body,
+	OFPMP_GROUP_DESC: _empty_body,
+	OFPMP_GROUP_FEATURES: _empty_body,
+	OFPMP_METER_FEATURES: _empty_body,
+	OFPMP_PORT_DESC: _empty_body,
+	OFPMP_FLOW: _single(ofp_flow_stats_request),
+	OFPMP_AGGREGATE: _single(ofp_aggregate_stats_request),
+	OFPMP_PORT_STATS: _single(ofp_port_stats_request),
+	OFPMP_QUEUE: _single(ofp_queue_stats_request),
+	OFPMP_GROUP: _single(ofp_group_stats_request),
+	OFPMP_METER: _single(ofp_meter_multipart_request),
+	OFPMP_METER_CONFIG: _single(ofp_meter_multipart_request),
+	OFPMP_TABLE_FEATURES: _list_of(ofp_table_features),
+	OFPMP_EXPERIMENTER: _rest_body,
+}
+
+multipart_reply_parsers = {
+	OFPMP_DESC: _single(ofp_desc),
+	OFPMP_FLOW: _list_of(ofp_flow_stats),
+	OFPMP_AGGREGATE: _list_of(ofp_aggregate_stats_reply),
+	OFPMP_TABLE: _list_of(ofp_table_stats),
+	OFPMP_PORT_STATS: _list_of(ofp_port_stats),
+	OFPMP_QUEUE: _list_of(ofp_queue_stats),
+	OFPMP_GROUP: _list_of(ofp_group_stats),
+	OFPMP_GROUP_DESC: _list_of(ofp_group_desc),
+	OFPMP_GROUP_FEATURES: _single(ofp_group_features),
+	OFPMP_METER: _list_of(ofp_meter_stats),
+	OFPMP_METER_CONFIG: _list_of(ofp_meter_config),
+	OFPMP_METER_FEATURES: _single(ofp_meter_features),
+	OFPMP_TABLE_FEATURES: _list_of(ofp_table_features),
+	OFPMP_PORT_DESC: _list_of(ofp_port),
+	OFPMP_EXPERIMENTER: ofp_experimenter_multipart_,
+}
+
+# Experimenter decoders keyed by (experimenter, exp_type) or experimenter.
+# experimenter_parsers: func(message, cursor) for OFPT_EXPERIMENTER message
+# experimenter_multipart_parsers: func(message, cursor, limit) for multipart reply body
+experimenter_parsers = {}
+experimenter_multipart_parsers = {}
@@ -0,0 +1,81 @@
+'''
+Fixed layout structures of OpenFlow 1.3
+
+parse.py and build.py take the functions of these structures from this
+schema, see twink.schema for the notation.
+'''
+from __future__ import absolute_import
+from . import *
+from ..schema import Schema
+
+schema = Schema('''
+# 7.2.2
+ofp_queue_prop_header HH4x property len=8
+
+# 7.2.3.8
+ofp_oxm_experimenter_header II oxm_header experimenter
+
+# 7.2.4
+ofp_instruction HH type len
+ofp_instruction_goto_table HHB3x type==OFPIT_GOTO_TABLE len:=8 table_id
+ofp_instruction_write_metadata HH4xQQ type==OFPIT_WRITE_METADATA len:=24
+	metadata metadata_mask
+ofp_instruction_meter HHI type==OFPIT_METER len:=8 meter_id
+
+# 7.2.5
+ofp_action_header HH4x type len
+ofp_action_output HHIH6x type==OFPAT_OUTPUT len:=16 port max_len
+ofp_action_group HHI type==OFPAT_GROUP len:=8 group_id
+ofp_action_set_queue HHI type==OFPAT_SET_QUEUE len:=8 queue_id
+ofp_action_mpls_ttl HHB3x type==OFPAT_SET_MPLS_TTL len:=8 mpls_ttl
+ofp_action_nw_ttl HHB3x type==OFPAT_SET_NW_TTL len:=8 nw_ttl
+ofp_action_push HHH2x type len:=8 ethertype
+ofp_action_pop_mpls HHH2x type==OFPAT_POP_MPLS len:=8 ethertype
+ofp_action_experimenter_header HHI type len experimenter
+
+# 7.3.4.4
+ofp_meter_band_header HHII type len rate burst_size
+ofp_meter_band_drop HHII4x type==OFPMBT_DROP len:=16 rate burst_size
+ofp_meter_band_dscp_remark HHIIB3x type==OFPMBT_DSCP_REMARK len:=16 rate
+	burst_size prec_level
+
+# 7.3.5.1
+ofp_desc 256s256s256s32s256s mfr_desc=b"" hw_desc=b"" sw_desc=b""
+	serial_num=b"" dp_desc=b""
+
+# 7.3.5.3
+ofp_aggregate_stats_reply QQI4x packet_count byte_count flow_count
+
+# 7.3.5.4
+ofp_table_stats B3xIQQ table_id active_count lookup_count matched_count
+
+# 7.3.5.5.2
+ofp_table_feature_prop_header HH type length
+
+# 7.3.5.6
+ofp_port_stats_request I4x port_no=OFPP_ANY
+ofp_port_stats I4x12Q2I port_no rx_packets tx_packets rx_bytes tx_bytes
+	rx_dropped tx_dropped rx_errors tx_errors rx_frame_err rx_over_err
+	rx_crc_err collisions duration_sec duration_nsec
+
+# 7.3.5.8
+ofp_queue_stats_request II port_no=OFPP_ANY queue_id=OFPQ_ALL
+ofp_queue_stats 2I3Q2I port_no queue_id tx_bytes tx_packets tx_errors
+	duration_sec duration_nsec
+
+# 7.3.5.9
+ofp_group_stats_request I4x group_id=OFPG_ALL
+ofp_bucket_counter QQ packet_count byte_count
+
+# 7.3.5.12
+ofp_meter_band_stats QQ packet_band_count byte_band_count
+
+# 7.3.5.14
+ofp_meter_features 3IBB2x max_meter band_types capabilities max_bands max_color
+
+# 7.3.5.15
+ofp_experimenter_multipart_header II experimenter exp_type
+
+# 7.5.1
+ofp_hello_elem_header HH type length
+''', globals())
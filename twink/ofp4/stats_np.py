@@ -0,0 +1,156 @@
+'''
+NumPy decoder for OpenFlow 1.3 statistics
+
+Multipart reply bodies are decoded into structured arrays with big-endian
+dtypes, without building a record per row. Functions take multipart reply
+data, which may be several reply messages back to back, as returned by
+SyncChannel.single() or multi().
+
+	ports = stats_np.port_stats(channel.single(request))
+	ports["rx_bytes"].sum()
+
+Rows of variable length (flow stats with match and instructions) are
+decoded for the fixed part, and come with an offset index into data.
+
+	(flows, offsets) = stats_np.flow_stats(data)
+	match = stats_np.flow_match(data, offsets[0])
+
+numpy is required for this module.
+'''
+from __future__ import absolute_import
+import struct
+import numpy as np
+from . import *
+
+_header = struct.Struct("!BBHIHH4x")
+_length = struct.Struct("!H")
+
+port_stats_dtype = np.dtype([
+	("port_no", ">u4"), ("pad", "V4"),
+	("rx_packets", ">u8"), ("tx_packets", ">u8"),
+	("rx_bytes", ">u8"), ("tx_bytes", ">u8"),
+	("rx_dropped", ">u8"), ("tx_dropped", ">u8"),
+	("rx_errors", ">u8"), ("tx_errors", ">u8"),
+	("rx_frame_err", ">u8"), ("rx_over_err", ">u8"), ("rx_crc_err", ">u8"),
+	("collisions", ">u8"),
+	("duration_sec", ">u4"), ("duration_nsec", ">u4")])
+
+queue_stats_dtype = np.dtype([
+	("port_no", ">u4"), ("queue_id", ">u4"),
+	("tx_bytes", ">u8"), ("tx_packets", ">u8"), ("tx_errors", ">u8"),
+	("duration_sec", ">u4"), ("duration_nsec", ">u4")])
+
+table_stats_dtype = np.dtype([
+	("table_id", "u1"), ("pad", "V3"),
+	("active_count", ">u4"), ("lookup_count", ">u8"), ("matched_count", ">u8")])
+
+# fixed part, followed by ofp_bucket_counter
+group_stats_dtype = np.dtype([
+	("length", ">u2"), ("pad", "V2"),
+	("group_id", ">u4"), ("ref_count", ">u4"), ("pad2", "V4"),
+	("packet_count", ">u8"), ("byte_count", ">u8"),
+	("duration_sec", ">u4"), ("duration_nsec", ">u4")])
+
+# fixed part, followed by ofp_meter_band_stats
+meter_stats_dtype = np.dtype([
+	("meter_id", ">u4"), ("len", ">u2"), ("pad", "V6"),
+	("flow_count", ">u4"), ("packet_in_count", ">u8"), ("byte_in_count", ">u8"),
+	("duration_sec", ">u4"), ("duration_nsec", ">u4")])
+
+# fixed part of ofp_flow_stats, followed by ofp_match and instructions
+flow_stats_dtype = np.dtype([
+	("length", ">u2"), ("table_id", "u1"), ("pad", "V1"),
+	("duration_sec", ">u4"), ("duration_nsec", ">u4"),
+	("priority", ">u2"), ("idle_timeout", ">u2"), ("hard_timeout", ">u2"), ("flags", ">u2"),
+	("pad2", "V4"),
+	("cookie", ">u8"), ("packet_count", ">u8"), ("byte_count", ">u8")])
+
+def _bodies(data, mptype):
+	'''
+	yields (start, end) of multipart reply bodies in data
+	'''
+	offset = 0
+	while offset < len(data):
+		(version, oftype, length, xid, reply_type, flags) = _header.unpack_from(data, offset)
+		if version != 4 or oftype != OFPT_MULTIPART_REPLY or reply_type != mptype:
+			raise ValueError("not a multipart reply of type %d" % mptype)
+		yield (offset+16, offset+length)
+		offset += length
+
+def _fixed(data, mptype, dtype):
+	arrays = []
+	for (start, end) in _bodies(data, mptype):
+		count = (end - start) // dtype.itemsize
+		assert start + count*dtype.itemsize == end
+		arrays.append(np.frombuffer(data, dtype, count, start))
+	if len(arrays) == 1:
+		return arrays[0]
+	return np.concatenate(arrays) if arrays else np.empty(0, dtype)
+
+def index(data, mptype, length_offset=0):
+	'''
+	@param length_offset position of the 16 bit row length field in a row
+	@return offsets of the variable length rows in data
+	'''
+	offsets = []
+	for (start, end) in _bodies(data, mptype):
+		while start < end:
+			offsets.append(start)
+			(length,) = _length.unpack_from(data, start+length_offset)
+			if length == 0:
+				raise ValueError("zero length entry at %d" % start)
+			start += length
+		assert start == end
+	return np.array(offsets, dtype=np.intp)
+
+def gather(data, offsets, dtype):
+	'''
+	decodes the fixed part at each offset
+	'''
+	raw = np.frombuffer(data, np.uint8)
+	return raw[offsets[:,None] + np.arange(dtype.itemsize)].view(dtype).reshape(-1)
+
+def port_stats(data):
+	return _fixed(data, OFPMP_PORT_STATS, port_stats_dtype)
+
+def queue_stats(data):
+	return _fixed(data, OFPMP_QUEUE, queue_stats_dtype)
+
+def table_stats(data):
+	return _fixed(data, OFPMP_TABLE, table_stats_dtype)
+
+def _indexed(data, mptype, dtype, length_offset=0):
+	offsets = index(data, mptype, length_offset)
+	return (gather(data, offsets, dtype), offsets)
+
+def group_stats(data):
+	'''
+	@return (structured array of the fixed part, offsets of the rows)
+	'''
+	return _indexed(data, OFPMP_GROUP, group_stats_dtype)
+
+def meter_stats(data):
+	'''
+	@return (structured array of the fixed part, offsets of the rows)
+	'''
+	return _indexed(data, OFPMP_METER, meter_stats_dtype, 4)
+
+def flow_stats(data):
+	'''
+	@return (structured array of the fixed part, offsets of the rows)
+	'''
+	return _indexed(data, OFPMP_FLOW, flow_stats_dtype)
+
+def flow_match(data, offset):
+	'''
+	@return ofp_match bytes of the flow stats row at offset
+	'''
+	start = offset + flow_stats_dtype.itemsize
+	(length,) = _length.unpack_from(data, start+2)
+	return data[start:start+(length+7)//8*8]
+
+def duration(rows):
+	'''
+	duration_sec and duration_nsec in float seconds
+	'''
+	return rows["duration_sec"] + rows["duration_nsec"] * 1e-9
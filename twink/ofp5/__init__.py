@@ -384,6 +384,12 @@ ofp_port_stats_optical_flags = type("ofp_port_stats_optical_flags", (_enum_base,
 	})(globals())
 
 # 7.3.5.9
+ofp_queue = type("ofp_queue", (_enum_base,), {
+	"prefix": "OFPQ",
+	"numbers": {
+		"ALL": 0xffffffff }
+	})(globals())
+
 ofp_queue_stats_prop_type = type("ofp_queue_stats_prop_type", (_enum_base,), {
 	"prefix": "OFPQSPT",
 	"numbers": {"EXPERIMENTER":0xFFFF}
@@ -426,7 +432,7 @@ ofp_controller_role = type("ofp_controller_role", (_enum_base,), {
 # 7.3.9.1
 ofp_bundle_ctrl_type = type("ofp_bundle_ctrl_type", (_enum_base,), {
 	"prefix": "OFPBCT",
-	"numbers": "OPEN_REQUEST OPEN_REPLY CLOSE_REQUEST CLOSE_REPLY DISCARD_REQUEST DISCARD_REPLY"
+	"numbers": "OPEN_REQUEST OPEN_REPLY CLOSE_REQUEST CLOSE_REPLY COMMIT_REQUEST COMMIT_REPLY DISCARD_REQUEST DISCARD_REPLY"
 	})(globals())
 
 # 7.3.9.3
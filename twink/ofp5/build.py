@@ -2,6 +2,7 @@ from __future__ import absolute_import
 import struct
 import random
 from . import *
+from .schema import schema as _schema
 
 _len = len
 _type = type
@@ -83,6 +84,11 @@ def ofp_(header, data, type=None):
 	else:
 		raise ValueError(header)
 	
+	if isinstance(data, list):
+		# buffer list for scatter-gather send
+		length = 8 + sum([_len(d) for d in data])
+		return [ofp_header(version, oftype, length, xid)+data[0]] + data[1:]
+	
 	data = _obj(data)
 	length = 8 + _len(data)
 	return ofp_header(version, oftype, length, xid)+data
@@ -90,10 +96,10 @@ def ofp_(header, data, type=None):
 
 # 7.2.1.1
 def ofp_port(port_no, length, hw_addr, name, config, state, properties):
-	assert isinstance(hw_addr, str) and _len(hw_addr)==6
-	assert isinstance(name, str) and _len(name)<=16
+	assert isinstance(hw_addr, bytes) and _len(hw_addr)==6
+	assert isinstance(name, bytes) and _len(name)<=16
 	
-	if isinstance(properties, str):
+	if isinstance(properties, bytes):
 		pass
 	elif isinstance(properties, (list, tuple)):
 		properties = b"".join([_obj(p) for p in properties])
@@ -111,37 +117,13 @@ def ofp_port(port_no, length, hw_addr, name, config, state, properties):
 		name,
 		config,
 		state
-		)
+		) + properties
 	return msg
 
 # 7.2.1.2
-def ofp_port_desc_prop_header(type, length):
-	# XXX: You won't need this function
-	return _pack("HH", type, length)
-
-def ofp_port_desc_prop_ethernet(type, length,
-		curr, advertised, supported, peer, curr_speed, max_speed):
-	if type is None:
-		type = OFPPDPT_ETHERNET
-	assert type == OFPPDPT_ETHERNET
-	
-	length = 32
-	return _pack("HH4x6I", type, length,
-		curr, advertised, supported, peer, curr_speed, max_speed)
-
-def ofp_port_desc_prop_optical(type, length, supported,
-		tx_min_freq_lmda, tx_max_freq_lmda, tx_grid_freq_lmda,
-		rx_min_freq_lmda, rx_max_freq_lmda, rx_grid_freq_lmda,
-		tx_pwr_min, tx_pwr_max):
-	if type is None:
-		type = OFPPDPT_OPTICAL
-	assert type == OFPPDPT_OPTICAL
-	
-	length = 40
-	return _pack("HH4x7I2H", type, length, supported,
-		tx_min_freq_lmda, tx_max_freq_lmda, tx_grid_freq_lmda,
-		rx_min_freq_lmda, rx_max_freq_lmda, rx_grid_freq_lmda,
-		tx_pwr_min, tx_pwr_max)
+ofp_port_desc_prop_header = _schema.builder("ofp_port_desc_prop_header")
+ofp_port_desc_prop_ethernet = _schema.builder("ofp_port_desc_prop_ethernet")
+ofp_port_desc_prop_optical = _schema.builder("ofp_port_desc_prop_optical")
 
 def ofp_port_desc_prop_experimenter(type, length,
 		experimenter, exp_type, experimenter_data):
@@ -179,33 +161,9 @@ def ofp_match(type, length, oxm_fields):
 	return msg
 
 # 7.2.4
-def ofp_instruction_header(type, len):
-	return _pack("HH", type, len)
-
-def ofp_instruction_goto_table(type, len, table_id):
-	if type is None:
-		type = OFPIT_GOTO_TABLE
-	assert type==OFPIT_GOTO_TABLE
-	len = 8
-	msg = _pack("HHB3x",
-		type,
-		len,
-		table_id)
-	assert _len(msg)==8
-	return msg
-
-def ofp_instruction_write_metadata(type, len, metadata, metadata_mask):
-	if type is None:
-		type = OFPIT_WRITE_METADATA
-	assert type==OFPIT_WRITE_METADATA
-	len = 24
-	msg = _pack("HH4xQQ",
-		type,
-		len,
-		metadata,
-		metadata_mask)
-	assert _len(msg)==24
-	return msg
+ofp_instruction_header = _schema.builder("ofp_instruction_header")
+ofp_instruction_goto_table = _schema.builder("ofp_instruction_goto_table")
+ofp_instruction_write_metadata = _schema.builder("ofp_instruction_write_metadata")
 
 def ofp_instruction_actions(type, len, actions):
 	'''type: OFPIT_WRITE_ACTIONS/APPLY_ACTIONS/CLEAR_ACTIONS
@@ -227,16 +185,7 @@ def ofp_instruction_actions(type, len, actions):
 		len) + actions
 	return msg
 
-def ofp_instruction_meter(type, len, meter_id):
-	if type is None:
-		type = OFPIT_METER
-	assert type==OFPIT_METER
-	len = 8
-	msg = _pack("HHI",
-		type,
-		len,
-		meter_id)
-	return msg
+ofp_instruction_meter = _schema.builder("ofp_instruction_meter")
 
 def ofp_instruction_experimenter_(type, len, experimenter, data):
 	if type is None:
@@ -254,67 +203,11 @@ def ofp_instruction_experimenter_(type, len, experimenter, data):
 	return msg
 
 # 7.2.4
-def ofp_action_header(type, len):
-	return _pack("HH", type, len)
-
-def ofp_action_output(type, len, port, max_len):
-	'''max_len: OFP_CML_MAX/NO_BUFFER
-	'''
-	if type is None:
-		type = OFPAT_OUTPUT
-	assert type == OFPAT_OUTPUT
-	
-	len = 16
-	
-	msg = _pack("HHIH6x",
-		type,
-		len,
-		port,
-		max_len)
-	assert _len(msg) == 16
-	return msg
-
-def ofp_action_group(type, len, group_id):
-	if type is None:
-		type = OFPAT_GROUP
-	assert type == OFPAT_GROUP
-	
-	len = 8
-	
-	msg = _pack("HHI",
-		type,
-		len,
-		group_id)
-	assert _len(msg) == 8
-	return msg
-
-def ofp_action_set_queue(type, len, queue_id):
-	if type is None:
-		type = OFPAT_SET_QUEUE
-	assert type == OFPAT_SET_QUEUE
-	
-	len = 8
-	
-	msg = _pack("HHI",
-		type,
-		len,
-		queue_id)
-	assert _len(msg) == 8
-	return msg
-
-def ofp_action_mpls_ttl(type, len, mpls_ttl):
-	if type is None:
-		type = OFPAT_SET_MPLS_TTL
-	assert type == OFPAT_SET_MPLS_TTL
-	
-	len = 8
-	
-	msg = _pack("HHB3x",
-		type,
-		len,
-		mpls_ttl)
-	assert _len(msg) == 8
-	return msg
+ofp_action_header = _schema.builder("ofp_action_header")
+ofp_action_output = _schema.builder("ofp_action_output")
+ofp_action_group = _schema.builder("ofp_action_group")
+ofp_action_set_queue = _schema.builder("ofp_action_set_queue")
+ofp_action_mpls_ttl = _schema.builder("ofp_action_mpls_ttl")
 
 def ofp_action_generic(type, len):
 	assert type in (OFPAT_COPY_TTL_OUT, OFPAT_COPY_TTL_IN,
@@ -322,19 +215,7 @@ def ofp_action_generic(type, len):
 	len = 8
 	return _pack("HH4x", type, len)
 
-def ofp_action_nw_ttl(type, len, nw_ttl):
-	if type is None:
-		type = OFPAT_SET_NW_TTL
-	assert type == OFPAT_SET_NW_TTL
-	
-	len = 8
-	
-	msg = _pack("HHB3x",
-		type,
-		len,
-		nw_ttl)
-	assert _len(msg) == 8
-	return msg
+ofp_action_nw_ttl = _schema.builder("ofp_action_nw_ttl")
 
 def ofp_action_push(type, len, ethertype):
 	'''type: OFPAT_PUSH_VLAN/PUSH_MPLS/PUSH_PBB
@@ -350,19 +231,7 @@ def ofp_action_push(type, len, ethertype):
 	assert _len(msg) == 8
 	return msg
 
-def ofp_action_pop_mpls(type, len, ethertype):
-	if type is None:
-		type = OFPAT_POP_MPLS
-	assert type == OFPAT_POP_MPLS
-	
-	len = 8
-	
-	msg = _pack("3H2x",
-		type,
-		len,
-		ethertype)
-	assert _len(msg) == 8
-	return msg
+ofp_action_pop_mpls = _schema.builder("ofp_action_pop_mpls")
 
 def ofp_action_set_field(type, len, field):
 	if type is None:
@@ -376,8 +245,7 @@ def ofp_action_set_field(type, len, field):
 	
 	return _pack("HH", type, len) + field + b'\0'*(len-filled_len)
 
-def ofp_action_experimenter_header(type, len, experimenter):
-	return _pack("HHI", type, len, experimenter)
+ofp_action_experimenter_header = _schema.builder("ofp_action_experimenter_header")
 
 def ofp_action_experimenter_(type, len, experimenter, data):
 	if type is None:
@@ -420,17 +288,9 @@ def ofp_table_mod(header, table_id, config, properties):
 		config)+properties, OFPT_TABLE_MOD)
 	return msg
 
-def ofp_table_mod_prop_header(type, length):
-	return _pack("HH", type, length)
-
-def ofp_table_mod_prop_eviction(type, length, flags):
-	type = OFPTMPT_EVICTION
-	return _pack("HHI", type, length, flags)
-
-def ofp_table_mod_prop_vacancy(type, length, vacancy_down, vacancy_up, vacancy):
-	type =OFPTMPT_VACANCY
-	length = 8
-	return _pack("HH3Bx", type, length, vacancy_down, vacancy_up, vacancy)
+ofp_table_mod_prop_header = _schema.builder("ofp_table_mod_prop_header")
+ofp_table_mod_prop_eviction = _schema.builder("ofp_table_mod_prop_eviction")
+ofp_table_mod_prop_vacancy = _schema.builder("ofp_table_mod_prop_vacancy")
 
 def ofp_table_mod_prop_experimenter(type, length, experimenter, exp_type, experimenter_data):
 	type = OFPTMPT_EXPERIMENTER
@@ -443,15 +303,16 @@ def ofp_table_mod_prop_experimenter(type, length, experimenter, exp_type, experi
 # 7.3.4.1
 def ofp_flow_mod(header, cookie, cookie_mask, table_id, command,
 		idle_timeout, hard_timeout, priority, buffer_id, out_port, out_group, flags, importance,
-		match, instructions):
+		match, instructions, iov=False):
 	'''command=OFPFC_ADD/MODIFY/MODIFY_STRICT/DELETE/DELETE_STRICT
+	iov=True returns a list of buffers for scatter-gather send
 	'''
-	if isinstance(instructions, str):
-		pass
+	if isinstance(instructions, bytes):
+		instructions = [instructions]
 	elif isinstance(instructions, (tuple,list)):
-		instructions = b"".join([_obj(i) for i in instructions])
+		instructions = [_obj(i) for i in instructions]
 	elif instructions is None:
-		instructions = b""
+		instructions = []
 	else:
 		raise ValueError(instructions)
 	
@@ -464,15 +325,16 @@ def ofp_flow_mod(header, cookie, cookie_mask, table_id, command,
 	if out_group is None:
 		out_group = OFPG_ANY
 
-	msg = ofp_(header, _pack("QQBB3H3IHH",
+	data = [_pack("QQBB3H3IHH",
 		cookie, cookie_mask,
 		table_id, command,
 		idle_timeout, hard_timeout,
 		priority, buffer_id,
 		out_port, out_group,
-		flags, importance)+_obj(match)+instructions, 
-		OFPT_FLOW_MOD)
-	return msg
+		flags, importance), _obj(match)] + instructions
+	if not iov:
+		data = b"".join(data)
+	return ofp_(header, data, OFPT_FLOW_MOD)
 
 # 7.3.4.2
 def ofp_group_mod(header, command, type, group_id, buckets):
@@ -530,18 +392,9 @@ def ofp_port_mod(header, port_no, hw_addr, config, mask, properties):
 		OFPT_PORT_MOD)
 	return msg
 
-def ofp_port_mod_prop_header(type, length):
-	return _pack("HH", type, length)
-
-def ofp_port_mod_prop_ethernet(type, length, advertise):
-	type = OFPPMPT_ETHERNET
-	length = 8
-	return _pack("HHI", type, length, advertise)
-
-def ofp_port_mod_prop_optical(type, length, configure, freq_lmda, fl_offset, grid_span, tx_pwr):
-	type = OFPPMPT_OPTICAL
-	length = 24
-	return _pack("HHIIiII", type, length, configure, freq_lmda, fl_offset, grid_span, tx_pwr)
+ofp_port_mod_prop_header = _schema.builder("ofp_port_mod_prop_header")
+ofp_port_mod_prop_ethernet = _schema.builder("ofp_port_mod_prop_ethernet")
+ofp_port_mod_prop_optical = _schema.builder("ofp_port_mod_prop_optical")
 
 def ofp_port_mod_prop_experimenter(type, length, experimenter, exp_type, experiimenter_data):
 	type = OFPPMPT_EXPERIMENTER
@@ -569,41 +422,9 @@ def ofp_meter_mod(header, command, flags, meter_id, bands):
 		meter_id) + bands
 	return msg
 
-def ofp_meter_band_header(type, len, rate, burst_size):
-	msg = _pack("HHII", type, len, rate, burst_size)
-	assert _len(msg) == 12
-	return msg
-
-def ofp_meter_band_drop(type, len, rate, burst_size):
-	if type is None:
-		type = OFPMBT_DROP
-	assert type == OFPMBT_DROP
-	
-	len = 16
-	
-	msg = _pack("HHII4x",
-		type,
-		len,
-		rate,
-		burst_size)
-	assert _len(msg) == 16
-	return msg
-
-def ofp_meter_band_dscp_remark(type, len, rate, burst_size, prec_level):
-	if type is None:
-		type = OFPMBT_DSCP_REMARK
-	assert type == OFPMBT_DSCP_REMARK
-	
-	len = 16
-	
-	msg = _pack("HHIIB3x",
-		type,
-		len,
-		rate,
-		burst_size,
-		prec_level)
-	assert _len(msg) == 16
-	return msg
+ofp_meter_band_header = _schema.builder("ofp_meter_band_header")
+ofp_meter_band_drop = _schema.builder("ofp_meter_band_drop")
+ofp_meter_band_dscp_remark = _schema.builder("ofp_meter_band_dscp_remark")
 
 def ofp_meter_band_experimenter(type, len, rate, burst_size, experimenter, data):
 	if type is None:
@@ -679,25 +500,7 @@ def ofp_multipart_reply(header, type, flags, body):
 	return msg
 
 # 7.3.5.1
-def ofp_desc(mfr_desc, hw_desc, sw_desc, serial_num, dp_desc):
-	if mfr_desc is None:
-		mfr_desc = b""
-	if hw_desc is None:
-		hw_desc = b""
-	if sw_desc is None:
-		sw_desc = b""
-	if serial_num is None:
-		serial_num = b""
-	if dp_desc is None:
-		dp_desc = b""
-	msg = _pack("256s256s256s32s256s",
-		mfr_desc,
-		hw_desc,
-		sw_desc,
-		serial_num,
-		dp_desc)
-	assert _len(msg) == 1056
-	return msg
+ofp_desc = _schema.builder("ofp_desc")
 
 # 7.3.5.2
 def ofp_flow_stats_request(table_id, out_port, out_group, cookie, cookie_mask, match):
@@ -719,12 +522,14 @@ def ofp_flow_stats_request(table_id, out_port, out_group, cookie, cookie_mask, m
 
 def ofp_flow_stats(length, table_id, duration_sec, duration_nsec, priority,
 		idle_timeout, hard_timeout, flags, cookie, packet_count, byte_count,
-		match, instructions):
+		match, instructions, importance=0):
+	'''importance is the last, to keep the argument order of older versions
+	'''
 	if instructions is None:
 		instructions = b""
 	elif isinstance(instructions, (list, tuple)):
 		instructions = b"".join([_obj(i) for i in instructions])
-	elif isinstance(instructions, str):
+	elif isinstance(instructions, bytes):
 		pass
 	else:
 		raise ValueError(instructions)
@@ -732,8 +537,8 @@ def ofp_flow_stats(length, table_id, duration_sec, duration_nsec, priority,
 	match = _obj(match)
 	
 	length = 48 + _len(match) + _len(instructions)
-	msg = _pack("HBxII4H4x3Q", length, table_id, duration_sec, duration_nsec,
-		priority, idle_timeout, hard_timeout, flags,
+	msg = _pack("HBxII5H2x3Q", length, table_id, duration_sec, duration_nsec,
+		priority, idle_timeout, hard_timeout, flags, importance,
 		cookie, packet_count, byte_count)+match+instructions
 	assert _len(msg) == length
 	return msg
@@ -754,14 +559,10 @@ def ofp_aggregate_stats_request(table_id, out_port, out_group, cookie, cookie_ma
 	assert len(desc) == 40
 	return desc + _obj(match)
 
-def ofp_aggregate_stats_reply(packet_count, byte_count, flow_count):
-	return _pack("QQI4x", packet_count, byte_count, flow_count)
+ofp_aggregate_stats_reply = _schema.builder("ofp_aggregate_stats_reply")
 
 # 7.3.5.4
-def ofp_table_stats(table_id, active_count, lookup_count, matched_count):
-	msg = _pack("B3xIQQ", table_id, active_count, lookup_count, matched_count)
-	assert _len(msg) == 24
-	return msg
+ofp_table_stats = _schema.builder("ofp_table_stats")
 
 # 7.3.5.5
 def ofp_table_desc(length, table_id, config, properties):
@@ -796,8 +597,7 @@ def ofp_table_features(length, table_id, name, metadata_match, metadata_write, c
 	return msg
 
 # 7.3.5.5.2
-def ofp_table_feature_prop_header(type, length):
-	return _pack("HH", type, length)
+ofp_table_feature_prop_header = _schema.builder("ofp_table_feature_prop_header")
 
 def ofp_table_feature_prop_instructions(type, length, instruction_ids):
 	if isinstance(instruction_ids, (list,tuple)):
@@ -895,17 +695,14 @@ def ofp_table_feature_prop_experimenter(type, length, experimenter, exp_type, da
 	return _pack("HHII", type, length, experimenter, exp_type) + data
 
 # 7.3.5.6
-def ofp_port_stats_request(port_no):
-	if port_no is None:
-		port_no = OFPP_ANY
-	return _pack("I4x", port_no)
+ofp_port_stats_request = _schema.builder("ofp_port_stats_request")
 
 def ofp_port_stats(length, port_no, duration_sec, duration_nsec,
 		rx_packets, tx_packets, rx_bytes, tx_bytes, rx_dropped, tx_dropped,
 		rx_errors, tx_errors, properties):
 	if isinstance(properties, (list,tuple)):
 		properties = b"".join([_obj(p) for p in properties])
-	elif isinstance(properties, str):
+	elif isinstance(properties, bytes):
 		pass
 	elif properties is None:
 		properties = b""
@@ -917,27 +714,9 @@ def ofp_port_stats(length, port_no, duration_sec, duration_nsec,
 		rx_packets, tx_packets, rx_bytes, tx_bytes, rx_dropped, tx_dropped,
 		rx_errors, tx_errors) + properties
 
-def ofp_port_stats_prop_header(type, length):
-	return _pack("HH", type, length)
-
-def ofp_port_stats_prop_ethernet(type, length,
-		rx_frame_err, rx_over_err, rx_crc_err, collisions):
-	type = OFPPSPT_ETHERNET
-	length = 40
-	return _pack("HH4x4Q", type, length, rx_frame_err, rx_over_err, rx_crc_err, collisions)
-
-def ofp_port_stats_prop_optical(type, length,
-		flags,
-		tx_freq_lmda, tx_offset, tx_grid_span,
-		rx_freq_lmda, rx_offset, rx_grid_span,
-		tx_pwr, rx_pwr, bias_current, temperature):
-	type = OFPPSPT_OPTICAL
-	length = 44
-	return _pack("HH4x7I4H", type, length,
-		flags,
-		tx_freq_lmda, tx_offset, tx_grid_span,
-		rx_freq_lmda, rx_offset, rx_grid_span,
-		tx_pwr, rx_pwr, bias_current, temperature)
+ofp_port_stats_prop_header = _schema.builder("ofp_port_stats_prop_header")
+ofp_port_stats_prop_ethernet = _schema.builder("ofp_port_stats_prop_ethernet")
+ofp_port_stats_prop_optical = _schema.builder("ofp_port_stats_prop_optical")
 
 def ofp_port_stats_prop_experimenter(type, length,
 		experimenter, exp_type, experimenter_data):
@@ -949,15 +728,10 @@ def ofp_port_stats_prop_experimenter(type, length,
 		experimenter, exp_type) + experimenter_data
 
 # 7.3.5.9
-def ofp_queue_stats_request(port_no, queue_id):
-	if port_no is None:
-		port_no = OFPP_ANY
-	if queue_id is None:
-		queue_id = OFPQ_ALL
-	return _pack("II", port_no, queue_id)
+ofp_queue_stats_request = _schema.builder("ofp_queue_stats_request")
 
 def ofp_queue_stats(length, port_no, queue_id, tx_bytes, tx_packets, tx_errors, duration_sec, duration_nsec, properties):
-	if isinstance(properties, str):
+	if isinstance(properties, bytes):
 		pass
 	elif isinstance(properties, (list, tuple)):
 		properties = b"".join([_obj(p) for p in properties])
@@ -970,8 +744,7 @@ def ofp_queue_stats(length, port_no, queue_id, tx_bytes, tx_packets, tx_errors,
 	return _pack("H6x2I3Q2I", length, port_no, queue_id, tx_bytes, tx_packets, tx_errors, duration_sec, duration_nsec
 		)+properties
 
-def ofp_queue_stats_prop_header(type, length):
-	return _pack("HH", type, length)
+ofp_queue_stats_prop_header = _schema.builder("ofp_queue_stats_prop_header")
 
 def ofp_queue_stats_prop_experimenter(type, length, experimenter, exp_type, experimenter_data):
 	type = OFPQSPT_EXPERIMENTER
@@ -979,12 +752,7 @@ def ofp_queue_stats_prop_experimenter(type, length, experimenter, exp_type, expe
 	return _pack("HHII", type, length, experimenter, exp_type) + experimenter_data + b'\0'*(_align(length)-length)
 
 # 7.3.5.10
-def ofp_queue_desc_request(port_no, queue_id):
-	if port_no is None:
-		port_no = OFPP_ANY
-	if queue_id is None:
-		queue_id = OFPQ_ALL
-	return _pack("II", port_no, queue_id)
+ofp_queue_desc_request = _schema.builder("ofp_queue_desc_request")
 
 def ofp_queue_desc(port_no, queue_id, len, properties):
 	if isinstance(properties, str):
@@ -1005,19 +773,18 @@ def ofp_queue_desc(port_no, queue_id, len, properties):
 	assert _len(desc)==16
 	return desc + properties
 
-def ofp_queue_desc_prop_header(type, len):
-	# XXX: You won't need this function
-	return _pack("HH4x", type, len)
-
-def ofp_queue_desc_prop_min_rate(type, length, rate):
-	type = OFPQDPT_MIN_RATE
-	length = 8
-	return _pack("HHH2x", type, length, rate)
+_ofp_queue_desc_prop_header = _schema.builder("ofp_queue_desc_prop_header")
 
-def ofp_queue_desc_prop_max_rate(type, length, rate):
-	type = OFPQDPT_MAX_RATE
-	length = 8
-	return _pack("HHH2x", type, length, rate)
+def ofp_queue_desc_prop_header(type, length=None, **kwargs):
+	'''len= is a deprecated alias of length
+	'''
+	if "len" in kwargs:
+		length = kwargs.pop("len")
+	if kwargs:
+		raise TypeError("unexpected keyword arguments %s" % ", ".join(kwargs))
+	return _ofp_queue_desc_prop_header(type, length)
+ofp_queue_desc_prop_min_rate = _schema.builder("ofp_queue_desc_prop_min_rate")
+ofp_queue_desc_prop_max_rate = _schema.builder("ofp_queue_desc_prop_max_rate")
 
 def ofp_queue_desc_prop_experimenter(type, length, experimenter, exp_type, experimenter_data):
 	type = OFPQDPT_EXPERIMENTER
@@ -1026,10 +793,7 @@ def ofp_queue_desc_prop_experimenter(type, length, experimenter, exp_type, exper
 		) + experimenter_data + b'\0'*(_align(length)-length)
 
 # 7.3.5.9
-def ofp_group_stats_request(group_id):
-	if group_id is None:
-		group_id = OFPG_ALL
-	return _pack("I4x", group_id)
+ofp_group_stats_request = _schema.builder("ofp_group_stats_request")
 
 def ofp_group_stats(length, group_id, ref_count, packet_count, byte_count,
 		duration_sec, duration_nsec, bucket_stats):
@@ -1047,8 +811,7 @@ def ofp_group_stats(length, group_id, ref_count, packet_count, byte_count,
 	return _pack("H2xII4xQQII", length, group_id, ref_count, packet_count, byte_count,
 		duration_sec, duration_nsec) + bucket_stats
 
-def ofp_bucket_counter(packet_count, byte_count):
-	return _pack("QQ", packet_count, byte_count)
+ofp_bucket_counter = _schema.builder("ofp_bucket_counter")
 
 # 7.3.5.10
 def ofp_group_desc(length, type, group_id, buckets):
@@ -1088,8 +851,7 @@ def ofp_group_features(types, capabilities, max_groups, actions):
 	return _pack("II", types, capabilities) + max_groups + actions
 
 # 7.3.5.14
-def ofp_meter_multipart_request(meter_id):
-	return _pack("I4x", meter_id)
+ofp_meter_multipart_request = _schema.builder("ofp_meter_multipart_request")
 
 def ofp_meter_stats(meter_id, len, flow_count, packet_in_count, byte_in_count,
 		duration_sec, duration_nsec, band_stats):
@@ -1105,8 +867,7 @@ def ofp_meter_stats(meter_id, len, flow_count, packet_in_count, byte_in_count,
 	return _pack("IH6xIQQII", meter_id, len, flow_count, packet_in_count, byte_in_count,
 		duration_sec, duration_nsec) + band_stats
 
-def ofp_meter_band_stats(packet_band_count, byte_band_count):
-	return _pack("QQ", packet_band_count, byte_band_count)
+ofp_meter_band_stats = _schema.builder("ofp_meter_band_stats")
 
 # 7.3.5.13
 def ofp_meter_config(length, flags, meter_id, bands):
@@ -1124,8 +885,7 @@ def ofp_meter_config(length, flags, meter_id, bands):
 	return _pack("HHI", length, flags, meter_id) + bands
 
 # 7.3.5.16
-def ofp_meter_features(max_meter, band_types, capabilities, max_bands, max_color):
-	return _pack("IIIBB2x", max_meter, band_types, capabilities, max_bands, max_color)
+ofp_meter_features = _schema.builder("ofp_meter_features")
 
 # 7.3.5.17
 def ofp_flow_monitor_request(monitor_id, out_port, out_group,
@@ -1151,31 +911,33 @@ def ofp_flow_update_full(length, event, table_id, reason,
 	return _pack("HHBB3H4xQ", length, event, table_id, reason,
 		idle_timeout, hard_timeout, priority, cookie)+match+instructions
 
-def ofp_flow_update_abbrev(length, event, xid):
-	length = 8
-	event = OFPFME_ABBREV
-	return _pack("HHI", length, event, xid)
+ofp_flow_update_abbrev = _schema.builder("ofp_flow_update_abbrev")
 
 def ofp_flow_update_paused(length, event):
 	length = 8
 	return _pack("HH4x", length, event)
 
 # 7.3.5.15
-def ofp_experimenter_multipart_header(experimenter, exp_type):
-	return _pack("II", experimenter, exp_type)
+ofp_experimenter_multipart_header = _schema.builder("ofp_experimenter_multipart_header")
 
 # 7.3.7
-def ofp_packet_out(header, buffer_id, in_port, actions_len, actions, data):
+def ofp_packet_out(header, buffer_id, in_port, actions_len, actions, data, iov=False):
+	'''
+	iov=True returns a list of buffers for scatter-gather send, 
+	data is not copied and may be a bytearray or memoryview.
+	'''
 	if isinstance(actions, (list,tuple)):
 		actions = b"".join([_obj(a) for a in actions])
-	elif isinstance(actions, str):
+	elif isinstance(actions, bytes):
 		pass
 	elif actions is None:
 		actions = b""
 	else:
 		raise ValueError(actions)
 	
-	if isinstance(data, str):
+	if isinstance(data, bytes):
+		pass
+	elif iov and isinstance(data, (bytearray, memoryview)):
 		pass
 	elif data is None:
 		data = b""
@@ -1187,6 +949,10 @@ def ofp_packet_out(header, buffer_id, in_port, actions_len, actions, data):
 	
 	actions_len = _len(actions)
 	
+	if iov:
+		return ofp_(header,
+			[_pack("IIH6x", buffer_id, in_port, actions_len) + actions, data],
+			OFPT_PACKET_OUT)
 	return ofp_(header,
 		_pack("IIH6x", buffer_id, in_port, actions_len) + actions + data,
 		OFPT_PACKET_OUT)
@@ -1228,8 +994,7 @@ def ofp_bundle_add_msg(header, bundle_id, flags, message, properties):
 		OFPT_BUNDLE_ADD_MESSAGE)
 
 # 7.3.9.4
-def ofp_bundle_prop_header(type, length):
-	return _pack("HH", type, length)
+ofp_bundle_prop_header = _schema.builder("ofp_bundle_prop_header")
 
 def ofp_bundle_prop_experimenter(type, length,
 		experimenter, exp_type, experimenter_data):
@@ -1254,8 +1019,7 @@ def ofp_async_config(header, properties):
 		properties,
 		(OFPT_GET_ASYNC_REPLY, OFPT_SET_ASYNC))
 
-def ofp_async_config_prop_header(type, length):
-	return _pack("HH", type, length)
+ofp_async_config_prop_header = _schema.builder("ofp_async_config_prop_header")
 
 def ofp_async_config_prop_reasons(type, length, mask):
 	assert type in (OFPACPT_PACKET_IN_SLAVE, OFPACPT_PACKET_IN_MASTER,
@@ -1275,7 +1039,14 @@ def ofp_async_config_prop_experimenter(type, length,
 		)+experimenter_data+b'\0'*(_align(length)-length)
 
 # 7.4.1
-def ofp_packet_in(header, buffer_id, total_len, reason, table_id, cookie, match, data):
+def ofp_packet_in(header, buffer_id, total_len, reason, table_id, cookie, match, data, iov=False):
+	'''
+	iov=True returns a list of buffers for scatter-gather send
+	'''
+	if iov:
+		return ofp_(header,
+			[_pack("IHBBQ", buffer_id, total_len, reason, table_id, cookie), _obj(match) + b"\0"*2, data],
+			OFPT_PACKET_IN)
 	return ofp_(header,
 		_pack("IHBBQ", buffer_id, total_len, reason, table_id, cookie) + _obj(match) + b"\0"*2 + data,
 		OFPT_PACKET_IN)
@@ -1311,8 +1082,7 @@ def ofp_role_status(header, role, reason, generation_id, properties):
 		_pack("IB3xQ", role, reason, generation_id)+properties,
 		(OFPT_ROLE_REQUEST, OFPT_ROLE_REPLY))
 
-def ofp_role_prop_header(type, length):
-	return _pack("HH", type, length)
+ofp_role_prop_header = _schema.builder("ofp_role_prop_header")
 
 def ofp_role_prop_experimenter(type, length, experimenter, exp_type, experimenter_data):
 	type = OFPRPT_EXPERIMENTER
@@ -1347,8 +1117,7 @@ def ofp_hello(header, elements):
 	
 	return ofp_(header, elements, OFPT_HELLO)
 
-def ofp_hello_elem_header(type, length):
-	return _pack("HH", type, length)
+ofp_hello_elem_header = _schema.builder("ofp_hello_elem_header")
 
 def ofp_hello_elem_versionbitmap(type, length, bitmaps):
 	if type is None:
@@ -2,6 +2,7 @@ from __future__ import absolute_import
 import struct
 from collections import namedtuple
 from . import _enum_base
+from ..ofp4.oxm import _and
 
 ofp_oxm_class = type("ofp_oxm_class", (_enum_base,), {
 	"prefix": "OFPXMC",
@@ -38,7 +39,7 @@ ofp_ipv6exthdr_flags = type("ofp_ipv6exthdr_flags", (_enum_base,), {
 	})(globals())
 
 def _bits(oxm_field):
-	if oxm_field in (OXM_OF_IN_PORT, OXM_OF_IN_PHY_PORT):
+	if oxm_field in (OXM_OF_IN_PORT, OXM_OF_IN_PHY_PORT, OXM_OF_IPV6_FLABEL, OXM_OF_MPLS_LABEL):
 		bits = "I"
 	elif oxm_field in (OXM_OF_METADATA, OXM_OF_TUNNEL_ID):
 		bits = "Q"
@@ -60,41 +61,141 @@ def _bits(oxm_field):
 		bits = "B"
 	return bits
 
-def parse(message, offset=0):
-	(oxm_class, p, oxm_length) = struct.unpack_from("!HBB", message, offset)
-	oxm_field = p>>1
-	oxm_hasmask = p&1
-	offset += 4
-	
-	if oxm_class != OFPXMC_OPENFLOW_BASIC:
-		raise ValueError("only OFPXMC_OPENFLOW_BASIC is supported")
-	
+oxm = namedtuple("oxm", "oxm_class oxm_field oxm_hasmask oxm_length oxm_value oxm_mask")
+
+# struct packs the whole TLV, length is the oxm_length, and
+# decode(message, offset) returns the record of the TLV at offset.
+codec = namedtuple("codec", "struct length decode")
+
+codecs = {} # oxm_class<<8 | oxm_field<<1 | oxm_hasmask -> codec
+experimenters = {} # experimenter id -> decode(message, offset)
+
+_header = struct.Struct("!I")
+_experimenter = struct.Struct("!I")
+_new = tuple.__new__
+
+def _basic_codec(oxm_class, oxm_field, oxm_hasmask):
 	bits = _bits(oxm_field)
-	
 	if oxm_hasmask:
-		assert oxm_length == struct.calcsize("!"+bits*2)
-		return namedtuple("oxm", "oxm_class oxm_field oxm_hasmask oxm_length oxm_value oxm_mask")(
-			oxm_class, oxm_field, oxm_hasmask, oxm_length, *struct.unpack_from("!"+bits*2, message, offset))
+		s = struct.Struct("!HBB"+bits*2)
+		unpack_from = s.unpack_from
+		def decode(message, offset):
+			(c, p, length, value, mask) = unpack_from(message, offset)
+			return _new(oxm, (oxm_class, oxm_field, 1, length, value, mask))
 	else:
-		assert oxm_length == struct.calcsize(bits)
-		return namedtuple("oxm", "oxm_class oxm_field oxm_hasmask oxm_length oxm_value")(
-			oxm_class, oxm_field, oxm_hasmask, oxm_length, *struct.unpack_from("!"+bits, message, offset))
+		s = struct.Struct("!HBB"+bits)
+		unpack_from = s.unpack_from
+		def decode(message, offset):
+			(c, p, length, value) = unpack_from(message, offset)
+			return _new(oxm, (oxm_class, oxm_field, 0, length, value, None))
+	return codec(s, s.size-4, decode)
+
+def register(oxm_class, oxm_field, oxm_hasmask, c):
+	codecs[(oxm_class<<8) | (oxm_field<<1) | oxm_hasmask] = c
+
+def register_experimenter(exp, decode):
+	'''
+	decode(message, offset) parses OFPXMC_EXPERIMENTER TLV of exp
+	'''
+	experimenters[exp] = decode
+
+def lookup(oxm_class, oxm_field, oxm_hasmask):
+	'''
+	@return codec, which is made from _bits() if not registered
+	'''
+	key = (oxm_class<<8) | (oxm_field<<1) | oxm_hasmask
+	c = codecs.get(key)
+	if c is None:
+		c = codecs[key] = _basic_codec(oxm_class, oxm_field, oxm_hasmask)
+	return c
 
-def parse_list(message, offset=0):
+for (name, oxm_field) in oxm_ofb_match_fields.items():
+	register(OFPXMC_OPENFLOW_BASIC, oxm_field, 0, _basic_codec(OFPXMC_OPENFLOW_BASIC, oxm_field, 0))
+	register(OFPXMC_OPENFLOW_BASIC, oxm_field, 1, _basic_codec(OFPXMC_OPENFLOW_BASIC, oxm_field, 1))
+del name, oxm_field
+
+def parse(message, offset=0):
+	(h,) = _header.unpack_from(message, offset)
+	c = codecs.get(h>>8)
+	if c is None:
+		oxm_class = h>>16
+		if oxm_class == OFPXMC_OPENFLOW_BASIC:
+			c = lookup(oxm_class, (h>>9)&0x7f, (h>>8)&1)
+		elif oxm_class == OFPXMC_EXPERIMENTER:
+			(exp,) = _experimenter.unpack_from(message, offset+4)
+			if exp not in experimenters:
+				raise ValueError("unsupported Experimenter ID")
+			return experimenters[exp](message, offset)
+		else:
+			raise ValueError("only OFPXMC_OPENFLOW_BASIC or some OFPXMC_EXPERIMENTER is supported")
+	assert h & 0xff == c.length
+	return c.decode(message, offset)
+
+def parse_list(message, offset=0, end=None):
+	'''
+	@param end end of the oxm fields, defaults to the end of message
+	'''
+	if end is None:
+		end = len(message)
 	ret = []
-	while offset < len(message):
-		m = parse(message, offset)
-		ret.append(m)
-		offset += 4 + m.oxm_length
+	get = codecs.get
+	unpack_from = _header.unpack_from
+	while offset < end:
+		(h,) = unpack_from(message, offset)
+		c = get(h>>8)
+		if c is not None and c.length == h & 0xff:
+			ret.append(c.decode(message, offset))
+		else:
+			ret.append(parse(message, offset))
+		offset += 4 + (h & 0xff)
 	return ret
 
+# maskable fields which are narrower than the packed value
+_widths = {OXM_OF_VLAN_VID: 13, OXM_OF_IPV6_FLABEL: 20, OXM_OF_IPV6_EXTHDR: 9}
+
+def _order(key):
+	return (key[0], key[1], repr(key[2:]))
+
+def canonical(fields):
+	'''
+	@param fields oxm_fields bytes, or a list of the records
+	@return hashable key, a sorted tuple of (oxm_class, oxm_field, value,
+		mask) with the mask applied to the value. An all-ones mask is taken
+		as exact match, and a field of zero mask is dropped as it matches
+		anything. Experimenter records are kept as they are.
+	'''
+	if not isinstance(fields, (list, tuple)):
+		fields = parse_list(fields)
+	ret = []
+	for f in fields:
+		if f.__class__ is not oxm:
+			ret.append(tuple(f))
+			continue
+		(value, mask) = (f.oxm_value, f.oxm_mask)
+		if mask is not None:
+			if isinstance(mask, bytes):
+				full = mask == b"\xff"*len(mask)
+				zero = not any(bytearray(mask))
+			else:
+				ones = (1 << _widths.get(f.oxm_field, 8*lookup(f.oxm_class, f.oxm_field, 0).length)) - 1
+				full = mask & ones == ones
+				zero = mask == 0
+			if zero:
+				continue
+			elif full:
+				mask = None
+			else:
+				value = _and(value, mask)
+		ret.append((f.oxm_class, f.oxm_field, value, mask))
+	ret.sort(key=_order)
+	return tuple(ret)
+
 def build(oxm_class, oxm_field, oxm_hasmask, oxm_length, oxm_value, oxm_mask=None):
 	if oxm_class is None:
 		oxm_class = OFPXMC_OPENFLOW_BASIC
 	assert oxm_class == OFPXMC_OPENFLOW_BASIC
 	
-	bits = _bits(oxm_field)
-	
+	# convert to pack integer
 	if oxm_hasmask:
 		oxm_hasmask = 1
 	else:
@@ -106,10 +207,8 @@ def build(oxm_class, oxm_field, oxm_hasmask, oxm_length, oxm_value, oxm_mask=Non
 	else:
 		oxm_hasmask = 1
 	
+	c = lookup(oxm_class, oxm_field, oxm_hasmask)
 	if oxm_hasmask:
-		oxm_length = struct.calcsize("!"+bits*2)
-		return struct.pack("!HBB"+bits*2, oxm_class, (oxm_field<<1)+oxm_hasmask, oxm_length, oxm_value, oxm_mask)
+		return c.struct.pack(oxm_class, (oxm_field<<1)+1, c.length, oxm_value, oxm_mask)
 	else:
-		oxm_length = struct.calcsize("!"+bits)
-		return struct.pack("!HBB"+bits, oxm_class, (oxm_field<<1)+oxm_hasmask, oxm_length, oxm_value)
-
+		return c.struct.pack(oxm_class, oxm_field<<1, c.length, oxm_value)
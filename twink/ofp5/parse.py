@@ -2,6 +2,7 @@ from __future__ import absolute_import
 import struct
 from collections import namedtuple
 from . import *
+from .schema import schema as _schema
 
 _len = len
 _type = type
@@ -22,14 +23,23 @@ def _cursor(offset):
 	else:
 		raise ValueError(offset)
 
+_structs = {}
+
+def _struct(fmt):
+	s = _structs.get(fmt)
+	if s is None:
+		if fmt[0] != "!":
+			s = struct.Struct("!"+fmt)
+		else:
+			s = struct.Struct(fmt)
+		_structs[fmt] = s
+	return s
+
 def _unpack(fmt, msg, offset):
 	cur = _cursor(offset)
-	
-	if fmt[0] != "!":
-		fmt = "!"+fmt
-	
-	ret = struct.unpack_from(fmt, msg, cur.offset)
-	cur.offset += struct.calcsize(fmt)
+	s = _struct(fmt)
+	ret = s.unpack_from(msg, cur.offset)
+	cur.offset += s.size
 	return ret
 
 def from_bitmap(uint32_t_list):
@@ -45,68 +55,32 @@ def parse(message, offset=0):
 		return None
 	
 	cursor = _cursor(offset)
-	header = ofp_header(message, cursor.offset)
-	assert header.version == 5
-	if header.type == OFPT_HELLO:
-		return ofp_hello(message, cursor)
-	elif header.type == OFPT_ERROR:
-		return ofp_error_msg(message, cursor)
-	elif header.type == OFPT_FEATURES_REPLY:
-		return ofp_switch_features(message, cursor)
-	elif header.type in (OFPT_SET_CONFIG, OFPT_GET_CONFIG_REPLY):
-		return ofp_switch_config(message, cursor)
-	elif header.type == OFPT_PACKET_IN:
-		return ofp_packet_in(message, cursor)
-	elif header.type == OFPT_FLOW_REMOVED:
-		return ofp_flow_removed(message, cursor)
-	elif header.type == OFPT_PORT_STATUS:
-		return ofp_port_status(message, cursor)
-	elif header.type == OFPT_PACKET_OUT:
-		return ofp_packet_out(message, cursor)
-	elif header.type == OFPT_FLOW_MOD:
-		return ofp_flow_mod(message, cursor)
-	elif header.type == OFPT_GROUP_MOD:
-		return ofp_group_mod(message, cursor)
-	elif header.type == OFPT_PORT_MOD:
-		return ofp_port_mod(message, cursor)
-	elif header.type == OFPT_TABLE_MOD:
-		return ofp_table_mod(message, cursor)
-	elif header.type == OFPT_MULTIPART_REQUEST:
-		return ofp_multipart_request(message, cursor)
-	elif header.type == OFPT_MULTIPART_REPLY:
-		return ofp_multipart_reply(message, cursor)
-	elif header.type == OFPT_EXPERIMENTER:
-		return ofp_experimenter_msg(message, cursor)
-	elif header.type in (OFPT_SET_ASYNC, OFPT_GET_ASYNC_REPLY):
-		return ofp_async_config(message, cursor)
-	elif header.type == OFPT_METER_MOD:
-		return ofp_meter_mod(message, cursor)
-	elif header.type == OFPT_ROLE_STATUS:
-		return ofp_role_status(message, cursor)
-	elif header.type == OFPT_TABLE_STATUS:
-		return ofp_table_status(message, cursor)
-	elif header.type == OFPT_REQUESTFORWARD:
-		return ofp_requestforward_(message, cursor)
-	elif header.type == OFPT_BUNDLE_CONTROL:
-		return ofp_bundle_ctrl_msg(message, cursor)
-	elif header.type == OFPT_BUNDLE_ADD_MESSAGE:
-		return ofp_bundle_add_msg(message, cursor)
-	else:
-		# OFPT_ECHO_REQUEST, OFPT_ECHO_REPLY
-		# OFPT_FEATURES_REQUEST
-		# OFPT_BARRIER_REQUEST, OFPT_BARRIER_REPLY
-		# OFPT_GET_ASYNC_REQUEST
-		return ofp_(message, cursor)
+	(version, type) = _struct("BB").unpack_from(message, cursor.offset)
+	assert version == 5
+	# OFPT_ECHO_REQUEST, OFPT_ECHO_REPLY, OFPT_FEATURES_REQUEST, 
+	# OFPT_BARRIER_REQUEST, OFPT_BARRIER_REPLY, OFPT_GET_ASYNC_REQUEST
+	# and unknown types are ofp_
+	return message_parsers.get(type, ofp_)(message, cursor)
+
+def parse_header_only(message, offset=0):
+	'''
+	Fast path for messages to be forwarded as they are.
+	@return (type, xid)
+	'''
+	(version, type, length, xid) = _struct("BBHI").unpack_from(message, offset)
+	assert version == 5
+	return (type, xid)
 
 # 7.1
+_ofp_header = namedtuple("ofp_header", "version type length xid")
 def ofp_header(message, offset):
 	cursor = _cursor(offset)
 	(version, type, length, xid) = _unpack("BBHI", message, cursor)
 	assert version == 5
-	return namedtuple("ofp_header",
-		"version type length xid")(
+	return _ofp_header(
 		version,type,length,xid)
 
+_ofp_ = namedtuple("ofp_", "header,data")
 def ofp_(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -115,48 +89,37 @@ def ofp_(message, offset):
 	
 	data = message[cursor.offset:offset+header.length]
 	cursor.offset = offset+header.length
-	return namedtuple("ofp_",
-		"header,data")(header, data)
+	return _ofp_(header, data)
 
 # 7.2.1.1
+_ofp_port = namedtuple("ofp_port", "port_no,length,hw_addr,name,config,state,properties")
 def ofp_port(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
 	
 	(port_no,length,hw_addr,name,config,state) = _unpack("IH2x6s2x16sII", message, cursor)
 	name = name.partition(b"\0")[0]
+	properties = []
 	while cursor.offset < offset+length:
 		h = ofp_port_desc_prop_header(message, cursor.offset)
 		if h.type == OFPPDPT_ETHERNET:
-			return ofp_port_desc_prop_ethernet(message, cursor)
+			properties.append(ofp_port_desc_prop_ethernet(message, cursor))
 		elif h.type == OFPPDPT_OPTICAL:
-			return ofp_port_desc_prop_optical(message, cursor)
+			properties.append(ofp_port_desc_prop_optical(message, cursor))
 		elif h.type == OFPPDPT_EXPERIMENTER:
-			return ofp_port_desc_prop_experimenter(message, cursor)
+			properties.append(ofp_port_desc_prop_experimenter(message, cursor))
 		else:
 			raise ValueError(h)
 	
-	return namedtuple("ofp_port", 
-		"port_no,length,hw_addr,name,config,state,properties")(
+	return _ofp_port(
 		port_no,length,hw_addr,name,config,state,properties)
 
 # 7.2.1.2
-def ofp_port_desc_prop_header(message, offset):
-	return namedtuple("ofp_port_desc_prop_header",
-		"type length")(*_unpack("HH", message, offset))
-
-def ofp_port_desc_prop_ethernet(message, offset):
-	return namedtuple("ofp_port_desc_prop_ethernet",
-		"type length curr advertised supported peer curr_speed max_speed")(
-		*_unpack("HH4x6I", message, offset))
-
-def ofp_port_desc_prop_optical(message, offset):
-	return namedtuple("ofp_port_desc_prop_optical",
-		'''type length supported
-		tx_min_freq_lmda tx_max_freq_lmda tx_grid_freq_lmda
-		rx_min_freq_lmda rx_max_freq_lmda rx_grid_freq_lmda
-		tx_pwr_min tx_pwr_max''')(*_unpack("HH4x7I2H", message, offset))
+ofp_port_desc_prop_header = _schema.parser("ofp_port_desc_prop_header")
+ofp_port_desc_prop_ethernet = _schema.parser("ofp_port_desc_prop_ethernet")
+ofp_port_desc_prop_optical = _schema.parser("ofp_port_desc_prop_optical")
 
+_ofp_port_desc_prop_experimenter = namedtuple("ofp_port_desc_prop_experimenter", "type,length,experimenter,exp_type,experimenter_data")
 def ofp_port_desc_prop_experimenter(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -165,11 +128,11 @@ def ofp_port_desc_prop_experimenter(message, offset):
 	experimenter_data = message[cursor.offset:offset+length]
 	cursor.offset = offset+length
 	
-	return namedtuple("ofp_port_desc_prop_experimenter",
-		"type,length,experimenter,exp_type,experimenter_data")(
+	return _ofp_port_desc_prop_experimenter(
 		type,length,experimenter,exp_type,experimenter_data)
 
 # 7.2.2.1
+_ofp_match = namedtuple("ofp_match", "type length oxm_fields")
 def ofp_match(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -177,18 +140,13 @@ def ofp_match(message, offset):
 	(type,length) = _unpack("HH", message, cursor)
 	oxm_fields = message[cursor.offset:offset+length]
 	cursor.offset = offset+_align(length)
-	return namedtuple("ofp_match",
-		"type length oxm_fields")(type,length,oxm_fields)
+	return _ofp_match(type,length,oxm_fields)
 
 # 7.2.2.8
-def ofp_oxm_experimenter_header(message, offset):
-	return namedtuple("ofp_oxm_experimenter_header",
-		"oxm_header experimenter")(*_unpack("II", message, offset))
+ofp_oxm_experimenter_header = _schema.parser("ofp_oxm_experimenter_header")
 
 # 7.2.3
-def ofp_instruction_header(message, offset):
-	return namedtuple("ofp_instruction_header",
-		"type len")(*_unpack("HH", message, offset))
+ofp_instruction_header = _schema.parser("ofp_instruction_header")
 
 def ofp_instruction_(message, offset):
 	cursor = _cursor(offset)
@@ -208,14 +166,10 @@ def ofp_instruction_(message, offset):
 	else:
 		raise ValueError(ofp_instruction_header(message, cursor.offset))
 
-def ofp_instruction_goto_table(message, offset):
-	return namedtuple("ofp_instruction_goto_table",
-		"type len table_id")(*_unpack("HHB3x", message, offset))
-
-def ofp_instruction_write_metadata(message, offset):
-	return namedtuple("ofp_instruction_write_metadata",
-		"type len metadata metadata_mask")(*_unpack("HH4xQQ", message, offset))
+ofp_instruction_goto_table = _schema.parser("ofp_instruction_goto_table")
+ofp_instruction_write_metadata = _schema.parser("ofp_instruction_write_metadata")
 
+_ofp_instruction_actions = namedtuple("ofp_instruction_actions", "type,len,actions")
 def ofp_instruction_actions(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -227,13 +181,11 @@ def ofp_instruction_actions(message, offset):
 		actions.append(ofp_action_(message,cursor))
 	
 	assert cursor.offset == offset+len
-	return namedtuple("ofp_instruction_actions",
-		"type,len,actions")(type,len,actions)
+	return _ofp_instruction_actions(type,len,actions)
 
-def ofp_instruction_meter(message, offset):
-	return namedtuple("ofp_instruction_meter",
-		"type len meter_id")(*_unpack("HHI", message, offset))
+ofp_instruction_meter = _schema.parser("ofp_instruction_meter")
 
+_ofp_instruction_experimenter_header = namedtuple("ofp_instruction_experimenter_header", "type len experimenter")
 def ofp_instruction_experimenter_header(message, offset):
 	# Note: no reference in spec
 	cursor = _cursor(offset)
@@ -243,9 +195,9 @@ def ofp_instruction_experimenter_header(message, offset):
 	
 	cursor.offset = offset+len
 	
-	return namedtuple("ofp_instruction_experimenter_header",
-		"type len experimenter")(type,len,experimenter)
+	return _ofp_instruction_experimenter_header(type,len,experimenter)
 
+_ofp_instruction_experimenter_ = namedtuple("ofp_instruction_experimenter_", "type len experimenter data")
 def ofp_instruction_experimenter_(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -255,13 +207,10 @@ def ofp_instruction_experimenter_(message, offset):
 	data = message[cursor.offset:offset+len]
 	cursor.offset = offset+len
 	
-	return namedtuple("ofp_instruction_experimenter_",
-		"type len experimenter data")(type,len,experimenter,data)
+	return _ofp_instruction_experimenter_(type,len,experimenter,data)
 
 # 7.2.4
-def ofp_action_header(message, offset):
-	return namedtuple("ofp_action_header",
-		"type,len")(*_unpack("HH", message, offset))
+ofp_action_header = _schema.parser("ofp_action_header")
 
 def ofp_action_(message, offset):
 	cursor = _cursor(offset)
@@ -290,38 +239,16 @@ def ofp_action_(message, offset):
 	else:
 		raise ValueError(header)
 
-def ofp_action_output(message, offset):
-	return namedtuple("ofp_action_output",
-		"type,len,port,max_len")(*_unpack("HHIH6x", message, offset))
-
-def ofp_action_group(message, offset):
-	return namedtuple("ofp_action_group",
-		"type,len,group_id")(*_unpack("HHI", message, offset))
-
-def ofp_action_set_queue(message, offset):
-	return namedtuple("ofp_action_set_queue",
-		"type,len,queue_id")(*_unpack("HHI", message, offset))
-
-def ofp_action_mpls_ttl(message, offset):
-	return namedutple("ofp_action_mpls_ttl",
-		"type,len,mpls_ttl")(*_unpack("HHB3x", message, offset))
-
-def ofp_action_generic(message, offset):
-	return namedtuple("ofp_action_generic",
-		"type,len")(*_unpack("HH4x", message, offset))
-
-def ofp_action_nw_ttl(message, offset):
-	return namedtuple("ofp_action_nw_ttl",
-		"type,len,nw_ttl")(*_unpack("HHB3x", message, offset))
-
-def ofp_action_push(message, offset):
-	return namedtuple("ofp_action_push",
-		"type,len,ethertype")(*_unpack("HHH2x", message, offset))
-
-def ofp_action_pop_mpls(message, offset):
-	return namedtuple("ofp_action_pop_mpls",
-		"type,len,ethertype")(*_unpack("HHH2x", message, offset))
+ofp_action_output = _schema.parser("ofp_action_output")
+ofp_action_group = _schema.parser("ofp_action_group")
+ofp_action_set_queue = _schema.parser("ofp_action_set_queue")
+ofp_action_mpls_ttl = _schema.parser("ofp_action_mpls_ttl")
+ofp_action_generic = _schema.parser("ofp_action_generic")
+ofp_action_nw_ttl = _schema.parser("ofp_action_nw_ttl")
+ofp_action_push = _schema.parser("ofp_action_push")
+ofp_action_pop_mpls = _schema.parser("ofp_action_pop_mpls")
 
+_ofp_action_set_field = namedtuple("ofp_action_set_field", "type,len,field")
 def ofp_action_set_field(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -329,13 +256,11 @@ def ofp_action_set_field(message, offset):
 	(type,len) = _unpack("HH", message, cursor)
 	field = message[cursor.offset:offset+len]
 	cursor.offset = offset+len
-	return namedtuple("ofp_action_set_field",
-		"type,len,field")(type,len,field)
+	return _ofp_action_set_field(type,len,field)
 
-def ofp_action_experimenter_header(message, offset):
-	return namedtuple("ofp_action_experimenter_header",
-		"type,len,experimenter")(*_unpack("HHI", message, offset))
+ofp_action_experimenter_header = _schema.parser("ofp_action_experimenter_header")
 
+_ofp_action_experimenter_ = namedtuple("ofp_action_experimenter_", "type,len,experimenter,data")
 def ofp_action_experimenter_(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -343,19 +268,19 @@ def ofp_action_experimenter_(message, offset):
 	header = ofp_action_experimenter_header(message, cursor)
 	data = message[cursor.offset:offset+header.len]
 	cursor.offset = offset + header.len
-	return namedtuple("ofp_action_experimenter_",
-		"type,len,experimenter,data")(*header+(data,))
+	return _ofp_action_experimenter_(*header+(data,))
 
 # 7.2.5
+_ofp_experimenter_structure = namedtuple("ofp_experimenter_structure", "experimenter,exp_type,experimenter_data")
 def ofp_experimenter_structure(message, offset):
 	experimenter,exp_type = _unpack("II", message, offset)
 	experimenter_data = message[cursor.offset:] # XXX: not self-descriptive for data length
 	
-	return namedtuple("ofp_experimenter_structure",
-		"experimenter,exp_type,experimenter_data")(
+	return _ofp_experimenter_structure(
 		experimenter,exp_type,experimenter_data)
 
 # 7.3.1
+_ofp_switch_features = namedtuple("ofp_switch_features", "header,datapath_id,n_buffers,n_tables,auxiliary_id,capabilities")
 def ofp_switch_features(message, offset=0):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -363,20 +288,20 @@ def ofp_switch_features(message, offset=0):
 	header = ofp_header(message, cursor)
 	(datapath_id, n_buffers, n_tables, 
 		auxiliary_id, capabilities, reserved) = _unpack("QIBB2xII", message, cursor)
-	return namedtuple("ofp_switch_features",
-		"header,datapath_id,n_buffers,n_tables,auxiliary_id,capabilities")(
+	return _ofp_switch_features(
 		header,datapath_id,n_buffers,n_tables,auxiliary_id,capabilities)
 
 # 7.3.2
+_ofp_switch_config = namedtuple("ofp_switch_config", "header,flags,miss_send_len")
 def ofp_switch_config(message, offset):
 	cursor = _cursor(offset)
 	
 	header = ofp_header(message, cursor)
 	(flags,miss_send_len) = _unpack("HH", message, cursor)
-	return namedtuple("ofp_switch_config",
-		"header,flags,miss_send_len")(header,flags,miss_send_len)
+	return _ofp_switch_config(header,flags,miss_send_len)
 
 # 7.3.4.1
+_ofp_table_mod = namedtuple("ofp_table_mod", "header,table_id,config,properties")
 def ofp_table_mod(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -395,22 +320,13 @@ def ofp_table_mod(message, offset):
 		else:
 			raise ValueError(h)
 	
-	return namedtuple("ofp_table_mod",
-		"header,table_id,config,properties")(header,table_id,config,properties)
-
-def ofp_table_mod_prop_header(message, offset):
-	return namedtuple("ofp_table_mod_prop_header",
-		"type length")(*_unpack("HH", message, offset))
-
-def ofp_table_mod_prop_eviction(message, offset):
-	return namedtuple("ofp_table_mod_prop_eviction",
-		"type length flags")(*_unpack("HHI", message, offset))
+	return _ofp_table_mod(header,table_id,config,properties)
 
-def ofp_table_mod_prop_vacancy(message, offset):
-	return namedtuple("ofp_table_mod_prop_vacancy",
-		"type length vacancy_down vacancy_up vacancy")(
-		*_unpack("HH3Bx", message, offset))
+ofp_table_mod_prop_header = _schema.parser("ofp_table_mod_prop_header")
+ofp_table_mod_prop_eviction = _schema.parser("ofp_table_mod_prop_eviction")
+ofp_table_mod_prop_vacancy = _schema.parser("ofp_table_mod_prop_vacancy")
 
+_ofp_table_mod_prop_experimenter = namedtuple("ofp_table_mod_prop_experimenter", "type,length,experimenter,exp_type,experimenter_data")
 def ofp_table_mod_prop_experimenter(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -419,11 +335,13 @@ def ofp_table_mod_prop_experimenter(message, offset):
 	experimenter_data = message[cursor.offset:offset+length]
 	cursor.offset = offset + _align(length)
 	
-	return namedtuple("ofp_table_mod_prop_experimenter",
-		"type,length,experimenter,exp_type,experimenter_data")(
+	return _ofp_table_mod_prop_experimenter(
 		type,length,experimenter,exp_type,experimenter_data)
 
 # 7.3.4.2
+_ofp_flow_mod = namedtuple("ofp_flow_mod", '''header,cookie,cookie_mask,table_id,command,
+	idle_timeout,hard_timeout,priority,
+	buffer_id,out_port,out_group,flags,importance,match,instructions''')
 def ofp_flow_mod(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -436,15 +354,13 @@ def ofp_flow_mod(message, offset):
 	match = ofp_match(message, cursor)
 	instructions = _list_fetch(message, cursor, offset+header.length, ofp_instruction_)
 	
-	return namedtuple("ofp_flow_mod",
-		'''header,cookie,cookie_mask,table_id,command,
-		idle_timeout,hard_timeout,priority,
-		buffer_id,out_port,out_group,flags,importance,match,instructions''')(
+	return _ofp_flow_mod(
 		header,cookie,cookie_mask,table_id,command,
 		idle_timeout,hard_timeout,priority,
 		buffer_id,out_port,out_group,flags,importance,match,instructions)
 
 # 7.3.4.3
+_ofp_group_mod = namedtuple("ofp_group_mod", "header,command,type,group_id,buckets")
 def ofp_group_mod(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -455,9 +371,9 @@ def ofp_group_mod(message, offset):
 	while cursor.offset < offset + header.length:
 		buckets.append(ofp_bucket(message, cursor))
 	
-	return namedtuple("ofp_group_mod",
-		"header,command,type,group_id,buckets")(header,command,type,group_id,buckets)
+	return _ofp_group_mod(header,command,type,group_id,buckets)
 
+_ofp_bucket = namedtuple("ofp_bucket", "len weight watch_port watch_group actions")
 def ofp_bucket(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -467,11 +383,11 @@ def ofp_bucket(message, offset):
 	while cursor.offset < offset+len:
 		actions.append(ofp_action_(message, cursor))
 	
-	return namedtuple("ofp_bucket",
-		"len weight watch_port watch_group actions")(
+	return _ofp_bucket(
 		len,weight,watch_port,watch_group,actions)
 
 # 7.3.4.4
+_ofp_port_mod = namedtuple("ofp_port_mod", "header,port_no,hw_addr,config,mask,properties")
 def ofp_port_mod(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -488,23 +404,14 @@ def ofp_port_mod(message, offset):
 		elif h.type == OFPPMPT_EXPERIMENTER:
 			properties.append(ofp_port_mod_prop_experimenter(message, cursor))
 	
-	return namedtuple("ofp_port_mod",
-		"header,port_no,hw_addr,config,mask,properties")(
+	return _ofp_port_mod(
 		header,port_no,hw_addr,config,mask,properties)
 
-def ofp_port_mod_prop_header(message, offset):
-	return namedtuple("ofp_port_mod_prop_header",
-		"type length")(*_unpack("HH", message, offset))
-
-def ofp_port_mod_prop_ethernet(message, offset):
-	return namedtuple("ofp_port_mod_prop_ethernet",
-		"type length advertise")(*_unpack("HHI", message, offset))
-
-def ofp_port_mod_prop_optical(message, offset):
-	return namedtuple("ofp_port_mod_prop_optical",
-		"type length configure freq_lmda fl_offset grid_span tx_pwr")(
-		*_unpack("HHIIiII", message, offset))
+ofp_port_mod_prop_header = _schema.parser("ofp_port_mod_prop_header")
+ofp_port_mod_prop_ethernet = _schema.parser("ofp_port_mod_prop_ethernet")
+ofp_port_mod_prop_optical = _schema.parser("ofp_port_mod_prop_optical")
 
+_ofp_port_mod_prop_experimenter = namedtuple("ofp_port_mod_prop_experimenter", "type,length,experimenter,exp_type,experimenter_data")
 def ofp_port_mod_prop_experimenter(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -513,11 +420,11 @@ def ofp_port_mod_prop_experimenter(message, offset):
 	experimenter_data = message[cursor.offset:offset+length]
 	cursor.offset = offset+_align(length)
 	
-	return namedtuple("ofp_port_mod_prop_experimenter",
-		"type,length,experimenter,exp_type,experimenter_data")(
+	return _ofp_port_mod_prop_experimenter(
 		type,length,experimenter,exp_type,experimenter_data)
 
 # 7.3.4.5
+_ofp_meter_mod = namedtuple("ofp_meter_mod", "header,command,flags,meter_id,bands")
 def ofp_meter_mod(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -530,13 +437,10 @@ def ofp_meter_mod(message, offset):
 	while cursor.offset < offset + header.length:
 		bands.append(ofp_meter_band_(message, cursor))
 	
-	return namedtuple("ofp_meter_mod",
-		"header,command,flags,meter_id,bands")(
+	return _ofp_meter_mod(
 		header,command,flags,meter_id,bands)
 
-def ofp_meter_band_header(message, offset):
-	return namedtuple("ofp_meter_band_header",
-		"type,len,rate,burst_size")(*_unpack("HHII", message, offset))
+ofp_meter_band_header = _schema.parser("ofp_meter_band_header")
 
 def ofp_meter_band_(message, offset):
 	cursor = _cursor(offset)
@@ -551,26 +455,21 @@ def ofp_meter_band_(message, offset):
 	else:
 		raise ValueError(header)
 
-def ofp_meter_band_drop(message, offset):
-	return namedtuple("ofp_meter_band_drop",
-		"type,len,rate,burst_size")(*_unpack("HHII4x", message, offset))
-
-def ofp_meter_band_dscp_remark(message, offset):
-	return namedtuple("ofp_meter_band_dscp_remark",
-		"type,len,rate,burst_size,prec_level")(
-		*_unpack("HHIIB3x", message, offset))
+ofp_meter_band_drop = _schema.parser("ofp_meter_band_drop")
+ofp_meter_band_dscp_remark = _schema.parser("ofp_meter_band_dscp_remark")
 
+_ofp_meter_band_experimenter = namedtuple("ofp_meter_band_experimenter", "type,len,rate,burst_size,experimenter,data")
 def ofp_meter_band_experimenter(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
 	
 	(type,len,rate,burst_size,experimenter) = _unpack("HH3I", message, offset)
 	data = message[cursor.offset:offset+len]
-	return namedtuple("ofp_meter_band_experimenter",
-		"type,len,rate,burst_size,experimenter,data")(
+	return _ofp_meter_band_experimenter(
 		type,len,rate,burst_size,experimenter,data)
 
 # 7.3.5
+_ofp_multipart_request = namedtuple("ofp_multipart_request", "header type flags body")
 def ofp_multipart_request(message, offset=0):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -578,38 +477,14 @@ def ofp_multipart_request(message, offset=0):
 	header = ofp_header(message, cursor)
 	
 	(type, flags) = _unpack("HH4x", message, cursor)
-	if type in (OFPMP_DESC, OFPMP_TABLE, OFPMP_GROUP_DESC, 
-			OFPMP_GROUP_FEATURES, OFPMP_METER_FEATURES, OFPMP_PORT_DESC, OFPMP_TABLE_DESC):
-		body = ""
-	elif type == OFPMP_FLOW:
-		body = ofp_flow_stats_request(message, cursor)
-	elif type == OFPMP_AGGREGATE:
-		body = ofp_aggregate_stats_request(message, cursor)
-	elif type == OFPMP_PORT_STATS:
-		body = ofp_port_stats_request(message, cursor)
-	elif type == OFPMP_QUEUE_STATS:
-		body = ofp_queue_stats_request(message, cursor)
-	elif type == OFPMP_GROUP:
-		body = ofp_group_stats_request(message, cursor)
-	elif type in (OFPMP_METER, OFPMP_METER_CONFIG):
-		body = ofp_meter_multipart_requests(message, cursor)
-	elif type == OFPMP_QUEUE_DESC:
-		body = ofp_queue_desc_request(message, cursor)
-	elif type == OFPMP_FLOW_MONITOR:
-		body = ofp_flow_monitor_request(message, cursor)
-	elif type == OFPMP_TABLE_FEATURES:
-		body = []
-		while cursor.offset < offset + header.length:
-			body.append(ofp_table_features(message, cursor))
-	elif type == OFPMP_EXPERIMENTER:
-		body = message[cursor.offset:offset+header.length]
-		cursor.offset = offset + header.length
-	else:
+	func = multipart_request_parsers.get(type)
+	if func is None:
 		raise ValueError("multiaprt type=%d flags=%s" % (type, flags))
+	body = func(message, cursor, offset + header.length)
 	
-	return namedtuple("ofp_multipart_request",
-		"header type flags body")(header,type,flags,body)
+	return _ofp_multipart_request(header,type,flags,body)
 
+_ofp_multipart_reply = namedtuple("ofp_multipart_reply", "header type flags body")
 def ofp_multipart_reply(message, offset=0):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -617,48 +492,12 @@ def ofp_multipart_reply(message, offset=0):
 	header = ofp_header(message, cursor)
 	
 	(type, flags) = _unpack("HH4x", message, cursor)
-	body = []
-	if type == OFPMP_DESC:
-		body = ofp_desc(message, cursor)
-	elif type == OFPMP_FLOW:
-		body = _list_fetch(message, cursor, offset + header.length, ofp_flow_stats)
-	elif type == OFPMP_AGGREGATE:
-		body = _list_fetch(message, cursor, offset + header.length, ofp_aggregate_stats_reply)
-	elif type == OFPMP_TABLE:
-		body = _list_fetch(message, cursor, offset + header.length, ofp_table_stats)
-	elif type == OFPMP_PORT_STATS:
-		body = _list_fetch(message, cursor, offset + header.length, ofp_port_stats)
-	elif type == OFPMP_QUEUE_STATS:
-		body = _list_fetch(message, cursor, offset + header.length, ofp_queue_stats)
-	elif type == OFPMP_GROUP:
-		body = _list_fetch(message, cursor, offset + header.length, ofp_group_stats)
-	elif type == OFPMP_GROUP_DESC:
-		body = _list_fetch(message, cursor, offset + header.length, ofp_group_desc)
-	elif type == OFPMP_GROUP_FEATURES:
-		body = ofp_group_features(message, cursor)
-	elif type == OFPMP_METER:
-		body = _list_fetch(message, cursor, offset + header.length, ofp_meter_stats)
-	elif type == OFPMP_METER_CONFIG:
-		body = _list_fetch(message, cursor, offset + header.length, ofp_meter_config)
-	elif type == OFPMP_METER_FEATURES:
-		body = ofp_meter_features(message, cursor)
-	elif type == OFPMP_TABLE_FEATURES:
-		body = _list_fetch(message, cursor, offset + header.length, ofp_table_features)
-	elif type == OFPMP_PORT_DESC:
-		body = _list_fetch(message, cursor, offset + header.length, ofp_port)
-	elif type == OFPMP_TABLE_DESC:
-		body = _list_fetch(message, cursor, offset + header.length, ofp_table_desc)
-	elif type == OFPMP_QUEUE_DESC:
-		body = _list_fetch(message, cursor, offset + header.length, ofp_queue_desc)
-	elif type == OFPMP_FLOW_MONITOR:
-		body = _list_fetch(message, cursor, offset + header.length, ofp_flow_update_header)
-	elif type == OFPMP_EXPERIMENTER:
-		body = ofp_experimenter_multipart_(message, cursor, offset+header.length)
-	else:
+	func = multipart_reply_parsers.get(type)
+	if func is None:
 		raise ValueError("multiaprt type=%d flags=%s" % (type, flags))
+	body = func(message, cursor, offset + header.length)
 	
-	return namedtuple("ofp_multipart_reply",
-		"header type flags body")(header,type,flags,body)
+	return _ofp_multipart_reply(header,type,flags,body)
 
 def _list_fetch(message, cursor, limit, fetcher):
 	ret = []
@@ -668,12 +507,30 @@ def _list_fetch(message, cursor, limit, fetcher):
 	assert cursor.offset == limit
 	return ret
 
+def _list_of(fetcher):
+	def fetch(message, cursor, limit):
+		return _list_fetch(message, cursor, limit, fetcher)
+	fetch.fetcher = fetcher # for iterating entries
+	return fetch
+
+def _single(fetcher):
+	def fetch(message, cursor, limit):
+		return fetcher(message, cursor)
+	return fetch
+
+def _empty_body(message, cursor, limit):
+	return ""
+
+def _rest_body(message, cursor, limit):
+	data = message[cursor.offset:limit]
+	cursor.offset = limit
+	return data
+
 # 7.3.5.1
-def ofp_desc(message, offset):
-	return namedtuple("ofp_desc",
-		"mfr_desc,hw_desc,sw_desc,serial_num,dp_desc")(*_unpack("256s256s256s32s256s", message, offset))
+ofp_desc = _schema.parser("ofp_desc")
 
 # 7.3.5.2
+_ofp_flow_stats_request = namedtuple("ofp_flow_stats_request", "table_id,out_port,out_group,cookie,cookie_mask,match")
 def ofp_flow_stats_request(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -682,31 +539,32 @@ def ofp_flow_stats_request(message, offset):
 	
 	match = ofp_match(message, cursor)
 	
-	return namedtuple("ofp_flow_stats_request",
-		"table_id,out_port,out_group,cookie,cookie_mask,match")(
+	return _ofp_flow_stats_request(
 		table_id,out_port,out_group,cookie,cookie_mask,match)
 
+_ofp_flow_stats = namedtuple("ofp_flow_stats", '''
+	length table_id duration_sec duration_nsec
+	priority idle_timeout hard_timeout flags importance cookie
+	packet_count byte_count match instructions''')
 def ofp_flow_stats(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
 	
 	(length,table_id,duration_sec,duration_nsec,priority,
-	idle_timeout,hard_timeout,flags,cookie,
-	packet_count,byte_count) = _unpack("HBxII4H4x3Q", message, cursor)
+	idle_timeout,hard_timeout,flags,importance,cookie,
+	packet_count,byte_count) = _unpack("HBxII5H2x3Q", message, cursor)
 	
 	match = ofp_match(message, cursor)
 	
 	instructions = _list_fetch(message, cursor, offset+length, ofp_instruction_)
 	
-	return namedtuple("ofp_flow_stats", '''
-		length table_id duration_sec duration_nsec
-		priority idle_timeout hard_timeout flags cookie
-		packet_count byte_count match instructions''')(
+	return _ofp_flow_stats(
 		length,table_id,duration_sec,duration_nsec,priority,
-		idle_timeout,hard_timeout,flags,cookie,
+		idle_timeout,hard_timeout,flags,importance,cookie,
 		packet_count,byte_count,match,instructions)
 
 # 7.3.5.3
+_ofp_aggregate_stats_request = namedtuple("ofp_aggregate_stats_request", "table_id,out_port,out_group,cookie,cookie_mask,match")
 def ofp_aggregate_stats_request(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -714,21 +572,16 @@ def ofp_aggregate_stats_request(message, offset):
 	(table_id,out_port,out_group,cookie,cookie_mask) = _unpack("B3xII4xQQ", message, cursor)
 	match = ofp_match(message, cursor)
 	
-	return namedtuple("ofp_aggregate_stats_request",
-		"table_id,out_port,out_group,cookie,cookie_mask,match")(
+	return _ofp_aggregate_stats_request(
 		table_id,out_port,out_group,cookie,cookie_mask,match)
 
-def ofp_aggregate_stats_reply(message, offset):
-	return namedtuple("ofp_aggregate_stats_reply",
-		"packet_count,byte_count,flow_count")(
-		*_unpack("QQI4x", message, offset))
+ofp_aggregate_stats_reply = _schema.parser("ofp_aggregate_stats_reply")
 
 # 7.3.5.4
-def ofp_table_stats(message, offset):
-	return namedtuple("ofp_table_stats", "table_id,out_port,out_group,cookie,cookie_mask")(
-		*_unpack("B3xIQQ", message, offset))
+ofp_table_stats = _schema.parser("ofp_table_stats")
 
 # 7.3.5.5
+_ofp_table_desc = namedtuple("ofp_table_desc", "length,table_id,config,properties")
 def ofp_table_desc(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -746,11 +599,11 @@ def ofp_table_desc(message, offset):
 		else:
 			raise ValueError(h)
 	
-	return namedtuple("ofp_table_desc",
-		"length,table_id,config,properties")(
+	return _ofp_table_desc(
 		length,table_id,config,properties)
 
 # 7.3.5.6.1
+_ofp_table_features = namedtuple("ofp_table_features", "length,table_id,name,metadata_match,metadata_write,capabilities,max_entries,properties")
 def ofp_table_features(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -775,15 +628,13 @@ def ofp_table_features(message, offset):
 		else:
 			raise ValueError(h)
 	
-	return namedtuple("ofp_table_feature_prop_header",
-		"length,table_id,name,metadata_match,metadata_write,capabilities,max_entries,properties")(
+	return _ofp_table_features(
 		length,table_id,name,metadata_match,metadata_write,capabilities,max_entries,properties)
 
 # 7.3.5.6.2
-def ofp_table_feature_prop_header(message, offset):
-	return namedtuple("ofp_table_feature_prop_header",
-		"type,length")(*_unpack("HH", message, offset))
+ofp_table_feature_prop_header = _schema.parser("ofp_table_feature_prop_header")
 
+_ofp_table_feature_prop_instructions = namedtuple("ofp_table_feature_prop_instructions", "type,length,instruction_ids")
 def ofp_table_feature_prop_instructions(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -792,19 +643,19 @@ def ofp_table_feature_prop_instructions(message, offset):
 	instruction_ids = _list_fetch(message, cursor, offset+length, ofp_instruction_id)
 	cursor.offset = offset + _align(length)
 	
-	return namedtuple("ofp_table_feature_prop_instructions",
-		"type,length,instruction_ids")(
+	return _ofp_table_feature_prop_instructions(
 		type,length,instruction_ids)
 
+_ofp_instruction_id = namedtuple("ofp_instruction_id", "type,len,exp_data")
 def ofp_instruction_id(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
 	
 	(type,len) = _unpack("HH", message, cursor)
 	exp_data = message[cursor.offset:offset+len]
-	return namedtuple("ofp_instruction_id",
-		"type,len,exp_data")(type,len,exp_data)
+	return _ofp_instruction_id(type,len,exp_data)
 
+_ofp_table_feature_prop_tables = namedtuple("ofp_table_feature_prop_tables", "type,length,table_ids")
 def ofp_table_feature_prop_tables(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -813,9 +664,9 @@ def ofp_table_feature_prop_tables(message, offset):
 	table_ids = _unpack("%dB" % (length-4), message, offset)
 	cursor.offset += _align(length)-length
 	
-	return namedtuple("ofp_table_feature_prop_tables",
-		"type,length,table_ids")(type,length,table_ids)
+	return _ofp_table_feature_prop_tables(type,length,table_ids)
 
+_ofp_table_feature_prop_actions = namedtuple("ofp_table_feature_prop_actions", "type,length,action_ids")
 def ofp_table_feature_prop_actions(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -824,18 +675,18 @@ def ofp_table_feature_prop_actions(message, offset):
 	action_ids = _list_fetch(message, cursor. offset+length, ofp_action_id)
 	cursor.offset = offset + align(length)
 	
-	return namedtuple("ofp_table_feature_prop_actions",
-		"type,length,action_ids")(type,length,action_ids)
+	return _ofp_table_feature_prop_actions(type,length,action_ids)
 
+_ofp_action_id = namedtuple("ofp_action_id", "type,len,exp_data")
 def ofp_action_id(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
 	
 	(type,len) = _unpack("HH", message, cursor)
 	exp_data = message[cursor.offset:offset+len]
-	return namedtuple("ofp_action_id",
-		"type,len,exp_data")(type,len,exp_data)
+	return _ofp_action_id(type,len,exp_data)
 
+_ofp_table_feature_prop_oxm = namedtuple("ofp_table_feature_prop_oxm", "type,length,oxm_ids")
 def ofp_table_feature_prop_oxm(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -844,9 +695,9 @@ def ofp_table_feature_prop_oxm(message, offset):
 	oxm_ids = _unpack("%dI" % ((length-4)/4), message, cursor)
 	cursor.offset += _align(length)-length
 	
-	return namedtuple("ofp_table_feature_prop_oxm",
-		"type,length,oxm_ids")(type,length,oxm_ids)
+	return _ofp_table_feature_prop_oxm(type,length,oxm_ids)
 
+_ofp_table_feature_prop_experimenter = namedtuple("ofp_table_feature_prop_experimenter", "type,length,experimenter,exp_type,data")
 def ofp_table_feature_prop_experimenter(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -855,20 +706,26 @@ def ofp_table_feature_prop_experimenter(message, offset):
 	data = message[cursor.offset:offset+length]
 	cursor.offset += _align(length)-length
 	
-	return namedtuple("ofp_table_feature_prop_experimenter",
-		"type,length,experimenter,exp_type,data")(
+	return _ofp_table_feature_prop_experimenter(
 		type,length,experimenter,exp_type,data)
 
 # 7.3.5.7
-def ofp_port_stats_request(message, offset):
-	return namedtuple("ofp_port_stats_request",
-		"port_no")(*_unpack("I4x", message, offset))
-
+ofp_port_stats_request = _schema.parser("ofp_port_stats_request")
+
+_ofp_port_stats = namedtuple("ofp_port_stats", '''
+	length
+	port_no
+	duration_sec duration_nsec
+	rx_packets tx_packets
+	rx_bytes tx_bytes
+	rx_dropped tx_dropped
+	rx_errors tx_errors
+	properties''')
 def ofp_port_stats(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
 	
-	fixed = _unpack("H2xIII12Q2I", message, cursor)
+	fixed = _unpack("H2xIII8Q", message, cursor)
 	properties = []
 	while cursor.offset < offset+fixed[0]:
 		h = ofp_port_stats_prop_header(message, cursor.offset)
@@ -881,33 +738,13 @@ def ofp_port_stats(message, offset):
 		else:
 			raise ValueError(h)
 	
-	return namedtuple("ofp_port_stats", '''
-		length
-		port_no
-		duration_sec duration_nsec
-		rx_packets tx_packets
-		rx_bytes tx_bytes
-		rx_dropped tx_dropped
-		rx_errors tx_errors
-		properties''')(*fixed+(properties,))
-
-def ofp_port_stats_prop_header(message, offset):
-	return namedtuple("ofp_port_stats_prop_header",
-		"type length")(*_unpack("HH",message,offset))
-
-def ofp_port_stats_prop_ethernet(message, offset):
-	return namedtuple("ofp_port_stats_prop_ethernet",
-		"type length rx_frame_err rx_over_err rx_crc_err collisions")(
-		*_unpack("HH4x4Q", message, offset))
-
-def ofp_port_stats_prop_optical(message, offset):
-	return namedtuple("ofp_port_stats_prop_optical",
-		'''type length flags
-		tx_freq_lmda tx_offset tx_grid_span
-		rx_freq_lmda rx_offset rx_grid_span
-		tx_pwr rx_pwr
-		bias_current temperature''')(*_unpack("HH4x7I4H", message, offset))
+	return _ofp_port_stats(*fixed+(properties,))
 
+ofp_port_stats_prop_header = _schema.parser("ofp_port_stats_prop_header")
+ofp_port_stats_prop_ethernet = _schema.parser("ofp_port_stats_prop_ethernet")
+ofp_port_stats_prop_optical = _schema.parser("ofp_port_stats_prop_optical")
+
+_ofp_port_stats_prop_experimenter = namedtuple("ofp_port_stats_prop_experimenter", "type,length,experimenter,exp_type,experimenter_data")
 def ofp_port_stats_prop_experimenter(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -915,18 +752,18 @@ def ofp_port_stats_prop_experimenter(message, offset):
 	(type,length,experimenter,exp_type) = _unpack("HHII", message, cursor)
 	experimenter_data = message[cursor.offset:offset+length]
 	cursor.offset = offset + _align(length)
-	return namedtuple("ofp_port_stats_experimenter",
-		"type,length,experimenter,exp_type,experimenter_data")(
+	return _ofp_port_stats_prop_experimenter(
 		type,length,experimenter,exp_type,experimenter_data)
 
 # 7.3.5.8
 ## skip ofp_port
 
 # 7.3.5.9
-def ofp_queue_stats_request(message, offset):
-	return namedtuple("ofp_queue_stats_request",
-		"port_no queue_id")(*_unpack("II", message, offset))
+ofp_queue_stats_request = _schema.parser("ofp_queue_stats_request")
 
+_ofp_queue_stats = namedtuple("ofp_queue_stats", '''length port_no queue_id
+	tx_bytes tx_packets tx_errors
+	duration_sec duration_nsec properties''')
 def ofp_queue_stats(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -940,16 +777,12 @@ def ofp_queue_stats(message, offset):
 		else:
 			raise ValueError(h)
 	
-	return namedtuple("ofp_queue_stats",
-		'''length port_no queue_id
-		tx_bytes tx_packets tx_errors
-		duration_sec duration_nsec''')(
+	return _ofp_queue_stats(
 		*fixed+(properties,))
 
-def ofp_queue_stats_prop_header(message, offset):
-	return namedtuple("ofp_queue_stats_prop_header",
-		"type length")(*_unpack("HH", message, offset))
+ofp_queue_stats_prop_header = _schema.parser("ofp_queue_stats_prop_header")
 
+_ofp_queue_stats_prop_experimenter = namedtuple("ofp_queue_stats_prop_experimenter", "type,length,experimenter,exp_type,experimenter_data")
 def ofp_queue_stats_prop_experimenter(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -957,15 +790,13 @@ def ofp_queue_stats_prop_experimenter(message, offset):
 	(type,length,experimenter,exp_type) = _unpack("HHII", message, cursor)
 	experimenter_data = message[cursor.offset:offset+length]
 	cursor.offset = offset + _align(length)
-	return namedtuple("ofp_queue_stats_prop_experimenter",
-		"type,length,experimenter,exp_type,experimenter_data")(
+	return _ofp_queue_stats_prop_experimenter(
 		type,length,experimenter,exp_type,experimenter_data)
 
 # 7.3.5.10
-def ofp_queue_desc_request(message, offset):
-	return namedtuple("ofp_queue_desc_request",
-		"port_no queue_id")(*_unpack("II", message, offset))
+ofp_queue_desc_request = _schema.parser("ofp_queue_desc_request")
 
+_ofp_queue_desc = namedtuple("ofp_queue_desc", "port_no queue_id len properties")
 def ofp_queue_desc(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -983,22 +814,14 @@ def ofp_queue_desc(message, offset):
 		else:
 			raise ValueError(h)
 	
-	return namedtuple("ofp_queue_desc",
-		"port_no queue_id len properties")(
+	return _ofp_queue_desc(
 		port_no,queue_id,len,properties)
 
-def ofp_queue_desc_prop_header(message, offset):
-	return namedtuple("ofp_queue_desc_prop_header",
-		"type length")(*_unpack("HH", message, offset))
-
-def ofp_queue_desc_prop_min_rate(message, offset):
-	return namedtuple("ofp_queue_desc_prop_min_rate",
-		"type length rate")(*_unpack("HHH2x", message, offset))
-
-def ofp_queue_desc_prop_max_rate(message, offset):
-	return namedtuple("ofp_queue_desc_prop_max_rate",
-		"type length rate")(*_unpack("HHH2x", message, offset))
+ofp_queue_desc_prop_header = _schema.parser("ofp_queue_desc_prop_header")
+ofp_queue_desc_prop_min_rate = _schema.parser("ofp_queue_desc_prop_min_rate")
+ofp_queue_desc_prop_max_rate = _schema.parser("ofp_queue_desc_prop_max_rate")
 
+_ofp_queue_desc_prop_experimenter = namedtuple("ofp_queue_desc_prop_experimenter", "type,length,experimenter,exp_type,experimenter_data")
 def ofp_queue_desc_prop_experimenter(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -1006,15 +829,15 @@ def ofp_queue_desc_prop_experimenter(message, offset):
 	(type,length,experimenter,exp_type) = _unpack("HHII", message, cursor)
 	experimenter_data = message[cursor.offset:offset+length]
 	cursor.offset = offset + _align(length)
-	return namedtuple("ofp_queue_desc_prop_experimenter",
-		"type,length,experimenter,exp_type,experimenter_data")(
+	return _ofp_queue_desc_prop_experimenter(
 		type,length,experimenter,exp_type,experimenter_data)
 
 # 7.3.5.11
-def ofp_group_stats_request(message, offset):
-	return namedtuple("ofp_group_stats_request",
-		"group_id")(*_unpack("I4x", message, offset))
+ofp_group_stats_request = _schema.parser("ofp_group_stats_request")
 
+_ofp_group_stats = namedtuple("ofp_group_stats", '''
+	length group_id ref_count packet_count byte_count
+	duration_sec duration_nsec bucket_stats''')
 def ofp_group_stats(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -1022,42 +845,39 @@ def ofp_group_stats(message, offset):
 	(length, group_id, ref_count, packet_count, byte_count,
 		duration_sec, duration_nsec) = _unpack("H2xII4xQQII", message, cursor)
 	bucket_stats = _list_fetch(message, cursor, offset+length, ofp_bucket_counter)
-	return namedtuple("ofp_group_stats", '''
-		length group_id ref_count packet_count byte_count
-		duration_sec duration_nsec bucket_stats''')(
+	return _ofp_group_stats(
 		length,group_id,ref_count,packet_count,byte_count,
 		duration_sec,duration_nsec,bucket_stats)
 
-def ofp_bucket_counter(message, offset):
-	return namedtuple("ofp_bucket_counter",
-		"packet_count byte_count")(*_unpack("QQ", message, offset))
+ofp_bucket_counter = _schema.parser("ofp_bucket_counter")
 
 # 7.3.5.12
+_ofp_group_desc = namedtuple("ofp_group_desc", "length type group_id buckets")
 def ofp_group_desc(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
 	
 	(length, type, group_id) = _unpack("HBxI", message, cursor)
 	buckets = _list_fetch(message, cursor, offset+length, ofp_bucket)
-	return namedtuple("ofp_group_desc",
-		"length type group_id buckets")(
+	return _ofp_group_desc(
 		length,type,group_id,buckets)
 
 # 7.3.5.13
+_ofp_group_features = namedtuple("ofp_group_features", "type,capabilities,max_groups,actions")
 def ofp_group_features(message, offset):
 	cursor = _cursor(offset)
 	(type,capabilities) = _unpack("II", message, cursor)
 	max_groups = _unpack("4I", message, cursor)
 	actions = _unpack("4I", message, cursor)
-	return namedtuple("ofp_group_features",
-		"type,capabilities,max_groups,actions")(
+	return _ofp_group_features(
 		type,capabilities,max_groups,actions)
 
 # 7.3.5.14
-def ofp_meter_multipart_request(message, offset):
-	return namedtuple("ofp_meter_multipart_request",
-		"meter_id")(*_unpack("I4x", message, offset))
+ofp_meter_multipart_request = _schema.parser("ofp_meter_multipart_request")
 
+_ofp_meter_stats = namedtuple("ofp_meter_stats", '''
+	meter_id len flow_count packet_in_count byte_in_count 
+	duration_sec duration_nsec band_stats''')
 def ofp_meter_stats(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -1067,18 +887,15 @@ def ofp_meter_stats(message, offset):
 	
 	band_stats = _list_fetch(message, cursor, offset+len, ofp_meter_band_stats)
 	
-	return namedtuple("ofp_meter_stats", '''
-		meter_id len flow_count packet_in_count byte_in_count 
-		duration_sec duration_nsec band_stats''')(
+	return _ofp_meter_stats(
 		meter_id,len,flow_count,packet_in_count,byte_in_count,
 		duration_sec,duration_nsec,band_stats)
 
-def ofp_meter_band_stats(message, offset):
-	return namedtuple("ofp_meter_band_stats",
-		"packet_band_count,byte_band_count")(*_unpack("QQ", message, offset))
+ofp_meter_band_stats = _schema.parser("ofp_meter_band_stats")
 
 # 7.3.5.15
 ## skip ofp_meter_multipart_request
+_ofp_meter_config = namedtuple("ofp_meter_config", "length,flags,meter_id,bands")
 def ofp_meter_config(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -1086,17 +903,14 @@ def ofp_meter_config(message, offset):
 	(length,flags,meter_id) = _unpack("HHI", message, cursor)
 	bands = _list_fetch(message, cursor, offset+length, ofp_meter_band_)
 	
-	return namedtuple("ofp_meter_config",
-		"length,flags,meter_id,bands")(
+	return _ofp_meter_config(
 		length,flags,meter_id,bands)
 
 # 7.3.5.16
-def ofp_meter_features(message, offset):
-	return namedtuple("ofp_meter_features", '''
-		max_meter band_types capabilities
-		max_bands max_color''')(*_unpack("3IBB2x", message, offset))
+ofp_meter_features = _schema.parser("ofp_meter_features")
 
 # 7.3.5.17.1
+_ofp_flow_monitor_request = namedtuple("ofp_flow_monitor_request", "monitor_id,out_port,out_group,flags,table_id,command,match")
 def ofp_flow_monitor_request(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -1104,15 +918,15 @@ def ofp_flow_monitor_request(message, offset):
 	(monitor_id,out_port,out_group,flags,table_id,command) = _unpack("IIIHBB", message, cursor)
 	match = ofp_match(message, cursor)
 	
-	return namedtuple("ofp_flow_monitor_request",
-		"monitor_id,out_port,out_group,flags,table_id,command,match")(
+	return _ofp_flow_monitor_request(
 		monitor_id,out_port,out_group,flags,table_id,command,match)
 
 # 7.3.5.17.2
-def ofp_flow_update_header(message, offset):
-	return namedtuple("ofp_flow_update_header",
-		"length event")(*_unpack("HH", message, offset))
+ofp_flow_update_header = _schema.parser("ofp_flow_update_header")
 
+_ofp_flow_update_full = namedtuple("ofp_flow_update_full", '''length,event,table_id,reason,
+	idle_timeout,hard_timeout,
+	priority,cookie,match,instructions''')
 def ofp_flow_update_full(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -1128,18 +942,14 @@ def ofp_flow_update_full(message, offset):
 	while cursor.offset < offset + length:
 		instructions.append(ofp_instruction_(message,cursor))
 	
-	return namedtuple("ofp_flow_monitor_request",
-		'''length,event,table_id,reason,
-		idle_timeout,hard_timeout,
-		priority,cookie,match,instructions''')(
+	return _ofp_flow_update_full(
 		length,event,table_id,reason,
 		idle_timeout,hard_timeout,
 		priority,cookie,match,instructions)
 
-def ofp_flow_update_abbrev(message, offset):
-	return namedtuple("ofp_flow_update_abbrev",
-		"length,event,xid")(*_unpack("HHI", message, offset))
+ofp_flow_update_abbrev = _schema.parser("ofp_flow_update_abbrev")
 
+_ofp_flow_update_paused = namedtuple("ofp_flow_update_paused", "length,event")
 def ofp_flow_update_paused(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -1147,26 +957,29 @@ def ofp_flow_update_paused(message, offset):
 	(length,event,zero) = _unpack("HHI", message, cursor)
 	assert zero==0
 	
-	return namedtuple("ofp_flow_update_paused",
-		"length,event")(length,event)
+	return _ofp_flow_update_paused(length,event)
 
 # 7.3.5.18
-def ofp_experimenter_multipart_header(message, offset):
-	return namedtuple("ofp_experimenter_multipart_header",
-		"experimenter,exp_type")(*_unpack("II", message, offset))
+ofp_experimenter_multipart_header = _schema.parser("ofp_experimenter_multipart_header")
 
+_ofp_experimenter_multipart_ = namedtuple("ofp_experimenter_multipart_", "experimenter,exp_type,data")
 def ofp_experimenter_multipart_(message, offset, limit):
 	cursor = _cursor(offset)
 	offset = cursor.offset
 	
 	(experimenter,exp_type) = ofp_experimenter_multipart_header(message, cursor)
+	func = _experimenter_parser(experimenter_multipart_parsers, experimenter, exp_type)
+	if func:
+		cursor.offset = offset
+		return func(message, cursor, limit)
+	
 	data = message[cursor.offset:limit]
 	cursor.offset = limit
 	
-	return namedtuple("ofp_experimenter_multipart_",
-		"experimenter,exp_type,data")(experimenter,exp_type,data)
+	return _ofp_experimenter_multipart_(experimenter,exp_type,data)
 
 # 7.3.6
+_ofp_packet_out = namedtuple("ofp_packet_out", "header,buffer_id,in_port,actions_len,actions,data")
 def ofp_packet_out(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -1183,11 +996,11 @@ def ofp_packet_out(message, offset):
 	data = message[cursor.offset:offset+header.length]
 	cursor.offset = offset+header.length
 	
-	return namedtuple("ofp_packet_out",
-		"header,buffer_id,in_port,actions_len,actions,data")(
+	return _ofp_packet_out(
 		header,buffer_id,in_port,actions_len,actions,data)
 
 # 7.3.8
+_ofp_role_request = namedtuple("ofp_role_request", "header,role,generation_id")
 def ofp_role_request(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -1195,10 +1008,10 @@ def ofp_role_request(message, offset):
 	header = ofp_header(message, cursor)
 	(role,generation_id) = _unpack("I4xQ", message, cursor)
 	
-	return namedtuple("ofp_role_request",
-		"header,role,generation_id")(header,role,generation_id)
+	return _ofp_role_request(header,role,generation_id)
 
 # 7.3.9.1
+_ofp_bundle_ctrl_msg = namedtuple("ofp_bundle_ctrl_msg", "header,bundle_id,type,flags,properties")
 def ofp_bundle_ctrl_msg(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -1214,11 +1027,11 @@ def ofp_bundle_ctrl_msg(message, offset):
 		else:
 			raise ValueError(h)
 	
-	return namedtuple("ofp_bundle_ctrl_msg",
-		"header,bundle_id,type,flags,properties")(
+	return _ofp_bundle_ctrl_msg(
 		header,bundle_id,type,flags,properties)
 
 # 7.3.9.2
+_ofp_bundle_add_msg = namedtuple("ofp_bundle_add_msg", "header,bundle_id,flags,message,properties")
 def ofp_bundle_add_msg(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -1236,14 +1049,12 @@ def ofp_bundle_add_msg(message, offset):
 		else:
 			raise ValueError(h)
 	
-	return namedtuple("ofp_bundle_add_msg",
-		"header,bundle_id,flags,message,properties")(
+	return _ofp_bundle_add_msg(
 		header,bundle_id,flags,message,properties)
 
-def ofp_bundle_prop_header(message, offset):
-	return namedtuple("ofp_bundle_prop_header",
-		"type length")(*_unpack("HH", message, offset))
+ofp_bundle_prop_header = _schema.parser("ofp_bundle_prop_header")
 
+_ofp_bundle_prop_experimenter = namedtuple("ofp_bundle_prop_experimenter", "type,length,experimenter,exp_type,data")
 def ofp_bundle_prop_experimenter(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -1253,11 +1064,11 @@ def ofp_bundle_prop_experimenter(message, offset):
 	data = message[cursor.offset:offset+length]
 	cursor.offset = offset+length
 	
-	return namedtuple("ofp_bundle_prop_experimenter",
-		"type,length,experimenter,exp_type,data")(
+	return _ofp_bundle_prop_experimenter(
 		type,length,experimenter,exp_type,data)
 
 # 7.3.10
+_ofp_async_config = namedtuple("ofp_async_config", "header,properties")
 def ofp_async_config(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -1277,14 +1088,12 @@ def ofp_async_config(message, offset):
 		else:
 			raise ValueError(h)
 	
-	return namedtuple("ofp_async_config",
-		"header,properties")(
+	return _ofp_async_config(
 		header,properties)
 
-def ofp_async_config_prop_header(message, offset):
-	return namedtuple("ofp_async_config_prop_header",
-		"type length")(*_unpack("HH", message, offset))
+ofp_async_config_prop_header = _schema.parser("ofp_async_config_prop_header")
 
+_ofp_async_config_prop_experimenter = namedtuple("ofp_async_config_prop_experimenter", "type length experimenter exp_type data")
 def ofp_async_config_prop_experimenter(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -1293,15 +1102,13 @@ def ofp_async_config_prop_experimenter(message, offset):
 	data = message[cursor.offset:offset+header.length]
 	cursor.offset = offset+header.length
 	
-	return namedtuple("ofp_async_config_prop_experimenter",
-		"type length experimenter exp_type data")(
+	return _ofp_async_config_prop_experimenter(
 		type,length,experimenter,exp_type,data)
 
-def ofp_async_config_prop_reasons(message, offset):
-	return namedtuple("ofp_async_config_prop_reasons",
-		"type length mask")(*_unpack("HHI", message, offset))
+ofp_async_config_prop_reasons = _schema.parser("ofp_async_config_prop_reasons")
 
 # 7.4.1
+_ofp_packet_in = namedtuple("ofp_packet_in", "header,buffer_id,total_len,reason,table_id,cookie,match,data")
 def ofp_packet_in(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -1315,11 +1122,14 @@ def ofp_packet_in(message, offset):
 	data = message[cursor.offset:offset+header.length]
 	cursor.offset = offset+header.length
 	
-	return namedtuple("ofp_packet_in",
-		"header,buffer_id,total_len,reason,table_id,cookie,match,data")(
+	return _ofp_packet_in(
 		header,buffer_id,total_len,reason,table_id,cookie,match,data)
 
 # 7.4.2
+_ofp_flow_removed = namedtuple("ofp_flow_removed", '''header cookie priority reason table_id 
+	duration_sec duration_nsec 
+	idle_timeout hard_timeout packet_count byte_count
+	match''')
 def ofp_flow_removed(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -1332,17 +1142,14 @@ def ofp_flow_removed(message, offset):
 	
 	match = ofp_match(message, cursor)
 	
-	return namedtuple("ofp_flow_removed",
-		'''header cookie priority reason table_id 
-		duration_sec duration_nsec 
-		idle_timeout hard_timeout packet_count byte_count
-		match''')(
+	return _ofp_flow_removed(
 		header,cookie,priority,reason,table_id,
 		duration_sec,duration_nsec,
 		idle_timeout,hard_timeout,packet_count,byte_count,
 		match)
 
 # 7.4.3
+_ofp_port_status = namedtuple("ofp_port_status", "header,reason,desc")
 def ofp_port_status(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -1352,11 +1159,11 @@ def ofp_port_status(message, offset):
 	(reason,) = _unpack("B7x", message, cursor)
 	
 	desc = ofp_port(message, cursor)
-	return namedtuple("ofp_port_status",
-		"header,reason,desc")(
+	return _ofp_port_status(
 		header,reason,desc)
 
 # 7.4.4
+_ofp_role_status = namedtuple("ofp_role_status", "header,role,reason,generation_id,properties")
 def ofp_role_status(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -1371,25 +1178,23 @@ def ofp_role_status(message, offset):
 		else:
 			raise ValueError(h)
 	
-	return namedtuple("ofp_role_status",
-		"header,role,reason,generation_id,properties")(
+	return _ofp_role_status(
 		header,role,reason,generation_id,properties)
 
-def ofp_role_prop_header(message, offset):
-	return namedtuple("ofp_role_prop_header",
-		"type length")(*_unpack("HH", message, offset))
+ofp_role_prop_header = _schema.parser("ofp_role_prop_header")
 
+_ofp_role_prop_experimenter = namedtuple("ofp_role_prop_experimenter", "type,length,experimenter,exp_type,experimenter_data")
 def ofp_role_prop_experimenter(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
 	
 	(type,length,experimenter,exp_type) = _unpack("HHII", message, offset)
 	experimenter_data = message[cursor.offset:offset+length]
-	return namedtuple("ofp_role_prop_experimenter",
-		"type,length,experimenter,exp_type,experimenter_data")(
+	return _ofp_role_prop_experimenter(
 		type,length,experimenter,exp_type,experimenter_data)
 
 # 7.4.5
+_ofp_table_status = namedtuple("ofp_table_status", "header,reason,table")
 def ofp_table_status(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -1397,10 +1202,10 @@ def ofp_table_status(message, offset):
 	header = ofp_header(message, cursor)
 	(reason,) = _unpack("B7x", message, cursor)
 	table = ofp_table_desc(message, cursor)
-	return namedtuple("ofp_table_status",
-		"header,reason,table")(header,reason,table)
+	return _ofp_table_status(header,reason,table)
 
 # 7.4.6
+_ofp_requestforward_header = namedtuple("ofp_requestforward_header", "header request")
 def ofp_requestforward_header(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -1408,9 +1213,9 @@ def ofp_requestforward_header(message, offset):
 	header = ofp_header(message, cursor)
 	request = ofp_header(message, cursor)
 	
-	return namedtuple("ofp_requestforward_header",
-		"header request")(header, request)
+	return _ofp_requestforward_header(header, request)
 
+_ofp_requestforward_ = namedtuple("ofp_requestforward_", "header request")
 def ofp_requestforward_(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -1418,10 +1223,10 @@ def ofp_requestforward_(message, offset):
 	header = ofp_header(message, cursor)
 	request = parse(message, cursor)
 	
-	return namedtuple("ofp_requestforward_",
-		"header request")(header, request)
+	return _ofp_requestforward_(header, request)
 
 # 7.5.1
+_ofp_hello = namedtuple("ofp_hello", "header elements")
 def ofp_hello(message, offset=0):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -1438,12 +1243,11 @@ def ofp_hello(message, offset=0):
 			raise ValueError("message offset=%d %s" % (cursor.offset, elem_header))
 	
 	assert cursor.offset == offset + header.length, (cursor.offset, offset, header.length)
-	return namedtuple("ofp_hello", "header elements")(header, elements)
+	return _ofp_hello(header, elements)
 
-def ofp_hello_elem_header(message, offset):
-	return namedtuple("ofp_hello_elem_header",
-		"type length")(*_unpack("HH", message, offset))
+ofp_hello_elem_header = _schema.parser("ofp_hello_elem_header")
 
+_ofp_hello_elem_versionbitmap = namedtuple("ofp_hello_elem_versionbitmap", "type length bitmaps")
 def ofp_hello_elem_versionbitmap(message, offset):
 	cursor = _cursor(offset)
 	(type, length) = _unpack("HH", message, cursor)
@@ -1452,10 +1256,10 @@ def ofp_hello_elem_versionbitmap(message, offset):
 	bitmaps = _unpack("%dI" % ((length-4)/4), message, cursor)
 	cursor.offset += _align(length) - length
 	
-	return namedtuple("ofp_hello_elem_versionbitmap",
-		"type length bitmaps")(type,length,bitmaps)
+	return _ofp_hello_elem_versionbitmap(type,length,bitmaps)
 
 # 7.5.4
+_ofp_error_msg = namedtuple("ofp_error_msg", "header,type,code,data")
 def ofp_error_msg(message, offset=0):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -1467,9 +1271,9 @@ def ofp_error_msg(message, offset=0):
 	data = message[cursor.offset:offset+header.length]
 	cursor.offset = offset + header.length
 	
-	return namedtuple("ofp_error_msg",
-		"header,type,code,data")(header,type,code,data)
+	return _ofp_error_msg(header,type,code,data)
 
+_ofp_error_experimenter_msg = namedtuple("ofp_error_experimenter_msg", "header,type,exp_code,experimenter,data")
 def ofp_error_experimenter_msg(message, offset=0):
 	cursor = _cursor(offset)
 	offset = cursor.offset
@@ -1481,21 +1285,107 @@ def ofp_error_experimenter_msg(message, offset=0):
 	data = message[cursor.offset:offset+header.length]
 	cursor.offset = offset + header.length
 	
-	return namedtuple("ofp_error_experimenter_msg",
-		"header,type,exp_code,experimenter,data")(
+	return _ofp_error_experimenter_msg(
 		header,type,exp_code,experimenter,data)
 
 # 7.5.5
+_ofp_experimenter_msg = namedtuple("ofp_experimenter_msg", "header,experimenter,exp_type,data")
 def ofp_experimenter_msg(message, offset):
 	cursor = _cursor(offset)
 	offset = cursor.offset
 	
 	header = ofp_header(message, cursor)
 	(experimenter,exp_type) = _unpack("II", message, cursor)
+	func = _experimenter_parser(experimenter_parsers, experimenter, exp_type)
+	if func:
+		cursor.offset = offset
+		return func(message, cursor)
 	
 	data = message[cursor.offset:offset+header.length]
 	cursor.offset = offset+header.length
 	
-	return namedtuple("ofp_experimenter_msg",
-		"header,experimenter,exp_type,data")(header,experimenter,exp_type,data)
-
+	return _ofp_experimenter_msg(header,experimenter,exp_type,data)
+
+def _experimenter_parser(table, experimenter, exp_type):
+	func = table.get((experimenter, exp_type))
+	if func is None:
+		func = table.get(experimenter)
+	return func
+
+# Dispatch tables. Entries may be added or replaced by users.
+# message_parsers: ofp_type -> func(message, cursor)
+# multipart_*_parsers: multipart type -> func(message, cursor, limit) for body
+message_parsers = {
+	OFPT_HELLO: ofp_hello,
+	OFPT_ERROR: ofp_error_msg,
+	OFPT_FEATURES_REPLY: ofp_switch_features,
+	OFPT_SET_CONFIG: ofp_switch_config,
+	OFPT_GET_CONFIG_REPLY: ofp_switch_config,
+	OFPT_PACKET_IN: ofp_packet_in,
+	OFPT_FLOW_REMOVED: ofp_flow_removed,
+	OFPT_PORT_STATUS: ofp_port_status,
+	OFPT_PACKET_OUT: ofp_packet_out,
+	OFPT_FLOW_MOD: ofp_flow_mod,
+	OFPT_GROUP_MOD: ofp_group_mod,
+	OFPT_PORT_MOD: ofp_port_mod,
+	OFPT_TABLE_MOD: ofp_table_mod,
+	OFPT_MULTIPART_REQUEST: ofp_multipart_request,
+	OFPT_MULTIPART_REPLY: ofp_multipart_reply,
+	OFPT_EXPERIMENTER: ofp_experimenter_msg,
+	OFPT_SET_ASYNC: ofp_async_config,
+	OFPT_GET_ASYNC_REPLY: ofp_async_config,
+	OFPT_METER_MOD: ofp_meter_mod,
+	OFPT_ROLE_STATUS: ofp_role_status,
+	OFPT_TABLE_STATUS: ofp_table_status,
+	OFPT_REQUESTFORWARD: ofp_requestforward_,
+	OFPT_BUNDLE_CONTROL: ofp_bundle_ctrl_msg,
+	OFPT_BUNDLE_ADD_MESSAGE: ofp_bundle_add_msg,
+}
+
+multipart_request_parsers = {
+	OFPMP_DESC: _empty_body,
+	OFPMP_TABLE: _empty_body,
+	OFPMP_GROUP_DESC: _empty_body,
+	OFPMP_GROUP_FEATURES: _empty_body,
+	OFPMP_METER_FEATURES: _empty_body,
+	OFPMP_PORT_DESC: _empty_body,
+	OFPMP_TABLE_DESC: _empty_body,
+	OFPMP_FLOW: _single(ofp_flow_stats_request),
+	OFPMP_AGGREGATE: _single(ofp_aggregate_stats_request),
+	OFPMP_PORT_STATS: _single(ofp_port_stats_request),
+	OFPMP_QUEUE_STATS: _single(ofp_queue_stats_request),
+	OFPMP_GROUP: _single(ofp_group_stats_request),
+	OFPMP_METER: _single(ofp_meter_multipart_request),
+	OFPMP_METER_CONFIG: _single(ofp_meter_multipart_request),
+	OFPMP_QUEUE_DESC: _single(ofp_queue_desc_request),
+	OFPMP_FLOW_MONITOR: _single(ofp_flow_monitor_request),
+	OFPMP_TABLE_FEATURES: _list_of(ofp_table_features),
+	OFPMP_EXPERIMENTER: _rest_body,
+}
+
+multipart_reply_parsers = {
+	OFPMP_DESC: _single(ofp_desc),
+	OFPMP_FLOW: _list_of(ofp_flow_stats),
+	OFPMP_AGGREGATE: _list_of(ofp_aggregate_stats_reply),
+	OFPMP_TABLE: _list_of(ofp_table_stats),
+	OFPMP_PORT_STATS: _list_of(ofp_port_stats),
+	OFPMP_QUEUE_STATS: _list_of(ofp_queue_stats),
+	OFPMP_GROUP: _list_of(ofp_group_stats),
+	OFPMP_GROUP_DESC: _list_of(ofp_group_desc),
+	OFPMP_GROUP_FEATURES: _single(ofp_group_features),
+	OFPMP_METER: _list_of(ofp_meter_stats),
+	OFPMP_METER_CONFIG: _list_of(ofp_meter_config),
+	OFPMP_METER_FEATURES: _single(ofp_meter_features),
+	OFPMP_TABLE_FEATURES: _list_of(ofp_table_features),
+	OFPMP_PORT_DESC: _list_of(ofp_port),
+	OFPMP_TABLE_DESC: _list_of(ofp_table_desc),
+	OFPMP_QUEUE_DESC: _list_of(ofp_queue_desc),
+	OFPMP_FLOW_MONITOR: _list_of(ofp_flow_update_header),
+	OFPMP_EXPERIMENTER: ofp_experimenter_multipart_,
+}
+
+# Experimenter decoders keyed by (experimenter, exp_type) or experimenter.
+# experimenter_parsers: func(message, cursor) for OFPT_EXPERIMENTER message
+# experimenter_multipart_parsers: func(message, cursor, limit) for multipart reply body
+experimenter_parsers = {}
+experimenter_multipart_parsers = {}
@@ -0,0 +1,123 @@
+'''
+Fixed layout structures of OpenFlow 1.4
+
+parse.py and build.py take the functions of these structures from this
+schema, see twink.schema for the notation.
+'''
+from __future__ import absolute_import
+from . import *
+from ..schema import Schema
+
+schema = Schema('''
+# 7.2.1.2
+ofp_port_desc_prop_header HH type length
+ofp_port_desc_prop_ethernet HH4x6I type==OFPPDPT_ETHERNET length:=32
+	curr advertised supported peer curr_speed max_speed
+ofp_port_desc_prop_optical HH4x7I2H type==OFPPDPT_OPTICAL length:=40
+	supported tx_min_freq_lmda tx_max_freq_lmda tx_grid_freq_lmda
+	rx_min_freq_lmda rx_max_freq_lmda rx_grid_freq_lmda tx_pwr_min
+	tx_pwr_max
+
+# 7.2.2.8
+ofp_oxm_experimenter_header II oxm_header experimenter
+
+# 7.2.3
+ofp_instruction_header HH type len
+ofp_instruction_goto_table HHB3x type==OFPIT_GOTO_TABLE len:=8 table_id
+ofp_instruction_write_metadata HH4xQQ type==OFPIT_WRITE_METADATA len:=24
+	metadata metadata_mask
+ofp_instruction_meter HHI type==OFPIT_METER len:=8 meter_id
+
+# 7.2.4
+ofp_action_header HH4x type len
+ofp_action_output HHIH6x type==OFPAT_OUTPUT len:=16 port max_len
+ofp_action_group HHI type==OFPAT_GROUP len:=8 group_id
+ofp_action_set_queue HHI type==OFPAT_SET_QUEUE len:=8 queue_id
+ofp_action_mpls_ttl HHB3x type==OFPAT_SET_MPLS_TTL len:=8 mpls_ttl
+ofp_action_generic HH4x type len:=8
+ofp_action_nw_ttl HHB3x type==OFPAT_SET_NW_TTL len:=8 nw_ttl
+ofp_action_push HHH2x type len:=8 ethertype
+ofp_action_pop_mpls HHH2x type==OFPAT_POP_MPLS len:=8 ethertype
+ofp_action_experimenter_header HHI type len experimenter
+
+# 7.3.4.1
+ofp_table_mod_prop_header HH type length
+ofp_table_mod_prop_eviction HHI type:=OFPTMPT_EVICTION length:=8 flags
+ofp_table_mod_prop_vacancy HH3Bx type:=OFPTMPT_VACANCY length:=8
+	vacancy_down vacancy_up vacancy
+
+# 7.3.4.4
+ofp_port_mod_prop_header HH type length
+ofp_port_mod_prop_ethernet HHI type:=OFPPMPT_ETHERNET length:=8 advertise
+ofp_port_mod_prop_optical HHIIiII type:=OFPPMPT_OPTICAL length:=24
+	configure freq_lmda fl_offset grid_span tx_pwr
+
+# 7.3.4.5
+ofp_meter_band_header HHII type len rate burst_size
+ofp_meter_band_drop HHII4x type==OFPMBT_DROP len:=16 rate burst_size
+ofp_meter_band_dscp_remark HHIIB3x type==OFPMBT_DSCP_REMARK len:=16 rate
+	burst_size prec_level
+
+# 7.3.5.1
+ofp_desc 256s256s256s32s256s mfr_desc=b"" hw_desc=b"" sw_desc=b""
+	serial_num=b"" dp_desc=b""
+
+# 7.3.5.3
+ofp_aggregate_stats_reply QQI4x packet_count byte_count flow_count
+
+# 7.3.5.4
+ofp_table_stats B3xIQQ table_id active_count lookup_count matched_count
+
+# 7.3.5.6.2
+ofp_table_feature_prop_header HH type length
+
+# 7.3.5.7
+ofp_port_stats_request I4x port_no=OFPP_ANY
+ofp_port_stats_prop_header HH type length
+ofp_port_stats_prop_ethernet HH4x4Q type:=OFPPSPT_ETHERNET length:=40
+	rx_frame_err rx_over_err rx_crc_err collisions
+ofp_port_stats_prop_optical HH4x7I4H type:=OFPPSPT_OPTICAL length:=44
+	flags tx_freq_lmda tx_offset tx_grid_span rx_freq_lmda rx_offset
+	rx_grid_span tx_pwr rx_pwr bias_current temperature
+
+# 7.3.5.9
+ofp_queue_stats_request II port_no=OFPP_ANY queue_id=OFPQ_ALL
+ofp_queue_stats_prop_header HH type length
+
+# 7.3.5.10
+ofp_queue_desc_request II port_no=OFPP_ANY queue_id=OFPQ_ALL
+ofp_queue_desc_prop_header HH type length
+ofp_queue_desc_prop_min_rate HHH2x type:=OFPQDPT_MIN_RATE length:=8 rate
+ofp_queue_desc_prop_max_rate HHH2x type:=OFPQDPT_MAX_RATE length:=8 rate
+
+# 7.3.5.11
+ofp_group_stats_request I4x group_id=OFPG_ALL
+ofp_bucket_counter QQ packet_count byte_count
+
+# 7.3.5.14
+ofp_meter_multipart_request I4x meter_id
+ofp_meter_band_stats QQ packet_band_count byte_band_count
+
+# 7.3.5.16
+ofp_meter_features 3IBB2x max_meter band_types capabilities max_bands max_color
+
+# 7.3.5.17.2
+ofp_flow_update_header HH length event
+ofp_flow_update_abbrev HHI length:=8 event:=OFPFME_ABBREV xid
+
+# 7.3.5.18
+ofp_experimenter_multipart_header II experimenter exp_type
+
+# 7.3.9.2
+ofp_bundle_prop_header HH type length
+
+# 7.3.10
+ofp_async_config_prop_header HH type length
+ofp_async_config_prop_reasons HHI type length:=8 mask
+
+# 7.4.4
+ofp_role_prop_header HH type length
+
+# 7.5.1
+ofp_hello_elem_header HH type length
+''', globals())
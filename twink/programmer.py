@@ -0,0 +1,156 @@
+'''
+Bulk flow programming
+
+FlowProgrammer sends flow_mods through a SyncChannel with a barrier
+request after every `batch` messages, and keeps at most `window` barriers
+unanswered instead of waiting for each round trip. OFPT_ERROR replies are
+mapped back to the flow_mod by xid.
+
+	programmer = FlowProgrammer(channel, batch=256, window=4)
+	result = programmer.program(flow_mods)
+	for (flow_mod, error) in result.errors:
+		...
+	result.rate # flow_mods per second
+
+With bundle=True on an OpenFlow 1.4 channel, each batch is sent as
+OFPT_BUNDLE_ADD_MESSAGE of one bundle, and the bundle commit takes the
+place of the barrier, so that a batch is applied as a whole.
+
+flow_mods are bytes, and should have distinct xids as errors are matched
+by xid.
+'''
+from __future__ import absolute_import
+import struct
+import time
+from collections import namedtuple, deque
+from .base import sched, ofp_header_only, hms_xid, SyncTracker, ChannelClose
+
+_xid = struct.Struct("!I")
+
+# count: flow_mods sent
+# errors: list of (message, OFPT_ERROR message). message is the flow_mod,
+#	or the bundle control message when the bundle failed as a whole.
+# elapsed: seconds
+# rate: flow_mods per second
+Result = namedtuple("Result", "count errors elapsed rate")
+
+class _ErrorTracker(object):
+	'''
+	stays in SyncChannel.syncs for the xid of a message until its batch
+	is acknowledged, and keeps OFPT_ERROR replies
+	'''
+	def __init__(self, xid, message, errors):
+		self.xid = xid
+		self.message = message
+		self.errors = errors
+
+	def put(self, message, last):
+		if message[1] == 1: # OFPT_ERROR
+			self.errors.append((self.message, message))
+
+	def cancel(self):
+		pass
+
+
+class FlowProgrammer(object):
+	def __init__(self, channel, **kwargs):
+		self.channel = channel
+		self.batch = kwargs.get("batch", 256)
+		self.window = kwargs.get("window", 4)
+		self.timeout = kwargs.get("timeout", 10)
+		self.bundle = kwargs.get("bundle", False)
+		self.bundle_flags = kwargs.get("bundle_flags", 1) # OFPBF_ATOMIC
+		self.bundle_id = 0
+
+	def program(self, flow_mods):
+		'''
+		sends all the flow_mods, and waits for them to be acknowledged
+		@return Result
+		'''
+		if self.bundle and self.channel.version != 5:
+			raise ValueError("bundle requires OpenFlow 1.4")
+
+		errors = []
+		pending = deque() # (done tracker, request, {xid: _ErrorTracker})
+		count = 0
+		start = time.time()
+		try:
+			batch = []
+			for message in flow_mods:
+				batch.append(message)
+				if len(batch) < self.batch:
+					continue
+				while len(pending) >= self.window:
+					self._wait(pending.popleft(), errors)
+				pending.append(self._send(batch, errors))
+				count += len(batch)
+				batch = []
+			if batch:
+				while len(pending) >= self.window:
+					self._wait(pending.popleft(), errors)
+				pending.append(self._send(batch, errors))
+				count += len(batch)
+			while pending:
+				self._wait(pending.popleft(), errors)
+		finally:
+			for p in pending:
+				self._unregister(p)
+
+		elapsed = time.time() - start
+		return Result(count, errors, elapsed, count/elapsed if elapsed > 0 else 0.0)
+
+	def _send(self, batch, errors):
+		channel = self.channel
+		trackers = {}
+		for message in batch:
+			(xid,) = _xid.unpack_from(message, 4)
+			trackers[xid] = _ErrorTracker(xid, message, errors)
+
+		if self.bundle:
+			from .ofp5 import build as b
+			self.bundle_id = (self.bundle_id + 1) & 0xffffffff
+			begin = b.ofp_bundle_ctrl_msg((5, None, None, hms_xid()), self.bundle_id,
+				b.OFPBCT_OPEN_REQUEST, self.bundle_flags, None)
+			request = b.ofp_bundle_ctrl_msg((5, None, None, hms_xid()), self.bundle_id,
+				b.OFPBCT_COMMIT_REQUEST, self.bundle_flags, None)
+			messages = [begin]
+			for message in batch:
+				messages.append(b.ofp_bundle_add_msg((5, None, None, _xid.unpack_from(message, 4)[0]),
+					self.bundle_id, self.bundle_flags, message, None))
+			messages.append(request)
+
+			x = _ErrorTracker(_xid.unpack_from(begin, 4)[0], begin, errors)
+			trackers[x.xid] = x
+		else:
+			request = ofp_header_only(20, version=channel.version) # OFPT_BARRIER_REQUEST
+			messages = batch + [request]
+
+		done = SyncTracker(_xid.unpack_from(request, 4)[0], sched.Event())
+		with channel.syncs_lock:
+			channel.syncs.update(trackers)
+			channel.syncs[done.xid] = done
+		channel.send(messages)
+		channel.flush()
+		return (done, request, trackers)
+
+	def _wait(self, item, errors):
+		(done, request, trackers) = item
+		try:
+			if not done.ev.wait(timeout=self.timeout):
+				raise ChannelClose("no response for %d messages" % len(trackers))
+			if not done.data:
+				raise ChannelClose("closed during programming")
+			if done.data[1] == 1: # OFPT_ERROR
+				errors.append((request, done.data))
+		finally:
+			self._unregister(item)
+
+	def _unregister(self, item):
+		(done, request, trackers) = item
+		syncs = self.channel.syncs
+		with self.channel.syncs_lock:
+			for xid, x in trackers.items():
+				if syncs.get(xid) is x:
+					del syncs[xid]
+			if syncs.get(done.xid) is done:
+				del syncs[done.xid]
@@ -0,0 +1,149 @@
+'''
+Flow table reconciliation
+
+Brings the flows of a switch to a desired set by sending only the
+difference, instead of reprogramming every flow after a reconnect.
+
+	r = Reconciler(channel, cookie=0xab00000000000000, cookie_mask=0xff00000000000000)
+	result = r.reconcile(flow_mods) # OFPFC_ADD flow_mods of the desired flows
+	(len(result.add), len(result.modify), len(result.delete))
+
+The current flows are taken by a flow stats request streamed through
+SyncChannel.stream(), within the table and cookie scope of the
+Reconciler, so that flows of other applications are left alone. Flows
+are compared by (table_id, priority, canonical match). A flow missing
+on the switch is added, a flow of other instructions is modified with
+OFPFC_MODIFY_STRICT, and a flow not desired is removed with
+OFPFC_DELETE_STRICT. A flow whose cookie, timeouts, flags or importance
+differ is added again, as MODIFY does not change them. The flow_mods
+are sent through FlowProgrammer in barriered batches; additions and
+modifications go before deletions.
+
+Instructions are compared as bytes, as the switch reports them.
+
+Reconciler blocks on the channel, and does not work under
+twink.use_asyncio(). diff() and diff_flow_mods() do not use a channel.
+'''
+from __future__ import absolute_import
+from collections import namedtuple
+from . import base
+from .flowtable import FlowTable, OFPTT_ALL, OFPP_ANY, OFPG_ANY
+from .programmer import FlowProgrammer
+
+# add, modify and delete are lists of Flow. programmed is the Result of
+# FlowProgrammer, or None when nothing was sent.
+Result = namedtuple("Result", "add modify delete programmed")
+
+def _ident(flow):
+	return (flow.table_id, flow.priority, flow.key)
+
+def diff(desired, actual):
+	'''
+	@param desired iterable of Flow, such as a FlowTable
+	@param actual iterable of Flow
+	@return (add, modify, delete) lists of Flow. add and modify are the
+		desired flows, and delete are the actual flows.
+	'''
+	have = dict([(_ident(f), f) for f in actual])
+	add = []
+	modify = []
+	for flow in desired:
+		old = have.pop(_ident(flow), None)
+		if old is None:
+			add.append(flow)
+		elif (old.cookie, old.idle_timeout, old.hard_timeout, old.flags, old.importance) != (
+				flow.cookie, flow.idle_timeout, flow.hard_timeout, flow.flags, flow.importance):
+			add.append(flow)
+		elif old.instructions != flow.instructions:
+			modify.append(flow)
+	return (add, modify, list(have.values()))
+
+def flow_mod(version, command, flow):
+	'''
+	@return flow_mod message of command for flow
+	'''
+	if version == 4:
+		from .ofp4 import build as b
+		return b.ofp_flow_mod(None, flow.cookie, 0, flow.table_id, command,
+			flow.idle_timeout, flow.hard_timeout, flow.priority, None, None, None,
+			flow.flags, flow.match, flow.instructions)
+	elif version == 5:
+		from .ofp5 import build as b
+		return b.ofp_flow_mod(None, flow.cookie, 0, flow.table_id, command,
+			flow.idle_timeout, flow.hard_timeout, flow.priority, None, None, None,
+			flow.flags, flow.importance, flow.match, flow.instructions)
+	raise ValueError("OpenFlow 1.3 or 1.4 is required")
+
+def diff_flow_mods(version, add, modify, delete):
+	'''
+	@return flow_mod messages which apply the diff
+	'''
+	ret = [flow_mod(version, 0, f) for f in add] # OFPFC_ADD
+	ret += [flow_mod(version, 2, f) for f in modify] # OFPFC_MODIFY_STRICT
+	ret += [flow_mod(version, 4, f) for f in delete] # OFPFC_DELETE_STRICT
+	return ret
+
+
+class Reconciler(object):
+	'''
+	channel is a SyncChannel. Other keyword arguments go to FlowProgrammer.
+	'''
+	def __init__(self, channel, **kwargs):
+		if base._use_asyncio:
+			raise ValueError("Reconciler blocks, and does not work with asyncio channels")
+		self.channel = channel
+		self.table_id = kwargs.pop("table_id", OFPTT_ALL)
+		self.cookie = kwargs.pop("cookie", 0)
+		self.cookie_mask = kwargs.pop("cookie_mask", 0)
+		self.maxsize = kwargs.pop("maxsize", 16)
+		self.timeout = kwargs.pop("timeout", 10)
+		self.programmer = FlowProgrammer(channel, **kwargs)
+
+	def request(self):
+		'''
+		@return flow stats request of the scope
+		'''
+		version = self.channel.version
+		if version == 4:
+			from .ofp4 import build as b
+		elif version == 5:
+			from .ofp5 import build as b
+		else:
+			raise ValueError("OpenFlow 1.3 or 1.4 is required")
+		return b.ofp_multipart_request((version, None, None, None), b.OFPMP_FLOW, 0,
+			b.ofp_flow_stats_request(self.table_id, OFPP_ANY, OFPG_ANY, self.cookie, self.cookie_mask, None))
+
+	def actual(self):
+		'''
+		@return list of Flow in the scope, streamed from the switch
+		'''
+		table = FlowTable(self.channel.version)
+		return list(self.channel.stream(self.request(), entries=table.flow_stats,
+			maxsize=self.maxsize, timeout=self.timeout))
+
+	def desired(self, flow_mods):
+		'''
+		@return FlowTable of the flows which the flow_mods add, in the scope
+		'''
+		table = FlowTable(self.channel.version)
+		for message in flow_mods:
+			table.flow_mod(message)
+		for flow in list(table):
+			if flow.cookie & self.cookie_mask != self.cookie & self.cookie_mask:
+				raise ValueError("cookie %x is out of the scope" % flow.cookie)
+			if self.table_id not in (OFPTT_ALL, flow.table_id):
+				raise ValueError("table %d is out of the scope" % flow.table_id)
+		return table
+
+	def reconcile(self, flow_mods):
+		'''
+		@param flow_mods OFPFC_ADD flow_mod messages of the desired flows
+		@return Result
+		'''
+		want = self.desired(flow_mods)
+		(add, modify, delete) = diff(want, self.actual())
+		messages = diff_flow_mods(self.channel.version, add, modify, delete)
+		programmed = None
+		if messages:
+			programmed = self.programmer.program(messages)
+		return Result(add, modify, delete, programmed)
@@ -0,0 +1,142 @@
+from __future__ import absolute_import
+import asyncio
+import inspect
+import logging
+import signal
+import subprocess
+import socket
+import threading
+
+__all__="subprocess socket Queue Lock Event spawn wait serve_forever Pool".split()
+
+# Channel state locks are never held across await, so a plain lock
+# works for the code running in the event loop thread.
+Lock = threading.RLock
+Event = asyncio.Event
+Queue = asyncio.Queue
+
+def spawn(func, *args, **kwargs):
+	'''
+	Runs func as a task of the running event loop. If func returns an
+	awaitable, the task waits for it.
+	'''
+	async def run():
+		try:
+			ret = func(*args, **kwargs)
+			if inspect.isawaitable(ret):
+				ret = await ret
+			return ret
+		except Exception:
+			logging.warn("fail in task", exc_info=True)
+			raise
+	return asyncio.ensure_future(run())
+
+def wait(event, timeout=None):
+	'''
+	Waits for the event at most timeout seconds in a task, as the loop
+	can not block. The task results in True if the event was set.
+	'''
+	async def run():
+		try:
+			await asyncio.wait_for(event.wait(), timeout)
+		except asyncio.TimeoutError:
+			pass
+		return event.is_set()
+	return asyncio.ensure_future(run())
+
+
+class Pool(object):
+	'''
+	Fixed number of worker tasks, same interface as sched_basic.Pool.
+	Workers are started on the running loop by the first submit().
+	'''
+	def __init__(self, size=8, maxsize=1024):
+		self.size = size
+		self.maxsize = maxsize
+		self.rejected = 0
+		self.lock = Lock()
+		self.queues = [Queue() for i in range(size)]
+		self.workers = None
+	
+	async def _work(self, queue):
+		while True:
+			job = await queue.get()
+			if job is None:
+				break
+			func, args, kwargs = job
+			try:
+				ret = func(*args, **kwargs)
+				if inspect.isawaitable(ret):
+					await ret
+			except Exception:
+				logging.warn("fail in pool worker", exc_info=True)
+	
+	@property
+	def depth(self):
+		return sum([q.qsize() for q in self.queues])
+	
+	def submit(self, func, args=(), kwargs={}, key=None, block=False):
+		'''
+		block=True accepts the job over maxsize, as the loop can not wait here.
+		@return False if the job was rejected
+		'''
+		if self.workers is None:
+			self.workers = [asyncio.ensure_future(self._work(q)) for q in self.queues]
+		if key is None:
+			queue = min(self.queues, key=lambda q: q.qsize())
+		else:
+			queue = self.queues[hash(key) % self.size]
+		if not block and queue.qsize() >= self.maxsize:
+			with self.lock:
+				self.rejected += 1
+			return False
+		queue.put_nowait((func, args, kwargs))
+		return True
+	
+	def spawn(self, func, *args, **kwargs):
+		return self.submit(func, args, kwargs)
+	
+	def stop(self):
+		for queue in self.queues:
+			queue.put_nowait(None)
+
+
+def serve_forever(*servers, **opts):
+	async def main():
+		ev = opts.get("main")
+		if not ev:
+			ev = Event()
+			asyncio.get_running_loop().add_signal_handler(signal.SIGINT, ev.set)
+		
+		for serv in servers:
+			ret = serv.start()
+			if inspect.isawaitable(ret):
+				await ret
+		
+		try:
+			await ev.wait()
+		finally:
+			for serv in servers:
+				ret = serv.stop()
+				if inspect.isawaitable(ret):
+					await ret
+	
+	asyncio.run(main())
+
+
+if __name__=="__main__":
+	async def main():
+		with Lock():
+			r = spawn(lambda x: x, 1)
+			assert await r == 1
+		
+		e = Event()
+		async def remote():
+			e.set()
+		r = spawn(remote)
+		await asyncio.wait_for(e.wait(), 0.5)
+		assert await r == None
+		assert await wait(e, 0.1)
+		assert not await wait(Event(), 0.1)
+	
+	asyncio.run(main())
@@ -5,11 +5,11 @@ import signal
 import subprocess
 import socket
 try:
-	from queue import Queue
+	from queue import Queue, Full
 except ImportError:
-	from Queue import Queue
+	from Queue import Queue, Full
 
-__all__="subprocess socket Queue Lock Event spawn serve_forever".split()
+__all__="subprocess socket Queue Lock Event spawn wait serve_forever Pool".split()
 
 Lock = threading.RLock
 Event = threading.Event
@@ -53,6 +53,80 @@ def spawn(func, *args, **kwargs):
 	th.start()
 	return th
 
+def wait(event, timeout=None):
+	'''
+	@return True if the event was set within timeout seconds
+	'''
+	return event.wait(timeout)
+
+
+class Pool(object):
+	'''
+	Fixed number of workers, each with a bounded job queue.
+	
+	Jobs submitted with the same key go to the same worker, so they run 
+	in the submitted order. Jobs without key go to the shortest queue.
+	When the queue is full, submit() returns False and counts it in 
+	`rejected`, or waits with block=True.
+	'''
+	_queue = Queue
+	_lock = Lock
+	
+	def __init__(self, size=8, maxsize=1024):
+		self.size = size
+		self.maxsize = maxsize
+		self.rejected = 0
+		self.lock = self._lock()
+		self.queues = [self._queue(maxsize) for i in range(size)]
+		self.workers = [self._start(q) for q in self.queues]
+	
+	def _start(self, queue):
+		th = threading.Thread(target=self._work, args=(queue,))
+		th.daemon = True
+		th.start()
+		return th
+	
+	def _work(self, queue):
+		while True:
+			job = queue.get()
+			if job is None:
+				break
+			func, args, kwargs = job
+			try:
+				func(*args, **kwargs)
+			except Exception:
+				logging.warn("fail in pool worker", exc_info=True)
+	
+	@property
+	def depth(self):
+		'''
+		number of jobs waiting in the queues
+		'''
+		return sum([q.qsize() for q in self.queues])
+	
+	def submit(self, func, args=(), kwargs={}, key=None, block=False):
+		'''
+		@return False if the job was rejected
+		'''
+		if key is None:
+			queue = min(self.queues, key=lambda q: q.qsize())
+		else:
+			queue = self.queues[hash(key) % self.size]
+		try:
+			queue.put((func, args, kwargs), block)
+		except Full:
+			with self.lock:
+				self.rejected += 1
+			return False
+		return True
+	
+	def spawn(self, func, *args, **kwargs):
+		return self.submit(func, args, kwargs)
+	
+	def stop(self):
+		for queue in self.queues:
+			queue.put(None)
+
 
 def serve_forever(*servers, **opts):
 	ev = opts.get("main")
@@ -83,4 +157,15 @@ if __name__=="__main__":
 	assert e.wait(0.5)
 	assert r.get() == None
 	r.join()
+	
+	p = Pool(1, 1)
+	started = Event()
+	e = Event()
+	p.submit(lambda: started.set() or e.wait())
+	assert started.wait(0.5)
+	assert p.submit(e.wait)
+	assert not p.submit(e.wait)
+	assert p.rejected == 1 and p.depth == 1
+	e.set()
+	p.stop()
 
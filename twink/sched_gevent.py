@@ -5,8 +5,18 @@ from gevent.queue import Queue
 from gevent.event import Event
 from gevent.lock import Semaphore as Lock
 from gevent import spawn
+from . import sched_basic
+from .sched_basic import wait
 
-__all__="subprocess socket Queue Lock Event spawn serve_forever".split()
+__all__="subprocess socket Queue Lock Event spawn wait serve_forever Pool".split()
+
+
+class Pool(sched_basic.Pool):
+	_queue = Queue
+	_lock = Lock
+	
+	def _start(self, queue):
+		return spawn(self._work, queue)
 
 
 def serve_forever(*servers, **opts):
@@ -0,0 +1,132 @@
+'''
+Parse and build functions generated from a structure schema
+
+A schema is lines of structure name, struct format and field names. Lines
+starting with whitespace continue the previous line, and # starts a
+comment.
+
+	ofp_action_output HHIH6x type==OFPAT_OUTPUT len:=16 port max_len
+
+A field may have a default expression, which the builder uses:
+
+	name=EXPR   EXPR when the argument is None
+	name==EXPR  EXPR when the argument is None, and asserts the value
+	name:=EXPR  always EXPR, such as the length of a fixed structure
+
+Expressions are evaluated in the namespace given to Schema, which is
+usually the constants of the protocol version.
+
+	schema = Schema(text, globals())
+	ofp_action_output = schema.parser("ofp_action_output")
+
+parser() returns fn(message, offset) which returns a namedtuple record, and
+advances offset if it is a cursor. builder() returns fn(*fields) which
+returns the packed bytes, and builder_into() returns fn(buf, offset,
+*fields) which packs into buf and returns the size. They are compiled as
+straight-line code with one precompiled struct.Struct, and the number of
+the fields is checked against the format when the schema is loaded.
+'''
+from __future__ import absolute_import
+import re
+import struct
+from collections import namedtuple
+
+Field = namedtuple("Field", "name op expr")
+
+def _fields(words):
+	ret = []
+	for word in words:
+		m = re.match(r"^(\w+)(?:(:=|==|=)(.+))?$", word)
+		if m is None:
+			raise ValueError("bad field %s" % word)
+		ret.append(Field(*m.groups()))
+	return ret
+
+def _lines(text):
+	lines = []
+	for line in text.splitlines():
+		line = line.partition("#")[0]
+		if not line.strip():
+			continue
+		if line[0].isspace() and lines:
+			lines[-1] += " " + line.strip()
+		else:
+			lines.append(line.strip())
+	return lines
+
+_parser_template = '''
+def _make(_new, _record, _unpack_from):
+	def {name}(message, offset):
+		if offset.__class__ is int:
+			return _new(_record, _unpack_from(message, offset))
+		ret = _new(_record, _unpack_from(message, offset.offset))
+		offset.offset += {size}
+		return ret
+	return {name}
+'''
+
+_builder_template = '''
+def _make(_pack):
+	def {name}({args}):
+{body}		return _pack({args})
+	return {name}
+'''
+
+_builder_into_template = '''
+def _make(_pack_into):
+	def {name}_into(buf, offset, {args}):
+{body}		_pack_into(buf, offset, {args})
+		return {size}
+	return {name}_into
+'''
+
+class Schema(object):
+	def __init__(self, text, namespace):
+		self.namespace = dict(namespace)
+		self.entries = {} # name -> (struct.Struct, [Field])
+		self.records = {}
+		for line in _lines(text):
+			words = line.split()
+			(name, fmt, fields) = (words[0], words[1], _fields(words[2:]))
+			s = struct.Struct("!"+fmt)
+			if len(s.unpack(b"\0"*s.size)) != len(fields):
+				raise ValueError("%s has %d fields for %s" % (name, len(fields), fmt))
+			self.entries[name] = (s, fields)
+			self.records[name] = namedtuple(name, [f.name for f in fields])
+
+	def _compile(self, name, source):
+		code = compile(source, "<schema %s>" % name, "exec")
+		namespace = dict(self.namespace)
+		exec(code, namespace)
+		return namespace["_make"]
+
+	def parser(self, name):
+		(s, fields) = self.entries[name]
+		make = self._compile(name, _parser_template.format(name=name, size=s.size))
+		func = make(tuple.__new__, self.records[name], s.unpack_from)
+		func.record = self.records[name]
+		return func
+
+	def builder(self, name):
+		(s, fields) = self.entries[name]
+		make = self._compile(name, self._builder_source(_builder_template, name))
+		return make(s.pack)
+
+	def builder_into(self, name):
+		(s, fields) = self.entries[name]
+		make = self._compile(name, self._builder_source(_builder_into_template, name))
+		return make(s.pack_into)
+
+	def _builder_source(self, template, name):
+		(s, fields) = self.entries[name]
+		body = []
+		for f in fields:
+			if f.op == "=":
+				body.append("if {0} is None:\n\t{0} = {1}".format(f.name, f.expr))
+			elif f.op == "==":
+				body.append("if {0} is None:\n\t{0} = {1}\nassert {0} == {1}".format(f.name, f.expr))
+			elif f.op == ":=":
+				body.append("{0} = {1}".format(f.name, f.expr))
+		body = "".join(["\t\t%s\n" % line for line in "\n".join(body).splitlines()])
+		args = ", ".join([f.name for f in fields])
+		return template.format(name=name, args=args, body=body, size=s.size)
@@ -0,0 +1,282 @@
+'''
+Periodic statistics polling
+
+StatsPoller polls port, flow, group and meter statistics of SyncChannel
+datapaths (OpenFlow 1.3 or 1.4), and keeps counter deltas and rates
+between the latest two samples of each datapath.
+
+	poller = StatsPoller(interval=5.0)
+	poller.start()
+	poller.add(channel)
+	...
+	r = poller.rates(channel.datapath, "port")
+	dict(zip(r.keys, r.rate["rx_bytes"])) # bytes per second by port_no
+
+Replies are decoded by ofp4.stats_np or ofp5.stats_np, and all the rows of
+a sample are computed at once. numpy is required for this module.
+'''
+from __future__ import absolute_import
+import heapq
+import logging
+import random
+import time
+from collections import namedtuple
+import numpy as np
+from .base import sched, ChannelClose
+
+counters = {
+	"port": '''rx_packets tx_packets rx_bytes tx_bytes
+		rx_dropped tx_dropped rx_errors tx_errors'''.split(),
+	"flow": ["packet_count", "byte_count"],
+	"group": ["packet_count", "byte_count"],
+	"meter": ["packet_in_count", "byte_in_count"],
+}
+
+_unsupported = np.uint64(0xffffffffffffffff) # counters not supported by the switch
+
+# keys: port_no, group_id or meter_id array, or list of
+#	(table_id, priority, cookie, match) for flows
+# counters: uint64 array of (rows, counters)
+# duration: float seconds of the rows
+Sample = namedtuple("Sample", "time keys counters duration")
+
+# delta and rate are structured arrays which have the counters as fields,
+# NaN for the rows which were not in the previous sample and for counters
+# not supported. interval is the seconds of the rows.
+Rates = namedtuple("Rates", "time keys interval delta rate")
+
+def _modules(version):
+	if version == 4:
+		from .ofp4 import build, stats_np
+	elif version == 5:
+		from .ofp5 import build, stats_np
+	else:
+		raise ValueError("OpenFlow 1.3 or 1.4 is required")
+	return (build, stats_np)
+
+def request(version, kind):
+	'''
+	@return multipart request message which queries all the entries
+	'''
+	(b, s) = _modules(version)
+	if kind == "port":
+		(mptype, body) = (b.OFPMP_PORT_STATS, b.ofp_port_stats_request(None))
+	elif kind == "flow":
+		(mptype, body) = (b.OFPMP_FLOW, b.ofp_flow_stats_request(None, None, None, None, None, None))
+	elif kind == "group":
+		(mptype, body) = (b.OFPMP_GROUP, b.ofp_group_stats_request(None))
+	elif kind == "meter":
+		(mptype, body) = (b.OFPMP_METER, b.ofp_meter_multipart_request(b.OFPM_ALL))
+	else:
+		raise ValueError(kind)
+	return b.ofp_multipart_request((version, None, None, None), mptype, 0, body)
+
+def sample(version, kind, data, now=None):
+	'''
+	decodes multipart reply data into a Sample
+	'''
+	(b, s) = _modules(version)
+	if kind == "port":
+		rows = s.port_stats(data)
+		if isinstance(rows, tuple): # OpenFlow 1.4 has offsets
+			rows = rows[0]
+		keys = rows["port_no"]
+	elif kind == "flow":
+		(rows, offsets) = s.flow_stats(data)
+		keys = list(zip(rows["table_id"].tolist(), rows["priority"].tolist(), rows["cookie"].tolist(),
+			[bytes(s.flow_match(data, o)) for o in offsets.tolist()]))
+	elif kind == "group":
+		(rows, offsets) = s.group_stats(data)
+		keys = rows["group_id"]
+	elif kind == "meter":
+		(rows, offsets) = s.meter_stats(data)
+		keys = rows["meter_id"]
+	else:
+		raise ValueError(kind)
+
+	values = np.empty((len(rows), len(counters[kind])), np.uint64)
+	for i, name in enumerate(counters[kind]):
+		values[:,i] = rows[name]
+	nsec = rows["duration_nsec"].astype(np.float64)
+	nsec[nsec >= 1e9] = 0 # not supported
+	duration = rows["duration_sec"] + nsec * 1e-9
+	return Sample(time.time() if now is None else now, keys, values, duration)
+
+def _align(prev_keys, keys):
+	'''
+	@return positions of keys in prev_keys, -1 for missing
+	'''
+	if len(prev_keys) == 0:
+		return np.full(len(keys), -1, np.intp)
+	if isinstance(keys, np.ndarray):
+		order = np.argsort(prev_keys, kind="mergesort")
+		ordered = prev_keys[order]
+		pos = np.minimum(np.searchsorted(ordered, keys), len(ordered)-1)
+		return np.where(ordered[pos] == keys, order[pos], -1)
+	table = dict(zip(prev_keys, range(len(prev_keys))))
+	return np.fromiter((table.get(k, -1) for k in keys), np.intp, len(keys))
+
+def delta_rates(prev, cur, names):
+	'''
+	Computes Rates of cur rows against prev. Counters are unsigned 64 bit,
+	so a wrapped counter gives the right delta by modular subtraction.
+	A row whose duration went back is taken as restarted, and counted from
+	zero. The interval of a row is taken from duration, or the sample time
+	when duration is not supported.
+	'''
+	pos = _align(prev.keys, cur.keys)
+	found = pos >= 0
+	pos = np.where(found, pos, 0)
+
+	if len(prev.keys):
+		base = prev.counters[pos]
+		interval = cur.duration - prev.duration[pos]
+	else:
+		base = np.zeros_like(cur.counters)
+		interval = np.zeros(len(cur.keys))
+
+	restart = interval < 0
+	base[restart] = 0
+	interval[restart] = cur.duration[restart]
+	interval[interval <= 0] = cur.time - prev.time
+	interval[~found] = np.nan
+
+	delta = (cur.counters - base).astype(np.float64) # modulo 2**64
+	delta[(cur.counters == _unsupported) | (base == _unsupported)] = np.nan
+	delta[~found] = np.nan
+	with np.errstate(divide="ignore", invalid="ignore"):
+		rate = delta / interval[:,None]
+
+	dtype = np.dtype([(name, np.float64) for name in names])
+	return Rates(cur.time, cur.keys, interval,
+		np.ascontiguousarray(delta).view(dtype).reshape(-1),
+		np.ascontiguousarray(rate).view(dtype).reshape(-1))
+
+
+class StatsPoller(object):
+	'''
+	Polls the registered datapaths every interval seconds. Polls are
+	spread over the interval and run in a sched.Pool, with all the kinds
+	of one datapath sent through one SyncChannel.multi() call. A datapath
+	whose previous poll has not finished is skipped, and counted in
+	`skipped`, so that a slow switch does not pile up the others.
+	'''
+	def __init__(self, **kwargs):
+		self.interval = kwargs.get("interval", 5.0)
+		self.kinds = kwargs.get("kinds", ("port", "flow", "group", "meter"))
+		self.pool = kwargs.get("pool")
+		self._own_pool = self.pool is None
+		if self._own_pool:
+			self.pool = sched.Pool(kwargs.get("workers", 32))
+		self.lock = sched.Lock()
+		self.wakeup = sched.Event()
+		self.closed = False
+		self.skipped = 0
+		self.channels = {} # datapath -> channel
+		self.samples = {} # (datapath, kind) -> Sample
+		self.results = {} # (datapath, kind) -> Rates
+		self.busy = set()
+		self.due = [] # heap of (time, datapath)
+		self.due_at = {} # datapath -> time
+
+	def start(self):
+		sched.spawn(self.run)
+
+	def stop(self):
+		self.closed = True
+		self.wakeup.set()
+		if self._own_pool:
+			self.pool.stop()
+
+	def add(self, channel):
+		datapath = channel.datapath
+		due = time.time() + random.uniform(0, self.interval)
+		with self.lock:
+			self.channels[datapath] = channel
+			self.due_at[datapath] = due
+			heapq.heappush(self.due, (due, datapath))
+		self.wakeup.set()
+
+	def remove(self, datapath):
+		with self.lock:
+			self.channels.pop(datapath, None)
+			self.due_at.pop(datapath, None)
+			for kind in self.kinds:
+				self.samples.pop((datapath, kind), None)
+				self.results.pop((datapath, kind), None)
+
+	def rates(self, datapath, kind):
+		'''
+		@return the latest Rates, or None before two samples are taken
+		'''
+		return self.results.get((datapath, kind))
+
+	def rate(self, datapath, kind, key):
+		'''
+		@return {counter: rate} of the entry, or None
+		'''
+		r = self.results.get((datapath, kind))
+		if r is None:
+			return None
+		pos = _align(r.keys, np.asarray([key]) if isinstance(r.keys, np.ndarray) else [key])[0]
+		if pos < 0:
+			return None
+		return dict(zip(r.rate.dtype.names, r.rate[pos].tolist()))
+
+	def run(self):
+		while not self.closed:
+			self.wakeup.clear()
+			now = time.time()
+			jobs = []
+			with self.lock:
+				while self.due and self.due[0][0] <= now:
+					(due, datapath) = heapq.heappop(self.due)
+					if self.due_at.get(datapath) != due:
+						continue # removed or added again
+					due += self.interval
+					if due <= now: # fell behind, do not burst
+						due = now + self.interval
+					self.due_at[datapath] = due
+					heapq.heappush(self.due, (due, datapath))
+					if datapath in self.busy:
+						self.skipped += 1
+					else:
+						self.busy.add(datapath)
+						jobs.append(datapath)
+				wait = self.due[0][0] - now if self.due else self.interval
+
+			for datapath in jobs:
+				if not self.pool.submit(self.poll, (datapath,)):
+					with self.lock:
+						self.busy.discard(datapath)
+						self.skipped += 1
+			self.wakeup.wait(max(wait, 0))
+
+	def poll(self, datapath):
+		try:
+			channel = self.channels.get(datapath)
+			if channel is None:
+				return
+			replies = channel.multi([request(channel.version, kind) for kind in self.kinds])
+			now = time.time()
+			for kind, data in zip(self.kinds, replies):
+				if not data or data[1] != 19: # OFPT_MULTIPART_REPLY
+					continue # not supported by the switch
+				self.update(datapath, kind, sample(channel.version, kind, data, now))
+		except ChannelClose:
+			logging.debug("stats poll of %x failed" % datapath, exc_info=True)
+			if channel.closed:
+				self.remove(datapath)
+		finally:
+			with self.lock:
+				self.busy.discard(datapath)
+
+	def update(self, datapath, kind, cur):
+		key = (datapath, kind)
+		with self.lock:
+			if datapath not in self.channels:
+				return
+			prev = self.samples.get(key)
+			self.samples[key] = cur
+		if prev is not None:
+			self.results[key] = delta_rates(prev, cur, counters[kind])
@@ -0,0 +1,130 @@
+'''
+Flow_mod templates
+
+A template is a flow_mod message built once by ofp4.build.ofp_flow_mod or
+ofp5.build.ofp_flow_mod, with placeholder values in the match fields which
+vary. Instances are stamped out by copying the message and patching xid,
+cookie and the named OXM fields at the offsets recorded from the template.
+The match and the instructions are not rebuilt.
+
+	match = ofp_match(None, None, [
+		oxm.build(None, oxm.OXM_OF_IN_PORT, None, None, 0),
+		oxm.build(None, oxm.OXM_OF_ETH_DST, None, None, b"\0"*6)])
+	t = FlowModTemplate(ofp_flow_mod(None, 0, 0, 0, OFPFC_ADD,
+		0, 0, 10, None, None, None, 0, match, instructions), "in_port", "eth_dst")
+	channel.send(t((3, mac), cookie=7))
+
+Values are given in the order of the names, in the form oxm.build takes.
+A masked field keeps the mask of the template, and the value is masked
+with it, as OpenFlow requires the bits out of the mask to be zero.
+'''
+from __future__ import absolute_import
+import struct
+from .ofp4.oxm import _and
+
+_header = struct.Struct("!BBHI")
+_xid = struct.Struct("!I")
+_cookie = struct.Struct("!Q")
+_match = struct.Struct("!HH")
+_oxm = struct.Struct("!HBB")
+
+MATCH_OFFSET = 48 # ofp_header and the fixed part of ofp_flow_mod
+COOKIE_OFFSET = 8
+
+def _modules(version):
+	if version == 4:
+		from .ofp4 import build, oxm
+	elif version == 5:
+		from .ofp5 import build, oxm
+	else:
+		raise ValueError("OpenFlow 1.3 or 1.4 is required")
+	return (build, oxm)
+
+def oxm_offsets(message, offset=MATCH_OFFSET):
+	'''
+	@param offset position of ofp_match in message
+	@return {oxm_field: (value offset, value length, hasmask)} of
+		OFPXMC_OPENFLOW_BASIC fields in the match
+	'''
+	(type, length) = _match.unpack_from(message, offset)
+	ret = {}
+	end = offset + length
+	offset += 4
+	while offset < end:
+		(oxm_class, p, oxm_length) = _oxm.unpack_from(message, offset)
+		if oxm_class == 0x8000: # OFPXMC_OPENFLOW_BASIC
+			hasmask = p & 1
+			ret[p>>1] = (offset+4, oxm_length//2 if hasmask else oxm_length, hasmask)
+		offset += 4 + oxm_length
+	return ret
+
+class FlowModTemplate(object):
+	'''
+	names are OXM field names like "eth_dst" (OXM_OF_ETH_DST) or the
+	oxm_field numbers.
+	'''
+	def __init__(self, message, *names):
+		(version, oftype, length, xid) = _header.unpack_from(message, 0)
+		(build, oxm) = _modules(version)
+		if oftype != build.OFPT_FLOW_MOD:
+			raise ValueError("not a flow_mod")
+
+		self.message = bytes(message[:length])
+		self.version = version
+		self.names = names
+		self.build = build
+
+		fields = oxm_offsets(self.message)
+		self.patches = [] # (oxm offset, pack_into, oxm header, mask or None)
+		for name in names:
+			if isinstance(name, int):
+				oxm_field = name
+			else:
+				oxm_field = getattr(oxm, "OXM_OF_"+name.upper(), None)
+			if oxm_field not in fields:
+				raise ValueError("%s is not in the match" % (name,))
+			(offset, size, hasmask) = fields[oxm_field]
+			c = oxm.lookup(oxm.OFPXMC_OPENFLOW_BASIC, oxm_field, hasmask)
+			assert c.length == size * (2 if hasmask else 1)
+			header = _oxm.unpack_from(self.message, offset-4)
+			mask = None
+			if hasmask:
+				mask = c.decode(self.message, offset-4).oxm_mask
+			self.patches.append((offset-4, c.struct.pack_into, header, mask))
+
+	def __len__(self):
+		return len(self.message)
+
+	def __call__(self, values, xid=None, cookie=None):
+		'''
+		@return flow_mod message bytes
+		'''
+		buf = bytearray(self.message)
+		self._patch(buf, 0, values, xid, cookie)
+		return bytes(buf)
+
+	def into(self, buf, offset, values, xid=None, cookie=None):
+		'''
+		writes a flow_mod message into buf at offset
+		@return the bytes written
+		'''
+		length = len(self.message)
+		if len(buf) < offset + length:
+			raise ValueError("buffer too small")
+		buf[offset:offset+length] = self.message
+		self._patch(buf, offset, values, xid, cookie)
+		return length
+
+	def _patch(self, buf, offset, values, xid, cookie):
+		if len(values) != len(self.patches):
+			raise ValueError("%d values for %d fields" % (len(values), len(self.patches)))
+		if xid is None:
+			xid = self.build.default_xid()
+		_xid.pack_into(buf, offset+4, xid)
+		if cookie is not None:
+			_cookie.pack_into(buf, offset+COOKIE_OFFSET, cookie)
+		for (field_offset, pack_into, (c, p, length), mask), value in zip(self.patches, values):
+			if mask is None:
+				pack_into(buf, offset+field_offset, c, p, length, value)
+			else:
+				pack_into(buf, offset+field_offset, c, p, length, _and(value, mask), mask)